@@ -184,49 +184,16 @@ register_error_handlers(app)
 # Initialize request logging for monitoring
 request_logger = RequestLogger(app)
 
-# JWT Token Blacklist for secure logout
-# Uses Redis if available, falls back to in-memory set (not suitable for multi-worker production)
-jwt_blacklist = set()
-
-# Try to use Redis for blacklist if available
-try:
-    import redis
-    REDIS_URL = os.getenv('REDIS_URL')
-    if REDIS_URL:
-        redis_client = redis.from_url(REDIS_URL)
-        redis_client.ping()  # Test connection
-        USE_REDIS_BLACKLIST = True
-        logging.info("JWT blacklist using Redis storage")
-    else:
-        USE_REDIS_BLACKLIST = False
-        redis_client = None
-        logging.warning("JWT blacklist using in-memory storage - not suitable for production with multiple workers")
-except Exception as e:
-    USE_REDIS_BLACKLIST = False
-    redis_client = None
-    logging.warning(f"Redis not available for JWT blacklist, using in-memory: {e}")
-
-
-def add_token_to_blacklist(jti, expires_in_seconds=3600):
-    """Add a token JTI to the blacklist"""
-    if USE_REDIS_BLACKLIST and redis_client:
-        redis_client.setex(f"jwt_blacklist:{jti}", expires_in_seconds, "1")
-    else:
-        jwt_blacklist.add(jti)
-
-
-def is_token_blacklisted(jti):
-    """Check if a token JTI is blacklisted"""
-    if USE_REDIS_BLACKLIST and redis_client:
-        return redis_client.get(f"jwt_blacklist:{jti}") is not None
-    return jti in jwt_blacklist
+# JWT revocation for secure logout: local bloom filters per worker, shared through Redis when configured
+from services import token_revocation
+# Guest sessions are cached in Redis; purchases must refresh the cached copy
+from services import guest_admission
 
 
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
     """Check if the token has been revoked"""
-    jti = jwt_payload.get("jti")
-    return is_token_blacklisted(jti)
+    return token_revocation.is_revoked(jwt_payload.get("jti"), jwt_payload.get("exp"))
 
 
 # Handle OPTIONS requests for CORS preflight - bypass authentication
@@ -310,6 +277,13 @@ def set_security_headers(response):
     return response
 
 
+# Release the AI queue slot taken by admission control (after streamed responses finish)
+@app.teardown_request
+def release_ai_queue_slot(exc):
+    from services import ai_queue
+    ai_queue.release_request_slot()
+
+
 # Import models from models.py (single source of truth)
 from models import User, Analysis, GuestSession, GuestAnalysis, Purchase, Feedback, JobApplication
 
@@ -399,7 +373,14 @@ def auto_migrate():
                 # AI-generated content columns for Analysis table
                 'ALTER TABLE analyses ADD COLUMN IF NOT EXISTS optimized_resume TEXT;',
                 'ALTER TABLE analyses ADD COLUMN IF NOT EXISTS optimized_feedback TEXT;',
-                'ALTER TABLE analyses ADD COLUMN IF NOT EXISTS cover_letter TEXT;'
+                'ALTER TABLE analyses ADD COLUMN IF NOT EXISTS cover_letter TEXT;',
+                # Salary quantile sketch per market rollup cell
+                'ALTER TABLE skill_demand_daily ADD COLUMN IF NOT EXISTS salary_digest JSON;',
+                # Industry dimension ids (backfilled by the market rollup refresh)
+                'ALTER TABLE job_posting_keyword ADD COLUMN IF NOT EXISTS industry_id INTEGER REFERENCES industries(id);',
+                'ALTER TABLE skill_demand_daily ADD COLUMN IF NOT EXISTS industry_id INTEGER REFERENCES industries(id);',
+                'CREATE INDEX IF NOT EXISTS idx_job_posting_keyword_industry_id ON job_posting_keyword (industry_id, extracted_at);',
+                'CREATE INDEX IF NOT EXISTS idx_skill_demand_industry_day ON skill_demand_daily (industry_id, day);'
             ]
             for command in commands:
                 db.session.execute(text(command))
@@ -470,6 +451,9 @@ def init_default_configurations():
             db.session.rollback()
             logging.error(f"Error initializing configurations: {str(e)}")
 
+        # Load the configuration snapshot once at startup
+        config_manager.reload()
+
 
 init_default_configurations()
 
@@ -529,6 +513,10 @@ def transfer_guest_analyses_to_user(guest_token, user_id):
 
         db.session.commit()
         logging.info(f"Transferred {transferred_count} analyses from guest session {guest_session.id} to user {user_id}")
+
+        if transferred_count:
+            from services.user_profile_service import rebuild_profile
+            rebuild_profile(user_id)
         return transferred_count
 
     except Exception as e:
@@ -1213,8 +1201,8 @@ def logout():
         jti = jwt_data.get("jti")
 
         if jti:
-            # Blacklist for 1 hour (same as access token expiry)
-            add_token_to_blacklist(jti, expires_in_seconds=3600)
+            # Revoked until the token would have expired anyway
+            token_revocation.revoke(jti, jwt_data.get("exp"))
 
         user_id = get_jwt_identity()
         logging.info(f"User {user_id} logged out, token blacklisted")
@@ -1226,7 +1214,6 @@ def logout():
 
 @app.route('/api/analyze', methods=['POST'])
 @jwt_required()
-@limiter.limit("10 per hour")  # Limit resume analyses
 def analyze_resume():
     try:
         user_id = int(get_jwt_identity())
@@ -1235,21 +1222,12 @@ def analyze_resume():
         logging.error(f"JWT Error: {str(e)}")
         return jsonify({'error': 'Authentication error'}), 401
 
-    # Check abuse patterns
-    from abuse_prevention import check_abuse_pattern, check_daily_credit_limit, has_sufficient_credits, deduct_credits
+    # Check abuse patterns, daily limit and credits
+    from services import admission_control, credit_ledger
 
-    allowed, msg = check_abuse_pattern(user_id, 'analyze')
-    if not allowed:
-        return jsonify({'error': msg}), 429
-
-    allowed, msg = check_daily_credit_limit(user_id, 'analyze')
-    if not allowed:
-        return jsonify({'error': msg}), 429
-
-    # Check if user has sufficient credits
-    has_credits, info = has_sufficient_credits(user_id, 'analyze')
-    if not has_credits:
-        return jsonify(info), 402  # 402 Payment Required
+    decision = admission_control.admit(user_id, 'analyze')
+    if not decision.allowed:
+        return decision.to_response()  # 429 rate limited, 402 Payment Required
 
     # Validate file upload
     if 'resume' not in request.files:
@@ -1281,6 +1259,7 @@ def analyze_resume():
         logging.error(f"Failed to import AI modules: {str(e)}")
         return jsonify({'error': 'AI processing module not available'}), 500
 
+    reservation_id = None
     try:
         # Extract resume text from file
         resume_text = extract_text_from_file(resume_file)
@@ -1288,6 +1267,11 @@ def analyze_resume():
         if not resume_text or len(resume_text.strip()) < 50:
             return jsonify({'error': 'Resume appears empty. Please provide a valid resume.'}), 400
 
+        # Hold the credits for the duration of the AI call
+        reservation_id = credit_ledger.reserve(user_id, decision.required_credits, 'analyze')
+        if reservation_id is None:
+            return jsonify({'error': 'Insufficient credits'}), 402
+
         # Use intelligent analyzer for better results
         analyzer = get_analyzer()
         logging.info(f"Starting intelligent analysis for user {user_id}")
@@ -1319,12 +1303,14 @@ def analyze_resume():
         db.session.add(analysis)
         db.session.commit()
 
-        # Deduct credits for the analysis
-        success, msg = deduct_credits(user_id, 'analyze')
-        if success:
-            logging.info(f"Analysis completed for user {user_id}, analysis_id: {analysis.id} - {msg}")
-        else:
-            logging.warning(f"Failed to deduct credits for analysis {analysis.id}: {msg}")
+        # Fold this analysis into the user's materialized skill profile
+        from services.user_profile_service import record_analysis
+        record_analysis(analysis, experience_level=result.get('resume_level'))
+
+        # Keep the reserved credits now the analysis is saved
+        credit_ledger.commit_reservation(reservation_id)
+        reservation_id = None
+        logging.info(f"Analysis completed for user {user_id}, analysis_id: {analysis.id}")
 
         # Extract skills from resume using Spacy NER and pattern matching
         extracted_skills = []
@@ -1398,11 +1384,13 @@ def analyze_resume():
         
     except Exception as e:
         logging.error(f"Analysis failed for user {user_id}: {str(e)}")
+        if reservation_id is not None:
+            db.session.rollback()
+            credit_ledger.refund_reservation(reservation_id)
         return jsonify({'error': 'Analysis failed. Please try again.'}), 500
 
 @app.route('/api/analyze/stream', methods=['POST'])
 @jwt_required()
-@limiter.limit("10 per hour")
 def analyze_resume_stream():
     """
     Stream analysis results using Server-Sent Events (SSE).
@@ -1416,19 +1404,11 @@ def analyze_resume_stream():
         return jsonify({'error': 'Authentication error'}), 401
 
     # Check credits and rate limits
-    from abuse_prevention import check_abuse_pattern, check_daily_credit_limit, has_sufficient_credits
-    
-    allowed, msg = check_abuse_pattern(user_id, 'analyze')
-    if not allowed:
-        return jsonify({'error': msg}), 429
-    
-    allowed, msg = check_daily_credit_limit(user_id, 'analyze')
-    if not allowed:
-        return jsonify({'error': msg}), 429
-    
-    has_credits, info = has_sufficient_credits(user_id, 'analyze')
-    if not has_credits:
-        return jsonify(info), 402
+    from services import admission_control
+
+    decision = admission_control.admit(user_id, 'analyze')
+    if not decision.allowed:
+        return decision.to_response()
 
     # Accept JSON or form data with resume_text
     if request.is_json:
@@ -1456,8 +1436,15 @@ def analyze_resume_stream():
     if not job_description or len(job_description.strip()) < 50:
         return jsonify({'error': 'Job description required (minimum 50 characters)'}), 400
 
+    # Hold the credits while the analysis streams
+    from services import credit_ledger
+    reservation_id = credit_ledger.reserve(user_id, decision.required_credits, 'analyze')
+    if reservation_id is None:
+        return jsonify({'error': 'Insufficient credits'}), 402
+
     def generate_stream():
         """Generator function for SSE streaming"""
+        settled = False
         try:
             from intelligent_resume_analyzer import get_analyzer
             import json
@@ -1608,23 +1595,29 @@ def analyze_resume_stream():
                 )
                 
                 db.session.add(analysis)
-                
-                # Deduct credits
-                from abuse_prevention import deduct_credits
-                deduct_credits(user_id, 'analyze')
-                
                 db.session.commit()
                 result['analysis_id'] = analysis.id
+
+                from services.user_profile_service import record_analysis
+                record_analysis(analysis, experience_level=result.get('resume_level'))
             except Exception as e:
                 logging.error(f"Error saving analysis: {e}")
                 db.session.rollback()
             
+            # The analysis was delivered, so keep the reserved credits
+            settled = credit_ledger.commit_reservation(reservation_id)
+
             # Final result
             yield f"data: {json.dumps({'stage': 'complete', 'progress': 100, 'message': 'Analysis complete!', 'data': result})}\n\n"
             
         except Exception as e:
             logging.error(f"Streaming analysis error: {e}", exc_info=True)
             yield f"data: {json.dumps({'stage': 'error', 'progress': 0, 'message': f'Analysis failed: {str(e)}', 'error': str(e)})}\n\n"
+        finally:
+            # Failed or abandoned by the client before completing
+            if not settled:
+                db.session.rollback()
+                credit_ledger.refund_reservation(reservation_id)
     
     return Response(
         stream_with_context(generate_stream()),
@@ -1638,7 +1631,6 @@ def analyze_resume_stream():
 
 @app.route('/api/analyze-intelligent', methods=['POST'])
 @jwt_required()
-@limiter.limit("10 per hour")  # Limit intelligent analyses
 def analyze_resume_intelligent():
     """
     Intelligent resume analysis using Gemini AI
@@ -1651,6 +1643,13 @@ def analyze_resume_intelligent():
         logging.error(f"JWT Error: {str(e)}")
         return jsonify({'error': 'Authentication error'}), 401
 
+    # Check credits and rate limits
+    from services import admission_control, credit_ledger
+
+    decision = admission_control.admit(user_id, 'analyze')
+    if not decision.allowed:
+        return decision.to_response()
+
     try:
         # Validate file upload
         if 'resume' not in request.files:
@@ -1683,14 +1682,18 @@ def analyze_resume_intelligent():
         from intelligent_resume_analyzer import get_analyzer
         analyzer = get_analyzer()
 
-        logging.info(f"Starting intelligent analysis for user {user_id}")
-        analysis_result = analyzer.comprehensive_resume_analysis(resume_text, job_description)
+        # Hold the credits for the duration of the AI call (same cost as regular analyze)
+        reservation_id = credit_ledger.reserve(user_id, decision.required_credits, 'analyze')
+        if reservation_id is None:
+            return jsonify({'error': 'Insufficient credits'}), 402
 
-        # Deduct credits for analysis (same as regular analyze)
-        from abuse_prevention import deduct_credits
-        success, msg = deduct_credits(user_id, 'analyze')
-        if not success:
-            logging.warning(f"Failed to deduct credits for user {user_id}: {msg}")
+        logging.info(f"Starting intelligent analysis for user {user_id}")
+        try:
+            analysis_result = analyzer.comprehensive_resume_analysis(resume_text, job_description)
+        except Exception:
+            credit_ledger.refund_reservation(reservation_id)
+            raise
+        credit_ledger.commit_reservation(reservation_id)
 
         return jsonify({
             'analysis_id': None,  # This is a real-time analysis, not stored
@@ -1927,24 +1930,24 @@ def get_dashboard_stats():
 
 @app.route('/api/analyze/feedback/<int:analysis_id>', methods=['POST'])
 @jwt_required()
-@limiter.limit("5 per hour")  # Limit AI feedback generation
 def generate_feedback(analysis_id):
     """Generate personalized feedback for an existing analysis"""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
     analysis = Analysis.query.filter_by(id=analysis_id, user_id=user_id).first()
     
     if not analysis:
         return jsonify({'error': 'Analysis not found'}), 404
     
-    # Check credits for AI feedback (1 credit)
-    required_credits = 1
-    if user.credits < required_credits:
-        return jsonify({
-            'error': 'Insufficient credits. Please upgrade your plan.',
-            'required_credits': required_credits,
-            'current_credits': user.credits
-        }), 402
+    # Check credits and rate limits for AI feedback (1 credit)
+    from services import admission_control, credit_ledger
+    decision = admission_control.admit(user_id, 'feedback')
+    if not decision.allowed:
+        return decision.to_response()
+    
+    # Hold the credits for the duration of the AI call
+    reservation_id = credit_ledger.reserve(user_id, decision.required_credits, 'feedback')
+    if reservation_id is None:
+        return jsonify({'error': 'Insufficient credits'}), 402
     
     try:
         from gemini_service import generate_personalized_feedback
@@ -1957,11 +1960,12 @@ def generate_feedback(analysis_id):
             keywords_missing=analysis.keywords_missing
         )
         
-        # Deduct credits and save feedback
+        # Save feedback and keep the reserved credits
         # Save to optimized_feedback (personalized feedback) rather than ai_feedback (initial analysis)
-        user.credits -= required_credits
         analysis.optimized_feedback = feedback
         db.session.commit()
+        credit_ledger.commit_reservation(reservation_id)
+        reservation_id = None
         
         # Send email with AI feedback
         try:
@@ -2003,28 +2007,31 @@ def generate_feedback(analysis_id):
         
     except Exception as e:
         logging.error(f"Failed to generate feedback: {str(e)}", exc_info=True)
+        if reservation_id is not None:
+            db.session.rollback()
+            credit_ledger.refund_reservation(reservation_id)
         return jsonify({'error': 'Failed to generate feedback'}), 500
 
 @app.route('/api/analyze/optimize/<int:analysis_id>', methods=['POST'])
 @jwt_required()
-@limiter.limit("5 per hour")  # Limit Resume Optimization
 def optimize_resume(analysis_id):
     """Generate optimized resume version"""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
     analysis = Analysis.query.filter_by(id=analysis_id, user_id=user_id).first()
     
     if not analysis:
         return jsonify({'error': 'Analysis not found'}), 404
     
-    # Check credits for resume optimization (2 credits)
-    required_credits = 2
-    if user.credits < required_credits:
-        return jsonify({
-            'error': 'Insufficient credits. Please upgrade your plan.',
-            'required_credits': required_credits,
-            'current_credits': user.credits
-        }), 402
+    # Check credits and rate limits for resume optimization (2 credits)
+    from services import admission_control, credit_ledger
+    decision = admission_control.admit(user_id, 'optimize')
+    if not decision.allowed:
+        return decision.to_response()
+    
+    # Hold the credits for the duration of the AI call
+    reservation_id = credit_ledger.reserve(user_id, decision.required_credits, 'optimize')
+    if reservation_id is None:
+        return jsonify({'error': 'Insufficient credits'}), 402
     
     try:
         from gemini_service import generate_optimized_resume
@@ -2036,12 +2043,14 @@ def optimize_resume(analysis_id):
         )
         
         if not optimized_resume:
+            credit_ledger.refund_reservation(reservation_id)
             return jsonify({'error': 'Failed to generate optimized resume'}), 500
         
-        # Deduct credits and save optimized version
-        user.credits -= required_credits
+        # Save optimized version and keep the reserved credits
         analysis.optimized_resume = optimized_resume
         db.session.commit()
+        credit_ledger.commit_reservation(reservation_id)
+        reservation_id = None
         
         # Send email with optimized resume
         try:
@@ -2067,28 +2076,31 @@ def optimize_resume(analysis_id):
         
     except Exception as e:
         logging.error(f"Failed to optimize resume: {str(e)}", exc_info=True)
+        if reservation_id is not None:
+            db.session.rollback()
+            credit_ledger.refund_reservation(reservation_id)
         return jsonify({'error': 'Failed to optimize resume'}), 500
 
 @app.route('/api/analyze/cover-letter/<int:analysis_id>', methods=['POST'])
 @jwt_required()
-@limiter.limit("5 per hour")  # Limit cover letter generation
 def generate_cover_letter_route(analysis_id):
     """Generate tailored cover letter"""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
     analysis = Analysis.query.filter_by(id=analysis_id, user_id=user_id).first()
     
     if not analysis:
         return jsonify({'error': 'Analysis not found'}), 404
     
-    # Check credits for cover letter generation (2 credits)
-    required_credits = 2
-    if user.credits < required_credits:
-        return jsonify({
-            'error': 'Insufficient credits. Please upgrade your plan.',
-            'required_credits': required_credits,
-            'current_credits': user.credits
-        }), 402
+    # Check credits and rate limits for cover letter generation (2 credits)
+    from services import admission_control, credit_ledger
+    decision = admission_control.admit(user_id, 'cover_letter')
+    if not decision.allowed:
+        return decision.to_response()
+    
+    # Hold the credits for the duration of the AI call
+    reservation_id = credit_ledger.reserve(user_id, decision.required_credits, 'cover_letter')
+    if reservation_id is None:
+        return jsonify({'error': 'Insufficient credits'}), 402
     
     try:
         from gemini_service import generate_cover_letter
@@ -2101,12 +2113,14 @@ def generate_cover_letter_route(analysis_id):
         )
         
         if not cover_letter:
+            credit_ledger.refund_reservation(reservation_id)
             return jsonify({'error': 'Failed to generate cover letter'}), 500
 
-        # Deduct credits and save cover letter to database
-        user.credits -= required_credits
+        # Save cover letter to database and keep the reserved credits
         analysis.cover_letter = cover_letter
         db.session.commit()
+        credit_ledger.commit_reservation(reservation_id)
+        reservation_id = None
         
         # Send email with cover letter
         try:
@@ -2133,11 +2147,13 @@ def generate_cover_letter_route(analysis_id):
         
     except Exception as e:
         logging.error(f"Failed to generate cover letter: {str(e)}", exc_info=True)
+        if reservation_id is not None:
+            db.session.rollback()
+            credit_ledger.refund_reservation(reservation_id)
         return jsonify({'error': 'Failed to generate cover letter'}), 500
 
 @app.route('/api/analyze/skill-suggestions/<int:analysis_id>', methods=['POST'])
 @jwt_required()
-@limiter.limit("5 per hour")  # Limit for skill suggestion
 def get_skill_suggestions(analysis_id):
     """Get suggestions for acquiring missing skills"""
     user_id = int(get_jwt_identity())
@@ -2146,6 +2162,12 @@ def get_skill_suggestions(analysis_id):
     if not analysis:
         return jsonify({'error': 'Analysis not found'}), 404
     
+    # Suggestions are free but still rate limited
+    from services import admission_control
+    decision = admission_control.admit(user_id, 'skill_suggestions', required_credits=0)
+    if not decision.allowed:
+        return decision.to_response()
+    
     try:
         from gemini_service import suggest_missing_experience
         
@@ -2608,14 +2630,12 @@ def stripe_webhook():
                             guest_session.status = 'active'
                             guest_session.last_activity = datetime.utcnow()
                             db.session.commit()
+                            guest_admission.refresh_session(guest_session)
                             logging.info(f"Added guest credits for session {guest_session.id}")
                 
                 # Return early - don't process as subscription
                 return jsonify({'status': 'success'}), 200
             if user:
-                from config_manager import ConfigManager
-                config_manager = ConfigManager()
-
                 subscription_id = session.get('subscription')
                 user.subscription_id = subscription_id
                 # Normalize monthly_pro to pro_founding for consistency
@@ -2645,8 +2665,8 @@ def stripe_webhook():
                             # Allocate credits based on tier from database
                             tier_config = config_manager.get_subscription_tier(tier)
                             if tier_config:
-                                user.credits = tier_config.monthly_credits
-                                logging.info(f"User {user_id} upgraded to {tier} tier ({tier_config.monthly_credits} credits)")
+                                user.credits = tier_config['monthly_credits']
+                                logging.info(f"User {user_id} upgraded to {tier} tier ({tier_config['monthly_credits']} credits)")
                             else:
                                 # Fallback for backward compatibility
                                 if tier == 'elite':
@@ -2666,7 +2686,7 @@ def stripe_webhook():
                         user.subscription_status = 'active'
                         tier_config = config_manager.get_subscription_tier(tier)
                         if tier_config:
-                            user.credits = tier_config.monthly_credits
+                            user.credits = tier_config['monthly_credits']
                         elif tier == 'elite':
                             user.credits = 1000
                         elif tier == 'pro' or tier == 'pro_founding' or tier == 'monthly_pro':
@@ -2694,13 +2714,11 @@ def stripe_webhook():
             # Check if trial ended and subscription is now active
             if subscription.status == 'active' and user.subscription_status == 'trialing':
                 # Trial ended, subscription is now active - grant full credits
-                from config_manager import ConfigManager
-                config_manager = ConfigManager()
                 tier = user.subscription_tier
                 
                 tier_config = config_manager.get_subscription_tier(tier)
                 if tier_config:
-                    user.credits = tier_config.monthly_credits
+                    user.credits = tier_config['monthly_credits']
                 else:
                     # Fallback
                     if tier == 'elite':
@@ -3,56 +3,191 @@ Configuration Manager Service
 
 Provides intelligent, cached access to system configuration from the database.
 Eliminates hardcoded values and allows runtime configuration changes.
+
+SystemConfiguration, SubscriptionTier and RateLimitConfig are loaded together
+into one immutable ConfigSnapshot per process. Reads take the current snapshot
+reference without locking. Writes go through clear_cache(), which bumps the
+ConfigVersion counter, reloads this process's snapshot and publishes the new
+version on Redis (CONFIG_CHANNEL) so other workers reload on their next read.
+Workers also compare their snapshot with ConfigVersion every few seconds, so a
+missed message (or no Redis) only delays a reload.
 """
 
-from functools import lru_cache
-from datetime import timedelta
-from typing import Dict, Any, Optional, List
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Mapping, Tuple
 import logging
+import os
+import threading
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Redis channel carrying configuration version bumps
+CONFIG_CHANNEL = 'config:changed'
+
+# How often a worker checks ConfigVersion (the Redis listener makes this a safety net)
+VERSION_CHECK_SECONDS = 5
+VERSION_CHECK_SECONDS_WITH_LISTENER = 60
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Configuration tables at one version (treat the contained dicts as read-only)"""
+    version: int
+    configs: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    tiers: Mapping[str, Dict] = field(default_factory=lambda: MappingProxyType({}))  # Active tiers by name
+    tier_list: Tuple[Dict, ...] = ()  # Active tiers by position
+    rate_limits: Mapping[Tuple[str, str], Dict] = field(default_factory=lambda: MappingProxyType({}))
+    loaded_at: float = 0.0
+
+
+_snapshot: Optional[ConfigSnapshot] = None
+_reload_lock = threading.Lock()
+_stale = False
+_last_version_check = 0.0
+_redis_client = None
+_redis_checked = False
+_listener_pid = None
+
+
+def _get_redis():
+    """Lazily connect to Redis for change notifications (None if unavailable)"""
+    global _redis_client, _redis_checked
+    if _redis_checked:
+        return _redis_client
+
+    _redis_checked = True
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        try:
+            import redis
+            _redis_client = redis.from_url(redis_url, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"Config Redis unavailable, relying on version checks: {str(e)}")
+            _redis_client = None
+    return _redis_client
+
+
+def _listen_for_changes(client):
+    """Mark the snapshot stale whenever another worker publishes a change"""
+    global _stale
+    while True:
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CONFIG_CHANNEL)
+            for message in pubsub.listen():
+                _stale = True
+        except Exception as e:
+            logger.warning(f"Config change listener disconnected: {str(e)}")
+        # Changes may have been missed while disconnected
+        _stale = True
+        time.sleep(5)
+
+
+def _ensure_listener() -> bool:
+    """Start this process's change listener (once per pid, so forked workers get their own)"""
+    global _listener_pid
+    client = _get_redis()
+    if client is None:
+        return False
+    if _listener_pid != os.getpid():
+        _listener_pid = os.getpid()
+        threading.Thread(target=_listen_for_changes, args=(client,), name='config-listener', daemon=True).start()
+    return True
+
+
+def _read_version() -> int:
+    from models import db, ConfigVersion
+
+    # Column query: never answered from a stale identity map
+    return db.session.query(ConfigVersion.version).filter(ConfigVersion.id == 1).scalar() or 0
+
+
+def _load_snapshot() -> ConfigSnapshot:
+    """Read every configuration table into a new snapshot"""
+    from models import SystemConfiguration, SubscriptionTier, RateLimitConfig
+
+    version = _read_version()
+    configs = {c.config_key: c.config_value for c in SystemConfiguration.query.all()}
+    tier_list = tuple(t.to_dict() for t in SubscriptionTier.query.filter_by(
+        is_active=True
+    ).order_by(SubscriptionTier.position))
+    rate_limits = {
+        (limit.operation, limit.subscription_tier): limit.to_dict()
+        for limit in RateLimitConfig.query.all()
+    }
+    return ConfigSnapshot(
+        version=version,
+        configs=MappingProxyType(configs),
+        tiers=MappingProxyType({t['name']: t for t in tier_list}),
+        tier_list=tier_list,
+        rate_limits=MappingProxyType(rate_limits),
+        loaded_at=time.time()
+    )
+
+
+def reset_snapshot():
+    """Drop the process snapshot (the next read reloads it)"""
+    global _snapshot, _last_version_check
+    _snapshot = None
+    _last_version_check = 0.0
+
 
 class ConfigManager:
     """Manages system configuration with caching"""
 
-    # Cache timeout in seconds
-    CACHE_TIMEOUT = 300  # 5 minutes
-
-    def __init__(self, db):
+    def __init__(self, db=None):
         """Initialize with database instance"""
+        if db is None:
+            from models import db
         self.db = db
-        self._cache = {}
-        self._cache_timestamps = {}
 
-    def _is_cache_valid(self, key: str) -> bool:
-        """Check if cached value is still valid"""
-        if key not in self._cache_timestamps:
-            return False
-        from datetime import datetime
-        elapsed = (datetime.utcnow() - self._cache_timestamps[key]).total_seconds()
-        return elapsed < self.CACHE_TIMEOUT
+    def reload(self) -> ConfigSnapshot:
+        """Load a fresh snapshot for this process"""
+        global _snapshot, _stale, _last_version_check
+        with _reload_lock:
+            _stale = False
+            _last_version_check = time.monotonic()
+            try:
+                _snapshot = _load_snapshot()
+            except Exception as e:
+                logger.warning(f"Error loading configuration snapshot: {str(e)}")
+                self.db.session.rollback()
+                if _snapshot is None:
+                    # Empty until the tables can be read (the version check retries)
+                    _snapshot = ConfigSnapshot(version=-1)
+            return _snapshot
+
+    def snapshot(self) -> ConfigSnapshot:
+        """Current configuration snapshot (lock-free unless a reload is due)"""
+        global _last_version_check
+        snapshot = _snapshot
+        if snapshot is None or _stale:
+            return self.reload()
+
+        interval = VERSION_CHECK_SECONDS_WITH_LISTENER if _ensure_listener() else VERSION_CHECK_SECONDS
+        if time.monotonic() - _last_version_check < interval:
+            return snapshot
+
+        # One thread checks the version; the others keep serving the current snapshot
+        if not _reload_lock.acquire(blocking=False):
+            return snapshot
+        try:
+            _last_version_check = time.monotonic()
+            version = _read_version()
+        except Exception as e:
+            logger.warning(f"Error checking configuration version: {str(e)}")
+            self.db.session.rollback()
+            return snapshot
+        finally:
+            _reload_lock.release()
+        return self.reload() if version != snapshot.version else snapshot
 
     def get_config(self, config_key: str, default: Any = None) -> Any:
         """Get a single configuration value"""
-        from models import SystemConfiguration
-
-        # Check cache first
-        if self._is_cache_valid(config_key):
-            return self._cache.get(config_key, default)
-
-        try:
-            config = SystemConfiguration.query.filter_by(config_key=config_key).first()
-            if config:
-                self._cache[config_key] = config.config_value
-                from datetime import datetime
-                self._cache_timestamps[config_key] = datetime.utcnow()
-                return config.config_value
-            return default
-        except Exception as e:
-            logger.warning(f"Error fetching config {config_key}: {str(e)}")
-            return default
+        return self.snapshot().configs.get(config_key, default)
 
     def set_config(self, config_key: str, config_value: Any, data_type: str,
                    description: str = "", category: str = "", user_id: int = None) -> bool:
@@ -78,11 +213,8 @@ class ConfigManager:
                 self.db.session.add(config)
 
             self.db.session.commit()
-            # Invalidate cache
-            if config_key in self._cache:
-                del self._cache[config_key]
-            if config_key in self._cache_timestamps:
-                del self._cache_timestamps[config_key]
+            # Invalidate every worker's snapshot
+            self.clear_cache()
             return True
         except Exception as e:
             logger.error(f"Error setting config {config_key}: {str(e)}")
@@ -91,48 +223,21 @@ class ConfigManager:
 
     def get_subscription_tier(self, tier_name: str) -> Optional[Dict]:
         """Get subscription tier configuration"""
-        from models import SubscriptionTier
-
-        try:
-            tier = SubscriptionTier.query.filter_by(name=tier_name, is_active=True).first()
-            return tier.to_dict() if tier else None
-        except Exception as e:
-            logger.warning(f"Error fetching tier {tier_name}: {str(e)}")
-            return None
+        return self.snapshot().tiers.get(tier_name)
 
     def get_all_subscription_tiers(self) -> List[Dict]:
         """Get all active subscription tiers"""
-        from models import SubscriptionTier
-
-        try:
-            tiers = SubscriptionTier.query.filter_by(is_active=True).order_by(SubscriptionTier.position).all()
-            return [t.to_dict() for t in tiers]
-        except Exception as e:
-            logger.warning(f"Error fetching tiers: {str(e)}")
-            return []
+        return list(self.snapshot().tier_list)
 
     def get_rate_limit(self, operation: str, subscription_tier: str = 'default') -> Optional[Dict]:
         """Get rate limit configuration for an operation and tier"""
-        from models import RateLimitConfig
+        rate_limits = self.snapshot().rate_limits
+        # Try tier-specific limit first, then fall back to default
+        return rate_limits.get((operation, subscription_tier)) or rate_limits.get((operation, 'default'))
 
-        try:
-            # Try tier-specific limit first
-            limit = RateLimitConfig.query.filter_by(
-                operation=operation,
-                subscription_tier=subscription_tier
-            ).first()
-
-            # Fall back to default if not found
-            if not limit and subscription_tier != 'default':
-                limit = RateLimitConfig.query.filter_by(
-                    operation=operation,
-                    subscription_tier='default'
-                ).first()
-
-            return limit.to_dict() if limit else None
-        except Exception as e:
-            logger.warning(f"Error fetching rate limit {operation}/{subscription_tier}: {str(e)}")
-            return None
+    def get_all_rate_limits(self) -> Mapping[Tuple[str, str], Dict]:
+        """Get every rate limit configuration keyed by (operation, tier)"""
+        return self.snapshot().rate_limits
 
     def get_scoring_thresholds(self) -> List[Dict]:
         """Get all scoring thresholds ordered by min_score"""
@@ -204,16 +309,48 @@ class ConfigManager:
         return False
 
     def clear_cache(self) -> None:
-        """Clear all cached configurations"""
-        self._cache.clear()
-        self._cache_timestamps.clear()
-        logger.info("Configuration cache cleared")
+        """Publish a configuration change to every worker (call after committing a write)"""
+        from models import ConfigVersion
+        from sqlalchemy import update
+        from sqlalchemy.exc import IntegrityError
+
+        try:
+            bumped = self.db.session.execute(
+                update(ConfigVersion).where(ConfigVersion.id == 1).values(version=ConfigVersion.version + 1)
+            ).rowcount
+            if not bumped:
+                self.db.session.add(ConfigVersion(id=1, version=1))
+            self.db.session.commit()
+        except IntegrityError:
+            # Another worker created the row first
+            self.db.session.rollback()
+            self.db.session.execute(
+                update(ConfigVersion).where(ConfigVersion.id == 1).values(version=ConfigVersion.version + 1)
+            )
+            self.db.session.commit()
+        except Exception as e:
+            logger.error(f"Error bumping configuration version: {str(e)}")
+            self.db.session.rollback()
+
+        snapshot = self.reload()
+        client = _get_redis()
+        if client is not None:
+            try:
+                client.publish(CONFIG_CHANNEL, snapshot.version)
+            except Exception as e:
+                logger.warning(f"Could not publish configuration change: {str(e)}")
+        logger.info(f"Configuration reloaded at version {snapshot.version}")
 
     def get_stats(self) -> Dict[str, Any]:
         """Get configuration manager stats"""
+        snapshot = self.snapshot()
         return {
-            'cached_items': len(self._cache),
-            'cache_timeout_seconds': self.CACHE_TIMEOUT
+            'version': snapshot.version,
+            'loaded_at': snapshot.loaded_at,
+            'system_configs': len(snapshot.configs),
+            'subscription_tiers': len(snapshot.tiers),
+            'rate_limits': len(snapshot.rate_limits),
+            'change_listener': _listener_pid == os.getpid()
         }
 
 
@@ -57,34 +57,45 @@ class CostTracker:
             return True, ""
 
         try:
-            today_key = self._get_daily_key()
+            today_key = self.get_daily_key()
             count = int(self.redis_client.get(today_key) or 0)
-
-            estimated_cost_today = count * self.estimated_cost_per_analysis
-
-            # Check if we're at or over budget
-            if estimated_cost_today >= self.daily_budget_usd:
-                logger.critical(
-                    f"DAILY BUDGET EXCEEDED: ${estimated_cost_today:.2f} / ${self.daily_budget_usd} "
-                    f"({count} analyses today)"
-                )
-                return False, "Daily analysis limit reached due to high demand. Please try again tomorrow or create a free account for guaranteed access."
-
-            # Check if this analysis would put us over budget
-            estimated_cost_after = (count + 1) * self.estimated_cost_per_analysis
-            if estimated_cost_after > self.daily_budget_usd:
-                logger.warning(
-                    f"Analysis would exceed budget: ${estimated_cost_after:.2f} > ${self.daily_budget_usd}"
-                )
-                return False, "Daily analysis limit reached. Please try again tomorrow or sign up for free unlimited access."
-
-            return True, ""
+            return self.check_guest_budget(count)
 
         except Exception as e:
             logger.error(f"Error checking budget: {e}", exc_info=True)
             # Fail open on error to avoid blocking legitimate users
             return True, ""
 
+    def check_guest_budget(self, count: int) -> Tuple[bool, str]:
+        """
+        Check whether one more guest analysis fits today's budget.
+
+        Args:
+            count: Guest analyses already recorded today (value of get_daily_key())
+
+        Returns:
+            (allowed: bool, message: str) - (True, "") if allowed, (False, reason) if blocked
+        """
+        estimated_cost_today = count * self.estimated_cost_per_analysis
+
+        # Check if we're at or over budget
+        if estimated_cost_today >= self.daily_budget_usd:
+            logger.critical(
+                f"DAILY BUDGET EXCEEDED: ${estimated_cost_today:.2f} / ${self.daily_budget_usd} "
+                f"({count} analyses today)"
+            )
+            return False, "Daily analysis limit reached due to high demand. Please try again tomorrow or create a free account for guaranteed access."
+
+        # Check if this analysis would put us over budget
+        estimated_cost_after = (count + 1) * self.estimated_cost_per_analysis
+        if estimated_cost_after > self.daily_budget_usd:
+            logger.warning(
+                f"Analysis would exceed budget: ${estimated_cost_after:.2f} > ${self.daily_budget_usd}"
+            )
+            return False, "Daily analysis limit reached. Please try again tomorrow or sign up for free unlimited access."
+
+        return True, ""
+
     def record_guest_analysis(self) -> None:
         """
         Record that a guest analysis was completed.
@@ -95,7 +106,7 @@ class CostTracker:
             return
 
         try:
-            today_key = self._get_daily_key()
+            today_key = self.get_daily_key()
 
             # Increment counter
             count = self.redis_client.incr(today_key)
@@ -139,7 +150,7 @@ class CostTracker:
             }
 
         try:
-            today_key = self._get_daily_key()
+            today_key = self.get_daily_key()
             count = int(self.redis_client.get(today_key) or 0)
             estimated_cost = count * self.estimated_cost_per_analysis
             remaining = max(0, self.daily_budget_usd - estimated_cost)
@@ -222,7 +233,7 @@ class CostTracker:
                 'redis_available': False
             }
 
-    def _get_daily_key(self) -> str:
+    def get_daily_key(self) -> str:
         """Get Redis key for today's counter."""
         today = datetime.utcnow().date()
         return f"api_cost:guest:{today}"
@@ -238,7 +249,7 @@ class CostTracker:
             return False
 
         try:
-            today_key = self._get_daily_key()
+            today_key = self.get_daily_key()
             self.redis_client.delete(today_key)
             logger.warning("Daily cost counter RESET by admin")
             return True
@@ -5,7 +5,7 @@ Custom decorators for route protection and access control
 from functools import wraps
 from flask import jsonify, g, request
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-from models import User
+from services.user_context import load_user
 
 def subscription_required(f):
     """
@@ -33,7 +33,7 @@ def subscription_required(f):
 
         # Get current user from JWT
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
 
         if not user:
             return jsonify({
@@ -85,7 +85,7 @@ def admin_required(f):
         verify_jwt_in_request()
 
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
 
         if not user:
             return jsonify({
@@ -127,7 +127,7 @@ def role_required(role_name):
             verify_jwt_in_request()
 
             current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            user = load_user(current_user_id)
 
             if not user:
                 return jsonify({
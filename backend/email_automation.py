@@ -487,55 +487,56 @@ def check_trial_expiry(app, db, User, email_service):
     """Check for expired trials and send expiry emails"""
     with app.app_context():
         try:
+            from services import lifecycle_sweeps
             now = datetime.utcnow()
-            today = now.date()
-            
+
             # Find users whose trial expired today (trial_end_date is today or earlier)
-            expired_trials = User.query.filter(
-                and_(
-                    User.is_trial_active == True,
-                    User.trial_end_date.isnot(None),
-                    User.trial_end_date <= now,
-                    or_(
-                        User.trial_expired_date.is_(None),  # Haven't sent expiry email yet
-                        User.trial_expired_date > User.trial_end_date  # Expired but not processed
-                    )
+            expired_trials = and_(
+                User.is_trial_active == True,
+                User.trial_end_date.isnot(None),
+                User.trial_end_date <= now,
+                User.email_verified == True,
+                or_(
+                    User.trial_expired_date.is_(None),  # Haven't sent expiry email yet
+                    User.trial_expired_date > User.trial_end_date  # Expired but not processed
                 )
-            ).all()
-            
+            )
+
+            # Users who already subscribed (shouldn't happen, but safety check) just leave the trial
+            lifecycle_sweeps.run('trial_expiry_subscribed', and_(
+                expired_trials,
+                User.subscription_status == 'active',
+                User.subscription_tier.in_(['pro', 'elite'])
+            ), {'is_trial_active': False})
+
             emails_sent = 0
-            
-            for user in expired_trials:
-                try:
-                    if not user.email_verified:
-                        continue
-                    
-                    # Check if user has already subscribed (shouldn't happen, but safety check)
-                    if user.subscription_status == 'active' and user.subscription_tier in ['pro', 'elite']:
-                        # User subscribed, mark trial as inactive
-                        user.is_trial_active = False
+
+            for batch in lifecycle_sweeps.scan(expired_trials, [User.email, User.name, User.trial_end_date]):
+                sent_ids = []
+                for user in batch:
+                    try:
+                        # Send expiry email
+                        recipient_name = user.name or user.email.split('@')[0]
+                        unsubscribe_link = build_unsubscribe_link(user, email_service)
+
+                        if email_service.send_trial_expiry_email(user.email, recipient_name, user.trial_end_date, unsubscribe_link):
+                            sent_ids.append(user.id)
+                            logger.info(f"Sent trial expiry email to {user.email}")
+
+                    except Exception as e:
+                        logger.error(f"Error processing trial expiry for user {user.email}: {str(e)}", exc_info=True)
                         continue
-                    
-                    # Send expiry email
-                    recipient_name = user.name or user.email.split('@')[0]
-                    trial_end_date = user.trial_end_date
-                    unsubscribe_link = build_unsubscribe_link(user, email_service)
-                    
-                    if email_service.send_trial_expiry_email(user.email, recipient_name, trial_end_date, unsubscribe_link):
-                        user.trial_expired_date = now
-                        user.email_sequence_step = 4  # Expiry email sent
-                        user.last_email_sent_date = now
-                        emails_sent += 1
-                        logger.info(f"Sent trial expiry email to {user.email}")
-                
-                except Exception as e:
-                    logger.error(f"Error processing trial expiry for user {user.email}: {str(e)}", exc_info=True)
-                    continue
-            
+
+                # Expiry email sent
+                emails_sent += lifecycle_sweeps.mark(sent_ids, {
+                    'trial_expired_date': now,
+                    'email_sequence_step': 4,
+                    'last_email_sent_date': now
+                })
+
             if emails_sent > 0:
-                db.session.commit()
                 logger.info(f"Processed {emails_sent} expired trials")
-            
+
         except Exception as e:
             logger.error(f"Error in trial expiry check: {str(e)}", exc_info=True)
             db.session.rollback()
@@ -544,54 +545,53 @@ def handle_grace_period_end(app, db, User, email_service):
     """Handle grace period end - downgrade users who didn't subscribe"""
     with app.app_context():
         try:
+            from services import lifecycle_sweeps
             now = datetime.utcnow()
             grace_period_end = now - timedelta(days=3)
-            
+
             # Find users whose trial expired 3+ days ago and haven't subscribed
-            users_to_downgrade = User.query.filter(
-                and_(
-                    User.is_trial_active == True,
-                    User.trial_end_date.isnot(None),
-                    User.trial_end_date <= grace_period_end,
-                    User.subscription_status != 'active',  # Not subscribed
-                    or_(
-                        User.subscription_tier == 'pro',  # Still on pro (trial)
-                        User.subscription_tier == 'trial'
-                    )
+            users_to_downgrade = and_(
+                User.is_trial_active == True,
+                User.trial_end_date.isnot(None),
+                User.trial_end_date <= grace_period_end,
+                User.subscription_status != 'active',  # Not subscribed
+                or_(
+                    User.subscription_tier == 'pro',  # Still on pro (trial)
+                    User.subscription_tier == 'trial'
                 )
-            ).all()
-            
+            )
+
             downgraded = 0
             emails_sent = 0
-            
-            for user in users_to_downgrade:
-                try:
-                    # Send final email before downgrade
-                    if user.email_sequence_step < 5:  # Haven't sent final email
+
+            # Downgrade to free tier, then send the final email to each downgraded batch
+            for batch in lifecycle_sweeps.sweep('grace_period_downgrade', users_to_downgrade, {
+                'subscription_tier': 'free',
+                'subscription_status': 'inactive',
+                'credits': 5,  # Free tier credits
+                'is_trial_active': False
+            }, returning=[User.email, User.name, User.email_sequence_step], ledger_operation='grace_period_downgrade'):
+                downgraded += len(batch)
+                sent_ids = []
+                for user in batch:
+                    try:
+                        if user.email_sequence_step >= 5:  # Already sent final email
+                            continue
                         recipient_name = user.name or user.email.split('@')[0]
                         unsubscribe_link = build_unsubscribe_link(user, email_service)
                         if email_service.send_trial_expired_email(user.email, recipient_name, unsubscribe_link):
-                            user.email_sequence_step = 5
-                            user.last_email_sent_date = now
-                            emails_sent += 1
+                            sent_ids.append(user.id)
                             logger.info(f"Sent final trial expired email to {user.email}")
-                    
-                    # Downgrade to free tier
-                    user.subscription_tier = 'free'
-                    user.subscription_status = 'inactive'
-                    user.credits = 5  # Free tier credits
-                    user.is_trial_active = False
-                    downgraded += 1
-                    logger.info(f"Downgraded user {user.email} from trial to free tier")
-                
-                except Exception as e:
-                    logger.error(f"Error downgrading user {user.email}: {str(e)}", exc_info=True)
-                    continue
-            
+
+                    except Exception as e:
+                        logger.error(f"Error sending final trial email to {user.email}: {str(e)}", exc_info=True)
+                        continue
+
+                emails_sent += lifecycle_sweeps.mark(sent_ids, {'email_sequence_step': 5, 'last_email_sent_date': now})
+
             if downgraded > 0 or emails_sent > 0:
-                db.session.commit()
                 logger.info(f"Downgraded {downgraded} users and sent {emails_sent} final emails")
-            
+
         except Exception as e:
             logger.error(f"Error in grace period handler: {str(e)}", exc_info=True)
             db.session.rollback()
@@ -601,49 +601,48 @@ def check_inactive_users(app, db, User, email_service):
     """Send re-engagement emails to inactive users"""
     with app.app_context():
         try:
+            from services import lifecycle_sweeps
             now = datetime.utcnow()
             today = now.date()
             inactivity_threshold = now - timedelta(days=14)
+            # Avoid spamming: skip anyone we sent any email in the last 5 days
+            last_email_cutoff = datetime.combine(today - timedelta(days=4), datetime.min.time())
 
-            inactive_query = User.query.filter(
-                and_(
-                    User.email_verified == True,
-                    User.is_active == True,
-                    User.last_login.isnot(None),
-                    User.last_login <= inactivity_threshold,
-                    User.email_bounce_count < 3
-                )
+            inactive_users = and_(
+                User.email_verified == True,
+                User.is_active == True,
+                User.last_login.isnot(None),
+                User.last_login <= inactivity_threshold,
+                User.email_bounce_count < 3,
+                or_(User.last_email_sent_date.is_(None), User.last_email_sent_date < last_email_cutoff)
             )
 
             emails_sent = 0
             emails_skipped_prefs = 0
 
-            for batch in process_users_in_batches(inactive_query):
+            for batch in lifecycle_sweeps.scan(inactive_users, [User.email, User.name, User.email_preferences, User.last_login]):
+                sent_ids = []
                 for user in batch:
                     try:
                         if not can_send_email(user, 'marketing'):
                             emails_skipped_prefs += 1
                             continue
 
-                        # Avoid spamming: skip if we sent any email in last 5 days
-                        if user.last_email_sent_date and (today - user.last_email_sent_date.date()).days < 5:
-                            continue
-
-                        days_inactive = (today - user.last_login.date()).days if user.last_login else None
+                        days_inactive = (today - user.last_login.date()).days
                         recipient_name = user.name or user.email.split('@')[0]
                         unsubscribe_link = build_unsubscribe_link(user, email_service)
 
                         if send_email_with_retry(email_service, email_service.send_reengagement_email, user.email, recipient_name, days_inactive, unsubscribe_link):
-                            user.last_email_sent_date = now
-                            emails_sent += 1
+                            sent_ids.append(user.id)
                             logger.info(f"Sent re-engagement email to {user.email} after {days_inactive} days inactive")
 
                     except Exception as e:
                         logger.error(f"Error processing re-engagement for user {user.email}: {str(e)}", exc_info=True)
                         continue
 
+                emails_sent += lifecycle_sweeps.mark(sent_ids, {'last_email_sent_date': now})
+
             if emails_sent > 0:
-                db.session.commit()
                 logger.info(f"Sent {emails_sent} re-engagement emails (skipped prefs: {emails_skipped_prefs})")
 
         except Exception as e:
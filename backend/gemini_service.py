@@ -6,6 +6,7 @@ import html
 import re
 from typing import Optional, List, Dict, Any
 from errors import AIProcessingError
+from services import language_detection
 import logging
 from functools import lru_cache
 
@@ -41,7 +42,6 @@ class GeminiService:
         self.model = None
         self.max_retries = 3
         self.retry_delay = 1  # seconds
-        self._language_cache = {}  # Cache detected languages
         self._initialize_model()
     
     def _initialize_model(self):
@@ -84,52 +84,10 @@ class GeminiService:
     def detect_language(self, text: str) -> str:
         """
         Detect the primary language of the given text (resume or job description).
-        Uses a quick Gemini call to identify the language.
+        Uses the shared heuristic detector, so no Gemini call is spent on it.
         Returns ISO 639-1 two-letter language code (e.g., 'en', 'fr', 'de').
         """
-        if not text or len(text.strip()) < 50:
-            return 'en'  # Default to English for very short text
-
-        # Check cache first (use first 200 chars as key)
-        cache_key = hash(text[:200])
-        if cache_key in self._language_cache:
-            return self._language_cache[cache_key]
-
-        if not self._is_model_available():
-            return 'en'
-
-        # Use a sample of the text to detect language (faster)
-        text_sample = text[:1000]
-
-        prompt = f"""Analyze this text and determine its primary language.
-Return ONLY the ISO 639-1 two-letter language code (lowercase).
-
-Supported codes: en, fr, de, es, nl, pt, it, pl, ru, zh, ja, ko, ar, hi
-
-If the text is in multiple languages, return the dominant one.
-If unsure, return 'en'.
-
-Text sample:
-{text_sample}
-
-Response (just the two-letter code, nothing else):"""
-
-        try:
-            response = self.model.generate_content(
-                prompt,
-                request_options={'timeout': 10}  # Quick timeout for language detection
-            )
-            if response and response.text:
-                detected = response.text.strip().lower()[:2]
-                # Validate it's a supported language
-                if detected in self.SUPPORTED_LANGUAGES:
-                    logger.info(f"Detected language: {detected}")
-                    self._language_cache[cache_key] = detected
-                    return detected
-            return 'en'
-        except Exception as e:
-            logger.warning(f"Language detection failed, defaulting to English: {e}")
-            return 'en'
+        return language_detection.detect_language(text)
 
     def _get_language_instruction(self, language: str) -> str:
         """Get the language instruction for prompts"""
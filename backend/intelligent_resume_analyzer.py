@@ -7,7 +7,6 @@ import os
 import json
 import logging
 import time
-import re
 import hashlib
 from typing import Dict, List, Any, Optional, Callable
 from functools import wraps
@@ -23,6 +22,8 @@ from tenacity import (
     retry_if_exception_message,
     before_sleep_log
 )
+from services import ats_scanner, language_detection
+from services.memory_cache import MemoryCache
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +42,10 @@ DEFAULT_TIMEOUT = 30  # seconds
 MAX_RETRIES = 2
 RETRY_DELAY = 2  # seconds
 
+# In-memory analysis cache limits (used when Redis is unavailable)
+MEMORY_CACHE_MAX_ENTRIES = 100
+MEMORY_CACHE_MAX_BYTES = 50 * 1024 * 1024  # 50 MB
+
 
 # Global semaphore to limit concurrent Gemini API calls
 # Prevents hitting rate limits: max 10 concurrent calls across all users
@@ -120,7 +125,13 @@ class IntelligentResumeAnalyzer:
         self.request_options = {
             'timeout': DEFAULT_TIMEOUT
         }
-        self._language_cache = {}  # Cache for detected languages
+        # In-memory fallback when Redis is unavailable
+        self._memory_cache = MemoryCache(
+            max_entries=MEMORY_CACHE_MAX_ENTRIES,
+            ttl_seconds=86400,
+            max_bytes=MEMORY_CACHE_MAX_BYTES,
+            name='analysis'
+        )
 
     def detect_language(self, text: str) -> str:
         """
@@ -129,123 +140,9 @@ class IntelligentResumeAnalyzer:
 
         This is a ZERO-COST replacement for API-based detection.
         Eliminates 1 of 6 API calls per analysis (17% cost reduction).
+        See services/language_detection.py for the single-pass detector and its LRU cache.
         """
-        if not text or len(text.strip()) < 50:
-            return 'en'
-
-        # Check cache first
-        cache_key = hash(text[:200])
-        if cache_key in self._language_cache:
-            return self._language_cache[cache_key]
-
-        # Use heuristic detection (no API call)
-        detected = self._detect_language_heuristic(text)
-        self._language_cache[cache_key] = detected
-        logger.info(f"Detected language (heuristic): {detected}")
-        return detected
-
-    def _detect_language_heuristic(self, text: str) -> str:
-        """
-        FREE language detection using character analysis and keyword matching.
-        No API calls - pure Python logic.
-
-        Detection strategy:
-        1. Character script analysis (Cyrillic, CJK, Arabic, Devanagari)
-        2. European language keyword matching (French, German, Spanish, etc.)
-        3. Default to English if uncertain
-        """
-        if not text or len(text.strip()) < 50:
-            return 'en'
-
-        # Analyze first 1000 characters for speed
-        sample = text[:1000]
-
-        # Count characters by script
-        latin = cyrillic = cjk = arabic = devanagari = 0
-
-        for char in sample:
-            code = ord(char)
-            # Latin alphabet (including extended Latin for European languages)
-            if (0x0041 <= code <= 0x007A) or (0x00C0 <= code <= 0x00FF):
-                latin += 1
-            # Cyrillic (Russian, etc.)
-            elif 0x0400 <= code <= 0x04FF:
-                cyrillic += 1
-            # CJK (Chinese, Japanese, Korean)
-            elif (0x4E00 <= code <= 0x9FFF) or (0x3040 <= code <= 0x30FF):
-                cjk += 1
-            # Arabic
-            elif 0x0600 <= code <= 0x06FF:
-                arabic += 1
-            # Devanagari (Hindi)
-            elif 0x0900 <= code <= 0x097F:
-                devanagari += 1
-
-        # Non-Latin script detection
-        if cyrillic > latin * 0.3:
-            return 'ru'
-        elif cjk > latin * 0.2:
-            # Distinguish Japanese from Chinese by hiragana/katakana presence
-            if any(0x3040 <= ord(c) <= 0x30FF for c in sample[:200]):
-                return 'ja'
-            # Check for Korean Hangul
-            if any(0xAC00 <= ord(c) <= 0xD7AF for c in sample[:200]):
-                return 'ko'
-            return 'zh'
-        elif arabic > latin * 0.3:
-            return 'ar'
-        elif devanagari > latin * 0.3:
-            return 'hi'
-
-        # European language detection using keyword frequency
-        text_lower = sample.lower()
-
-        # French keywords
-        keywords_fr = ['le', 'la', 'les', 'de', 'et', 'un', 'une', 'dans', 'pour', 'avec']
-        score_fr = sum(f' {kw} ' in text_lower for kw in keywords_fr)
-
-        # German keywords
-        keywords_de = ['der', 'die', 'das', 'und', 'ist', 'für', 'mit', 'von', 'den', 'zu']
-        score_de = sum(f' {kw} ' in text_lower for kw in keywords_de)
-
-        # Spanish keywords
-        keywords_es = ['el', 'la', 'los', 'las', 'de', 'y', 'un', 'una', 'en', 'con']
-        score_es = sum(f' {kw} ' in text_lower for kw in keywords_es)
-
-        # Portuguese keywords
-        keywords_pt = ['o', 'a', 'os', 'as', 'de', 'e', 'um', 'uma', 'em', 'com', 'não']
-        score_pt = sum(f' {kw} ' in text_lower for kw in keywords_pt)
-
-        # Italian keywords
-        keywords_it = ['il', 'la', 'lo', 'i', 'gli', 'le', 'di', 'e', 'un', 'una', 'per']
-        score_it = sum(f' {kw} ' in text_lower for kw in keywords_it)
-
-        # Dutch keywords
-        keywords_nl = ['de', 'het', 'een', 'van', 'en', 'in', 'voor', 'met', 'op', 'te']
-        score_nl = sum(f' {kw} ' in text_lower for kw in keywords_nl)
-
-        # Polish keywords
-        keywords_pl = ['w', 'na', 'z', 'i', 'do', 'się', 'nie', 'o', 'że', 'jest']
-        score_pl = sum(f' {kw} ' in text_lower for kw in keywords_pl)
-
-        # Find language with highest score
-        scores = {
-            'fr': score_fr,
-            'de': score_de,
-            'es': score_es,
-            'pt': score_pt,
-            'it': score_it,
-            'nl': score_nl,
-            'pl': score_pl
-        }
-
-        # Require minimum score of 3 keywords to be confident
-        max_lang = max(scores, key=scores.get)
-        if scores[max_lang] >= 3:
-            return max_lang
-
-        # Default to English
-        return 'en'
+        return language_detection.detect_language(text)
 
     def _get_language_instruction(self, language: str) -> str:
         """Get the language instruction for prompts"""
@@ -906,88 +803,7 @@ Remember: {lang_instruction}"""
         Returns:
             Dict with heuristic scores and issues detected
         """
-        checks = {
-            "text_extraction_quality": 100,  # Default good
-            "parse_errors": [],
-            "column_structure_issues": False,
-            "non_standard_chars": 0,
-            "suspicious_low_length": False,
-            "issues": [],
-            "score": 100
-        }
-        
-        # Check 1: Text length (image-based PDFs extract poorly)
-        text_length = len(resume_text.strip())
-        if text_length < 500:
-            checks["suspicious_low_length"] = True
-            checks["text_extraction_quality"] -= 30
-            checks["issues"].append("Resume text is suspiciously short - may be image-based PDF that ATS cannot parse")
-        elif text_length < 1000:
-            checks["text_extraction_quality"] -= 15
-            checks["issues"].append("Resume text is shorter than expected - may have formatting issues")
-        
-        # Check 2: Non-standard characters (formatting artifacts)
-        # Count characters outside normal ASCII printable range (excluding common whitespace)
-        non_std_count = 0
-        for char in resume_text:
-            code = ord(char)
-            # Allow: ASCII printable (32-126), newline (10), tab (9), carriage return (13)
-            if code > 127 and code not in [8232, 8233]:  # Allow paragraph separators
-                non_std_count += 1
-        
-        checks["non_standard_chars"] = non_std_count
-        if non_std_count > 100:
-            checks["text_extraction_quality"] -= 20
-            checks["issues"].append(f"High number of non-standard characters ({non_std_count}) - may indicate formatting issues")
-        elif non_std_count > 50:
-            checks["text_extraction_quality"] -= 10
-            checks["issues"].append(f"Some non-standard characters detected ({non_std_count})")
-        
-        # Check 3: Parse error patterns
-        # Check for malformed dates (common ATS parsing issue)
-        # Look for date patterns that might be broken
-        date_patterns = [
-            r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}',  # Standard dates
-            r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{4}',  # Month Year
-        ]
-        found_dates = 0
-        for pattern in date_patterns:
-            found_dates += len(re.findall(pattern, resume_text, re.IGNORECASE))
-        
-        # If no dates found but resume is long, might indicate parsing issues
-        if text_length > 2000 and found_dates < 2:
-            checks["parse_errors"].append("Few or no dates detected - may indicate parsing issues")
-            checks["text_extraction_quality"] -= 10
-        
-        # Check 4: Column structure detection
-        # Look for text that might indicate broken column parsing
-        # Common issue: dates/companies on left, descriptions on right get mixed
-        lines = resume_text.split('\n')
-        suspicious_lines = 0
-        for line in lines:
-            # Very short lines followed by very long lines might indicate column issues
-            stripped = line.strip()
-            if len(stripped) > 0 and len(stripped) < 5:
-                suspicious_lines += 1
-        
-        if suspicious_lines > len(lines) * 0.3:  # More than 30% of lines are suspiciously short
-            checks["column_structure_issues"] = True
-            checks["text_extraction_quality"] -= 15
-            checks["issues"].append("Possible column structure issues detected - text may be misaligned")
-        
-        # Check 5: Section headers detection
-        # ATS-friendly resumes should have clear section headers
-        section_keywords = ['experience', 'education', 'skills', 'summary', 'objective', 'work', 'employment']
-        found_sections = sum(1 for keyword in section_keywords if keyword.lower() in resume_text.lower())
-        
-        if found_sections < 2:
-            checks["text_extraction_quality"] -= 10
-            checks["issues"].append("Few standard section headers detected - may affect ATS parsing")
-        
-        # Calculate final score (0-100)
-        checks["score"] = max(0, min(100, checks["text_extraction_quality"]))
-        
-        return checks
+        return ats_scanner.scan_resume(resume_text)
 
     def _get_analysis_cache_key(self, resume_text: str, job_description: str) -> str:
         """
@@ -1019,20 +835,10 @@ Remember: {lang_instruction}"""
                 pass
             
             # Fallback: In-memory cache (not persisted across restarts)
-            if not hasattr(self, '_memory_cache'):
-                self._memory_cache = {}
-                self._memory_cache_timestamps = {}
-            
-            if cache_key in self._memory_cache:
-                # Check if cache entry is still valid (24 hours)
-                cache_time = self._memory_cache_timestamps.get(cache_key, 0)
-                if time.time() - cache_time < 86400:
-                    logger.info(f"Cache hit from memory: {cache_key}")
-                    return self._memory_cache[cache_key]
-                else:
-                    # Expired, remove it
-                    del self._memory_cache[cache_key]
-                    del self._memory_cache_timestamps[cache_key]
+            cached = self._memory_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Cache hit from memory: {cache_key}")
+                return cached
             
             return None
         except Exception as e:
@@ -1058,20 +864,8 @@ Remember: {lang_instruction}"""
                 # Redis not available or error, fall back to in-memory
                 pass
             
-            # Fallback: In-memory cache
-            if not hasattr(self, '_memory_cache'):
-                self._memory_cache = {}
-                self._memory_cache_timestamps = {}
-            
-            self._memory_cache[cache_key] = result
-            self._memory_cache_timestamps[cache_key] = time.time()
-            
-            # Limit memory cache size (keep only last 100 entries)
-            if len(self._memory_cache) > 100:
-                # Remove oldest entry
-                oldest_key = min(self._memory_cache_timestamps.items(), key=lambda x: x[1])[0]
-                del self._memory_cache[oldest_key]
-                del self._memory_cache_timestamps[oldest_key]
+            # Fallback: In-memory cache (LRU, bounded by entries and bytes)
+            self._memory_cache.set(cache_key, result, ttl_seconds=ttl_seconds)
             
             logger.info(f"Cached analysis result in memory: {cache_key}")
         except Exception as e:
@@ -84,12 +84,14 @@ class JobPostingIngestionManager:
             from app import app
             from models import JobPostingKeyword, Keyword
             from skill_extractor import get_skill_extractor
+            from services import market_cache, market_rollup_service
 
             with app.app_context():
                 ingested = 0
                 skipped = 0
                 errors = 0
                 extracted_skills = 0
+                new_rows = []
 
                 # Get skill extractor if skills should be extracted
                 if extract_skills:
@@ -134,6 +136,7 @@ class JobPostingIngestionManager:
                                         extracted_at=posting.extracted_at
                                     )
                                     self.db.session.add(job_posting_keyword)
+                                    new_rows.append(job_posting_keyword)
                                     extracted_skills += 1
 
                                 except Exception as e:
@@ -146,7 +149,11 @@ class JobPostingIngestionManager:
                         logger.error(f"Error ingesting posting {posting.job_title}: {str(e)}")
                         errors += 1
 
+                # Fold the new rows into the daily rollup in the same transaction
+                market_rollup_service.record_postings(new_rows)
                 self.db.session.commit()
+                if new_rows:
+                    market_cache.bump_generation('ingest_postings')
 
                 return {
                     'postings_ingested': ingested,
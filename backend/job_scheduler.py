@@ -154,7 +154,8 @@ class JobPostingScheduler:
                 'status': task['status'],
                 'created_at': task['created_at'].isoformat(),
                 'last_run': task['last_run'].isoformat() if task['last_run'] else None,
-                'next_run': task['next_run'].isoformat() if task['next_run'] else None
+                'next_run': task['next_run'].isoformat() if task['next_run'] else None,
+                'last_metrics': task.get('last_metrics')
             }
         return None
 
@@ -166,7 +167,8 @@ class JobPostingScheduler:
                 'status': task['status'],
                 'created_at': task['created_at'].isoformat(),
                 'last_run': task['last_run'].isoformat() if task['last_run'] else None,
-                'next_run': task['next_run'].isoformat() if task['next_run'] else None
+                'next_run': task['next_run'].isoformat() if task['next_run'] else None,
+                'last_metrics': task.get('last_metrics')
             }
             for job_id, task in self.tasks.items()
         ]
@@ -234,13 +236,21 @@ def scheduled_job(job_id, minutes=None, hours=None, days=None):
     return decorator
 
 
-def log_job_execution(job_id, func_name, status, duration=None, error=None):
-    """Log job execution details"""
+def log_job_execution(job_id, func_name, status, duration=None, error=None, metrics=None):
+    """
+    Log job execution details
+
+    Args:
+        metrics: Optional dict of job-specific counters (rows written, etc.),
+            kept as the task's last_metrics
+    """
     scheduler_instance = get_scheduler()
     if job_id in scheduler_instance.tasks:
         scheduler_instance.tasks[job_id]['last_run'] = datetime.utcnow()
         if scheduler_instance.tasks[job_id]['job']:
             scheduler_instance.tasks[job_id]['next_run'] = scheduler_instance.tasks[job_id]['job'].next_run_time
+        if metrics is not None:
+            scheduler_instance.tasks[job_id]['last_metrics'] = metrics
 
     log_entry = {
         'job_id': job_id,
@@ -249,11 +259,14 @@ def log_job_execution(job_id, func_name, status, duration=None, error=None):
         'timestamp': datetime.utcnow().isoformat(),
         'duration': duration
     }
+    if metrics is not None:
+        log_entry['metrics'] = metrics
 
     if error:
         log_entry['error'] = str(error)
         logger.error(f"Job '{job_id}' failed: {error}")
     else:
-        logger.info(f"Job '{job_id}' executed successfully in {duration}s")
+        logger.info(f"Job '{job_id}' executed successfully in {duration}s"
+                    + (f" {metrics}" if metrics else ''))
 
     return log_entry
@@ -13,42 +13,31 @@ from models import (
 from difflib import SequenceMatcher
 import re
 from functools import lru_cache
-from datetime import datetime, timedelta
 import logging
 
+from services.memory_cache import MemoryCache
+
 logger = logging.getLogger(__name__)
 
 
 class KeywordManager:
     """Intelligent keyword management with caching and semantic matching"""
 
-    def __init__(self, cache_timeout=300):  # 5 minute cache
+    def __init__(self, cache_timeout=300, max_cache_entries=5000):  # 5 minute cache
         self.cache_timeout = cache_timeout
-        self.cache = {}
-        self.cache_times = {}
-
-    def _is_cache_valid(self, key):
-        """Check if cache entry is still valid"""
-        if key not in self.cache_times:
-            return False
-        elapsed = (datetime.utcnow() - self.cache_times[key]).total_seconds()
-        return elapsed < self.cache_timeout
+        self.cache = MemoryCache(max_entries=max_cache_entries, ttl_seconds=cache_timeout, name='keywords')
 
     def _get_cached(self, key):
         """Get value from cache if valid"""
-        if self._is_cache_valid(key):
-            return self.cache.get(key)
-        return None
+        return self.cache.get(key)
 
     def _set_cache(self, key, value):
         """Store value in cache"""
-        self.cache[key] = value
-        self.cache_times[key] = datetime.utcnow()
+        self.cache.set(key, value)
 
     def clear_cache(self):
         """Clear all cached data"""
         self.cache.clear()
-        self.cache_times.clear()
         logger.info("Keyword manager cache cleared")
 
     # ==================== KEYWORD RETRIEVAL ====================
@@ -487,6 +476,7 @@ class KeywordManager:
             'deprecated': Keyword.query.filter_by(is_deprecated=True).count(),
             'with_salary_premium': Keyword.query.filter(Keyword.average_salary_premium.isnot(None)).count(),
             'cache_size': len(self.cache),
+            'cache_stats': self.cache.get_stats(),
         }
 
     def _count_by_category(self):
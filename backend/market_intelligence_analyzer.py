@@ -13,10 +13,17 @@ from typing import Dict, List, Tuple, Optional
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 import logging
-import statistics
+
+from services.quantile_sketch import TDigest
 
 logger = logging.getLogger(__name__)
 
+# Values reported per skill in top_sources / top_industries / top_locations
+TOP_BREAKDOWN_VALUES = 3
+
+# Rows fetched per round trip when streaming aggregates
+STREAM_BATCH_SIZE = 1000
+
 
 class MarketIntelligenceAnalyzer:
     """Analyzes market trends and job posting data"""
@@ -29,6 +36,11 @@ class MarketIntelligenceAnalyzer:
         """
         Calculate market demand score for each skill based on job postings.
 
+        Reads the daily skill demand rollup (a few rows per skill per window).
+        If the rollup cannot be used, aggregation runs against raw postings: in
+        the database on PostgreSQL (GROUP BY, percentile_cont and ranked top-N
+        windows), or by streaming narrow rows elsewhere.
+
         Args:
             limit_days: Analyze job postings from last N days
             industry: Optional industry filter (e.g., 'Technology', 'Healthcare', 'Security')
@@ -41,111 +53,276 @@ class MarketIntelligenceAnalyzer:
 
         try:
             from app import app
-            from models import JobPostingKeyword, Keyword
-            from sqlalchemy import func
-            from sqlalchemy.orm import joinedload
+            from services import market_rollup_service
 
             with app.app_context():
+                if market_rollup_service.ensure_rollup():
+                    return self._skill_demand_from_rollup(limit_days, industry)
+
                 # Get cutoff date
                 cutoff_date = datetime.utcnow() - timedelta(days=limit_days)
 
-                # Query job postings with skills - EAGERLY LOAD keywords to avoid N+1 queries
-                query = JobPostingKeyword.query.options(
-                    joinedload(JobPostingKeyword.keyword)
-                ).filter(JobPostingKeyword.extracted_at >= cutoff_date)
+                if self._is_postgres():
+                    return self._aggregate_skill_demand_sql(cutoff_date, industry)
+                return self._aggregate_skill_demand_streaming(cutoff_date, industry)
 
-                # Apply industry filter if specified
-                if industry:
-                    # Try exact match first, then case-insensitive partial match
-                    query = query.filter(
-                        JobPostingKeyword.industry.ilike(f'%{industry}%')
-                    )
+        except Exception as e:
+            logger.error(f"Error calculating market demand: {str(e)}")
+            return {}
 
-                postings = query.all()
+    def _is_postgres(self) -> bool:
+        return self.db.session.get_bind().dialect.name == 'postgresql'
 
-                if not postings:
-                    return {}
+    def _skill_demand_from_rollup(self, limit_days: int, industry: Optional[str]) -> Dict[int, Dict]:
+        """Build market demand from SkillDemandDaily cells"""
+        from services import market_rollup_service
+
+        start_day = market_rollup_service.window_start(limit_days)
+        rows = market_rollup_service.aggregate_by_skill(start_day, industry=industry)
+        if not rows:
+            return {}
+
+        total_postings = sum(row.postings_count for row in rows)
+
+        breakdowns = defaultdict(dict)
+        for dimension in ('source', 'industry', 'location'):
+            values = defaultdict(list)
+            for keyword_id, value, count in market_rollup_service.aggregate_breakdown(dimension, start_day, industry):
+                values[keyword_id].append((value, int(count)))
+            for keyword_id, counts in values.items():
+                counts.sort(key=lambda item: (-item[1], item[0]))
+                breakdowns[keyword_id][dimension] = counts[:TOP_BREAKDOWN_VALUES]
+
+        # Salary percentiles from the merged per-cell digests
+        digests = market_rollup_service.merge_salary_digests(start_day, group_by='keyword_id', industry=industry)
+
+        result = {}
+        for row in rows:
+            count = int(row.salary_count or 0)
+            dims = breakdowns[row.keyword_id]
+            digest = digests.get(row.keyword_id)
+            percentiles = digest.percentiles() if digest is not None else None
+            result[row.keyword_id] = self._build_demand_entry(
+                row.keyword_id, row.keyword, int(row.postings_count), total_postings,
+                row.salary_sum / count if count else None,
+                percentiles['p50'] if percentiles else None,
+                row.salary_high - row.salary_low if count else None,
+                dims.get('source', []), dims.get('industry', []), dims.get('location', []),
+                salary_percentiles=percentiles
+            )
+        return result
+
+    @staticmethod
+    def _raw_filters(cutoff_date: datetime, industry: Optional[str]):
+        """Window / industry filters for queries against raw JobPostingKeyword rows"""
+        from models import JobPostingKeyword
+        from services import industry_service
+
+        def apply_filters(query):
+            query = query.filter(JobPostingKeyword.extracted_at >= cutoff_date)
+            if industry:
+                query = query.filter(industry_service.industry_condition(JobPostingKeyword.industry_id, industry))
+            return query
+
+        return apply_filters
+
+    @staticmethod
+    def _build_demand_entry(skill_id: int, skill_name: str, occurrences: int, total_postings: int,
+                            avg_salary, median_salary, salary_range,
+                            sources: List[Tuple[str, int]], industries: List[Tuple[str, int]],
+                            locations: List[Tuple[str, int]],
+                            salary_percentiles: Optional[Dict[str, float]] = None) -> Dict:
+        """Shape one skill's aggregates into the market demand response format"""
+        # Market demand = (occurrences / total postings) * 100
+        demand_percentage = (occurrences / total_postings) * 100
+
+        # Demand score (0-100)
+        demand_score = min(100, demand_percentage * 2)  # Scale up for visibility
+
+        return {
+            'skill_id': skill_id,
+            'skill_name': skill_name,
+            'market_demand_score': round(demand_score, 2),
+            'demand_percentage': round(demand_percentage, 2),
+            'postings_count': occurrences,
+            'average_salary': round(float(avg_salary), 2) if avg_salary else None,
+            'median_salary': round(float(median_salary), 2) if median_salary else None,
+            'salary_range': round(float(salary_range), 2) if salary_range else None,
+            'salary_percentiles': salary_percentiles,
+            'top_sources': dict(sources),
+            'top_industries': dict(industries),
+            'top_locations': dict(locations)
+        }
+
+    def _aggregate_skill_demand_sql(self, cutoff_date: datetime, industry: Optional[str]) -> Dict[int, Dict]:
+        """PostgreSQL: aggregate demand, salary percentiles and top-N breakdowns in the database"""
+        from sqlalchemy import text
+        from services import industry_service
+
+        params = {'cutoff': cutoff_date, 'top_n': TOP_BREAKDOWN_VALUES}
+        industry_filter = ''
+        if industry:
+            industry_filter = 'AND industry_id = ANY(:industry_ids)'
+            params['industry_ids'] = industry_service.resolve_industry_ids(industry)
+
+        filtered_cte = f"""
+            WITH filtered AS (
+                SELECT keyword_id, source, industry, location,
+                       CASE WHEN salary_min <> 0 AND salary_max <> 0
+                            THEN (salary_min + salary_max) / 2.0 END AS salary_mid
+                FROM job_posting_keyword
+                WHERE extracted_at >= :cutoff {industry_filter}
+            )
+        """
 
-                # Aggregate by keyword and build keyword map (no N+1 queries!)
-                skill_data = defaultdict(lambda: {
+        totals = self.db.session.execute(text(filtered_cte + """
+            SELECT f.keyword_id, k.keyword AS skill_name,
+                   COUNT(*) AS occurrences,
+                   AVG(f.salary_mid) AS avg_salary,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY f.salary_mid) AS median_salary,
+                   MAX(f.salary_mid) - MIN(f.salary_mid) AS salary_range,
+                   SUM(COUNT(*)) OVER () AS total_postings
+            FROM filtered f
+            JOIN keywords k ON k.id = f.keyword_id
+            GROUP BY f.keyword_id, k.keyword
+        """), params).fetchall()
+
+        if not totals:
+            return {}
+
+        breakdowns = defaultdict(lambda: {'source': [], 'industry': [], 'location': []})
+        ranked = self.db.session.execute(text(filtered_cte + """
+            , dims AS (
+                SELECT keyword_id, 'source' AS dim, source AS value, COUNT(*) AS cnt
+                FROM filtered WHERE source <> '' GROUP BY keyword_id, source
+                UNION ALL
+                SELECT keyword_id, 'industry', industry, COUNT(*)
+                FROM filtered WHERE industry <> '' GROUP BY keyword_id, industry
+                UNION ALL
+                SELECT keyword_id, 'location', location, COUNT(*)
+                FROM filtered WHERE location <> '' GROUP BY keyword_id, location
+            ), ranked AS (
+                SELECT keyword_id, dim, value, cnt,
+                       ROW_NUMBER() OVER (PARTITION BY keyword_id, dim ORDER BY cnt DESC, value) AS rn
+                FROM dims
+            )
+            SELECT keyword_id, dim, value, cnt FROM ranked
+            WHERE rn <= :top_n
+            ORDER BY keyword_id, dim, rn
+        """), params)
+        for keyword_id, dim, value, cnt in ranked:
+            breakdowns[keyword_id][dim].append((value, cnt))
+
+        result = {}
+        for row in totals:
+            dims = breakdowns[row.keyword_id]
+            result[row.keyword_id] = self._build_demand_entry(
+                row.keyword_id, row.skill_name, row.occurrences, int(row.total_postings),
+                row.avg_salary, row.median_salary, row.salary_range,
+                dims['source'], dims['industry'], dims['location']
+            )
+        return result
+
+    def _aggregate_skill_demand_streaming(self, cutoff_date: datetime, industry: Optional[str]) -> Dict[int, Dict]:
+        """
+        Portable fallback: stream narrow rows in batches and keep per-skill running totals
+
+        Medians come from a second streamed pass ordered by (keyword, salary), so
+        no per-skill salary lists are held in memory.
+        """
+        from models import JobPostingKeyword, Keyword
+
+        apply_filters = self._raw_filters(cutoff_date, industry)
+        rows = apply_filters(self.db.session.query(
+            JobPostingKeyword.keyword_id,
+            Keyword.keyword,
+            JobPostingKeyword.salary_min,
+            JobPostingKeyword.salary_max,
+            JobPostingKeyword.source,
+            JobPostingKeyword.industry,
+            JobPostingKeyword.location
+        ).join(Keyword, Keyword.id == JobPostingKeyword.keyword_id))
+
+        skill_data = {}
+        total_postings = 0
+        for keyword_id, skill_name, salary_min, salary_max, source, posting_industry, location in \
+                rows.yield_per(STREAM_BATCH_SIZE):
+            total_postings += 1
+            data = skill_data.get(keyword_id)
+            if data is None:
+                data = skill_data[keyword_id] = {
+                    'skill_name': skill_name,
                     'occurrences': 0,
-                    'total_frequency': 0,
-                    'salary_values': [],
+                    'salary_count': 0,
+                    'salary_sum': 0.0,
+                    'salary_min': None,
+                    'salary_max': None,
                     'sources': Counter(),
                     'industries': Counter(),
                     'locations': Counter()
-                })
-                keyword_map = {}  # Cache keywords to avoid repeated queries
-
-                for posting in postings:
-                    kid = posting.keyword_id
-
-                    # Store keyword object (already loaded via joinedload)
-                    if kid not in keyword_map and posting.keyword:
-                        keyword_map[kid] = posting.keyword
-
-                    skill_data[kid]['occurrences'] += 1
-                    skill_data[kid]['total_frequency'] += posting.frequency
-
-                    # Collect salary data
-                    if posting.salary_min and posting.salary_max:
-                        avg_salary = (posting.salary_min + posting.salary_max) / 2
-                        skill_data[kid]['salary_values'].append(avg_salary)
-
-                    # Track sources and industries
-                    if posting.source:
-                        skill_data[kid]['sources'][posting.source] += 1
-                    if posting.industry:
-                        skill_data[kid]['industries'][posting.industry] += 1
-                    if posting.location:
-                        skill_data[kid]['locations'][posting.location] += 1
-
-                # Calculate demand scores
-                result = {}
-                total_postings = len(postings)
-
-                for skill_id, data in skill_data.items():
-                    # Use cached keyword (no database query!)
-                    keyword = keyword_map.get(skill_id)
-                    if not keyword:
-                        continue
-
-                    # Market demand = (occurrences / total postings) * 100
-                    demand_percentage = (data['occurrences'] / total_postings) * 100
-
-                    # Salary statistics
-                    if data['salary_values']:
-                        avg_salary = statistics.mean(data['salary_values'])
-                        median_salary = statistics.median(data['salary_values'])
-                        salary_range = max(data['salary_values']) - min(data['salary_values'])
-                    else:
-                        avg_salary = None
-                        median_salary = None
-                        salary_range = None
-
-                    # Demand score (0-100)
-                    demand_score = min(100, demand_percentage * 2)  # Scale up for visibility
-
-                    result[skill_id] = {
-                        'skill_id': skill_id,
-                        'skill_name': keyword.keyword,
-                        'market_demand_score': round(demand_score, 2),
-                        'demand_percentage': round(demand_percentage, 2),
-                        'postings_count': data['occurrences'],
-                        'average_salary': round(avg_salary, 2) if avg_salary else None,
-                        'median_salary': round(median_salary, 2) if median_salary else None,
-                        'salary_range': round(salary_range, 2) if salary_range else None,
-                        'top_sources': dict(data['sources'].most_common(3)),
-                        'top_industries': dict(data['industries'].most_common(3)),
-                        'top_locations': dict(data['locations'].most_common(3))
-                    }
+                }
 
-                return result
+            data['occurrences'] += 1
 
-        except Exception as e:
-            logger.error(f"Error calculating market demand: {str(e)}")
+            if salary_min and salary_max:
+                mid = (salary_min + salary_max) / 2
+                data['salary_count'] += 1
+                data['salary_sum'] += mid
+                data['salary_min'] = mid if data['salary_min'] is None else min(data['salary_min'], mid)
+                data['salary_max'] = mid if data['salary_max'] is None else max(data['salary_max'], mid)
+
+            if source:
+                data['sources'][source] += 1
+            if posting_industry:
+                data['industries'][posting_industry] += 1
+            if location:
+                data['locations'][location] += 1
+
+        if not skill_data:
             return {}
 
+        medians = self._stream_salary_medians(apply_filters, skill_data)
+
+        result = {}
+        for skill_id, data in skill_data.items():
+            count = data['salary_count']
+            result[skill_id] = self._build_demand_entry(
+                skill_id, data['skill_name'], data['occurrences'], total_postings,
+                data['salary_sum'] / count if count else None,
+                medians.get(skill_id),
+                data['salary_max'] - data['salary_min'] if count else None,
+                data['sources'].most_common(TOP_BREAKDOWN_VALUES),
+                data['industries'].most_common(TOP_BREAKDOWN_VALUES),
+                data['locations'].most_common(TOP_BREAKDOWN_VALUES)
+            )
+        return result
+
+    def _stream_salary_medians(self, apply_filters, skill_data: Dict[int, Dict]) -> Dict[int, float]:
+        """Pick each skill's median salary from a (keyword, salary)-ordered stream"""
+        from models import JobPostingKeyword
+
+        midpoint = (JobPostingKeyword.salary_min + JobPostingKeyword.salary_max) / 2.0
+        rows = apply_filters(self.db.session.query(JobPostingKeyword.keyword_id, midpoint)).filter(
+            JobPostingKeyword.salary_min != 0,
+            JobPostingKeyword.salary_max != 0
+        ).order_by(JobPostingKeyword.keyword_id, midpoint)
+
+        medians = {}
+        current_id = None
+        position = 0
+        lower = None
+        for keyword_id, mid in rows.yield_per(STREAM_BATCH_SIZE):
+            if keyword_id != current_id:
+                current_id, position, lower = keyword_id, 0, None
+            count = skill_data[keyword_id]['salary_count'] if keyword_id in skill_data else 0
+            if count:
+                if position == (count - 1) // 2:
+                    lower = float(mid)
+                if position == count // 2:
+                    medians[keyword_id] = (lower + float(mid)) / 2
+            position += 1
+        return medians
+
     def get_salary_trends(self, skill_id: int, limit_days: int = 180) -> Dict:
         """
         Get salary trends over time for a specific skill.
@@ -162,8 +339,9 @@ class MarketIntelligenceAnalyzer:
 
         try:
             from app import app
-            from models import JobPostingKeyword, Keyword
+            from models import Keyword
             from datetime import date
+            from services import market_rollup_service
 
             with app.app_context():
                 # Verify skill exists
@@ -171,47 +349,51 @@ class MarketIntelligenceAnalyzer:
                 if not keyword:
                     return {}
 
-                cutoff_date = datetime.utcnow() - timedelta(days=limit_days)
+                if not market_rollup_service.ensure_rollup():
+                    return {}
 
-                # Get postings with this skill
-                postings = (
-                    JobPostingKeyword.query
-                    .filter(JobPostingKeyword.keyword_id == skill_id)
-                    .filter(JobPostingKeyword.extracted_at >= cutoff_date)
-                    .all()
-                )
+                start_day = market_rollup_service.window_start(limit_days)
+                daily_rows = market_rollup_service.aggregate_by_day(skill_id, start_day)
 
-                if not postings:
+                if not daily_rows:
                     return {'skill_id': skill_id, 'skill_name': keyword.keyword, 'message': 'No data'}
 
-                # Group by month
-                monthly_data = defaultdict(lambda: {'salaries': [], 'count': 0})
-
-                for posting in postings:
-                    month_key = posting.extracted_at.strftime('%Y-%m')
+                # Group rollup days by month
+                monthly_data = defaultdict(lambda: {'count': 0, 'salary_count': 0, 'salary_sum': 0.0})
 
-                    if posting.salary_min and posting.salary_max:
-                        avg = (posting.salary_min + posting.salary_max) / 2
-                        monthly_data[month_key]['salaries'].append(avg)
+                for row in daily_rows:
+                    day = row.day if isinstance(row.day, date) else date.fromisoformat(str(row.day)[:10])
+                    month_key = day.strftime('%Y-%m')
+                    monthly_data[month_key]['count'] += int(row.postings_count)
+                    monthly_data[month_key]['salary_count'] += int(row.salary_count or 0)
+                    monthly_data[month_key]['salary_sum'] += float(row.salary_sum or 0)
 
-                    monthly_data[month_key]['count'] += 1
+                # Merge daily salary digests into monthly ones
+                monthly_digests = defaultdict(TDigest)
+                for day, digest in market_rollup_service.merge_salary_digests(
+                    start_day, group_by='day', keyword_id=skill_id
+                ).items():
+                    monthly_digests[day.strftime('%Y-%m')].merge(digest)
 
                 # Calculate monthly statistics
                 trend_data = []
                 for month in sorted(monthly_data.keys()):
                     data = monthly_data[month]
-                    if data['salaries']:
-                        avg_salary = statistics.mean(data['salaries'])
-                        median_salary = statistics.median(data['salaries'])
+                    percentiles = None
+                    if data['salary_count']:
+                        avg_salary = data['salary_sum'] / data['salary_count']
+                        if month in monthly_digests:
+                            percentiles = monthly_digests[month].percentiles()
                     else:
                         avg_salary = None
-                        median_salary = None
+                    median_salary = percentiles['p50'] if percentiles else None
 
                     trend_data.append({
                         'month': month,
                         'postings': data['count'],
                         'average_salary': round(avg_salary, 2) if avg_salary else None,
-                        'median_salary': round(median_salary, 2) if median_salary else None
+                        'median_salary': round(median_salary, 2) if median_salary else None,
+                        'salary_percentiles': percentiles
                     })
 
                 # Calculate trend direction
@@ -233,7 +415,7 @@ class MarketIntelligenceAnalyzer:
                     'skill_name': keyword.keyword,
                     'trend_direction': trend_direction,
                     'monthly_data': trend_data,
-                    'total_postings': sum(d['count'] for d in trend_data),
+                    'total_postings': sum(d['postings'] for d in trend_data),
                     'period_days': limit_days
                 }
 
@@ -241,13 +423,18 @@ class MarketIntelligenceAnalyzer:
             logger.error(f"Error analyzing salary trends: {str(e)}")
             return {}
 
-    def get_skill_gap_analysis(self, user_skills: List[str], job_title: Optional[str] = None) -> Dict:
+    def get_skill_gap_analysis(self, user_skills: List[str], job_title: Optional[str] = None,
+                               industry: Optional[str] = None) -> Dict:
         """
         Analyze gap between user skills and market demand.
 
+        Compares against the precomputed demand vector of the target role,
+        else the industry, else all postings (see services/skill_gap_index).
+
         Args:
             user_skills: List of skills user has (from resume)
             job_title: Optional target job title
+            industry: Optional industry used when the role has no vector
 
         Returns:
             Dictionary with skill gap analysis
@@ -257,51 +444,28 @@ class MarketIntelligenceAnalyzer:
 
         try:
             from app import app
-            from models import JobPostingKeyword, Keyword
-            from sqlalchemy import func
+            from services import skill_gap_index
 
             with app.app_context():
-                # Get market demand for all skills
-                market_demand = self.get_skill_market_demand()
+                gaps = skill_gap_index.analyze_gap(user_skills, job_title=job_title, industry=industry)
+                if gaps is None:
+                    return {}
 
-                # Find user skill IDs
-                user_skill_ids = set()
-                for skill_name in user_skills:
-                    keyword = Keyword.query.filter_by(keyword=skill_name.lower()).first()
-                    if keyword:
-                        user_skill_ids.add(keyword.id)
-
-                # Get top demanded skills
-                top_skills = sorted(
-                    market_demand.values(),
-                    key=lambda x: x['market_demand_score'],
-                    reverse=True
-                )[:20]
-
-                # Analyze gaps
-                have_skills = []
-                missing_skills = []
-                high_demand_missing = []
-
-                for skill_data in top_skills:
-                    if skill_data['skill_id'] in user_skill_ids:
-                        have_skills.append(skill_data)
-                    else:
-                        missing_skills.append(skill_data)
-                        if skill_data['market_demand_score'] >= 70:  # High demand threshold
-                            high_demand_missing.append(skill_data)
+                have_skills = gaps['have_skills']
+                high_demand_missing = gaps['high_demand_missing']
 
                 # Calculate gap score
-                gap_score = (len(high_demand_missing) / max(1, len(top_skills))) * 100
+                gap_score = (len(high_demand_missing) / max(1, gaps['compared_skills'])) * 100
 
                 return {
                     'user_skill_count': len(user_skills),
                     'matched_skills': len(have_skills),
-                    'missing_skills': len(missing_skills),
+                    'missing_skills': len(gaps['missing_skills']),
                     'high_demand_gaps': len(high_demand_missing),
                     'gap_score': round(gap_score, 1),  # 0-100, lower is better
                     'have_skills': have_skills[:10],
                     'missing_high_demand': high_demand_missing[:10],
+                    'demand_scope': gaps['scope'],
                     'recommendation': self._get_gap_recommendation(gap_score)
                 }
 
@@ -338,65 +502,41 @@ class MarketIntelligenceAnalyzer:
 
         try:
             from app import app
-            from models import JobPostingKeyword, Keyword
-            from sqlalchemy.orm import joinedload
+            from services import market_rollup_service
 
             with app.app_context():
-                cutoff_date = datetime.utcnow() - timedelta(days=limit_days)
+                if not market_rollup_service.ensure_rollup():
+                    return {}
 
-                # Get postings for this industry - EAGERLY LOAD keywords to avoid N+1 queries
-                postings = (
-                    JobPostingKeyword.query
-                    .options(joinedload(JobPostingKeyword.keyword))
-                    .filter(JobPostingKeyword.industry.ilike(f"%{industry}%"))
-                    .filter(JobPostingKeyword.extracted_at >= cutoff_date)
-                    .all()
+                # Sum this industry's rollup cells per skill
+                rows = market_rollup_service.aggregate_by_skill(
+                    market_rollup_service.window_start(limit_days), industry=industry
                 )
 
-                if not postings:
+                if not rows:
                     return {'industry': industry, 'message': 'No data available'}
 
-                # Count skill occurrences and build keyword map (no N+1 queries!)
-                skill_counts = Counter()
-                skill_salaries = defaultdict(list)
-                keyword_map = {}  # Cache keywords to avoid repeated queries
-
-                for posting in postings:
-                    skill_counts[posting.keyword_id] += posting.frequency
-
-                    # Store keyword object (already loaded via joinedload)
-                    if posting.keyword_id not in keyword_map and posting.keyword:
-                        keyword_map[posting.keyword_id] = posting.keyword
-
-                    if posting.salary_min and posting.salary_max:
-                        avg_salary = (posting.salary_min + posting.salary_max) / 2
-                        skill_salaries[posting.keyword_id].append(avg_salary)
-
-                # Get top skills
+                # Get top skills by how often postings mention them
+                rows.sort(key=lambda row: row.frequency_sum or 0, reverse=True)
                 top_skills = []
-                for skill_id, count in skill_counts.most_common(15):
-                    # Use cached keyword (no database query!)
-                    keyword = keyword_map.get(skill_id)
-                    if not keyword:
-                        continue
-
+                for row in rows[:15]:
                     # Calculate average salary for this skill in this industry
-                    if skill_salaries[skill_id]:
-                        avg_salary = statistics.mean(skill_salaries[skill_id])
+                    if row.salary_count:
+                        avg_salary = row.salary_sum / row.salary_count
                     else:
                         avg_salary = None
 
                     top_skills.append({
-                        'skill_id': skill_id,
-                        'skill_name': keyword.keyword,
-                        'demand_frequency': count,
+                        'skill_id': row.keyword_id,
+                        'skill_name': row.keyword,
+                        'demand_frequency': int(row.frequency_sum or 0),
                         'average_salary': round(avg_salary, 2) if avg_salary else None,
-                        'category': keyword.category
+                        'category': row.category
                     })
 
                 return {
                     'industry': industry,
-                    'postings_analyzed': len(postings),
+                    'postings_analyzed': sum(int(row.postings_count) for row in rows),
                     'top_skills': top_skills,
                     'period_days': limit_days
                 }
@@ -409,6 +549,9 @@ class MarketIntelligenceAnalyzer:
         """
         Get salary insights for a location, optionally for a specific skill.
 
+        Reads rollup cells for the location (all retained days) and merges their
+        salary digests for the median and percentiles.
+
         Args:
             location: Location (e.g., 'San Francisco, CA')
             skill_id: Optional skill ID for location-specific salary
@@ -421,53 +564,46 @@ class MarketIntelligenceAnalyzer:
 
         try:
             from app import app
-            from models import JobPostingKeyword, Keyword
-            from sqlalchemy import func
-            from sqlalchemy.orm import joinedload
+            from models import Keyword
+            from services import market_rollup_service
 
             with app.app_context():
-                # Build query with eager loading
-                query = JobPostingKeyword.query.options(
-                    joinedload(JobPostingKeyword.keyword)
-                ).filter(
-                    JobPostingKeyword.location.ilike(f"%{location}%")
-                )
-
-                if skill_id:
-                    query = query.filter(JobPostingKeyword.keyword_id == skill_id)
+                if not market_rollup_service.ensure_rollup():
+                    return {}
 
-                postings = query.all()
+                start_day = market_rollup_service.window_start(market_rollup_service.ROLLUP_RETENTION_DAYS)
+                totals = market_rollup_service.aggregate_location(location, start_day, keyword_id=skill_id)
 
-                if not postings:
+                if not totals.postings_count:
                     return {'location': location, 'message': 'No data available'}
 
-                # Collect salary data
-                salaries = []
-                for posting in postings:
-                    if posting.salary_min and posting.salary_max:
-                        avg = (posting.salary_min + posting.salary_max) / 2
-                        salaries.append(avg)
-
-                if salaries:
-                    avg_salary = statistics.mean(salaries)
-                    median_salary = statistics.median(salaries)
-                    min_salary = min(salaries)
-                    max_salary = max(salaries)
+                salary_count = int(totals.salary_count or 0)
+                percentiles = None
+                if salary_count:
+                    avg_salary = totals.salary_sum / salary_count
+                    digest = market_rollup_service.merge_salary_digests(
+                        start_day, keyword_id=skill_id, location=location
+                    ).get(None)
+                    percentiles = digest.percentiles() if digest is not None else None
+                    min_salary = totals.salary_low
+                    max_salary = totals.salary_high
                 else:
-                    avg_salary = median_salary = min_salary = max_salary = None
+                    avg_salary = min_salary = max_salary = None
+                median_salary = percentiles['p50'] if percentiles else None
 
                 result = {
                     'location': location,
-                    'postings_count': len(postings),
+                    'postings_count': int(totals.postings_count),
                     'average_salary': round(avg_salary, 2) if avg_salary else None,
                     'median_salary': round(median_salary, 2) if median_salary else None,
                     'min_salary': round(min_salary, 2) if min_salary else None,
-                    'max_salary': round(max_salary, 2) if max_salary else None
+                    'max_salary': round(max_salary, 2) if max_salary else None,
+                    'salary_percentiles': percentiles
                 }
 
-                # If skill-specific, add skill name (use cached keyword, no database query!)
-                if skill_id and postings:
-                    keyword = postings[0].keyword  # Use eagerly loaded keyword
+                # If skill-specific, add skill name
+                if skill_id:
+                    keyword = Keyword.query.get(skill_id)
                     if keyword:
                         result['skill_name'] = keyword.keyword
 
@@ -2,7 +2,8 @@
 from functools import wraps
 from flask import request, jsonify, g
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-from models import User, AdminLog
+from models import AdminLog
+from services.user_context import load_user, has_permission
 from datetime import datetime
 
 
@@ -13,7 +14,7 @@ def require_admin(f):
         try:
             verify_jwt_in_request()
             user_id = get_jwt_identity()
-            user = User.query.get(user_id)
+            user = load_user(user_id)
 
             if not user or not user.is_admin:
                 return jsonify({
@@ -42,9 +43,9 @@ def require_permission(permission_name):
             try:
                 verify_jwt_in_request()
                 user_id = get_jwt_identity()
-                user = User.query.get(user_id)
+                user = load_user(user_id)
 
-                if not user or not user.has_permission(permission_name):
+                if not user or not has_permission(user, permission_name):
                     return jsonify({
                         'status': 'error',
                         'message': f'Permission required: {permission_name}',
@@ -72,7 +73,7 @@ def admin_action_log(action_name, resource_type):
             try:
                 verify_jwt_in_request()
                 user_id = get_jwt_identity()
-                user = User.query.get(user_id)
+                user = load_user(user_id)
 
                 if not user or not user.is_admin:
                     return jsonify({
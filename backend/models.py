@@ -340,6 +340,17 @@ class SystemConfiguration(db.Model):
             'updated_at': self.updated_at.isoformat()
         }
 
+class ConfigVersion(db.Model):
+    """Single-row counter bumped on every configuration write so workers know to reload"""
+    __tablename__ = 'config_version'
+
+    id = db.Column(db.Integer, primary_key=True)  # Always 1
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ConfigVersion {self.version}>'
+
 class SubscriptionTier(db.Model):
     """Define subscription tiers with their features and limits"""
     __tablename__ = 'subscription_tiers'
@@ -655,6 +666,41 @@ class UserSkillHistory(db.Model):
         return f'<UserSkillHistory user={self.user_id}, keyword={self.keyword_id}>'
 
 
+class UserSkillProfile(db.Model):
+    """Materialized per-user skill profile, updated incrementally as analyses are saved"""
+    __tablename__ = 'user_skill_profiles'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+
+    # Parallel arrays sorted by skill name: ["aws", "python"] / [1.8, 1.0]
+    skill_names = db.Column(db.JSON, default=[])
+    skill_weights = db.Column(db.JSON, default=[])
+    keyword_ids = db.Column(db.JSON, default=[])  # Sorted ids of skills that resolve to a Keyword row
+
+    experience_level = db.Column(db.String(50), nullable=True)  # 'Entry', 'Mid', 'Senior', 'Lead', 'Executive'
+    industry = db.Column(db.String(100), nullable=True)  # Most recent detected industry
+    analyses_count = db.Column(db.Integer, default=0, nullable=False)
+    last_analysis_id = db.Column(db.Integer, nullable=True)
+    last_analysis_at = db.Column(db.DateTime, nullable=True)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserSkillProfile user={self.user_id} skills={len(self.skill_names or [])}>'
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'skills': dict(zip(self.skill_names or [], self.skill_weights or [])),
+            'keyword_ids': self.keyword_ids or [],
+            'experience_level': self.experience_level,
+            'industry': self.industry,
+            'analyses_count': self.analyses_count,
+            'last_analysis_at': self.last_analysis_at.isoformat() if self.last_analysis_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
 # ==================== NEW: ML AND MARKET INTELLIGENCE MODELS ====================
 
 class SkillExtraction(db.Model):
@@ -714,6 +760,31 @@ class SkillRelationship(db.Model):
         return f'<SkillRelationship {self.skill_1_id} <-> {self.skill_2_id}>'
 
 
+class Industry(db.Model):
+    """Canonical industry dimension - market tables join on industry_id instead of matching names"""
+    __tablename__ = 'industries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)  # Canonical display name, e.g. 'Technology'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    aliases = db.relationship('IndustryAlias', backref='industry', lazy='dynamic', cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<Industry {self.name}>'
+
+
+class IndustryAlias(db.Model):
+    """Lowercased industry name / synonym -> canonical industry (raw posting values included)"""
+    __tablename__ = 'industry_aliases'
+
+    alias = db.Column(db.String(100), primary_key=True)
+    industry_id = db.Column(db.Integer, db.ForeignKey('industries.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<IndustryAlias {self.alias} -> {self.industry_id}>'
+
+
 class JobPostingKeyword(db.Model):
     """Track skills extracted from job postings for market intelligence"""
     __tablename__ = 'job_posting_keyword'
@@ -735,6 +806,7 @@ class JobPostingKeyword(db.Model):
     # Location and industry
     location = db.Column(db.String(200), nullable=True)
     industry = db.Column(db.String(100), nullable=True)
+    industry_id = db.Column(db.Integer, db.ForeignKey('industries.id'), nullable=True)  # Resolved from industry
 
     # Metadata
     source = db.Column(db.String(50))  # 'indeed', 'linkedin', 'glassdoor', etc.
@@ -744,6 +816,7 @@ class JobPostingKeyword(db.Model):
         db.Index('idx_job_keyword', 'keyword_id'),
         db.Index('idx_job_posting_keyword_location', 'location'),
         db.Index('idx_job_posting_keyword_industry', 'industry'),
+        db.Index('idx_job_posting_keyword_industry_id', 'industry_id', 'extracted_at'),
         db.Index('idx_job_extracted_at', 'extracted_at'),
     )
 
@@ -751,6 +824,70 @@ class JobPostingKeyword(db.Model):
         return f'<JobPostingKeyword {self.job_title} - {self.keyword_id}>'
 
 
+class SkillDemandDaily(db.Model):
+    """Daily rollup of JobPostingKeyword rows so market queries never rescan raw postings"""
+    __tablename__ = 'skill_demand_daily'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Cell key - empty string instead of NULL so the unique constraint applies
+    day = db.Column(db.Date, nullable=False)
+    keyword_id = db.Column(db.Integer, db.ForeignKey('keywords.id', ondelete='CASCADE'), nullable=False)
+    industry = db.Column(db.String(100), nullable=False, default='')
+    location = db.Column(db.String(200), nullable=False, default='')
+    source = db.Column(db.String(50), nullable=False, default='')
+    industry_id = db.Column(db.Integer, db.ForeignKey('industries.id'), nullable=True)  # Resolved from industry (NULL when blank)
+
+    postings_count = db.Column(db.Integer, nullable=False, default=0)  # JobPostingKeyword rows in the cell
+    frequency_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    # Salary midpoint (min + max) / 2 over rows that have both bounds
+    salary_count = db.Column(db.Integer, nullable=False, default=0)
+    salary_sum = db.Column(db.Float, nullable=False, default=0.0)
+    salary_low = db.Column(db.Float, nullable=True)
+    salary_high = db.Column(db.Float, nullable=True)
+    salary_digest = db.Column(db.JSON(none_as_null=True), nullable=True)  # t-digest centroids [[mean, weight], ...] of the midpoints
+
+    # Raw bounds, for averages of salary_min / salary_max on their own
+    salary_min_count = db.Column(db.Integer, nullable=False, default=0)
+    salary_min_sum = db.Column(db.Float, nullable=False, default=0.0)
+    salary_max_count = db.Column(db.Integer, nullable=False, default=0)
+    salary_max_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    last_seen = db.Column(db.DateTime, nullable=True)  # Latest extracted_at in the cell
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'keyword_id', 'industry', 'location', 'source', name='unique_skill_demand_cell'),
+        db.Index('idx_skill_demand_keyword_day', 'keyword_id', 'day'),
+        db.Index('idx_skill_demand_day', 'day'),
+        db.Index('idx_skill_demand_industry_day', 'industry_id', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<SkillDemandDaily {self.day} keyword={self.keyword_id} count={self.postings_count}>'
+
+
+class SkillDemandVector(db.Model):
+    """Precomputed ranked skill demand for one scope (all postings, an industry or a role)"""
+    __tablename__ = 'skill_demand_vectors'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # 'all', 'industry', 'role'
+    scope_key = db.Column(db.String(200), nullable=False, default='')  # industry id or normalized role
+    window_days = db.Column(db.Integer, nullable=False)
+    total_postings = db.Column(db.Integer, nullable=False, default=0)  # JobPostingKeyword rows in scope
+    entries = db.Column(db.JSON, nullable=False)  # [[keyword_id, keyword, postings_count], ...] by count desc
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_key', 'window_days', name='unique_skill_demand_vector'),
+    )
+
+    def __repr__(self):
+        return f'<SkillDemandVector {self.scope}:{self.scope_key} ({len(self.entries or [])} skills)>'
+
+
 class SkillTaxonomy(db.Model):
     """Hierarchical skill taxonomy for organizational structure"""
     __tablename__ = 'skill_taxonomy'
@@ -1451,6 +1588,27 @@ class Purchase(db.Model):
         }
 
 
+class CreditLedgerEntry(db.Model):
+    """Append-only audit log of every change to a user's credit balance"""
+    __tablename__ = 'credit_ledger'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # 'debit', 'grant', 'reserve', 'commit', 'refund', 'reset'
+    delta = db.Column(db.Integer, nullable=False)  # Change to users.credits (negative for charges)
+    balance_after = db.Column(db.Integer, nullable=True)  # users.credits right after the change
+    operation = db.Column(db.String(100), nullable=True)  # 'analyze', 'cover_letter', 'purchase', ...
+    settles_id = db.Column(db.Integer, db.ForeignKey('credit_ledger.id'), nullable=True, unique=True)  # Reservation a commit/refund settles
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_credit_ledger_user_created', 'user_id', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<CreditLedgerEntry {self.kind} {self.delta:+d} for User {self.user_id}>'
+
+
 class UserSchema(SQLAlchemyAutoSchema):
     """Marshmallow schema for User serialization"""
     email = fields.Email(required=True, validate=validate.Length(max=120))
@@ -15,6 +15,7 @@ from sqlalchemy import create_engine
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from models import db, JobPostingKeyword, Keyword
+from services import market_cache, market_rollup_service
 from sample_job_postings import load_sample_postings
 from app import app
 
@@ -38,6 +39,7 @@ def populate_market_data():
         inserted_count = 0
         skipped_count = 0
         missing_skills = set()
+        new_rows = []
 
         # Insert job posting keywords
         for posting in sample_postings:
@@ -93,11 +95,14 @@ def populate_market_data():
                 )
 
                 db.session.add(job_keyword)
+                new_rows.append(job_keyword)
                 inserted_count += 1
 
-        # Commit all changes
+        # Commit all changes (rollup update included)
         try:
+            market_rollup_service.record_postings(new_rows)
             db.session.commit()
+            market_cache.bump_generation('populate_market_data')
             print(f"\n✅ Successfully inserted {inserted_count} job-skill records")
             print(f"⏭️  Skipped {skipped_count} duplicate records")
 
@@ -1,26 +1,21 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from datetime import datetime, timedelta
 from models import db, User, Analysis, analysis_schema, analysis_create_schema
-from validators import FileValidator, TextValidator, RequestValidator, RateLimitValidator
+from validators import FileValidator, TextValidator, RequestValidator
 from errors import ValidationError, NotFoundError, AIProcessingError, FileProcessingError
 from ai_processor import ai_processor
 from gemini_service import gemini_service
 from services.result_filter import ResultFilter
+from services.user_profile_service import record_analysis, rebuild_profile
+from services.user_context import load_user
+from services import admission_control, credit_ledger
 import logging
 
 logger = logging.getLogger(__name__)
 
 analysis_bp = Blueprint('analysis', __name__, url_prefix='/api/v1/analysis')
 
-# Rate limiting
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"]
-)
-
 def create_success_response(message: str, data: dict = None, status_code: int = 200):
     """Create standardized success response"""
     response = {
@@ -35,44 +30,43 @@ def create_success_response(message: str, data: dict = None, status_code: int =
 def get_current_user():
     """Get current user from JWT token"""
     user_id = get_jwt_identity()
-    user = User.query.get(int(user_id))
+    user = load_user(user_id)
     if not user:
         raise NotFoundError("User not found")
     if not user.is_active:
         raise ValidationError("Account is disabled")
     return user
 
+def reserve_credits(user_id: int, operation: str):
+    """
+    Admit an AI request (abuse, daily, balance and tier rate limits plus an AI
+    queue slot) and hold its credits for the duration of the AI call
+
+    Returns:
+        Tuple of (reservation id, None), or (None, error response) when rejected
+    """
+    decision = admission_control.admit(user_id, operation)
+    if not decision.allowed:
+        return None, decision.to_response()
+    reservation_id = credit_ledger.reserve(user_id, decision.required_credits, operation)
+    if reservation_id is None:
+        return None, (jsonify({'error': 'Insufficient credits'}), 402)
+    return reservation_id, None
+
+def release_credits(reservation_id):
+    """Hand reserved credits back after a failed AI call"""
+    if reservation_id is not None:
+        db.session.rollback()
+        credit_ledger.refund_reservation(reservation_id)
+
 @analysis_bp.route('/analyze', methods=['POST'])
 @jwt_required()
-@limiter.limit("10 per hour")
 def analyze_resume():
     """Analyze resume against job description"""
+    reservation_id = None
     try:
         user = get_current_user()
 
-        # Check if user has enough credits
-        from services.subscription_service import SubscriptionService
-        credit_check = SubscriptionService.check_credit_limit(user.id, 'resume_analysis')
-
-        if not credit_check['has_credits']:
-            return jsonify({
-                'status': 'error',
-                'error': 'Insufficient credits',
-                'credits_available': credit_check['credits_available'],
-                'credits_needed': credit_check['credits_needed'],
-                'message': f"You need {credit_check['credits_needed']} credit(s) but only have {credit_check['credits_available']}. Please upgrade your plan.",
-                'upgrade_url': '/pricing'
-            }), 402  # Payment Required
-
-        # Check rate limits
-        today = datetime.utcnow().date()
-        analyses_today = Analysis.query.filter(
-            Analysis.user_id == user.id,
-            db.func.date(Analysis.created_at) == today
-        ).count()
-
-        RateLimitValidator.validate_analysis_rate_limit(user.id, analyses_today)
-        
         # Validate file upload
         if 'resume' not in request.files:
             raise ValidationError("Resume file is required")
@@ -89,6 +83,11 @@ def analyze_resume():
         job_description = TextValidator.validate_job_description(form_data['job_description'])
         job_title = TextValidator.validate_job_title(form_data.get('job_title'))
         company_name = TextValidator.validate_company_name(form_data.get('company_name'))
+
+        # Credits, daily and tier limits are checked once the request is known to be valid
+        reservation_id, rejection = reserve_credits(user.id, 'analyze')
+        if rejection:
+            return rejection
         
         # Process the analysis
         logger.info(f"Starting resume analysis for user {user.id}")
@@ -110,10 +109,13 @@ def analyze_resume():
         
         db.session.add(analysis)
         db.session.commit()
+        record_analysis(analysis)
 
-        # Deduct credits after successful analysis
-        deduction_result = SubscriptionService.deduct_credits(user.id, 'resume_analysis')
-        logger.info(f"Analysis completed for user {user.id}, score: {result['match_score']}%. Credits remaining: {deduction_result['credits_remaining']}")
+        # Keep the reserved credits now the analysis is saved
+        credit_ledger.commit_reservation(reservation_id)
+        reservation_id = None
+        credits_remaining = db.session.query(User.credits).filter_by(id=user.id).scalar()
+        logger.info(f"Analysis completed for user {user.id}, score: {result['match_score']}%. Credits remaining: {credits_remaining}")
 
         # Get user's analysis count to determine if this is their first scan
         analysis_count = Analysis.query.filter_by(user_id=user.id).count()
@@ -127,7 +129,7 @@ def analyze_resume():
 
         # Add analysis metadata
         filtered_result['analysis_id'] = analysis.id
-        filtered_result['credits_remaining'] = deduction_result['credits_remaining']
+        filtered_result['credits_remaining'] = credits_remaining
         filtered_result['created_at'] = analysis.created_at.isoformat()
 
         return create_success_response(
@@ -137,10 +139,12 @@ def analyze_resume():
         
     except (ValidationError, FileProcessingError, AIProcessingError) as e:
         logger.warning(f"Analysis error: {e.message}")
+        release_credits(reservation_id)
         raise
     except Exception as e:
         logger.error(f"Analysis error: {e}")
         db.session.rollback()
+        release_credits(reservation_id)
         raise
 
 @analysis_bp.route('/analyses', methods=['GET'])
@@ -216,9 +220,9 @@ def get_analysis(analysis_id):
 
 @analysis_bp.route('/analyses/<int:analysis_id>/feedback', methods=['POST'])
 @jwt_required()
-@limiter.limit("5 per hour")
 def generate_feedback(analysis_id):
     """Generate AI-powered feedback for analysis"""
+    reservation_id = None
     try:
         user = get_current_user()
         
@@ -226,6 +230,10 @@ def generate_feedback(analysis_id):
         if not analysis:
             raise NotFoundError("Analysis not found")
         
+        reservation_id, rejection = reserve_credits(user.id, 'feedback')
+        if rejection:
+            return rejection
+
         # Generate feedback using Gemini
         feedback = gemini_service.generate_personalized_feedback(
             resume_text=analysis.resume_text,
@@ -242,6 +250,8 @@ def generate_feedback(analysis_id):
         analysis.ai_feedback = feedback
         analysis.updated_at = datetime.utcnow()
         db.session.commit()
+        credit_ledger.commit_reservation(reservation_id)
+        reservation_id = None
         
         logger.info(f"Feedback generated for analysis {analysis_id}")
         
@@ -255,17 +265,19 @@ def generate_feedback(analysis_id):
         
     except (NotFoundError, AIProcessingError) as e:
         logger.warning(f"Generate feedback error: {e.message}")
+        release_credits(reservation_id)
         raise
     except Exception as e:
         logger.error(f"Generate feedback error: {e}")
         db.session.rollback()
+        release_credits(reservation_id)
         raise
 
 @analysis_bp.route('/analyses/<int:analysis_id>/optimize', methods=['POST'])
 @jwt_required()
-@limiter.limit("5 per hour")
 def optimize_resume(analysis_id):
     """Generate optimized resume version"""
+    reservation_id = None
     try:
         user = get_current_user()
         
@@ -273,6 +285,10 @@ def optimize_resume(analysis_id):
         if not analysis:
             raise NotFoundError("Analysis not found")
         
+        reservation_id, rejection = reserve_credits(user.id, 'optimize')
+        if rejection:
+            return rejection
+
         # Generate optimized resume using Gemini
         optimized_resume = gemini_service.generate_optimized_resume(
             resume_text=analysis.resume_text,
@@ -287,6 +303,8 @@ def optimize_resume(analysis_id):
         analysis.optimized_resume = optimized_resume
         analysis.updated_at = datetime.utcnow()
         db.session.commit()
+        credit_ledger.commit_reservation(reservation_id)
+        reservation_id = None
         
         logger.info(f"Optimized resume generated for analysis {analysis_id}")
         
@@ -300,17 +318,19 @@ def optimize_resume(analysis_id):
         
     except (NotFoundError, AIProcessingError) as e:
         logger.warning(f"Optimize resume error: {e.message}")
+        release_credits(reservation_id)
         raise
     except Exception as e:
         logger.error(f"Optimize resume error: {e}")
         db.session.rollback()
+        release_credits(reservation_id)
         raise
 
 @analysis_bp.route('/analyses/<int:analysis_id>/cover-letter', methods=['POST'])
 @jwt_required()
-@limiter.limit("5 per hour")
 def generate_cover_letter(analysis_id):
     """Generate tailored cover letter"""
+    reservation_id = None
     try:
         user = get_current_user()
         
@@ -318,6 +338,10 @@ def generate_cover_letter(analysis_id):
         if not analysis:
             raise NotFoundError("Analysis not found")
         
+        reservation_id, rejection = reserve_credits(user.id, 'cover_letter')
+        if rejection:
+            return rejection
+
         # Generate cover letter using Gemini
         cover_letter = gemini_service.generate_cover_letter(
             resume_text=analysis.resume_text,
@@ -328,6 +352,10 @@ def generate_cover_letter(analysis_id):
         
         if not cover_letter:
             raise AIProcessingError("Failed to generate cover letter")
+
+        # Keep the reserved credits now the letter was generated
+        credit_ledger.commit_reservation(reservation_id)
+        reservation_id = None
         
         logger.info(f"Cover letter generated for analysis {analysis_id}")
         
@@ -341,14 +369,15 @@ def generate_cover_letter(analysis_id):
         
     except (NotFoundError, AIProcessingError) as e:
         logger.warning(f"Generate cover letter error: {e.message}")
+        release_credits(reservation_id)
         raise
     except Exception as e:
         logger.error(f"Generate cover letter error: {e}")
+        release_credits(reservation_id)
         raise
 
 @analysis_bp.route('/analyses/<int:analysis_id>/skill-suggestions', methods=['POST'])
 @jwt_required()
-@limiter.limit("5 per hour")
 def get_skill_suggestions(analysis_id):
     """Get suggestions for acquiring missing skills"""
     try:
@@ -358,6 +387,11 @@ def get_skill_suggestions(analysis_id):
         if not analysis:
             raise NotFoundError("Analysis not found")
         
+        # Suggestions are free but still rate limited
+        decision = admission_control.admit(user.id, 'skill_suggestions', required_credits=0)
+        if not decision.allowed:
+            return decision.to_response()
+
         # Generate skill suggestions using Gemini
         suggestions = gemini_service.suggest_missing_experience(
             keywords_missing=analysis.keywords_missing or [],
@@ -397,6 +431,7 @@ def delete_analysis(analysis_id):
         
         db.session.delete(analysis)
         db.session.commit()
+        rebuild_profile(user.id)
         
         logger.info(f"Analysis {analysis_id} deleted by user {user.id}")
         
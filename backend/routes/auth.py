@@ -7,6 +7,8 @@ from datetime import datetime
 from models import db, User, user_schema
 from validators import TextValidator, RequestValidator
 from errors import ValidationError, AuthenticationError, AuthorizationError
+from services import token_revocation
+from services.user_context import load_user
 import logging
 import os
 import secrets
@@ -148,8 +150,7 @@ def login():
 def get_current_user():
     """Get current user information"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(int(user_id))
+        user = load_user()
         
         if not user:
             raise AuthenticationError("User not found")
@@ -172,9 +173,12 @@ def get_current_user():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    """Logout user (token will be invalidated client-side)"""
+    """Logout user and revoke the token"""
     try:
         user_id = get_jwt_identity()
+        jwt_data = get_jwt()
+        if jwt_data.get('jti'):
+            token_revocation.revoke(jwt_data['jti'], jwt_data.get('exp'))
         logger.info(f"User logged out: {user_id}")
         
         return create_success_response("Logout successful")
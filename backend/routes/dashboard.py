@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
-from models import db, User, Analysis
+from models import db, Analysis
+from services.user_context import load_user
 from errors import NotFoundError
 from datetime import datetime, timedelta
 import logging
@@ -24,7 +25,7 @@ def create_success_response(message: str, data: dict = None, status_code: int =
 def get_current_user():
     """Get current user from JWT token"""
     user_id = get_jwt_identity()
-    user = User.query.get(int(user_id))
+    user = load_user(user_id)
     if not user:
         raise NotFoundError("User not found")
     if not user.is_active:
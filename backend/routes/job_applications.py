@@ -6,7 +6,8 @@ Handles CRUD operations for job application tracking
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-from models import db, JobApplication, User
+from models import db, JobApplication
+from services.user_context import load_user
 import logging
 
 job_applications_bp = Blueprint('job_applications', __name__, url_prefix='/api/job-applications')
@@ -19,7 +20,7 @@ VALID_WORK_TYPES = ['remote', 'hybrid', 'onsite', None]
 def get_current_user():
     """Get current authenticated user"""
     user_id = get_jwt_identity()
-    return User.query.get(int(user_id))
+    return load_user(user_id)
 
 
 @job_applications_bp.route('', methods=['GET'])
@@ -433,3 +433,23 @@ def reset_daily_cost_counter():
             'error': 'Failed to reset cost counter',
             'details': str(e)
         }), 500
+
+
+# ============== AI QUEUE MONITORING ==============
+
+@admin_diag_bp.route('/ai-queue', methods=['GET'])
+@jwt_required()
+def get_ai_queue_stats():
+    """
+    Get this worker's AI queue depth, slot usage and per-tier wait times.
+    Admin-only endpoint for watching AI latency under load.
+    """
+    if not is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    from services import ai_queue
+
+    return jsonify({
+        'status': 'success',
+        **ai_queue.get_stats()
+    }), 200
@@ -7,10 +7,11 @@ Allows admins to manage system configurations, subscription tiers, rate limits,
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import (
-    User, SystemConfiguration, SubscriptionTier, RateLimitConfig,
+    SystemConfiguration, SubscriptionTier, RateLimitConfig,
     ScoringThreshold, ValidationRule, db
 )
 from config_manager import get_config_manager
+from services.user_context import load_user
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,7 +26,7 @@ def require_admin():
     def decorator(f):
         def wrapper(*args, **kwargs):
             user_id = get_jwt_identity()
-            user = User.query.get(int(user_id))
+            user = load_user(user_id)
             if not user or not user.is_admin:
                 return jsonify({
                     'status': 'error',
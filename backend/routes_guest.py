@@ -13,6 +13,7 @@ from models import db, GuestSession, GuestAnalysis
 from ai_processor import process_resume_analysis
 from security_config import sanitize_text_input, validate_file_upload
 from services.result_filter import ResultFilter
+from services import guest_admission
 import logging
 
 guest_bp = Blueprint('guest', __name__, url_prefix='/api/guest')
@@ -25,20 +26,15 @@ def generate_guest_token():
     return 'guest_' + secrets.token_urlsafe(32)
 
 def get_guest_session_from_token(token):
-    """Retrieve and validate guest session from token"""
-    if not token or not token.startswith('guest_'):
-        return None
+    """Retrieve and validate guest session state from token (Redis first, then database)"""
+    return guest_admission.get_session(token)
 
-    session = GuestSession.query.filter_by(session_token=token).first()
-    if not session:
-        return None
-
-    if session.is_expired():
-        session.status = 'expired'
-        db.session.commit()
-        return None
-
-    return session
+def get_client_ip():
+    """First X-Forwarded-For address, or the peer address"""
+    ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
+    if ip_address:
+        ip_address = ip_address.split(',')[0].strip()
+    return ip_address
 
 # ============== MIDDLEWARE ==============
 
@@ -50,15 +46,15 @@ def guest_token_required(f):
 
         try:
             token = auth_header.split(' ')[1]
-            guest_session = get_guest_session_from_token(token)
+            guest_state = get_guest_session_from_token(token)
 
-            if not guest_session:
+            if not guest_state:
                 return jsonify({
                     'error': 'Invalid or expired guest session',
                     'error_type': 'UNAUTHORIZED'
                 }), 401
 
-            g.guest_session = guest_session
+            g.guest_state = guest_state
             g.is_guest = True
             return f(*args, **kwargs)
         except (IndexError, AttributeError):
@@ -84,9 +80,7 @@ def create_guest_session():
     """
     try:
         # Get client IP address
-        ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
-        if ip_address:
-            ip_address = ip_address.split(',')[0].strip()
+        ip_address = get_client_ip()
 
         # Get user agent and device fingerprint
         user_agent = request.headers.get('User-Agent', '')
@@ -105,38 +99,12 @@ def create_guest_session():
                     'error_type': 'CAPTCHA_REQUIRED'
                 }), 403
 
-        # SECURITY: Check for abuse - limit guest sessions per IP
-        # Count active sessions from this IP in the last 24 hours
-        recent_sessions_count = GuestSession.query.filter(
-            GuestSession.ip_address == ip_address,
-            GuestSession.created_at >= datetime.utcnow() - timedelta(hours=24),
-            GuestSession.status == 'active'
-        ).count()
-
-        # Allow max 3 active sessions per IP per day to prevent abuse
-        # (Frontend now reuses sessions, so this limit should rarely be hit)
-        if recent_sessions_count >= 3:
-            logger.warning(f"Rate limit exceeded for IP {ip_address}: {recent_sessions_count} sessions in 24h")
-            return jsonify({
-                'error': 'Too many guest sessions from this IP. Please try again later or create an account.',
-                'error_type': 'RATE_LIMIT_EXCEEDED',
-                'retry_after': '24 hours'
-            }), 429
-
-        # SECURITY: Check if this IP has already used guest credits recently
-        # This prevents users from creating multiple sessions to bypass the 2-analysis limit
-        total_analyses_from_ip = db.session.query(GuestAnalysis).join(GuestSession).filter(
-            GuestSession.ip_address == ip_address,
-            GuestSession.created_at >= datetime.utcnow() - timedelta(hours=24)
-        ).count()
-
-        if total_analyses_from_ip >= 3:  # Max 3 total analyses per IP per day across all sessions (reduced from 10 for cost control)
-            logger.warning(f"Analysis limit exceeded for IP {ip_address}: {total_analyses_from_ip} analyses in 24h")
-            return jsonify({
-                'error': 'Daily guest analysis limit reached. Create an account for unlimited access.',
-                'error_type': 'DAILY_LIMIT_EXCEEDED',
-                'analyses_used': total_analyses_from_ip
-            }), 429
+        # SECURITY: Check for abuse - limit guest sessions and analyses per IP.
+        # The analysis count also prevents users from creating multiple sessions
+        # to bypass the per-session limit
+        decision = guest_admission.check_new_session(ip_address)
+        if not decision.allowed:
+            return decision.to_response()
 
         # Generate session
         session_id = str(uuid.uuid4())
@@ -157,6 +125,7 @@ def create_guest_session():
 
         db.session.add(guest_session)
         db.session.commit()
+        guest_admission.record_new_session(guest_session)
 
         logger.info(f"Created guest session {session_id} from {ip_address} (1 credit)")
 
@@ -193,47 +162,17 @@ def analyze_resume_guest():
         - results: Analysis results
         - credits_remaining: Credits left after analysis
     """
-    guest_session = g.guest_session
+    guest_state = g.guest_state
+    ip_address = get_client_ip()
+    claim = None
+    saved = False
 
     try:
-        # CRITICAL: Check daily budget FIRST to prevent runaway costs
-        from cost_tracker import cost_tracker
-        can_proceed, budget_error_msg = cost_tracker.can_process_guest_analysis()
-        if not can_proceed:
-            logger.warning(f"Guest analysis blocked: daily budget exceeded")
-            return jsonify({
-                'error': budget_error_msg,
-                'error_type': 'DAILY_BUDGET_EXCEEDED',
-                'retry_after': '24 hours',
-                'upgrade_message': 'Sign up for a free account to get guaranteed access to 10 analyses per day!'
-            }), 503  # Service Unavailable
-
-        # SECURITY: Check if guest has credits
-        if not guest_session.has_credits():
-            return jsonify({
-                'error': 'No guest credits remaining. Create an account for unlimited analyses.',
-                'error_type': 'INSUFFICIENT_CREDITS',
-                'credits_remaining': 0,
-                'upgrade_message': 'Sign up now to unlock unlimited resume analyses and advanced features!'
-            }), 402
-
-        # SECURITY: Double-check IP hasn't exceeded daily limit (defense in depth)
-        ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
-        if ip_address:
-            ip_address = ip_address.split(',')[0].strip()
-
-        total_analyses_from_ip = db.session.query(GuestAnalysis).join(GuestSession).filter(
-            GuestSession.ip_address == ip_address,
-            GuestSession.created_at >= datetime.utcnow() - timedelta(hours=24)
-        ).count()
-
-        if total_analyses_from_ip >= 1:
-            logger.warning(f"Analysis attempt from IP {ip_address} that exceeded limit")
-            return jsonify({
-                'error': 'Guest analysis limit reached. Sign up for 10 free analyses!',
-                'error_type': 'DAILY_LIMIT_EXCEEDED',
-                'upgrade_message': 'Create an account for 10 free analyses and unlock premium features!'
-            }), 429
+        # CRITICAL: Daily budget first to prevent runaway costs, then the session's
+        # credit and the per-IP/device daily limits (defense in depth)
+        claim = guest_admission.claim_analysis(guest_state, ip_address)
+        if not claim.allowed:
+            return claim.to_response()
 
         # Validate file upload
         if 'resume' not in request.files:
@@ -273,7 +212,7 @@ def analyze_resume_guest():
             from intelligent_resume_analyzer import get_analyzer
             analyzer = get_analyzer()
 
-            logger.info(f"Starting intelligent analysis for guest session {guest_session.id}")
+            logger.info(f"Starting intelligent analysis for guest session {guest_state.id}")
             analysis_result = analyzer.comprehensive_resume_analysis(resume_text, job_description)
 
             if not analysis_result:
@@ -300,6 +239,7 @@ def analyze_resume_guest():
         keywords_found = match_analysis.get('keywords_present', [])
         keywords_missing = [k['keyword'] if isinstance(k, dict) else k for k in match_analysis.get('keywords_missing', [])]
 
+        guest_session = GuestSession.query.get(guest_state.id)
         guest_analysis = GuestAnalysis(
             id=analysis_id,
             guest_session_id=guest_session.id,
@@ -323,14 +263,16 @@ def analyze_resume_guest():
         guest_session.last_activity = datetime.utcnow()
 
         db.session.commit()
+        saved = True
 
         # Record analysis in cost tracker for budget enforcement
+        from cost_tracker import cost_tracker
         cost_tracker.record_guest_analysis()
 
         logger.info(f"Guest analysis created: {analysis_id} for session {guest_session.id}")
 
-        # Count guest analyses for this session (for blur strategy)
-        analyses_count = len(guest_session.analyses)
+        # Count guest analyses for this session (for blur strategy): one credit each
+        analyses_count = guest_session.credits_used
 
         # Apply blur strategy for guest users
         # Guests always see full results on first scan (to hook them), then need to sign up
@@ -358,11 +300,15 @@ def analyze_resume_guest():
 
     except Exception as e:
         logger.error(f"Error in guest analysis: {str(e)}")
+        db.session.rollback()
         return jsonify({
             'error': 'Analysis failed',
             'error_type': 'INTERNAL_SERVER_ERROR',
             'details': str(e)
         }), 500
+    finally:
+        if claim is not None and not saved:
+            guest_admission.release_claim(guest_state, ip_address, claim)
 
 @guest_bp.route('/analysis/<analysis_id>', methods=['GET'])
 @guest_token_required
@@ -373,12 +319,12 @@ def get_guest_analysis(analysis_id):
     Returns:
         - analysis: Guest analysis results (without resume/job_description content for safety)
     """
-    guest_session = g.guest_session
+    guest_state = g.guest_state
 
     try:
         analysis = GuestAnalysis.query.filter_by(
             id=analysis_id,
-            guest_session_id=guest_session.id
+            guest_session_id=guest_state.id
         ).first()
 
         if not analysis:
@@ -408,7 +354,12 @@ def get_guest_analysis(analysis_id):
 @guest_token_required
 def get_guest_session_info():
     """Get current guest session information"""
-    guest_session = g.guest_session
+    guest_session = GuestSession.query.get(g.guest_state.id)
+    if not guest_session:
+        return jsonify({
+            'error': 'Invalid or expired guest session',
+            'error_type': 'UNAUTHORIZED'
+        }), 401
 
     return jsonify({
         'session': guest_session.to_dict(),
@@ -123,6 +123,7 @@ def load_sample_data():
     from sample_job_postings import load_sample_postings
     from models import User, JobPostingKeyword, Keyword
     from app import db
+    from services import market_cache, market_rollup_service
 
     try:
         user_id = int(get_jwt_identity())
@@ -142,6 +143,7 @@ def load_sample_data():
         inserted_count = 0
         duplicate_count = 0
         new_keywords_created = 0
+        new_rows = []
 
         for posting in sample_postings:
             for skill_name in posting.get('skills', []):
@@ -179,10 +181,13 @@ def load_sample_data():
                     source='sample_data'
                 )
                 db.session.add(job_keyword)
+                new_rows.append(job_keyword)
                 inserted_count += 1
 
-        # Commit all changes
+        # Commit all changes (rollup update included)
+        market_rollup_service.record_postings(new_rows)
         db.session.commit()
+        market_cache.bump_generation('load_sample_data')
 
         # Get total count in database
         total_records = JobPostingKeyword.query.count()
@@ -330,6 +335,7 @@ def get_job_postings_statistics():
     from models import JobPostingKeyword
     from app import db
     from sqlalchemy import func
+    from services import industry_service
     import statistics as stat_module
 
     try:
@@ -342,8 +348,8 @@ def get_job_postings_statistics():
         query = JobPostingKeyword.query
 
         if industry_filter and industry_filter.lower() != 'general':
-            # Apply case-insensitive industry filter
-            query = query.filter(JobPostingKeyword.industry.ilike(f'%{industry_filter}%'))
+            # Filter on the resolved industry ids
+            query = query.filter(industry_service.industry_condition(JobPostingKeyword.industry_id, industry_filter))
             logger.info(f"Filtering statistics by industry: {industry_filter}")
 
         postings = query.all()
@@ -14,59 +14,51 @@ ALL DATA IS DYNAMIC - No hardcoded values. Everything comes from real job postin
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
-from sqlalchemy import func, desc, and_, or_
+from sqlalchemy import func, and_
 from collections import Counter, defaultdict
 import logging
 
-from models import db, User, Analysis, Keyword, JobPostingKeyword
+from models import db, User, Keyword, JobPostingKeyword, SkillDemandDaily
+from services import industry_service, market_cache, market_rollup_service, user_profile_service
 
 job_seeker_bp = Blueprint('job_seeker', __name__, url_prefix='/api/insights')
 logger = logging.getLogger(__name__)
 
 
 def get_user_skills(user_id):
-    """Extract skills from user's most recent resume analyses."""
-    analyses = Analysis.query.filter_by(user_id=user_id).order_by(
-        Analysis.created_at.desc()
-    ).limit(5).all()
+    """Get the user's skills from their materialized skill profile."""
+    return user_profile_service.get_user_skill_set(user_id)
 
-    user_skills = set()
-    for analysis in analyses:
-        if analysis.keywords_found:
-            for kw in analysis.keywords_found:
-                if isinstance(kw, dict):
-                    user_skills.add(kw.get('keyword', '').lower())
-                elif isinstance(kw, str):
-                    user_skills.add(kw.lower())
 
-    return user_skills
+def get_user_skill_ids(user_id):
+    """Get the Keyword ids of the user's skills from their skill profile."""
+    return user_profile_service.get_user_keyword_ids(user_id)
 
 
 def get_market_skills_for_industry(industry=None, days=90):
-    """Get skill demand data from real job postings."""
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    """Get skill demand data from the daily skill demand rollup of real job postings."""
+    market_rollup_service.ensure_rollup()
 
     query = db.session.query(
         Keyword.id,
         Keyword.keyword,
         Keyword.category,
-        func.count(JobPostingKeyword.id).label('posting_count'),
-        func.avg(JobPostingKeyword.salary_min).label('avg_salary_min'),
-        func.avg(JobPostingKeyword.salary_max).label('avg_salary_max'),
-        func.max(JobPostingKeyword.extracted_at).label('last_seen')
+        func.sum(SkillDemandDaily.postings_count).label('posting_count'),
+        (func.sum(SkillDemandDaily.salary_min_sum) /
+         func.nullif(func.sum(SkillDemandDaily.salary_min_count), 0)).label('avg_salary_min'),
+        (func.sum(SkillDemandDaily.salary_max_sum) /
+         func.nullif(func.sum(SkillDemandDaily.salary_max_count), 0)).label('avg_salary_max'),
+        func.max(SkillDemandDaily.last_seen).label('last_seen')
     ).join(
-        JobPostingKeyword, Keyword.id == JobPostingKeyword.keyword_id
+        SkillDemandDaily, Keyword.id == SkillDemandDaily.keyword_id
     ).filter(
-        JobPostingKeyword.extracted_at >= cutoff_date
+        SkillDemandDaily.day >= market_rollup_service.window_start(days)
     )
 
     if industry:
-        query = query.filter(
-            or_(
-                JobPostingKeyword.industry.ilike(f'%{industry}%'),
-                Keyword.category.ilike(f'%{industry}%')
-            )
-        )
+        query = query.filter(industry_service.industry_condition(
+            SkillDemandDaily.industry_id, industry, keyword_id_column=SkillDemandDaily.keyword_id
+        ))
 
     query = query.group_by(Keyword.id, Keyword.keyword, Keyword.category)
 
@@ -263,11 +255,7 @@ def get_competitiveness_score():
         qualifying_postings = db.session.query(
             func.count(func.distinct(JobPostingKeyword.job_posting_url))
         ).filter(
-            JobPostingKeyword.keyword_id.in_(
-                db.session.query(Keyword.id).filter(
-                    func.lower(Keyword.keyword).in_(user_skills)
-                )
-            )
+            JobPostingKeyword.keyword_id.in_(get_user_skill_ids(user_id))
         ).scalar() or 0
 
         total_postings = db.session.query(
@@ -352,7 +340,7 @@ def get_salary_estimate():
         )
 
         if industry:
-            query = query.filter(JobPostingKeyword.industry.ilike(f'%{industry}%'))
+            query = query.filter(industry_service.industry_condition(JobPostingKeyword.industry_id, industry))
 
         if location:
             query = query.filter(JobPostingKeyword.location.ilike(f'%{location}%'))
@@ -449,6 +437,69 @@ def get_salary_estimate():
         return jsonify({'error': 'Failed to estimate salary'}), 500
 
 
+def compute_skill_trends(industry=None):
+    """Classify skills as growing, declining, stable or emerging from the last 30 days vs the 60 days before."""
+    # Define time periods for comparison
+    now = datetime.utcnow()
+    recent_start = now - timedelta(days=30)  # Last 30 days
+    previous_start = now - timedelta(days=90)  # Previous 60 days (30-90 days ago)
+
+    # Both windows and the growth class come back from one rollup query
+    market_rollup_service.ensure_rollup()
+    rows = market_rollup_service.aggregate_trends(
+        recent_start.date(), previous_start.date(), industry=industry, match_category=True
+    )
+
+    growing = []
+    declining = []
+    stable_count = 0
+    emerging = []  # New skills that weren't in previous period
+
+    for row in rows:
+        if row.trend == 'emerging':
+            emerging.append({
+                'skill_id': row.keyword_id,
+                'skill_name': row.keyword,
+                'category': row.category,
+                'current_demand': int(row.current_count),
+                'previous_demand': 0,
+                'growth': 'new'
+            })
+        elif row.trend == 'stable':
+            stable_count += 1
+        elif row.trend:
+            trend_data = {
+                'skill_id': row.keyword_id,
+                'skill_name': row.keyword,
+                'category': row.category,
+                'current_demand': int(row.current_count),
+                'previous_demand': int(row.previous_count),
+                'change_percentage': round(float(row.change_percentage), 1)
+            }
+            if row.trend == 'growing':
+                growing.append(trend_data)
+            else:
+                declining.append(trend_data)
+
+    # Sort by change rate
+    growing.sort(key=lambda x: x['change_percentage'], reverse=True)
+    declining.sort(key=lambda x: x['change_percentage'])
+    emerging.sort(key=lambda x: x['current_demand'], reverse=True)
+
+    # Calculate market velocity (how fast the market is changing)
+    total_skills = len(rows)
+    changing_skills = len(growing) + len(declining) + len(emerging)
+    market_velocity = round((changing_skills / total_skills * 100), 1) if total_skills > 0 else 0
+
+    return {
+        'growing': growing,
+        'declining': declining,
+        'emerging': emerging,
+        'stable_count': stable_count,
+        'market_velocity': market_velocity
+    }
+
+
 @job_seeker_bp.route('/trending-skills', methods=['GET'])
 @jwt_required()
 def get_trending_skills():
@@ -466,128 +517,25 @@ def get_trending_skills():
             return jsonify({'error': 'User not found'}), 404
 
         industry = user.preferred_industry
-
-        # Define time periods for comparison
-        now = datetime.utcnow()
-        recent_start = now - timedelta(days=30)  # Last 30 days
-        previous_start = now - timedelta(days=90)  # Previous 60 days (30-90 days ago)
-
-        # Get skill counts for recent period
-        recent_query = db.session.query(
-            Keyword.id,
-            Keyword.keyword,
-            Keyword.category,
-            func.count(JobPostingKeyword.id).label('count')
-        ).join(
-            JobPostingKeyword, Keyword.id == JobPostingKeyword.keyword_id
-        ).filter(
-            JobPostingKeyword.extracted_at >= recent_start
-        )
-
-        if industry:
-            recent_query = recent_query.filter(
-                or_(
-                    JobPostingKeyword.industry.ilike(f'%{industry}%'),
-                    Keyword.category.ilike(f'%{industry}%')
-                )
-            )
-
-        recent_skills = {
-            r.id: {'keyword': r.keyword, 'category': r.category, 'count': r.count}
-            for r in recent_query.group_by(Keyword.id, Keyword.keyword, Keyword.category).all()
-        }
-
-        # Get skill counts for previous period
-        previous_query = db.session.query(
-            Keyword.id,
-            func.count(JobPostingKeyword.id).label('count')
-        ).join(
-            JobPostingKeyword, Keyword.id == JobPostingKeyword.keyword_id
-        ).filter(
-            JobPostingKeyword.extracted_at >= previous_start,
-            JobPostingKeyword.extracted_at < recent_start
+        trends = market_cache.get_or_compute(
+            'trending_skills', industry, (30, 90), lambda: compute_skill_trends(industry)
         )
 
-        if industry:
-            previous_query = previous_query.filter(
-                or_(
-                    JobPostingKeyword.industry.ilike(f'%{industry}%'),
-                    Keyword.category.ilike(f'%{industry}%')
-                )
-            )
-
-        previous_skills = {
-            r.id: r.count
-            for r in previous_query.group_by(Keyword.id).all()
-        }
-
-        # Calculate trends
-        growing = []
-        declining = []
-        stable = []
-        emerging = []  # New skills that weren't in previous period
-
-        for skill_id, data in recent_skills.items():
-            prev_count = previous_skills.get(skill_id, 0)
-            curr_count = data['count']
-
-            if prev_count == 0:
-                if curr_count >= 3:  # At least 3 mentions to be considered emerging
-                    emerging.append({
-                        'skill_id': skill_id,
-                        'skill_name': data['keyword'],
-                        'category': data['category'],
-                        'current_demand': curr_count,
-                        'previous_demand': 0,
-                        'growth': 'new'
-                    })
-            else:
-                change_rate = ((curr_count - prev_count) / prev_count) * 100
-
-                trend_data = {
-                    'skill_id': skill_id,
-                    'skill_name': data['keyword'],
-                    'category': data['category'],
-                    'current_demand': curr_count,
-                    'previous_demand': prev_count,
-                    'change_percentage': round(change_rate, 1)
-                }
-
-                if change_rate >= 25:
-                    growing.append(trend_data)
-                elif change_rate <= -25:
-                    declining.append(trend_data)
-                else:
-                    stable.append(trend_data)
-
-        # Sort by change rate
-        growing.sort(key=lambda x: x['change_percentage'], reverse=True)
-        declining.sort(key=lambda x: x['change_percentage'])
-        emerging.sort(key=lambda x: x['current_demand'], reverse=True)
-
         # Get user's skills to highlight relevant trends
-        user_skills = get_user_skills(user_id)
-        user_skill_ids = set(
-            r.id for r in db.session.query(Keyword.id).filter(
-                func.lower(Keyword.keyword).in_(user_skills)
-            ).all()
-        )
+        user_skill_ids = set(get_user_skill_ids(user_id))
 
-        # Mark which trends affect user
-        for skill_list in [growing, declining, emerging, stable]:
-            for skill in skill_list:
-                skill['user_has_skill'] = skill['skill_id'] in user_skill_ids
-
-        # Calculate market velocity (how fast the market is changing)
-        total_skills = len(recent_skills)
-        changing_skills = len(growing) + len(declining) + len(emerging)
-        market_velocity = round((changing_skills / total_skills * 100), 1) if total_skills > 0 else 0
+        # Mark which trends affect user (on copies - the trend lists are shared)
+        growing, declining, emerging = (
+            [dict(skill, user_has_skill=skill['skill_id'] in user_skill_ids) for skill in trends[name]]
+            for name in ('growing', 'declining', 'emerging')
+        )
+        market_velocity = trends['market_velocity']
 
         return jsonify({
             'growing_skills': growing[:10],
             'declining_skills': declining[:10],
             'emerging_skills': emerging[:10],
-            'stable_skills_count': len(stable),
+            'stable_skills_count': trends['stable_count'],
             'market_velocity': market_velocity,
             'market_velocity_description': 'High change' if market_velocity > 30 else 'Moderate change' if market_velocity > 15 else 'Stable market',
             'analysis_period': {
@@ -607,6 +555,90 @@ def get_trending_skills():
         return jsonify({'error': 'Failed to analyze skill trends'}), 500
 
 
+def compute_location_skill_stats(industry=None):
+    """
+    Aggregate job posting locations per skill (user-independent, cached per industry).
+
+    Returns {location: {keyword_id: (job_count, salary_min_sum, salary_min_count,
+    salary_max_sum, salary_max_count, job_titles)}} so any skill subset can be summed later.
+    """
+    query = db.session.query(
+        JobPostingKeyword.location,
+        JobPostingKeyword.keyword_id,
+        JobPostingKeyword.job_title,
+        func.count(JobPostingKeyword.id),
+        func.sum(JobPostingKeyword.salary_min),
+        func.count(JobPostingKeyword.salary_min),
+        func.sum(JobPostingKeyword.salary_max),
+        func.count(JobPostingKeyword.salary_max)
+    ).filter(
+        JobPostingKeyword.location.isnot(None),
+        JobPostingKeyword.location != ''
+    )
+
+    if industry:
+        query = query.filter(industry_service.industry_condition(JobPostingKeyword.industry_id, industry))
+
+    cells = defaultdict(lambda: [0, 0, 0, 0, 0, set()])
+    for location, keyword_id, job_title, count, min_sum, min_count, max_sum, max_count in query.group_by(
+        JobPostingKeyword.location, JobPostingKeyword.keyword_id, JobPostingKeyword.job_title
+    ):
+        cell = cells[(location, keyword_id)]
+        cell[0] += count
+        cell[1] += min_sum or 0
+        cell[2] += min_count
+        cell[3] += max_sum or 0
+        cell[4] += max_count
+        if job_title is not None:
+            cell[5].add(job_title)
+
+    stats = defaultdict(dict)
+    for (location, keyword_id), cell in cells.items():
+        stats[location][keyword_id] = tuple(cell[:5]) + (frozenset(cell[5]),)
+    return dict(stats)
+
+
+def summarize_locations(location_stats, skill_ids=None):
+    """Sum cached location stats over the given skill ids (None = all skills), busiest locations first."""
+    locations = []
+    for location, skills in location_stats.items():
+        job_count = min_sum = min_count = max_sum = max_count = 0
+        titles = set()
+        for keyword_id, cell in skills.items():
+            if skill_ids is not None and keyword_id not in skill_ids:
+                continue
+            job_count += cell[0]
+            min_sum += cell[1]
+            min_count += cell[2]
+            max_sum += cell[3]
+            max_count += cell[4]
+            titles |= cell[5]
+
+        if job_count:
+            locations.append({
+                'location': location,
+                'job_count': job_count,
+                'unique_roles': len(titles),
+                'avg_salary_min': min_sum / min_count if min_count else None,
+                'avg_salary_max': max_sum / max_count if max_count else None
+            })
+
+    locations.sort(key=lambda loc: loc['job_count'], reverse=True)
+    return locations
+
+
+def compute_market_average_salary():
+    """Average salary midpoint across all postings with salary data."""
+    overall_avg = db.session.query(
+        func.avg(JobPostingKeyword.salary_min).label('avg_min'),
+        func.avg(JobPostingKeyword.salary_max).label('avg_max')
+    ).filter(JobPostingKeyword.salary_min.isnot(None)).first()
+
+    if overall_avg and overall_avg.avg_min and overall_avg.avg_max:
+        return (overall_avg.avg_min + overall_avg.avg_max) / 2
+    return None
+
+
 @job_seeker_bp.route('/location-intelligence', methods=['GET'])
 @jwt_required()
 def get_location_intelligence():
@@ -624,33 +656,16 @@ def get_location_intelligence():
         user_skills = get_user_skills(user_id)
         industry = user.preferred_industry
 
-        # Get location data from real job postings
-        query = db.session.query(
-            JobPostingKeyword.location,
-            func.count(JobPostingKeyword.id).label('job_count'),
-            func.avg(JobPostingKeyword.salary_min).label('avg_salary_min'),
-            func.avg(JobPostingKeyword.salary_max).label('avg_salary_max'),
-            func.count(func.distinct(JobPostingKeyword.job_title)).label('unique_roles')
-        ).filter(
-            JobPostingKeyword.location.isnot(None),
-            JobPostingKeyword.location != ''
+        # Location stats per skill are cached per industry; narrow them to the user's skills here
+        location_stats = market_cache.get_or_compute(
+            'location_intelligence', industry, None, lambda: compute_location_skill_stats(industry)
+        )
+        skill_id_list = get_user_skill_ids(user_id) if user_skills else []
+        skill_ids = frozenset(skill_id_list) or None
+        # Summaries are cached per skill set, so users with the same skills share one
+        location_data = market_cache.get_or_compute(
+            'location_summary', industry, skill_ids, lambda: summarize_locations(location_stats, skill_ids)[:20]
         )
-
-        # Filter by user's skills if available
-        if user_skills:
-            skill_ids = db.session.query(Keyword.id).filter(
-                func.lower(Keyword.keyword).in_(user_skills)
-            ).all()
-            skill_id_list = [s.id for s in skill_ids]
-            if skill_id_list:
-                query = query.filter(JobPostingKeyword.keyword_id.in_(skill_id_list))
-
-        if industry:
-            query = query.filter(JobPostingKeyword.industry.ilike(f'%{industry}%'))
-
-        location_data = query.group_by(JobPostingKeyword.location).order_by(
-            desc('job_count')
-        ).limit(20).all()
 
         if not location_data:
             return jsonify({
@@ -658,15 +673,8 @@ def get_location_intelligence():
                 'locations': []
             }), 200
 
-        # Calculate overall averages for comparison
-        overall_avg = db.session.query(
-            func.avg(JobPostingKeyword.salary_min).label('avg_min'),
-            func.avg(JobPostingKeyword.salary_max).label('avg_max')
-        ).filter(JobPostingKeyword.salary_min.isnot(None)).first()
-
-        overall_avg_salary = None
-        if overall_avg and overall_avg.avg_min and overall_avg.avg_max:
-            overall_avg_salary = (overall_avg.avg_min + overall_avg.avg_max) / 2
+        # Overall averages for comparison
+        overall_avg_salary = market_cache.get_or_compute('market_average_salary', None, None, compute_market_average_salary)
 
         # Format location insights
         locations = []
@@ -674,22 +682,22 @@ def get_location_intelligence():
             avg_salary = None
             salary_vs_average = None
 
-            if loc.avg_salary_min and loc.avg_salary_max:
-                avg_salary = int((loc.avg_salary_min + loc.avg_salary_max) / 2)
+            if loc['avg_salary_min'] and loc['avg_salary_max']:
+                avg_salary = int((loc['avg_salary_min'] + loc['avg_salary_max']) / 2)
                 if overall_avg_salary:
                     salary_vs_average = round(((avg_salary - overall_avg_salary) / overall_avg_salary) * 100, 1)
 
             locations.append({
-                'location': loc.location,
-                'job_count': loc.job_count,
-                'unique_roles': loc.unique_roles,
+                'location': loc['location'],
+                'job_count': loc['job_count'],
+                'unique_roles': loc['unique_roles'],
                 'average_salary': avg_salary,
                 'salary_range': {
-                    'min': int(loc.avg_salary_min) if loc.avg_salary_min else None,
-                    'max': int(loc.avg_salary_max) if loc.avg_salary_max else None
+                    'min': int(loc['avg_salary_min']) if loc['avg_salary_min'] else None,
+                    'max': int(loc['avg_salary_max']) if loc['avg_salary_max'] else None
                 },
                 'salary_vs_average': salary_vs_average,
-                'opportunity_score': round((loc.job_count / location_data[0].job_count) * 100, 1)
+                'opportunity_score': round((loc['job_count'] / location_data[0]['job_count']) * 100, 1)
             })
 
         # Identify remote opportunities
@@ -710,6 +718,27 @@ def get_location_intelligence():
         return jsonify({'error': 'Failed to analyze location data'}), 500
 
 
+def compute_dashboard_market(industry=None):
+    """Market-wide dashboard numbers and skills by 90-day demand (user-independent, cached per industry)."""
+    total_postings = db.session.query(
+        func.count(func.distinct(JobPostingKeyword.job_posting_url))
+    ).scalar() or 0
+
+    total_skills_tracked = db.session.query(func.count(Keyword.id)).scalar() or 0
+
+    market_data = get_market_skills_for_industry(industry, days=90)
+    skills = sorted(
+        ((skill.keyword, int(skill.posting_count)) for skill in market_data),
+        key=lambda item: item[1], reverse=True
+    )
+
+    return {
+        'total_postings': total_postings,
+        'total_skills_tracked': total_skills_tracked,
+        'skills': skills
+    }
+
+
 @job_seeker_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 def get_insights_dashboard():
@@ -724,62 +753,54 @@ def get_insights_dashboard():
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
+        profile = user_profile_service.get_profile(user_id)
         user_skills = get_user_skills(user_id)
         industry = user.preferred_industry
 
-        # Quick stats from real data
-        total_postings = db.session.query(
-            func.count(func.distinct(JobPostingKeyword.job_posting_url))
-        ).scalar() or 0
-
-        total_skills_tracked = db.session.query(func.count(Keyword.id)).scalar() or 0
+        # Quick stats and industry demand from real data, shared until the next ingestion
+        market = market_cache.get_or_compute('insights_dashboard', industry, 90, lambda: compute_dashboard_market(industry))
 
         # User's matching jobs
         matching_jobs = 0
         if user_skills:
-            skill_ids = [s.id for s in db.session.query(Keyword.id).filter(
-                func.lower(Keyword.keyword).in_(user_skills)
-            ).all()]
+            skill_ids = get_user_skill_ids(user_id)
             if skill_ids:
                 matching_jobs = db.session.query(
                     func.count(func.distinct(JobPostingKeyword.job_posting_url))
                 ).filter(JobPostingKeyword.keyword_id.in_(skill_ids)).scalar() or 0
 
         # Calculate quick competitiveness
-        market_data = get_market_skills_for_industry(industry, days=90)
-        total_demand = sum(s.posting_count for s in market_data) if market_data else 0
+        market_data = market['skills']
+        total_demand = sum(count for _, count in market_data)
         user_demand = sum(
-            s.posting_count for s in market_data
-            if s.keyword.lower() in user_skills
-        ) if market_data else 0
+            count for keyword, count in market_data
+            if keyword.lower() in user_skills
+        )
 
         competitiveness = round((user_demand / total_demand * 100), 1) if total_demand > 0 else 0
 
         # Get top missing skill
         top_missing = None
-        if market_data:
-            for skill in sorted(market_data, key=lambda x: x.posting_count, reverse=True):
-                if skill.keyword.lower() not in user_skills:
-                    top_missing = {
-                        'skill': skill.keyword,
-                        'demand': skill.posting_count
-                    }
-                    break
+        for keyword, count in market_data:
+            if keyword.lower() not in user_skills:
+                top_missing = {
+                    'skill': keyword,
+                    'demand': count
+                }
+                break
 
         return jsonify({
             'quick_stats': {
                 'your_skills': len(user_skills),
                 'matching_jobs': matching_jobs,
-                'total_jobs_in_market': total_postings,
-                'skills_tracked': total_skills_tracked
+                'total_jobs_in_market': market['total_postings'],
+                'skills_tracked': market['total_skills_tracked']
             },
             'competitiveness_score': competitiveness,
             'top_skill_to_learn': top_missing,
             'industry_focus': industry,
             'preferences_set': user.preferences_completed,
-            'last_resume_analysis': Analysis.query.filter_by(user_id=user_id).order_by(
-                Analysis.created_at.desc()
-            ).first().created_at.isoformat() if Analysis.query.filter_by(user_id=user_id).first() else None,
+            'last_resume_analysis': profile.last_analysis_at.isoformat() if profile and profile.last_analysis_at else None,
             'generated_at': datetime.utcnow().isoformat()
         }), 200
 
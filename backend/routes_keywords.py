@@ -8,10 +8,11 @@ Allows admins and users to manage the intelligent keyword system.
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import (
-    User, Keyword, KeywordSimilarity, KeywordDatabase,
+    Keyword, KeywordSimilarity, KeywordDatabase,
     KeywordMatchingRule, UserSkillHistory, db
 )
 from keyword_manager import get_keyword_manager
+from services.user_context import load_user
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,7 +27,7 @@ def require_admin():
     def decorator(f):
         def wrapper(*args, **kwargs):
             user_id = get_jwt_identity()
-            user = User.query.get(int(user_id))
+            user = load_user(user_id)
             if not user or not user.is_admin:
                 return jsonify({
                     'status': 'error',
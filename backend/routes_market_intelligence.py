@@ -14,6 +14,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 import logging
 
+from services import market_cache
+
 # Create blueprint
 market_bp = Blueprint('market', __name__, url_prefix='/api/market')
 
@@ -63,9 +65,12 @@ def get_skills_market_demand():
             if not user_industry and user.detected_industries:
                 user_industry = user.detected_industries[0].get('industry') if user.detected_industries else None
 
-        # Get analyzer
+        # Industry-level demand is shared by all users until the next ingestion
         analyzer = get_market_intelligence_analyzer(db)
-        all_skills = analyzer.get_skill_market_demand(limit_days=limit_days, industry=user_industry)
+        all_skills = market_cache.get_or_compute(
+            'skill_demand', user_industry, limit_days,
+            lambda: analyzer.get_skill_market_demand(limit_days=limit_days, industry=user_industry)
+        )
 
         # Filter and sort
         filtered_skills = [
@@ -189,7 +194,8 @@ def analyze_skill_gap():
     Request body:
         {
             "skills": ["Python", "Django", "PostgreSQL"],
-            "job_title": "Senior Backend Engineer"  // optional
+            "job_title": "Senior Backend Engineer",  // optional
+            "industry": "Technology"  // optional
         }
 
     Returns:
@@ -214,10 +220,11 @@ def analyze_skill_gap():
             return jsonify({'error': 'Maximum 50 skills allowed'}), 400
 
         job_title = data.get('job_title')
+        industry = data.get('industry')
 
         # Get analyzer
         analyzer = get_market_intelligence_analyzer(db)
-        gap_analysis = analyzer.get_skill_gap_analysis(skills, job_title=job_title)
+        gap_analysis = analyzer.get_skill_gap_analysis(skills, job_title=job_title, industry=industry)
 
         return jsonify({
             'user_skills': skills,
@@ -346,52 +353,52 @@ def get_market_dashboard_summary():
         # Get analyzer
         analyzer = get_market_intelligence_analyzer(db)
 
-        # Get market demand with optional industry filter
-        all_demand = analyzer.get_skill_market_demand(limit_days=90, industry=user_industry)
+        def build_summary():
+            # Get market demand with optional industry filter
+            all_demand = market_cache.get_or_compute(
+                'skill_demand', user_industry, 90,
+                lambda: analyzer.get_skill_market_demand(limit_days=90, industry=user_industry)
+            )
+            if not all_demand:
+                return None
+
+            # Sort by demand
+            sorted_skills = sorted(
+                all_demand.values(),
+                key=lambda x: x['market_demand_score'],
+                reverse=True
+            )
+
+            # Get top skills
+            highest_paying = sorted_skills[:20]
+            return {
+                'total_skills_analyzed': len(all_demand),
+                'top_demanded_skills': sorted_skills[:10],
+                'highest_paying_skills': sorted(
+                    highest_paying,
+                    key=lambda x: x.get('average_salary') or 0,
+                    reverse=True
+                )[:5],
+                'overall_statistics': {
+                    'skills_with_market_data': len(all_demand),
+                    'average_demand_score': round(
+                        sum(s['market_demand_score'] for s in all_demand.values()) / len(all_demand),
+                        2
+                    )
+                }
+            }
+
+        summary = market_cache.get_or_compute('dashboard_summary', user_industry, 90, build_summary)
 
-        if not all_demand:
+        if not summary:
             return jsonify({
                 'message': 'No market data available',
                 'timestamp': datetime.utcnow().isoformat()
             }), 200
 
-        # Sort by demand
-        sorted_skills = sorted(
-            all_demand.values(),
-            key=lambda x: x['market_demand_score'],
-            reverse=True
-        )
-
-        # Get by category
-        from models import Keyword
-        categories = {}
-        for skill in sorted_skills[:50]:
-            cat = skill.get('skill_name', 'Unknown')
-            if cat not in categories:
-                categories[cat] = []
-            categories[cat].append(skill)
-
-        # Get top skills
-        top_skills = sorted_skills[:10]
-        highest_paying = sorted_skills[:20]
-        highest_paying_sorted = sorted(
-            highest_paying,
-            key=lambda x: x.get('average_salary') or 0,
-            reverse=True
-        )[:5]
-
         return jsonify({
             'timestamp': datetime.utcnow().isoformat(),
-            'total_skills_analyzed': len(all_demand),
-            'top_demanded_skills': top_skills,
-            'highest_paying_skills': highest_paying_sorted,
-            'overall_statistics': {
-                'skills_with_market_data': len(all_demand),
-                'average_demand_score': round(
-                    sum(s['market_demand_score'] for s in all_demand.values()) / len(all_demand),
-                    2
-                ) if all_demand else 0
-            },
+            **summary,
             'industry_context': {
                 'current_industry': user_industry,
                 'detected_industries': detected_industries[:3] if detected_industries else [],
@@ -15,7 +15,7 @@ from datetime import datetime
 import logging
 
 from job_scheduler import get_scheduler
-from models import User
+from services.user_context import load_user
 
 # Create blueprint
 scheduler_bp = Blueprint('scheduler', __name__, url_prefix='/api/admin/scheduler')
@@ -27,7 +27,7 @@ def require_admin(f):
     """Decorator to require admin access"""
     def decorated_function(*args, **kwargs):
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = load_user(user_id)
 
         if not user or not user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
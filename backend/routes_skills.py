@@ -247,6 +247,13 @@ def submit_skill_feedback(extraction_id):
 
         db.session.commit()
 
+        # Fold the analysis' new confirmed skill set into the co-occurrence matrix
+        try:
+            from services.skill_cooccurrence import get_cooccurrence_engine
+            get_cooccurrence_engine().update_analyses([extraction.analysis_id])
+        except Exception as e:
+            logger.warning(f"Could not update skill co-occurrence matrix: {str(e)}")
+
         logger.info(f"Feedback recorded for extraction {extraction_id}: confirmed={confirmed}, rejected={rejected}")
 
         return jsonify({
@@ -419,13 +426,16 @@ def get_skill_relationships(skill_id):
     Query parameters:
         - top_n: Number of related skills to return (default: 10)
         - min_strength: Minimum co-occurrence count (default: 2)
+        - scoring: 'count' (default), 'lift' or 'pmi'
 
     Returns:
         - Related skills with co-occurrence strength
         - Skill category information
     """
     from skill_relationship_analyzer import get_skill_relationship_analyzer
+    from services.skill_cooccurrence import SCORING_METHODS
     from models import Keyword
+    from app import db
 
     try:
         user_id = int(get_jwt_identity())
@@ -438,13 +448,17 @@ def get_skill_relationships(skill_id):
         # Get parameters
         top_n = request.args.get('top_n', 10, type=int)
         min_strength = request.args.get('min_strength', 2, type=int)
+        scoring = request.args.get('scoring', 'count')
+        if scoring not in SCORING_METHODS:
+            return jsonify({'error': f"scoring must be one of: {', '.join(SCORING_METHODS)}"}), 400
 
         # Get analyzer and find relationships
-        analyzer = get_skill_relationship_analyzer()
+        analyzer = get_skill_relationship_analyzer(db)
         related_skills = analyzer.get_related_skills(
             skill_id,
             top_n=top_n,
-            min_strength=min_strength
+            min_strength=min_strength,
+            scoring=scoring
         )
 
         return jsonify({
@@ -502,7 +516,8 @@ def recommend_related_skills():
     Request body:
         {
             "skills": ["Python", "Django", "PostgreSQL"],
-            "top_n": 5
+            "top_n": 5,
+            "scoring": "count"  // optional: 'count', 'lift' or 'pmi'
         }
 
     Returns:
@@ -511,6 +526,8 @@ def recommend_related_skills():
         - Skill categories
     """
     from skill_relationship_analyzer import get_skill_relationship_analyzer
+    from services.skill_cooccurrence import SCORING_METHODS
+    from app import db
 
     try:
         user_id = int(get_jwt_identity())
@@ -528,9 +545,13 @@ def recommend_related_skills():
         if top_n < 1 or top_n > 50:
             top_n = 5
 
+        scoring = data.get('scoring', 'count')
+        if scoring not in SCORING_METHODS:
+            return jsonify({'error': f"scoring must be one of: {', '.join(SCORING_METHODS)}"}), 400
+
         # Get recommendations
-        analyzer = get_skill_relationship_analyzer()
-        recommendations = analyzer.recommend_related_skills(skills, top_n=top_n)
+        analyzer = get_skill_relationship_analyzer(db)
+        recommendations = analyzer.recommend_related_skills(skills, top_n=top_n, scoring=scoring)
 
         return jsonify({
             'input_skills': skills,
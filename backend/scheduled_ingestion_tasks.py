@@ -5,12 +5,15 @@ Defines recurring tasks for automatic job posting ingestion, data updates,
 and market intelligence refreshes.
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 from job_scheduler import get_scheduler, log_job_execution
 
 logger = logging.getLogger(__name__)
 
+# Longest a single cleanup run spends on batched deletes before yielding
+CLEANUP_TIME_BUDGET_SECONDS = 600
+
 
 def ingest_sample_job_postings():
     """
@@ -141,8 +144,8 @@ def refresh_market_statistics():
     - Industry distribution
     - Skill relationships
     """
-    from app import db
-    from market_intelligence_analyzer import MarketIntelligenceAnalyzer
+    from app import app
+    from services import market_cache, market_rollup_service, skill_gap_index
 
     job_id = 'refresh_market_stats'
     start_time = datetime.utcnow()
@@ -150,25 +153,28 @@ def refresh_market_statistics():
     try:
         logger.info("Starting market statistics refresh...")
 
-        analyzer = MarketIntelligenceAnalyzer(db)
-
-        # Refresh all market data
-        stats = analyzer.get_market_summary()
-        top_skills = analyzer.get_top_demanded_skills(limit=20)
-        salary_trends = analyzer.get_salary_trends_by_skill()
+        # Reconcile the daily skill demand rollup that all market endpoints read
+        with app.app_context():
+            cells_written = market_rollup_service.refresh_rollup()
+            # Ranked demand vectors for skill gap analysis
+            vectors = skill_gap_index.rebuild_vectors()
+        market_cache.bump_generation('refresh_market_statistics')
 
         duration = (datetime.utcnow() - start_time).total_seconds()
         log_job_execution(
             job_id=job_id,
             func_name='refresh_market_statistics',
             status='success',
-            duration=duration
+            duration=duration,
+            metrics={'rollup_cells_written': cells_written, 'demand_vectors': vectors}
         )
 
-        logger.info("Market statistics refreshed successfully")
+        logger.info(f"Market statistics refreshed successfully ({cells_written} rollup cells)")
         return {
             'success': True,
             'message': 'Market statistics refreshed',
+            'rollup_cells_written': cells_written,
+            'demand_vectors': vectors,
             'stats_updated': datetime.utcnow().isoformat()
         }
 
@@ -192,11 +198,12 @@ def cleanup_old_data():
     """
     Scheduled task: Cleanup and archive old data
 
-    This task removes or archives job postings and analysis data
-    older than a specified retention period to maintain database performance.
+    This task removes job posting data older than the retention period to
+    maintain database performance. On a partitioned PostgreSQL table whole
+    monthly partitions are dropped; remaining expired rows are deleted in
+    committed batches, resuming on the next run if the time budget runs out.
     """
-    from app import db
-    from models import JobPostingKeyword
+    from services import market_cache, posting_retention
 
     job_id = 'cleanup_old_data'
     start_time = datetime.utcnow()
@@ -206,32 +213,32 @@ def cleanup_old_data():
 
         # Define retention period (e.g., 90 days)
         retention_days = 90
-        cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
-
-        # Count old records before deletion
-        old_records = JobPostingKeyword.query.filter(
-            JobPostingKeyword.created_at < cutoff_date
-        ).count()
-
-        # Delete old records (optional - can also archive to another table)
-        JobPostingKeyword.query.filter(
-            JobPostingKeyword.created_at < cutoff_date
-        ).delete()
-        db.session.commit()
+        metrics = posting_retention.purge_expired_postings(
+            retention_days, time_budget_seconds=CLEANUP_TIME_BUDGET_SECONDS
+        )
+        removed = metrics['rows_deleted'] + len(metrics['partitions_dropped'])
+        if removed:
+            market_cache.bump_generation('cleanup_old_data')
 
         duration = (datetime.utcnow() - start_time).total_seconds()
         log_job_execution(
             job_id=job_id,
             func_name='cleanup_old_data',
             status='success',
-            duration=duration
+            duration=duration,
+            metrics=metrics
         )
 
-        logger.info(f"Cleaned up {old_records} old records")
+        message = (f"Cleaned up {metrics['rows_deleted']} old records"
+                   f" and {len(metrics['partitions_dropped'])} expired partitions")
+        if not metrics['complete']:
+            message += ' (time budget reached, resuming next run)'
+        logger.info(message)
         return {
             'success': True,
-            'message': f'Cleaned up {old_records} old records',
-            'retention_days': retention_days
+            'message': message,
+            'retention_days': retention_days,
+            'metrics': metrics
         }
 
     except Exception as e:
@@ -254,8 +261,8 @@ def rebuild_skill_relationships():
     """
     Scheduled task: Rebuild skill relationship cache
 
-    This task recalculates skill co-occurrence relationships and
-    updates the skill recommendation cache based on current job postings.
+    This task rebuilds the skill co-occurrence matrix from confirmed
+    extractions and bulk-upserts the SkillRelationship table.
     """
     from app import db
     from skill_relationship_analyzer import SkillRelationshipAnalyzer
@@ -276,10 +283,11 @@ def rebuild_skill_relationships():
             job_id=job_id,
             func_name='rebuild_skill_relationships',
             status='success',
-            duration=duration
+            duration=duration,
+            metrics=result
         )
 
-        logger.info("Skill relationships rebuilt successfully")
+        logger.info(f"Skill relationships rebuilt successfully in {duration:.2f}s")
         return {
             'success': True,
             'message': 'Skill relationships rebuilt',
@@ -0,0 +1,245 @@
+"""
+Admission Control - One pre-flight check for credit-consuming AI endpoints
+
+Every AI route calls admit() before doing any work. It loads the user once and
+answers the abuse (rapid-fire), daily credit, credit balance and per-tier rate
+limit (services/tier_rate_limiter.py) checks together, then waits for a slot in
+the tier-weighted AI queue (services/ai_queue.py), returning an
+AdmissionDecision the route either proceeds with or turns straight into its
+error response.
+
+With REDIS_URL configured the 5-minute and daily windows are Redis counters
+(one pipelined read per request, one write per admitted request). Without
+Redis they come from a single range query over the user's analyses that the
+idx_user_created (user_id, created_at) index answers, joined to the user row.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+import logging
+import os
+import uuid
+
+from flask import jsonify
+from sqlalchemy import and_, func
+
+from models import db, User, Analysis
+from services import ai_queue, tier_rate_limiter
+from services.user_context import load_user, remember_user
+
+logger = logging.getLogger(__name__)
+
+# Rapid-fire window: more than RECENT_LIMIT operations in it is treated as abuse
+RECENT_WINDOW_SECONDS = 300
+RECENT_LIMIT = 10
+
+# Decision reasons
+ADMITTED = 'admitted'
+USER_NOT_FOUND = 'user_not_found'
+TOO_MANY_REQUESTS = 'too_many_requests'
+DAILY_LIMIT = 'daily_limit'
+INSUFFICIENT_CREDITS = 'insufficient_credits'
+RATE_LIMITED = 'rate_limited'
+OVERLOADED = 'overloaded'
+UNAVAILABLE = 'unavailable'
+
+UPGRADE_URL = '/dashboard/upgrade'
+
+_redis_client = None
+_redis_checked = False
+
+
+@dataclass
+class AdmissionDecision:
+    """Outcome of a pre-flight admission check"""
+    allowed: bool
+    reason: str
+    status_code: int = 200
+    message: str = ''
+    user: Optional[User] = None
+    required_credits: int = 0
+    details: Dict = field(default_factory=dict)
+    retry_after: Optional[int] = None  # Seconds, sent as Retry-After
+
+    def to_response(self):
+        """(response, status) for a rejected request"""
+        response = jsonify({'error': self.message, **self.details})
+        if self.retry_after:
+            response.headers['Retry-After'] = str(self.retry_after)
+        return response, self.status_code
+
+
+def _get_redis():
+    """Lazily connect to Redis for the usage windows (None if unavailable)"""
+    global _redis_client, _redis_checked
+    if _redis_checked:
+        return _redis_client
+
+    _redis_checked = True
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        try:
+            import redis
+            _redis_client = redis.from_url(redis_url, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"Admission control Redis unavailable, using database counts: {str(e)}")
+            _redis_client = None
+    return _redis_client
+
+
+def _recent_key(user_id: int) -> str:
+    return f'admission:{user_id}:recent'
+
+
+def _daily_key(user_id: int, now: datetime) -> str:
+    return f'admission:{user_id}:credits:{now:%Y%m%d}'
+
+
+def _load_from_database(user_id: int, now: datetime) -> Tuple[Optional[User], int, int]:
+    """
+    User plus recent and daily usage in one query
+
+    Returns:
+        Tuple of (user or None, operations in the recent window, estimated credits used today)
+    """
+    day_start = datetime.combine(now.date(), datetime.min.time())
+    recent_start = now - timedelta(seconds=RECENT_WINDOW_SECONDS)
+
+    # Plain range on created_at so idx_user_created serves the join
+    row = db.session.query(
+        User,
+        func.count(Analysis.id).filter(Analysis.created_at >= recent_start),
+        func.count(Analysis.id).filter(Analysis.created_at >= day_start)
+    ).outerjoin(Analysis, and_(
+        Analysis.user_id == User.id,
+        Analysis.created_at >= min(day_start, recent_start)
+    )).filter(User.id == user_id).group_by(User.id).first()
+
+    if row is None:
+        return None, 0, 0
+    user, recent, today = row
+    remember_user(user)
+    # Analyses are the only usage recorded in the database; estimate credits from them
+    # at the analysis price, whatever the operation being admitted costs
+    from abuse_prevention import OPERATION_COSTS
+    return user, recent, today * OPERATION_COSTS['analyze']
+
+
+def _load_from_redis(client, user_id: int, now: datetime) -> Tuple[Optional[User], int, int]:
+    """User plus recent operations and credits admitted today from the Redis windows"""
+    user = load_user(user_id)
+    if user is None:
+        return None, 0, 0
+
+    pipe = client.pipeline(transaction=False)
+    pipe.zremrangebyscore(_recent_key(user_id), 0, now.timestamp() - RECENT_WINDOW_SECONDS)
+    pipe.zcard(_recent_key(user_id))
+    pipe.get(_daily_key(user_id, now))
+    _, recent, credits_today = pipe.execute()
+    return user, int(recent or 0), int(credits_today or 0)
+
+
+def _record_in_redis(client, user_id: int, cost: int, now: datetime):
+    """Count an admitted operation in the recent and daily windows"""
+    pipe = client.pipeline(transaction=False)
+    pipe.zadd(_recent_key(user_id), {f'{now.timestamp()}:{uuid.uuid4().hex[:8]}': now.timestamp()})
+    pipe.expire(_recent_key(user_id), RECENT_WINDOW_SECONDS)
+    if cost:
+        pipe.incrby(_daily_key(user_id, now), cost)
+        pipe.expire(_daily_key(user_id, now), 2 * 86400)
+    pipe.execute()
+
+
+def admit(user_id: int, operation: str, required_credits: Optional[int] = None,
+          record: bool = True) -> AdmissionDecision:
+    """
+    Decide whether a user may start a credit-consuming operation
+
+    Args:
+        user_id: Requesting user
+        operation: Operation name (key of OPERATION_COSTS)
+        required_credits: Credits the operation needs (defaults to its OPERATION_COSTS entry)
+        record: Count an admitted operation in the Redis windows
+
+    Returns:
+        AdmissionDecision (allowed, or the status code and error body to return)
+    """
+    from abuse_prevention import OPERATION_COSTS
+
+    cost = OPERATION_COSTS.get(operation, 1) if required_credits is None else required_credits
+    now = datetime.utcnow()
+
+    client = _get_redis()
+    loaded = None
+    if client is not None:
+        try:
+            loaded = _load_from_redis(client, user_id, now)
+        except Exception as e:
+            logger.warning(f"Admission Redis read failed, using database counts: {str(e)}")
+            client = None
+    if loaded is None:
+        try:
+            loaded = _load_from_database(user_id, now)
+        except Exception as e:
+            logger.error(f"Error checking admission for user {user_id}: {str(e)}", exc_info=True)
+            db.session.rollback()
+            return AdmissionDecision(False, UNAVAILABLE, 402, 'Could not verify credits',
+                                     required_credits=cost)
+
+    user, recent, credits_today = loaded
+    if user is None:
+        return AdmissionDecision(False, USER_NOT_FOUND, 404, 'User not found', required_credits=cost)
+
+    if recent > RECENT_LIMIT:
+        logger.warning(f"Suspicious activity detected for user {user_id}: {recent} operations in 5 minutes")
+        return AdmissionDecision(False, TOO_MANY_REQUESTS, 429, 'Too many requests. Please wait before trying again.',
+                                 user=user, required_credits=cost, retry_after=RECENT_WINDOW_SECONDS)
+
+    daily_limit = tier_rate_limiter.daily_credit_limit(user.subscription_tier)
+    if cost and credits_today >= daily_limit:
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return AdmissionDecision(False, DAILY_LIMIT, 429,
+                                 f"Daily credit limit reached ({daily_limit} credits). Try again tomorrow.",
+                                 user=user, required_credits=cost,
+                                 retry_after=int((midnight - now).total_seconds()) + 1)
+
+    if user.credits < cost:
+        return AdmissionDecision(
+            False, INSUFFICIENT_CREDITS, 402,
+            f'Insufficient credits ({cost} required, {user.credits} available)',
+            user=user, required_credits=cost,
+            details={
+                'required_credits': cost,
+                'current_credits': user.credits,
+                'subscription_tier': user.subscription_tier,
+                'upgrade_url': UPGRADE_URL
+            }
+        )
+
+    # Last, so only requests that will run count against the tier's limits
+    limited = tier_rate_limiter.hit(user.id, user.subscription_tier, operation)
+    if not limited.allowed:
+        return AdmissionDecision(False, RATE_LIMITED, 429,
+                                 f'Rate limit reached for your plan. Try again in {limited.retry_after} seconds.',
+                                 user=user, required_credits=cost, retry_after=limited.retry_after)
+
+    # Held until the request is torn down
+    ticket = ai_queue.acquire_for_request(user.id, user.subscription_tier)
+    if not ticket.allowed:
+        return AdmissionDecision(False, OVERLOADED, 503,
+                                 f'AI analysis is at capacity. Estimated wait: {ticket.retry_after} seconds.',
+                                 user=user, required_credits=cost, retry_after=ticket.retry_after,
+                                 details={'estimated_wait_seconds': ticket.retry_after})
+
+    if record and client is not None:
+        try:
+            _record_in_redis(client, user_id, cost, now)
+        except Exception as e:
+            logger.warning(f"Admission Redis write failed for user {user_id}: {str(e)}")
+
+    return AdmissionDecision(True, ADMITTED, user=user, required_credits=cost, details={
+        'required_credits': cost,
+        'current_credits': user.credits,
+        'remaining_after': user.credits - cost
+    })
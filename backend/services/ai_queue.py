@@ -0,0 +1,283 @@
+"""
+AI Queue - Weighted fair admission to Gemini for AI endpoints
+
+GEMINI_SEMAPHORE caps concurrent Gemini calls, but callers block on it in
+arrival order, so a burst of free-tier analyses delays every paying user
+behind it. AI requests now take a slot from this queue (after admission
+control has accepted them) and hold it until the request finishes.
+
+When all MAX_CONCURRENT slots are busy, waiters are ordered by start-time
+fair queuing: each request gets a virtual tag of
+max(virtual time, tenant's previous tag) + 1 / tier weight, and the lowest
+tag is served next. A tier with weight 8 gets roughly eight slots for every
+one a weight-1 tier gets while both are waiting, and each user's requests are
+spaced out by their own previous tags so one user cannot crowd out others on
+the same tier.
+
+The queue is bounded. An arrival is shed (503 with Retry-After) when its
+estimated wait exceeds MAX_WAIT_SECONDS, or when the queue is full and it
+would be served after everyone already waiting; otherwise it displaces the
+waiter that would be served last. Waits are estimated from a moving average
+of how long requests hold a slot. Like GEMINI_SEMAPHORE, the queue is per
+process.
+
+A waiting request holds one of the worker's gunicorn threads, so the slot
+count is derived from GUNICORN_THREADS and kept below it: with the default
+2 threads one request calls Gemini while the other can wait its turn (or
+serve a non-AI request), instead of every request being admitted at once.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+# Share of AI capacity per subscription tier while tiers compete for slots
+TIER_WEIGHTS = {
+    'free': 1,
+    'basic': 2,
+    'student': 2,
+    'pro': 4,
+    'elite': 8
+}
+DEFAULT_WEIGHT = 1
+
+# Request threads per worker process (gunicorn_config.threads)
+WORKER_THREADS = int(os.getenv('GUNICORN_THREADS', 2))
+
+
+def concurrency_for_threads(threads: int) -> int:
+    """AI slots for a worker with this many threads (AI_QUEUE_CONCURRENCY, capped below threads)"""
+    limit = max(1, threads - 1)
+    return max(1, min(int(os.getenv('AI_QUEUE_CONCURRENCY', limit)), limit))
+
+
+# AI requests in flight at once (each analysis makes up to 2 parallel Gemini calls)
+MAX_CONCURRENT = concurrency_for_threads(WORKER_THREADS)
+
+# Requests allowed to wait for a slot, and the longest wait worth queuing for
+MAX_DEPTH = int(os.getenv('AI_QUEUE_MAX_DEPTH', 20))
+MAX_WAIT_SECONDS = float(os.getenv('AI_QUEUE_MAX_WAIT_SECONDS', 30))
+
+# Slot hold time assumed until requests have completed, and its smoothing factor
+INITIAL_SERVICE_SECONDS = 10.0
+SERVICE_TIME_ALPHA = 0.2
+
+# Waits kept per tier for the wait time percentiles
+WAIT_SAMPLES = 200
+
+
+@dataclass
+class QueueTicket:
+    """Outcome of asking for an AI slot"""
+    allowed: bool
+    tier: str
+    wait_seconds: float = 0.0  # Time spent queued
+    retry_after: int = 0  # Seconds to wait before retrying, when shed
+    acquired_at: float = 0.0
+
+
+@dataclass(eq=False)
+class _Waiter:
+    tag: float
+    tenant: str
+    tier: str
+    event: threading.Event = field(default_factory=threading.Event)
+    granted: bool = False
+    shed: bool = False
+
+
+@dataclass
+class _TierStats:
+    admitted: int = 0
+    shed: int = 0
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+
+
+class FairQueue:
+    """Bounded weighted fair queue in front of a fixed number of slots"""
+
+    def __init__(self, concurrency: int = MAX_CONCURRENT, max_depth: int = MAX_DEPTH,
+                 max_wait: float = MAX_WAIT_SECONDS, weights: Optional[Dict[str, int]] = None):
+        self.concurrency = concurrency
+        self.max_depth = max_depth
+        self.max_wait = max_wait
+        self.weights = weights or TIER_WEIGHTS
+        self._lock = threading.Lock()
+        self._waiting: List = []  # Heap of (tag, sequence, waiter)
+        self._sequence = itertools.count()
+        self._active = 0
+        self._virtual_time = 0.0
+        self._tenant_tags: Dict[str, float] = {}
+        self._service_seconds = INITIAL_SERVICE_SECONDS
+        self._stats: Dict[str, _TierStats] = {}
+
+    def _tier_stats(self, tier: str) -> _TierStats:
+        if tier not in self._stats:
+            self._stats[tier] = _TierStats()
+        return self._stats[tier]
+
+    def _estimated_wait(self, ahead: int) -> float:
+        """Seconds until a request with `ahead` waiters before it gets a slot"""
+        return (ahead + 1) * self._service_seconds / self.concurrency
+
+    def _shed(self, tier: str, wait: float) -> QueueTicket:
+        self._tier_stats(tier).shed += 1
+        return QueueTicket(False, tier, retry_after=max(1, math.ceil(wait)))
+
+    def _grant(self, tier: str, wait: float) -> QueueTicket:
+        stats = self._tier_stats(tier)
+        stats.admitted += 1
+        stats.waits.append(wait)
+        return QueueTicket(True, tier, wait_seconds=wait, acquired_at=time.monotonic())
+
+    def acquire(self, tenant, tier: str) -> QueueTicket:
+        """
+        Wait for a slot
+
+        Args:
+            tenant: Fairness key (user ID)
+            tier: Subscription tier (selects the weight)
+
+        Returns:
+            QueueTicket; release() it when allowed, return 503 when shed
+        """
+        tenant = str(tenant)
+        now = time.monotonic()
+        with self._lock:
+            if self._active < self.concurrency and not self._waiting:
+                self._active += 1
+                return self._grant(tier, 0.0)
+
+            weight = self.weights.get(tier, DEFAULT_WEIGHT)
+            tag = max(self._virtual_time, self._tenant_tags.get(tenant, 0.0)) + 1.0 / weight
+            ahead = sum(1 for queued_tag, _, _ in self._waiting if queued_tag <= tag)
+            wait = self._estimated_wait(ahead)
+            if wait > self.max_wait:
+                return self._shed(tier, wait)
+
+            if len(self._waiting) >= self.max_depth:
+                last = max(self._waiting)
+                if last[0] <= tag:
+                    return self._shed(tier, self._estimated_wait(len(self._waiting)))
+                self._waiting.remove(last)
+                heapq.heapify(self._waiting)
+                last[2].shed = True
+                last[2].event.set()
+
+            waiter = _Waiter(tag, tenant, tier)
+            self._tenant_tags[tenant] = tag
+            heapq.heappush(self._waiting, (tag, next(self._sequence), waiter))
+
+        waiter.event.wait(self.max_wait)
+        with self._lock:
+            waited = time.monotonic() - now
+            if waiter.granted:
+                return self._grant(tier, waited)
+            if not waiter.shed:
+                # Timed out: give up the place in line
+                self._waiting = [entry for entry in self._waiting if entry[2] is not waiter]
+                heapq.heapify(self._waiting)
+            return self._shed(tier, self._estimated_wait(len(self._waiting)))
+
+    def release(self, ticket: QueueTicket):
+        """Free a slot, handing it to the next waiter in tag order"""
+        if not ticket.allowed:
+            return
+        with self._lock:
+            held = time.monotonic() - ticket.acquired_at
+            self._service_seconds += SERVICE_TIME_ALPHA * (held - self._service_seconds)
+
+            if self._waiting:
+                tag, _, waiter = heapq.heappop(self._waiting)
+                self._virtual_time = tag
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                self._active -= 1
+
+            if len(self._tenant_tags) > 1000:
+                self._tenant_tags = {tenant: tag for tenant, tag in self._tenant_tags.items()
+                                     if tag > self._virtual_time}
+
+    def get_stats(self) -> Dict:
+        """Slots in use, queue depth and admitted/shed counts and waits per tier"""
+        with self._lock:
+            depth: Dict[str, int] = {}
+            for _, _, waiter in self._waiting:
+                depth[waiter.tier] = depth.get(waiter.tier, 0) + 1
+
+            tiers = {}
+            for tier, stats in self._stats.items():
+                waits = sorted(stats.waits)
+                tiers[tier] = {
+                    'admitted': stats.admitted,
+                    'shed': stats.shed,
+                    'queued': depth.get(tier, 0),
+                    'wait_avg_seconds': round(sum(waits) / len(waits), 3) if waits else 0.0,
+                    'wait_p95_seconds': round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0
+                }
+
+            return {
+                'active': self._active,
+                'concurrency': self.concurrency,
+                'queue_depth': len(self._waiting),
+                'max_depth': self.max_depth,
+                'estimated_service_seconds': round(self._service_seconds, 3),
+                'tiers': tiers
+            }
+
+
+_queue = FairQueue()
+
+
+def get_queue() -> FairQueue:
+    return _queue
+
+
+def acquire_for_request(user_id: int, tier: str) -> QueueTicket:
+    """
+    Take an AI slot for the rest of the current request
+
+    The slot is released by release_request_slot() when the request is torn
+    down (after the last chunk of a streamed response). Outside a request
+    there is nothing to release it, so no slot is taken.
+    """
+    if not has_request_context():
+        return QueueTicket(True, tier)
+    if 'ai_queue_ticket' in g:
+        # One slot per request, however many times admission runs
+        return g.ai_queue_ticket
+    ticket = _queue.acquire(user_id, tier)
+    if ticket.allowed:
+        g.ai_queue_ticket = ticket
+    else:
+        logger.warning(f"AI queue shed request from user {user_id} ({tier}), retry after {ticket.retry_after}s")
+    return ticket
+
+
+def release_request_slot():
+    """Release the current request's AI slot, if it holds one"""
+    ticket = g.pop('ai_queue_ticket', None)
+    if ticket is not None:
+        _queue.release(ticket)
+
+
+def get_stats() -> Dict:
+    return _queue.get_stats()
+
+
+def reset():
+    """Replace the queue (drops waiters and metrics)"""
+    global _queue
+    _queue = FairQueue()
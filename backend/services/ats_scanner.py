@@ -0,0 +1,184 @@
+"""
+ATS Scanner - Single-pass ATS readability checks for resume text
+
+Builds every ATS readability metric from one walk over the resume lines plus a
+handful of C-level scans (ASCII encode, one date regex, one section regex).
+Cheap enough to run on every analysis, the guest path and bulk rescoring.
+"""
+
+import re
+from typing import Any, Dict
+
+# Section words looked for anywhere in the text (legacy check)
+SECTION_KEYWORDS = ('experience', 'education', 'skills', 'summary', 'objective', 'work', 'employment')
+
+SECTION_PATTERN = re.compile('|'.join(SECTION_KEYWORDS))
+
+DATE_PATTERN = re.compile(
+    r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}'
+    r'|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{4}',
+    re.IGNORECASE
+)
+
+# Line prefixes that mark a bullet point
+BULLET_PATTERN = re.compile(r'(?:[-*•●◦▪■□‣○►➢✓–—]|\d{1,2}[.)])\s')
+
+# Pipe- or tab-separated cells, wide gaps between columns, or box-drawing characters
+TABLE_ARTIFACT_PATTERN = re.compile(r'\|.*\||\t.*\t|\S {4,}\S|[\u2500-\u257f]')
+
+# Recognised section header lines -> canonical section
+SECTION_HEADERS = {
+    'summary': 'summary',
+    'professional summary': 'summary',
+    'profile': 'summary',
+    'about me': 'summary',
+    'objective': 'summary',
+    'career objective': 'summary',
+    'experience': 'experience',
+    'work experience': 'experience',
+    'professional experience': 'experience',
+    'employment': 'experience',
+    'employment history': 'experience',
+    'work history': 'experience',
+    'education': 'education',
+    'education and training': 'education',
+    'skills': 'skills',
+    'technical skills': 'skills',
+    'core competencies': 'skills',
+    'key skills': 'skills',
+    'projects': 'projects',
+    'certifications': 'certifications',
+    'licenses and certifications': 'certifications',
+    'awards': 'awards',
+    'publications': 'publications',
+    'languages': 'languages',
+    'volunteer experience': 'volunteering',
+    'volunteering': 'volunteering',
+}
+
+# Sections most ATS parsers expect to find
+REQUIRED_SECTIONS = ('experience', 'education', 'skills')
+
+MAX_HEADER_LENGTH = 40
+
+
+def _header_section(stripped: str) -> str:
+    """Return the canonical section for a header line, or '' if it is not a header"""
+    if len(stripped) > MAX_HEADER_LENGTH:
+        return ''
+    name = stripped.rstrip(':').strip().lower().replace('&', 'and')
+    return SECTION_HEADERS.get(name, '')
+
+
+def scan_resume(resume_text: str) -> Dict[str, Any]:
+    """
+    Run all ATS readability checks over resume text
+
+    Args:
+        resume_text: Extracted resume text
+
+    Returns:
+        Dict with the legacy heuristic fields (score, issues, parse_errors, ...)
+        plus a 'metrics' dict with line, bullet, table and header statistics
+    """
+    text = resume_text or ''
+    checks = {
+        "text_extraction_quality": 100,  # Default good
+        "parse_errors": [],
+        "column_structure_issues": False,
+        "non_standard_chars": 0,
+        "suspicious_low_length": False,
+        "table_artifacts": False,
+        "issues": [],
+        "score": 100
+    }
+
+    # ---- Whole-text scans (each runs in C) ----
+    # Characters above ASCII, excluding line/paragraph separators
+    non_std_count = (len(text) - len(text.encode('ascii', 'ignore'))
+                     - text.count('\u2028') - text.count('\u2029'))
+    date_count = len(DATE_PATTERN.findall(text))
+    found_sections = len(set(SECTION_PATTERN.findall(text.lower())))
+
+    # ---- Single walk over lines ----
+    lines = text.split('\n')
+    content_lines = short_lines = bullet_lines = table_lines = 0
+    headers = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        content_lines += 1
+        if len(stripped) < 5:
+            short_lines += 1
+        if BULLET_PATTERN.match(stripped):
+            bullet_lines += 1
+        elif TABLE_ARTIFACT_PATTERN.search(line):
+            table_lines += 1
+        else:
+            section = _header_section(stripped)
+            if section and section not in headers:
+                headers.append(section)
+
+    text_length = len(text.strip())
+    bullet_density = bullet_lines / content_lines if content_lines else 0.0
+    table_ratio = table_lines / content_lines if content_lines else 0.0
+
+    checks["non_standard_chars"] = non_std_count
+    checks["metrics"] = {
+        "text_length": text_length,
+        "line_count": content_lines,
+        "bullet_lines": bullet_lines,
+        "bullet_density": round(bullet_density, 3),
+        "table_artifact_lines": table_lines,
+        "date_count": date_count,
+        "section_headers": headers,
+        "missing_sections": [s for s in REQUIRED_SECTIONS if s not in headers]
+    }
+
+    # Check 1: Text length (image-based PDFs extract poorly)
+    if text_length < 500:
+        checks["suspicious_low_length"] = True
+        checks["text_extraction_quality"] -= 30
+        checks["issues"].append("Resume text is suspiciously short - may be image-based PDF that ATS cannot parse")
+    elif text_length < 1000:
+        checks["text_extraction_quality"] -= 15
+        checks["issues"].append("Resume text is shorter than expected - may have formatting issues")
+
+    # Check 2: Non-standard characters (formatting artifacts)
+    if non_std_count > 100:
+        checks["text_extraction_quality"] -= 20
+        checks["issues"].append(f"High number of non-standard characters ({non_std_count}) - may indicate formatting issues")
+    elif non_std_count > 50:
+        checks["text_extraction_quality"] -= 10
+        checks["issues"].append(f"Some non-standard characters detected ({non_std_count})")
+
+    # Check 3: Few dates in a long resume usually means dates were mangled
+    if text_length > 2000 and date_count < 2:
+        checks["parse_errors"].append("Few or no dates detected - may indicate parsing issues")
+        checks["text_extraction_quality"] -= 10
+
+    # Check 4: Broken column parsing leaves many tiny fragments
+    if short_lines > len(lines) * 0.3:
+        checks["column_structure_issues"] = True
+        checks["text_extraction_quality"] -= 15
+        checks["issues"].append("Possible column structure issues detected - text may be misaligned")
+
+    # Check 5: Standard section words
+    if found_sections < 2:
+        checks["text_extraction_quality"] -= 10
+        checks["issues"].append("Few standard section headers detected - may affect ATS parsing")
+
+    # Check 6: Tables and multi-column layouts
+    if table_lines >= 3 and table_ratio > 0.1:
+        checks["table_artifacts"] = True
+        checks["text_extraction_quality"] -= 10
+        checks["issues"].append(f"Table or multi-column layout detected ({table_lines} lines) - ATS may scramble the content")
+
+    # Check 7: Achievements written as paragraphs instead of bullets
+    if content_lines >= 20 and bullet_density < 0.05:
+        checks["text_extraction_quality"] -= 5
+        checks["issues"].append("Few bullet points detected - use bullets so ATS and recruiters can scan achievements")
+
+    checks["score"] = max(0, min(100, checks["text_extraction_quality"]))
+    return checks
@@ -0,0 +1,153 @@
+"""
+Credit Ledger - Atomic credit balance changes with an append-only audit trail
+
+Every change to users.credits is one conditional UPDATE ... RETURNING: a charge
+only matches when the balance covers it, so concurrent requests can never
+overdraw or lose an update, and the users row is locked for a single statement
+instead of a read-modify-write transaction. Each change appends a
+CreditLedgerEntry in the same transaction.
+
+Long AI calls reserve credits up front, then commit the reservation when the
+work succeeds or refund it when it fails. Each reservation is settled at most
+once (unique settles_id), so retried refunds cannot mint credits.
+
+Monthly allowance resets are set-based and write their RESET entries in bulk
+(SubscriptionService.reset_monthly_credits).
+"""
+
+from typing import Optional
+import logging
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, CreditLedgerEntry
+
+logger = logging.getLogger(__name__)
+
+# Ledger entry kinds
+DEBIT = 'debit'
+GRANT = 'grant'
+RESERVE = 'reserve'
+COMMIT = 'commit'
+REFUND = 'refund'
+RESET = 'reset'
+
+
+def _apply(user_id: int, delta: int) -> Optional[int]:
+    """
+    Change a balance in one statement (charges only apply if the balance covers them)
+
+    Returns:
+        New balance, or None if the user does not exist or cannot afford the charge
+    """
+    stmt = update(User).where(User.id == user_id)
+    if delta < 0:
+        stmt = stmt.where(User.credits >= -delta)
+    stmt = stmt.values(credits=User.credits + delta).returning(User.credits)
+    return db.session.execute(stmt, execution_options={'synchronize_session': False}).scalar()
+
+
+def _record(user_id: int, kind: str, delta: int, operation: Optional[str] = None,
+            settles_id: Optional[int] = None) -> Optional[CreditLedgerEntry]:
+    """Apply delta and append its ledger entry. Commits."""
+    try:
+        balance = _apply(user_id, delta) if delta else None
+        if delta and balance is None:
+            return None
+
+        entry = CreditLedgerEntry(
+            user_id=user_id,
+            kind=kind,
+            delta=delta,
+            balance_after=balance,
+            operation=operation,
+            settles_id=settles_id
+        )
+        db.session.add(entry)
+        db.session.commit()
+        return entry
+
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def debit(user_id: int, amount: int, operation: str) -> Optional[int]:
+    """
+    Charge credits for a completed operation
+
+    Returns:
+        New balance, or None if the balance did not cover the charge (nothing charged)
+    """
+    entry = _record(user_id, DEBIT, -amount, operation)
+    if entry is None:
+        return None
+    logger.info(f"Deducted {amount} credits from user {user_id} for {operation}. Remaining: {entry.balance_after}")
+    return entry.balance_after
+
+
+def grant(user_id: int, amount: int, reason: Optional[str] = None) -> Optional[int]:
+    """
+    Add credits (purchases, promotions, manual adjustments)
+
+    Returns:
+        New balance, or None if the user does not exist
+    """
+    entry = _record(user_id, GRANT, amount, reason)
+    if entry is None:
+        return None
+    logger.info(f"Added {amount} credits to user {user_id}. Reason: {reason}. New balance: {entry.balance_after}")
+    return entry.balance_after
+
+
+def reserve(user_id: int, amount: int, operation: str) -> Optional[int]:
+    """
+    Take credits before starting a long-running operation
+
+    The credits leave the balance immediately; settle the reservation with
+    commit_reservation() or refund_reservation() once the operation finishes.
+
+    Returns:
+        Reservation id, or None if the balance did not cover the amount
+    """
+    entry = _record(user_id, RESERVE, -amount, operation)
+    return entry.id if entry is not None else None
+
+
+def _settle(reservation_id: int, kind: str) -> bool:
+    reservation = CreditLedgerEntry.query.get(reservation_id)
+    if reservation is None or reservation.kind != RESERVE:
+        logger.warning(f"Cannot {kind} unknown credit reservation {reservation_id}")
+        return False
+
+    delta = -reservation.delta if kind == REFUND else 0
+    try:
+        _record(reservation.user_id, kind, delta, reservation.operation, settles_id=reservation.id)
+    except IntegrityError:
+        logger.warning(f"Credit reservation {reservation_id} was already settled")
+        return False
+    return True
+
+
+def commit_reservation(reservation_id: int) -> bool:
+    """
+    Keep reserved credits (the operation succeeded)
+
+    Returns:
+        bool: False if the reservation was unknown or already settled
+    """
+    return _settle(reservation_id, COMMIT)
+
+
+def refund_reservation(reservation_id: int) -> bool:
+    """
+    Return reserved credits to the user (the operation failed)
+
+    Returns:
+        bool: False if the reservation was unknown or already settled
+    """
+    settled = _settle(reservation_id, REFUND)
+    if settled:
+        logger.info(f"Refunded credit reservation {reservation_id}")
+    return settled
@@ -0,0 +1,436 @@
+"""
+Guest Admission - Session lookup and abuse limits for guest mode
+
+Guest requests used to look their session up by token and count analyses per
+IP with a GuestAnalysis JOIN GuestSession query on every call. With REDIS_URL
+configured this module keeps that state in Redis instead:
+
+    guest:session:{token}       hash of id, credits, ip, device and expiry,
+                                expiring with the session (EXPIREAT expires_at)
+    guest:ip:{ip}:sessions      sorted sets of timestamps over the trailing
+    guest:ip:{ip}:analyses      24 hours, for the per-IP and per-device limits
+    guest:device:{fp}:analyses
+
+so the database is only touched to create a session and to save an analysis
+(plus once to cache a session created before its hash existed). The daily
+guest budget is read from cost_tracker's counter in the same round trip as
+the IP and device counts.
+
+An analysis is claimed before the AI call: the session's credit is taken with
+an atomic HINCRBY and the IP/device windows are counted. release_claim() gives
+both back if the analysis is not saved. The HINCRBY runs in a MULTI with
+EXISTS and EXPIREAT, so a session key that expired meanwhile is not left
+behind without a TTL. Purchases that top up or extend a session call
+refresh_session() after committing. Without Redis every check runs the
+original database queries.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import logging
+import os
+import time
+import uuid
+
+from flask import jsonify
+
+from models import db, GuestSession, GuestAnalysis
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 86400
+
+# Guest sessions one IP may open per day
+SESSION_LIMIT_PER_IP = 3
+# Guest analyses an IP may have run before it can no longer open sessions
+SESSION_ANALYSIS_LIMIT_PER_IP = 3
+# Guest analyses per IP (and per device fingerprint) per day
+ANALYSIS_LIMIT_PER_IP = 1
+ANALYSIS_LIMIT_PER_DEVICE = 1
+
+# How long an unknown token is remembered, so guessed tokens stay off the database
+MISSING_SESSION_TTL = 300
+
+UPGRADE_MESSAGE = 'Create an account for 10 free analyses and unlock premium features!'
+
+_redis_client = None
+_redis_checked = False
+
+
+@dataclass
+class GuestState:
+    """Guest session fields needed to admit requests"""
+    id: str
+    token: str
+    credits_remaining: int
+    expires_at: datetime
+    ip_address: Optional[str] = None
+    device_fingerprint: Optional[str] = None
+
+    def has_credits(self) -> bool:
+        return self.credits_remaining > 0
+
+
+@dataclass
+class GuestDecision:
+    """Outcome of a guest admission check"""
+    allowed: bool
+    status_code: int = 200
+    error: str = ''
+    error_type: str = ''
+    details: Dict = field(default_factory=dict)
+    claim_id: Optional[str] = None  # Set when an analysis was claimed in Redis
+
+    def to_response(self):
+        """(response, status) for a rejected request"""
+        return jsonify({'error': self.error, 'error_type': self.error_type, **self.details}), self.status_code
+
+
+def _get_redis():
+    """Lazily connect to Redis for guest state (None if unavailable)"""
+    global _redis_client, _redis_checked
+    if _redis_checked:
+        return _redis_client
+
+    _redis_checked = True
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        try:
+            import redis
+            _redis_client = redis.from_url(redis_url, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"Guest admission Redis unavailable, using database checks: {str(e)}")
+            _redis_client = None
+    return _redis_client
+
+
+def _session_key(token: str) -> str:
+    return f'guest:session:{token}'
+
+
+def _ip_sessions_key(ip: str) -> str:
+    return f'guest:ip:{ip}:sessions'
+
+
+def _ip_analyses_key(ip: str) -> str:
+    return f'guest:ip:{ip}:analyses'
+
+
+def _device_analyses_key(fingerprint: str) -> str:
+    return f'guest:device:{fingerprint}:analyses'
+
+
+def _epoch(value: datetime) -> float:
+    """Unix time of a naive UTC datetime"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _state_from_model(session: GuestSession) -> GuestState:
+    return GuestState(
+        id=session.id,
+        token=session.session_token,
+        credits_remaining=session.credits_remaining,
+        expires_at=session.expires_at,
+        ip_address=session.ip_address,
+        device_fingerprint=session.device_fingerprint
+    )
+
+
+def _cache_session(client, session: GuestSession):
+    """Write a session's hash, expiring with the session"""
+    key = _session_key(session.session_token)
+    pipe = client.pipeline(transaction=False)
+    pipe.delete(key)
+    pipe.hset(key, mapping={
+        'id': session.id,
+        'credits': session.credits_remaining,
+        'expires_at': _epoch(session.expires_at),
+        'ip': session.ip_address or '',
+        'device': session.device_fingerprint or ''
+    })
+    pipe.expireat(key, int(_epoch(session.expires_at)) + 1)
+    pipe.execute()
+
+
+def _load_from_database(token: str) -> Optional[GuestSession]:
+    session = GuestSession.query.filter_by(session_token=token).first()
+    if session and session.is_expired():
+        session.status = 'expired'
+        db.session.commit()
+        return None
+    return session
+
+
+def get_session(token: str) -> Optional[GuestState]:
+    """
+    Valid, unexpired guest session for a token
+
+    Returns:
+        GuestState, or None for unknown or expired tokens
+    """
+    if not token or not token.startswith('guest_'):
+        return None
+
+    client = _get_redis()
+    if client is not None:
+        try:
+            cached = client.hgetall(_session_key(token))
+            if cached.get('missing'):
+                return None
+            if cached:
+                expires_at = datetime.utcfromtimestamp(float(cached['expires_at']))
+                if datetime.utcnow() > expires_at:
+                    return None
+                return GuestState(
+                    id=cached['id'],
+                    token=token,
+                    credits_remaining=int(cached['credits']),
+                    expires_at=expires_at,
+                    ip_address=cached.get('ip') or None,
+                    device_fingerprint=cached.get('device') or None
+                )
+        except Exception as e:
+            logger.warning(f"Guest session Redis read failed, using database: {str(e)}")
+            client = None
+
+    session = _load_from_database(token)
+    if client is not None:
+        try:
+            if session is None:
+                client.hset(_session_key(token), 'missing', 1)
+                client.expire(_session_key(token), MISSING_SESSION_TTL)
+            else:
+                _cache_session(client, session)
+        except Exception as e:
+            logger.warning(f"Guest session Redis write failed: {str(e)}")
+    return _state_from_model(session) if session else None
+
+
+def _window_counts(client, keys, now: float):
+    """Entries in each key's trailing window, in one round trip"""
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.zremrangebyscore(key, 0, now - WINDOW_SECONDS)
+        pipe.zcard(key)
+    results = pipe.execute()
+    return [int(count or 0) for count in results[1::2]]
+
+
+def check_new_session(ip_address: str) -> GuestDecision:
+    """Per-IP session and analysis limits for opening a guest session"""
+    client = _get_redis()
+    sessions_count = analyses_count = None
+    if client is not None:
+        try:
+            now = time.time()
+            sessions_count, analyses_count = _window_counts(
+                client, [_ip_sessions_key(ip_address), _ip_analyses_key(ip_address)], now
+            )
+        except Exception as e:
+            logger.warning(f"Guest admission Redis read failed, using database: {str(e)}")
+            sessions_count = None
+
+    if sessions_count is None:
+        since = datetime.utcnow() - timedelta(hours=24)
+        sessions_count = GuestSession.query.filter(
+            GuestSession.ip_address == ip_address,
+            GuestSession.created_at >= since,
+            GuestSession.status == 'active'
+        ).count()
+        analyses_count = db.session.query(GuestAnalysis).join(GuestSession).filter(
+            GuestSession.ip_address == ip_address,
+            GuestSession.created_at >= since
+        ).count()
+
+    # Frontend reuses sessions, so this limit should rarely be hit
+    if sessions_count >= SESSION_LIMIT_PER_IP:
+        logger.warning(f"Rate limit exceeded for IP {ip_address}: {sessions_count} sessions in 24h")
+        return GuestDecision(
+            False, 429, 'Too many guest sessions from this IP. Please try again later or create an account.',
+            'RATE_LIMIT_EXCEEDED', {'retry_after': '24 hours'}
+        )
+
+    # Stops new sessions being used to get around the per-session limit
+    if analyses_count >= SESSION_ANALYSIS_LIMIT_PER_IP:
+        logger.warning(f"Analysis limit exceeded for IP {ip_address}: {analyses_count} analyses in 24h")
+        return GuestDecision(
+            False, 429, 'Daily guest analysis limit reached. Create an account for unlimited access.',
+            'DAILY_LIMIT_EXCEEDED', {'analyses_used': analyses_count}
+        )
+
+    return GuestDecision(True)
+
+
+def record_new_session(session: GuestSession):
+    """Cache a newly committed session and count it against its IP"""
+    client = _get_redis()
+    if client is None:
+        return
+    try:
+        _cache_session(client, session)
+        now = time.time()
+        key = _ip_sessions_key(session.ip_address)
+        pipe = client.pipeline(transaction=False)
+        pipe.zadd(key, {session.id: now})
+        pipe.expire(key, WINDOW_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to cache guest session {session.id}: {str(e)}")
+
+
+def refresh_session(session: GuestSession):
+    """Re-cache a session after its credits or expiry change in the database (purchases)"""
+    client = _get_redis()
+    if client is None:
+        return
+    try:
+        _cache_session(client, session)
+    except Exception as e:
+        logger.warning(f"Failed to refresh cached guest session {session.id}: {str(e)}")
+        try:
+            # Fall back to reloading it from the database on the next request
+            client.delete(_session_key(session.session_token))
+        except Exception:
+            pass
+
+
+def _adjust_credits(client, state: GuestState, amount: int) -> Optional[int]:
+    """
+    HINCRBY a cached session's credits, keeping the key's expiry
+
+    Returns:
+        New credit count, or None if the session is no longer cached (it
+        expired or was evicted); the key HINCRBY recreated is removed again
+    """
+    key = _session_key(state.token)
+    pipe = client.pipeline(transaction=True)
+    pipe.exists(key)
+    pipe.hincrby(key, 'credits', amount)
+    pipe.expireat(key, int(_epoch(state.expires_at)) + 1)
+    existed, credits, _ = pipe.execute()
+    if not existed:
+        client.delete(key)
+        return None
+    return int(credits)
+
+
+def _expired_session_decision() -> GuestDecision:
+    return GuestDecision(False, 401, 'Invalid or expired guest session', 'UNAUTHORIZED')
+
+
+def _budget_limit_decision(budget_error: str) -> GuestDecision:
+    logger.warning("Guest analysis blocked: daily budget exceeded")
+    return GuestDecision(False, 503, budget_error, 'DAILY_BUDGET_EXCEEDED', {
+        'retry_after': '24 hours',
+        'upgrade_message': 'Sign up for a free account to get guaranteed access to 10 analyses per day!'
+    })
+
+
+def _no_credits_decision() -> GuestDecision:
+    return GuestDecision(False, 402, 'No guest credits remaining. Create an account for unlimited analyses.',
+                         'INSUFFICIENT_CREDITS', {
+                             'credits_remaining': 0,
+                             'upgrade_message': 'Sign up now to unlock unlimited resume analyses and advanced features!'
+                         })
+
+
+def _daily_limit_decision(ip_address: str) -> GuestDecision:
+    logger.warning(f"Analysis attempt from IP {ip_address} that exceeded limit")
+    return GuestDecision(False, 429, 'Guest analysis limit reached. Sign up for 10 free analyses!',
+                         'DAILY_LIMIT_EXCEEDED', {'upgrade_message': UPGRADE_MESSAGE})
+
+
+def claim_analysis(state: GuestState, ip_address: str) -> GuestDecision:
+    """
+    Check the budget, credit and per-IP/device limits and claim one analysis
+
+    A claimed analysis must be saved with the session's credit deducted, or
+    handed back with release_claim().
+    """
+    from cost_tracker import cost_tracker
+
+    client = _get_redis()
+    if client is not None:
+        try:
+            return _claim_in_redis(client, cost_tracker, state, ip_address)
+        except Exception as e:
+            logger.warning(f"Guest admission Redis claim failed, using database: {str(e)}")
+
+    # Budget check first to prevent runaway costs
+    can_proceed, budget_error = cost_tracker.can_process_guest_analysis()
+    if not can_proceed:
+        return _budget_limit_decision(budget_error)
+    if not state.has_credits():
+        return _no_credits_decision()
+
+    analyses_from_ip = db.session.query(GuestAnalysis).join(GuestSession).filter(
+        GuestSession.ip_address == ip_address,
+        GuestSession.created_at >= datetime.utcnow() - timedelta(hours=24)
+    ).count()
+    if analyses_from_ip >= ANALYSIS_LIMIT_PER_IP:
+        return _daily_limit_decision(ip_address)
+    return GuestDecision(True)
+
+
+def _claim_in_redis(client, cost_tracker, state: GuestState, ip_address: str) -> GuestDecision:
+    now = time.time()
+    keys = [_ip_analyses_key(ip_address)]
+    if state.device_fingerprint:
+        keys.append(_device_analyses_key(state.device_fingerprint))
+
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.zremrangebyscore(key, 0, now - WINDOW_SECONDS)
+        pipe.zcard(key)
+    pipe.get(cost_tracker.get_daily_key())
+    results = pipe.execute()
+    counts = [int(count or 0) for count in results[1:-1:2]]
+    budget_used = int(results[-1] or 0)
+
+    # Budget check first to prevent runaway costs
+    can_proceed, budget_error = cost_tracker.check_guest_budget(budget_used)
+    if not can_proceed:
+        return _budget_limit_decision(budget_error)
+    if not state.has_credits():
+        return _no_credits_decision()
+    limits = [ANALYSIS_LIMIT_PER_IP, ANALYSIS_LIMIT_PER_DEVICE]
+    if any(count >= limit for count, limit in zip(counts, limits)):
+        return _daily_limit_decision(ip_address)
+
+    credits_left = _adjust_credits(client, state, -1)
+    if credits_left is None:
+        return _expired_session_decision()
+    if credits_left < 0:
+        # Another request took the last credit first
+        _adjust_credits(client, state, 1)
+        return _no_credits_decision()
+
+    claim_id = uuid.uuid4().hex
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.zadd(key, {claim_id: now})
+        pipe.expire(key, WINDOW_SECONDS)
+    pipe.execute()
+
+    state.credits_remaining = credits_left
+    return GuestDecision(True, claim_id=claim_id)
+
+
+def release_claim(state: GuestState, ip_address: str, decision: GuestDecision):
+    """Give back a claimed analysis that was not saved"""
+    if not decision.allowed or decision.claim_id is None:
+        return
+    client = _get_redis()
+    if client is None:
+        return
+    try:
+        _adjust_credits(client, state, 1)
+        pipe = client.pipeline(transaction=False)
+        pipe.zrem(_ip_analyses_key(ip_address), decision.claim_id)
+        if state.device_fingerprint:
+            pipe.zrem(_device_analyses_key(state.device_fingerprint), decision.claim_id)
+        pipe.execute()
+        decision.claim_id = None
+    except Exception as e:
+        logger.warning(f"Failed to release guest analysis claim for session {state.id}: {str(e)}")
@@ -1,9 +1,21 @@
 """
 Industry Service - Helper functions for industry-based personalization and data filtering
+
+Also owns the industry dimension (Industry / IndustryAlias): raw posting values,
+canonical names and synonyms resolve to an industry id, and market queries
+filter on the indexed industry_id columns instead of substring-matching names.
 """
 
-from typing import Optional, List, Dict, Any
-from models import User
+from typing import Optional, List, Dict, Any, Iterable
+import logging
+import threading
+import time
+
+from sqlalchemy import false, func, or_, select
+
+from models import db, User, Industry, IndustryAlias, JobPostingKeyword, Keyword, SkillDemandDaily
+
+logger = logging.getLogger(__name__)
 
 # Standard industry categories
 INDUSTRIES = [
@@ -26,6 +38,30 @@ INDUSTRIES = [
     'General'
 ]
 
+# Synonyms resolved to a canonical industry (matched lowercased)
+INDUSTRY_ALIASES = {
+    'Technology': ['tech', 'it', 'information technology', 'software', 'software development', 'internet'],
+    'Healthcare': ['health care', 'health', 'medical', 'hospital & health care'],
+    'Finance': ['financial services', 'banking', 'fintech', 'accounting'],
+    'Cybersecurity': ['security', 'cyber security', 'information security', 'infosec'],
+    'Cloud & DevOps': ['cloud', 'devops', 'cloud and devops'],
+    'Data Science': ['data', 'analytics', 'machine learning', 'ai'],
+    'Product Management': ['product'],
+    'Design': ['ux', 'ui/ux', 'ux design'],
+    'Human Resources': ['hr', 'people operations', 'recruiting'],
+    'Non-Profit': ['nonprofit', 'non profit', 'ngo'],
+    'Education': ['higher education', 'academia', 'e-learning'],
+    'Government': ['public sector'],
+    'Media': ['entertainment', 'publishing'],
+}
+
+# Minimum seconds between alias table reloads triggered by unknown names
+ALIAS_RELOAD_SECONDS = 60
+
+_alias_map: Dict[str, int] = {}
+_alias_loaded_at = 0.0
+_alias_lock = threading.Lock()
+
 # Industry-specific skills mapping
 INDUSTRY_SKILLS = {
     'Technology': {
@@ -322,3 +358,232 @@ def get_industry_description(industry: str) -> str:
     }
 
     return descriptions.get(industry, 'Professional industry')
+
+
+def normalize_industry(name: Optional[str]) -> str:
+    """Alias key for an industry value (trimmed and lowercased, '' when blank)"""
+    return (name or '').strip().lower()
+
+
+def get_canonical_industries() -> List[str]:
+    """
+    Canonical industry names: INDUSTRIES plus the auto-detected industries
+
+    Detected industries that are already a synonym of a standard one (e.g.
+    'Security' -> 'Cybersecurity') are not added again.
+
+    Returns:
+        List[str]: Canonical industry names
+    """
+    from skill_extractor import INDUSTRY_DETECTION
+
+    synonyms = {normalize_industry(alias) for aliases in INDUSTRY_ALIASES.values() for alias in aliases}
+    names = list(INDUSTRIES)
+    for name in INDUSTRY_DETECTION:
+        if name not in names and normalize_industry(name) not in synonyms:
+            names.append(name)
+    return names
+
+
+def seed_industries() -> int:
+    """
+    Insert any missing canonical industries and their aliases. Flushes, does not commit
+
+    Returns:
+        int: Number of industries and aliases added
+    """
+    existing = dict(db.session.query(IndustryAlias.alias, IndustryAlias.industry_id).all())
+    added = 0
+    for name in get_canonical_industries():
+        key = normalize_industry(name)
+        industry_id = existing.get(key)
+        if industry_id is None:
+            industry = Industry(name=name)
+            db.session.add(industry)
+            db.session.flush()
+            db.session.add(IndustryAlias(alias=key, industry_id=industry.id))
+            industry_id = existing[key] = industry.id
+            added += 1
+
+        for alias in INDUSTRY_ALIASES.get(name, []):
+            alias_key = normalize_industry(alias)
+            if alias_key not in existing:
+                db.session.add(IndustryAlias(alias=alias_key, industry_id=industry_id))
+                existing[alias_key] = industry_id
+                added += 1
+
+    db.session.flush()
+    if added:
+        logger.info(f"Seeded {added} industries and aliases")
+    return added
+
+
+def _load_aliases(commit: bool = True) -> Dict[str, int]:
+    """Read the alias table into the process cache, seeding an empty dimension first"""
+    global _alias_map, _alias_loaded_at
+
+    if Industry.query.first() is None:
+        seed_industries()
+        if commit:
+            db.session.commit()
+
+    _alias_map = dict(db.session.query(IndustryAlias.alias, IndustryAlias.industry_id).all())
+    _alias_loaded_at = time.monotonic()
+    return _alias_map
+
+
+def _get_aliases(missing_key: Optional[str] = None, commit: bool = True) -> Dict[str, int]:
+    """Cached alias map; reloaded (rate-limited) when missing_key is not in it"""
+    aliases = _alias_map
+    stale = time.monotonic() - _alias_loaded_at > ALIAS_RELOAD_SECONDS
+    if not aliases or (missing_key is not None and missing_key not in aliases and stale):
+        with _alias_lock:
+            aliases = _load_aliases(commit)
+    return aliases
+
+
+def clear_industry_cache():
+    """Drop the cached alias map (next lookup reloads it)"""
+    global _alias_map, _alias_loaded_at
+    _alias_map = {}
+    _alias_loaded_at = 0.0
+
+
+def get_or_create_industry_ids(names: Iterable[Optional[str]]) -> Dict[str, int]:
+    """
+    Map raw industry values (as stored on postings) to industry ids
+
+    Values that match no alias become a new canonical industry, so every stored
+    value has an id. Flushes, does not commit.
+
+    Args:
+        names: Raw industry values
+
+    Returns:
+        Dict of raw value -> industry id (blank values omitted)
+    """
+    global _alias_loaded_at
+
+    keys = {name: normalize_industry(name) for name in set(names) if normalize_industry(name)}
+    if not keys:
+        return {}
+
+    aliases = dict(_get_aliases(commit=False))
+    missing = {key for key in keys.values() if key not in aliases}
+    if missing:
+        # Another process may have added them since the last load
+        aliases.update(db.session.query(IndustryAlias.alias, IndustryAlias.industry_id).filter(
+            IndustryAlias.alias.in_(missing)
+        ).all())
+
+    created = {}
+    for name, key in keys.items():
+        if key in aliases or key in created:
+            continue
+        industry = Industry(name=name.strip()[:100])
+        db.session.add(industry)
+        db.session.flush()
+        db.session.add(IndustryAlias(alias=key, industry_id=industry.id))
+        created[key] = industry.id
+        logger.info(f"Added industry '{industry.name}' (id={industry.id})")
+
+    if created:
+        db.session.flush()
+        _alias_loaded_at = 0.0  # Let the next lookup miss reload the map
+    return {name: aliases.get(key, created.get(key)) for name, key in keys.items()}
+
+
+def resolve_industry_ids(industry: Optional[str]) -> List[int]:
+    """
+    Resolve a user-facing industry (name, alias or fragment) to industry ids
+
+    An exact alias match wins; otherwise every industry with an alias containing
+    the text matches, mirroring the old substring filters without touching the
+    posting tables.
+
+    Args:
+        industry: Industry text, e.g. 'Technology', 'tech', 'health'
+
+    Returns:
+        List[int]: Matching industry ids (empty if none)
+    """
+    key = normalize_industry(industry)
+    if not key:
+        return []
+
+    aliases = _get_aliases(missing_key=key)
+    if key in aliases:
+        return [aliases[key]]
+    return sorted({industry_id for alias, industry_id in aliases.items() if key in alias})
+
+
+def industry_condition(industry_id_column, industry: str, keyword_id_column=None):
+    """
+    Indexed equality predicate for an industry filter
+
+    Args:
+        industry_id_column: industry_id column to filter (e.g. SkillDemandDaily.industry_id)
+        industry: Industry text resolved with resolve_industry_ids
+        keyword_id_column: Also accept rows whose skill's Keyword.category is an alias
+            of the industry (the category subquery runs against the keywords table only)
+
+    Returns:
+        SQLAlchemy condition (always false when nothing resolves)
+    """
+    industry_ids = resolve_industry_ids(industry)
+    if not industry_ids:
+        return false()
+
+    if len(industry_ids) == 1:
+        condition = industry_id_column == industry_ids[0]
+    else:
+        condition = industry_id_column.in_(industry_ids)
+
+    if keyword_id_column is not None:
+        categories = [alias for alias, industry_id in _get_aliases().items() if industry_id in industry_ids]
+        condition = or_(condition, keyword_id_column.in_(
+            select(Keyword.id).where(func.lower(Keyword.category).in_(categories))
+        ))
+    return condition
+
+
+def backfill_industry_ids() -> int:
+    """
+    Set industry_id on postings and rollup cells that do not have one yet
+    (rows written before the dimension existed). Commits.
+
+    Returns:
+        int: Number of rows updated
+    """
+    pending = set()
+    for model in (JobPostingKeyword, SkillDemandDaily):
+        pending.update(value for (value,) in db.session.query(model.industry).filter(
+            model.industry_id.is_(None),
+            model.industry.isnot(None),
+            model.industry != ''
+        ).distinct())
+    if not pending:
+        return 0
+
+    try:
+        get_or_create_industry_ids(pending)
+
+        updated = 0
+        for model in (JobPostingKeyword, SkillDemandDaily):
+            resolved = select(IndustryAlias.industry_id).where(
+                IndustryAlias.alias == func.lower(func.trim(model.industry))
+            ).scalar_subquery()
+            updated += model.query.filter(
+                model.industry_id.is_(None),
+                model.industry.isnot(None),
+                model.industry != ''
+            ).update({model.industry_id: resolved}, synchronize_session=False)
+        db.session.commit()
+
+        logger.info(f"Backfilled industry_id on {updated} rows ({len(pending)} industry values)")
+        return updated
+
+    except Exception as e:
+        logger.error(f"Failed to backfill industry ids: {str(e)}")
+        db.session.rollback()
+        raise
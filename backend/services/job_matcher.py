@@ -10,9 +10,10 @@ import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import google.generativeai as genai
-from models import User, JobPosting, JobMatch, Analysis, db
-from services import industry_service
+from models import User, JobPosting, JobMatch, db
+from services import industry_service, user_profile_service
 from services.adzuna_service import get_adzuna_service
+from services.skill_overlap import get_skill_overlap_engine
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +24,9 @@ if GEMINI_API_KEY:
 else:
     logger.warning("GEMINI_API_KEY not set - job matching will use fallback logic")
 
+# Recent jobs ranked by skill overlap before the top 15 are fully scored
+PREFILTER_CANDIDATES = 200
+
 
 class JobMatchingService:
     """AI-powered job matching service using Gemini 1.5 Flash"""
@@ -40,6 +44,9 @@ class JobMatchingService:
         # Initialize Adzuna service
         self.adzuna = get_adzuna_service()
 
+        # Set-based skill overlap, shared by fallback scoring and the AI prefilter
+        self.overlap_engine = get_skill_overlap_engine()
+
     def fetch_and_store_adzuna_jobs(
         self,
         industry: str = None,
@@ -253,13 +260,16 @@ class JobMatchingService:
             if industry and industry != 'General':
                 query = query.filter(JobPosting.industry == industry)
 
-            # Reduced to 15 jobs to prevent worker timeout (was 100, then 30)
-            jobs = query.order_by(JobPosting.posted_date.desc()).limit(15).all()
+            candidates = query.order_by(JobPosting.posted_date.desc()).limit(PREFILTER_CANDIDATES).all()
 
-            if not jobs:
+            if not candidates:
                 logger.warning(f"No active jobs found for industry: {industry}")
                 return []  # Return empty list to maintain consistent API
 
+            # Only score the 15 jobs with the best skill overlap to prevent worker timeout
+            # (AI scoring is ~1 call per job; the overlap prefilter is pure set lookups)
+            jobs = self.overlap_engine.prefilter_jobs(user_skills, candidates, limit=15)
+
             # Generate matches for each job
             matches = []
             for job in jobs:
@@ -319,28 +329,25 @@ class JobMatchingService:
 
     def _get_user_profile(self, user_id: int) -> tuple:
         """
-        Get user's skills and experience from their resume analyses
+        Get user's skills and experience from their materialized skill profile
 
         Returns:
             Tuple of (skills_list, experience_level)
         """
-        # Get latest resume analysis
-        latest_analysis = Analysis.query.filter_by(
-            user_id=user_id
-        ).order_by(Analysis.created_at.desc()).first()
+        profile = user_profile_service.get_profile(user_id)
 
         skills = []
         experience_level = 'Mid'  # Default
 
-        if latest_analysis:
-            # Extract skills from keywords_found
-            if latest_analysis.keywords_found:
-                skills = latest_analysis.keywords_found
+        if profile:
+            # Strongest skills first so prompts and explanations lead with them
+            skills = user_profile_service.get_ranked_skills(user_id)
 
-            # Try to infer experience level from resume text or user profile
             user = User.query.get(user_id)
             if user and user.experience_level:
                 experience_level = user.experience_level
+            elif profile.experience_level:
+                experience_level = profile.experience_level
 
         return skills, experience_level
 
@@ -450,21 +457,15 @@ Provide ONLY the JSON, no other text.
         matching_skills = []
         missing_skills = []
 
-        # Normalize skills for comparison
-        user_skills_lower = [s.lower() for s in user_skills] if user_skills else []
-        job_requirements_lower = [r.lower() for r in job.requirements] if job.requirements else []
-
-        # Calculate skill match
-        if job_requirements_lower:
-            for req in job.requirements:
-                req_lower = req.lower()
-                if any(req_lower in skill or skill in req_lower for skill in user_skills_lower):
-                    matching_skills.append(req)
-                    score += 5  # 5 points per matching skill
-                else:
-                    missing_skills.append(req)
+        # Canonicalize skills to keyword ids and compare with set intersections
+        if job.requirements:
+            user_skill_ids = self.overlap_engine.canonicalize_skills(user_skills)
+            matching_skills, missing_skills = self.overlap_engine.match_requirements(
+                user_skill_ids, job.requirements
+            )
+            score += 5 * len(matching_skills)  # 5 points per matching skill
 
-            skill_match_pct = (len(matching_skills) / len(job.requirements)) * 100 if job.requirements else 0
+            skill_match_pct = (len(matching_skills) / len(job.requirements)) * 100
         else:
             skill_match_pct = 50  # Default if no requirements specified
 
@@ -0,0 +1,178 @@
+"""
+Language Detection - Shared, zero-cost resume language detection
+
+Classifies the writing system of a text sample in a single str.translate pass,
+then (for Latin text) tokenizes once and scores European stopword sets against an
+English baseline with set intersections. Results are memoized in a bounded LRU
+keyed on the sample, so repeated analyses of the same resume never re-scan it.
+
+Used by IntelligentResumeAnalyzer and GeminiService.
+"""
+
+import re
+import logging
+from typing import Dict
+
+from services.memory_cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+# Texts shorter than this are too short to classify reliably
+MIN_TEXT_LENGTH = 50
+
+# Only the start of the resume is inspected
+SAMPLE_CHARS = 1000
+
+# Detected languages kept in the LRU
+CACHE_SIZE = 2048
+
+# Minimum number of distinct stopwords for a European language to win over English
+MIN_STOPWORD_HITS = 3
+
+# A European language must also have this many more stopword hits than English
+ENGLISH_STOPWORD_MARGIN = 2
+
+# Private-use code points used as per-script markers by the translate table
+_LATIN, _CYRILLIC, _HAN, _KANA, _HANGUL, _ARABIC, _DEVANAGARI = (
+    '\ue000', '\ue001', '\ue002', '\ue003', '\ue004', '\ue005', '\ue006'
+)
+
+_SCRIPT_RANGES = (
+    (_LATIN, 0x0041, 0x007A),
+    (_LATIN, 0x00C0, 0x00FF),
+    (_CYRILLIC, 0x0400, 0x04FF),
+    (_ARABIC, 0x0600, 0x06FF),
+    (_DEVANAGARI, 0x0900, 0x097F),
+    (_KANA, 0x3040, 0x30FF),
+    (_HAN, 0x4E00, 0x9FFF),
+    (_HANGUL, 0xAC00, 0xD7AF),
+)
+
+
+def _build_script_table() -> Dict[int, str]:
+    """Map every code point of a tracked script to that script's marker"""
+    table = {}
+    for marker, start, end in _SCRIPT_RANGES:
+        for code in range(start, end + 1):
+            table[code] = marker
+    return table
+
+
+_SCRIPT_TABLE = _build_script_table()
+
+_WORD_PATTERN = re.compile(r'[^\W\d_]+')
+
+# Common English words, scored against the European candidates
+ENGLISH_STOPWORDS = frozenset({
+    'the', 'and', 'of', 'to', 'in', 'on', 'at', 'by', 'for', 'with', 'from', 'as',
+    'is', 'was', 'an', 'my', 'our', 'this', 'that', 'per', 'do'
+})
+
+# Candidates are scored in this order; the first language wins a tie. No
+# single letters (the tokenizer splits "e.g." and "w/") and no words that are
+# also English ("as", "in", "do", "per", "van", "met", "die", "con"...)
+EUROPEAN_STOPWORDS = {
+    'fr': frozenset({'le', 'les', 'de', 'du', 'des', 'et', 'un', 'une', 'dans', 'pour', 'avec', 'sur'}),
+    'de': frozenset({'der', 'das', 'und', 'ist', 'für', 'von', 'zu', 'ein', 'eine', 'nicht', 'auf', 'bei'}),
+    'es': frozenset({'el', 'los', 'las', 'de', 'del', 'un', 'una', 'en', 'por', 'para', 'que', 'como'}),
+    'pt': frozenset({'os', 'de', 'da', 'dos', 'das', 'uma', 'não', 'para', 'que', 'pelo', 'pela', 'são'}),
+    'it': frozenset({'il', 'gli', 'le', 'di', 'un', 'una', 'della', 'che', 'nel', 'sono', 'degli', 'alla'}),
+    'nl': frozenset({'de', 'het', 'een', 'en', 'voor', 'te', 'zijn', 'bij', 'niet', 'ook', 'naar'}),
+    'pl': frozenset({'na', 'się', 'nie', 'że', 'jest', 'oraz', 'przez', 'dla', 'jako', 'od'}),
+}
+
+
+def count_scripts(sample: str) -> Dict[str, int]:
+    """
+    Count characters per writing system in one pass
+
+    Args:
+        sample: Text to classify
+
+    Returns:
+        Dict of script name -> character count
+    """
+    marked = sample.translate(_SCRIPT_TABLE)
+    return {
+        'latin': marked.count(_LATIN),
+        'cyrillic': marked.count(_CYRILLIC),
+        'han': marked.count(_HAN),
+        'kana': marked.count(_KANA),
+        'hangul': marked.count(_HANGUL),
+        'arabic': marked.count(_ARABIC),
+        'devanagari': marked.count(_DEVANAGARI),
+    }
+
+
+def _detect_script_language(counts: Dict[str, int]) -> str:
+    """Pick a language from script counts, or '' when the text is Latin"""
+    latin = counts['latin']
+    cjk = counts['han'] + counts['kana'] + counts['hangul']
+
+    if counts['cyrillic'] > latin * 0.3:
+        return 'ru'
+    if cjk > latin * 0.2:
+        # Kana only appears in Japanese; Hangul dominates Korean text
+        if counts['kana']:
+            return 'ja'
+        if counts['hangul'] > counts['han']:
+            return 'ko'
+        return 'zh'
+    if counts['arabic'] > latin * 0.3:
+        return 'ar'
+    if counts['devanagari'] > latin * 0.3:
+        return 'hi'
+    return ''
+
+
+def _detect_european_language(sample: str) -> str:
+    """Score stopword overlap for Latin-script text, defaulting to English"""
+    words = set(_WORD_PATTERN.findall(sample.lower()))
+
+    best_lang = 'en'
+    best_score = max(MIN_STOPWORD_HITS, len(ENGLISH_STOPWORDS & words) + ENGLISH_STOPWORD_MARGIN) - 1
+    for lang, stopwords in EUROPEAN_STOPWORDS.items():
+        score = len(stopwords & words)
+        if score > best_score:
+            best_lang, best_score = lang, score
+    return best_lang
+
+
+_language_cache = MemoryCache(max_entries=CACHE_SIZE, name='language')
+
+
+def _detect_sample(sample: str) -> str:
+    """Detect the language of a sample (memoized)"""
+    detected = _language_cache.get(sample)
+    if detected is None:
+        detected = _detect_script_language(count_scripts(sample)) or _detect_european_language(sample)
+        _language_cache.set(sample, detected)
+    return detected
+
+
+def detect_language(text: str) -> str:
+    """
+    Detect the primary language of a resume without any API call
+
+    Args:
+        text: Resume or job description text
+
+    Returns:
+        ISO 639-1 two-letter language code ('en' when uncertain)
+    """
+    if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+        return 'en'
+
+    detected = _detect_sample(text[:SAMPLE_CHARS])
+    logger.debug(f"Detected language (heuristic): {detected}")
+    return detected
+
+
+def clear_cache():
+    """Drop all memoized detections"""
+    _language_cache.clear()
+
+
+def get_cache_stats() -> Dict:
+    """Get hit/miss stats for the detection cache"""
+    return _language_cache.get_stats()
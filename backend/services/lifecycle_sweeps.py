@@ -0,0 +1,146 @@
+"""
+Lifecycle Sweeps - Set-based batch updates for scheduled user lifecycle jobs
+
+Trial expiry, grace period downgrades and re-engagement jobs used to load
+every matching user as an ORM object and change them one at a time. A sweep
+instead locks the next batch of matching ids (keyset order, not OFFSET) and
+moves them through a state change with one UPDATE ... RETURNING. Each batch
+is committed and its returned rows are yielded to the caller, which sends
+emails for that batch while the next one is still in the database.
+
+The UPDATE re-checks the criteria, so a batch can come back short when rows
+changed after the id lookup; the sweep only ends when the lookup finds no
+more ids. Sweeps that set users.credits append a RESET credit ledger row per
+user in the same transaction (INSERT ... SELECT before the UPDATE), so the
+ledger keeps reconciling with balances. Jobs whose change must wait for an
+email to be delivered use scan() to read candidate columns and mark() to
+update the ids that were actually emailed.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import logging
+import os
+import time
+
+from sqlalchemy import and_, insert, literal, select, update
+
+from models import db, User, CreditLedgerEntry
+from services import credit_ledger
+
+logger = logging.getLogger(__name__)
+
+# Users per UPDATE/SELECT statement (one commit per batch)
+SWEEP_BATCH_SIZE = int(os.getenv('LIFECYCLE_SWEEP_BATCH_SIZE', 1000))
+
+
+def _next_ids(criteria, after_id: int, batch_size: int) -> List[int]:
+    """Lock and return the next batch of matching user ids"""
+    return db.session.execute(
+        select(User.id).where(criteria, User.id > after_id).order_by(User.id).limit(batch_size)
+        .with_for_update(of=User)
+    ).scalars().all()
+
+
+def _record_credit_resets(matched, credits: int, operation: str):
+    """Ledger rows for setting matched users' credits (taken before the UPDATE, from the old balances)"""
+    entries = select(
+        User.id, literal(credit_ledger.RESET), literal(credits) - User.credits, literal(credits),
+        literal(operation), literal(datetime.utcnow(), db.DateTime)
+    ).where(matched)
+    db.session.execute(insert(CreditLedgerEntry).from_select(
+        ['user_id', 'kind', 'delta', 'balance_after', 'operation', 'created_at'], entries
+    ))
+
+
+def sweep(name: str, criteria, values: Dict, returning: Sequence = (), batch_size: int = None,
+          ledger_operation: Optional[str] = None) -> Iterator[List]:
+    """
+    Apply values to every user matching criteria, one committed batch at a time
+
+    Args:
+        name: Sweep name for the timing log
+        criteria: SQLAlchemy filter on User
+        values: Column values to set
+        returning: User columns to return alongside id
+        batch_size: Users per statement (defaults to SWEEP_BATCH_SIZE)
+        ledger_operation: Credit ledger operation, required when values set credits
+
+    Yields:
+        List of RETURNING rows (id, *returning) for each committed batch
+    """
+    if 'credits' in values and not ledger_operation:
+        raise ValueError(f"Sweep {name} sets credits without a ledger operation")
+    batch_size = batch_size or SWEEP_BATCH_SIZE
+    started = time.monotonic()
+    last_id = 0
+    updated = batches = 0
+    try:
+        while True:
+            ids = _next_ids(criteria, last_id, batch_size)
+            if not ids:
+                db.session.commit()
+                break
+            last_id = ids[-1]
+
+            # criteria is repeated so rows changed since the id lookup are re-checked
+            matched = and_(User.id.in_(ids), criteria)
+            if 'credits' in values:
+                _record_credit_resets(matched, values['credits'], ledger_operation)
+            stmt = update(User).where(matched).values(**values).returning(User.id, *returning)
+            rows = db.session.execute(stmt, execution_options={'synchronize_session': False}).all()
+            db.session.commit()
+
+            batches += 1
+            if rows:
+                updated += len(rows)
+                yield rows
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        logger.info(f"Lifecycle sweep {name}: {updated} users in {batches} batches, {time.monotonic() - started:.2f}s")
+
+
+def run(name: str, criteria, values: Dict, batch_size: int = None, ledger_operation: Optional[str] = None) -> int:
+    """Run a sweep that needs no follow-up, returning the number of users updated"""
+    return sum(len(rows) for rows in sweep(name, criteria, values, batch_size=batch_size,
+                                           ledger_operation=ledger_operation))
+
+
+def scan(criteria, columns: Sequence, batch_size: int = None) -> Iterator[List]:
+    """
+    Read columns of every user matching criteria, a batch at a time in id order
+
+    Yields:
+        List of rows (id, *columns) per batch
+    """
+    batch_size = batch_size or SWEEP_BATCH_SIZE
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(User.id, *columns).where(criteria, User.id > last_id).order_by(User.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        yield rows
+        if len(rows) < batch_size:
+            break
+
+
+def mark(user_ids: Iterable[int], values: Dict) -> int:
+    """Apply values to the given users in one statement and commit"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    try:
+        result = db.session.execute(
+            update(User).where(User.id.in_(user_ids)).values(**values),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        return result.rowcount
+    except Exception:
+        db.session.rollback()
+        raise
@@ -0,0 +1,142 @@
+"""
+Market Cache - Response cache for market and insights endpoints
+
+Market aggregations only change when ingestion or cleanup runs, so the
+industry-level part of each market/insights response is cached under
+(endpoint, industry, window, generation). Writers call bump_generation() after
+committing; every cached entry from an older generation is then unreachable and
+ages out of the LRU. Per-user personalization is applied by the routes after
+the cache read, so all users in an industry share one entry.
+
+The generation counter lives in Redis when REDIS_URL is configured so a bump
+from the scheduler process invalidates every worker. Without Redis it is
+process-local and entries fall back to CACHE_TTL_SECONDS for cross-process
+staleness.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from services.memory_cache import MemoryCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = 512
+CACHE_TTL_SECONDS = 3600
+GENERATION_KEY = 'market_cache:generation'
+
+_cache = MemoryCache(max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS, name='market')
+_local_generation = 0
+_generation_lock = threading.Lock()
+_redis_client = None
+_redis_checked = False
+
+
+def _get_redis():
+    """Lazily connect to Redis for the shared generation counter (None if unavailable)"""
+    global _redis_client, _redis_checked
+    if _redis_checked:
+        return _redis_client
+
+    _redis_checked = True
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        try:
+            import redis
+            _redis_client = redis.from_url(redis_url, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"Market cache Redis unavailable, using process-local generation: {str(e)}")
+            _redis_client = None
+    return _redis_client
+
+
+def get_generation() -> Tuple[int, int]:
+    """Current cache generation as (shared, local)"""
+    shared = 0
+    client = _get_redis()
+    if client is not None:
+        try:
+            shared = int(client.get(GENERATION_KEY) or 0)
+        except Exception as e:
+            logger.debug(f"Market cache generation read failed: {str(e)}")
+    return shared, _local_generation
+
+
+def bump_generation(reason: str = '') -> Tuple[int, int]:
+    """
+    Invalidate all cached market responses
+
+    Call after committing new or deleted job posting data.
+
+    Args:
+        reason: Label for the log line (e.g. 'ingest_postings')
+
+    Returns:
+        Tuple[int, int]: The new generation
+    """
+    global _local_generation
+    with _generation_lock:
+        _local_generation += 1
+    _cache.clear()
+
+    client = _get_redis()
+    if client is not None:
+        try:
+            client.incr(GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f"Market cache generation bump failed: {str(e)}")
+
+    generation = get_generation()
+    logger.info(f"Market cache invalidated ({reason or 'manual'}), generation {generation}")
+    return generation
+
+
+def make_key(endpoint: str, industry: Optional[str] = None, window: Hashable = None) -> Tuple:
+    """Cache key for an endpoint/industry/window at the current generation"""
+    return (endpoint, (industry or '').strip().lower(), window, get_generation())
+
+
+def get_or_compute(endpoint: str, industry: Optional[str], window: Hashable,
+                   compute: Callable[[], Any]) -> Any:
+    """
+    Return the cached industry-level payload, computing it on a miss
+
+    Args:
+        endpoint: Endpoint name
+        industry: Industry filter (case-insensitive, None = all)
+        window: Time window or other shape parameter of the aggregation
+        compute: Zero-argument function building the payload
+
+    Returns:
+        The cached payload. Callers must treat it as read-only and copy
+        anything they personalize. Empty payloads (None, {}, []) are returned
+        but not cached: analyzers return them on errors as well as when there
+        is no data, and one failed query must not blank the endpoint for
+        CACHE_TTL_SECONDS.
+    """
+    key = make_key(endpoint, industry, window)
+    payload = _cache.get(key, MISSING)
+    if payload is MISSING:
+        payload = compute()
+        if not _is_empty(payload):
+            _cache.set(key, payload)
+    return payload
+
+
+def _is_empty(payload: Any) -> bool:
+    return payload is None or (isinstance(payload, (dict, list, tuple, set, frozenset)) and not payload)
+
+
+def clear():
+    """Drop all cached entries without bumping the generation"""
+    _cache.clear()
+
+
+def get_stats() -> Dict[str, Any]:
+    """Cache hit/miss counters and the current generation"""
+    stats = _cache.get_stats()
+    stats['generation'] = list(get_generation())
+    stats['shared_generation'] = _get_redis() is not None
+    return stats
@@ -0,0 +1,566 @@
+"""
+Market Rollup Service - Daily skill demand rollup for market intelligence
+
+Maintains SkillDemandDaily: one row per (day, keyword, industry, location, source)
+with posting counts, salary sums and a t-digest of salary midpoints. Ingestion folds new JobPostingKeyword rows in
+incrementally and the scheduled refresh reconciles recent days from raw rows, so
+market endpoints answer any 30/90/180-day window by summing a few rollup rows per
+skill instead of rescanning postings.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+
+from sqlalchemy import and_, case, func
+
+from models import db, JobPostingKeyword, Keyword, SkillDemandDaily
+from services import industry_service, market_cache
+from services.quantile_sketch import TDigest
+
+logger = logging.getLogger(__name__)
+
+# Longest window any market endpoint asks for
+ROLLUP_RETENTION_DAYS = 180
+
+# Days re-derived from raw rows on every scheduled refresh (catches late or manual inserts)
+RECONCILE_DAYS = 2
+
+CellKey = Tuple[date, int, str, str, str]
+
+_backfill_lock = threading.Lock()
+
+# Set once this process has checked that every row carries its industry_id
+_industry_ids_ready = False
+
+# Market cache generation at this process's last backfill of an empty rollup.
+# An empty rollup is only backfilled again after ingestion or the scheduled
+# refresh bumps the generation, not on every read
+_backfill_generation = None
+
+
+def window_start(days: int, now: Optional[datetime] = None) -> date:
+    """First rollup day included in a "last N days" window"""
+    return ((now or datetime.utcnow()) - timedelta(days=days)).date()
+
+
+def _cell_key(day: date, keyword_id: int, industry: Optional[str],
+              location: Optional[str], source: Optional[str]) -> CellKey:
+    """Normalize a cell key (NULL dimensions are stored as '')"""
+    return (day, keyword_id, industry or '', location or '', source or '')
+
+
+def _new_totals() -> Dict:
+    return {
+        'postings_count': 0,
+        'frequency_sum': 0,
+        'salary_count': 0,
+        'salary_sum': 0.0,
+        'salary_low': None,
+        'salary_high': None,
+        'salary_min_count': 0,
+        'salary_min_sum': 0.0,
+        'salary_max_count': 0,
+        'salary_max_sum': 0.0,
+        'salary_digest': None,
+        'last_seen': None
+    }
+
+
+def _add_row(totals: Dict, frequency: Optional[int], salary_min: Optional[int],
+             salary_max: Optional[int], extracted_at: datetime):
+    """Fold one JobPostingKeyword row into cell totals"""
+    totals['postings_count'] += 1
+    totals['frequency_sum'] += frequency or 0
+
+    if salary_min and salary_max:
+        mid = (salary_min + salary_max) / 2
+        totals['salary_count'] += 1
+        totals['salary_sum'] += mid
+        totals['salary_low'] = mid if totals['salary_low'] is None else min(totals['salary_low'], mid)
+        totals['salary_high'] = mid if totals['salary_high'] is None else max(totals['salary_high'], mid)
+        if totals['salary_digest'] is None:
+            totals['salary_digest'] = TDigest()
+        totals['salary_digest'].add(mid)
+    if salary_min is not None:
+        totals['salary_min_count'] += 1
+        totals['salary_min_sum'] += salary_min
+    if salary_max is not None:
+        totals['salary_max_count'] += 1
+        totals['salary_max_sum'] += salary_max
+
+    if totals['last_seen'] is None or extracted_at > totals['last_seen']:
+        totals['last_seen'] = extracted_at
+
+
+def _merge_into_cell(cell: SkillDemandDaily, totals: Dict):
+    """Add cell totals onto an existing rollup row"""
+    for field in ('postings_count', 'frequency_sum', 'salary_count', 'salary_min_count', 'salary_max_count'):
+        setattr(cell, field, (getattr(cell, field) or 0) + totals[field])
+    for field in ('salary_sum', 'salary_min_sum', 'salary_max_sum'):
+        setattr(cell, field, (getattr(cell, field) or 0.0) + totals[field])
+
+    if totals['salary_low'] is not None:
+        cell.salary_low = totals['salary_low'] if cell.salary_low is None else min(cell.salary_low, totals['salary_low'])
+        cell.salary_high = totals['salary_high'] if cell.salary_high is None else max(cell.salary_high, totals['salary_high'])
+    if totals['salary_digest'] is not None:
+        # Reassign (not mutate) so the JSON column is marked dirty
+        cell.salary_digest = TDigest.from_list(cell.salary_digest).merge(totals['salary_digest']).to_list()
+    if totals['last_seen'] and (cell.last_seen is None or totals['last_seen'] > cell.last_seen):
+        cell.last_seen = totals['last_seen']
+
+
+def record_postings(rows: Iterable[JobPostingKeyword]) -> int:
+    """
+    Fold newly inserted JobPostingKeyword rows into the rollup
+
+    Call after the rows are added (and before the caller commits), so the raw rows
+    and their rollup update land in the same transaction. Does not commit.
+
+    Args:
+        rows: JobPostingKeyword objects added in this transaction
+
+    Returns:
+        int: Number of rollup cells created or updated
+    """
+    rows = list(rows)
+    industry_ids = industry_service.get_or_create_industry_ids(row.industry for row in rows)
+
+    cells: Dict[CellKey, Dict] = {}
+    for row in rows:
+        row.industry_id = industry_ids.get(row.industry)
+        extracted_at = row.extracted_at or datetime.utcnow()
+        key = _cell_key(extracted_at.date(), row.keyword_id, row.industry, row.location, row.source)
+        totals = cells.get(key)
+        if totals is None:
+            totals = cells[key] = _new_totals()
+        _add_row(totals, row.frequency if row.frequency is not None else 1,
+                 row.salary_min, row.salary_max, extracted_at)
+
+    if not cells:
+        return 0
+
+    # Load every existing cell these rows touch in one query
+    days = {key[0] for key in cells}
+    keyword_ids = {key[1] for key in cells}
+    existing = {
+        _cell_key(cell.day, cell.keyword_id, cell.industry, cell.location, cell.source): cell
+        for cell in SkillDemandDaily.query.filter(
+            SkillDemandDaily.day.in_(days),
+            SkillDemandDaily.keyword_id.in_(keyword_ids)
+        )
+    }
+
+    for key, totals in cells.items():
+        cell = existing.get(key)
+        if cell is None:
+            day, keyword_id, industry, location, source = key
+            cell = SkillDemandDaily(day=day, keyword_id=keyword_id, industry=industry,
+                                    industry_id=industry_ids.get(industry), location=location, source=source)
+            for field, value in _new_totals().items():
+                setattr(cell, field, value)
+            db.session.add(cell)
+        _merge_into_cell(cell, totals)
+
+    return len(cells)
+
+
+def _as_date(value) -> date:
+    """func.date() returns a date on PostgreSQL and a string on SQLite"""
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _build_salary_digests(start_at: datetime, midpoint, day_column) -> Dict[CellKey, TDigest]:
+    """Stream salary midpoints since start_at into one digest per rollup cell"""
+    rows = db.session.query(
+        day_column,
+        JobPostingKeyword.keyword_id,
+        JobPostingKeyword.industry,
+        JobPostingKeyword.location,
+        JobPostingKeyword.source,
+        midpoint
+    ).filter(
+        JobPostingKeyword.extracted_at >= start_at,
+        midpoint.isnot(None)
+    )
+
+    digests: Dict[CellKey, TDigest] = {}
+    for day, keyword_id, industry, location, source, mid in rows.yield_per(1000):
+        key = _cell_key(_as_date(day), keyword_id, industry, location, source)
+        digest = digests.get(key)
+        if digest is None:
+            digest = digests[key] = TDigest()
+        digest.add(float(mid))
+    return digests
+
+
+def rebuild_rollup(days: int = ROLLUP_RETENTION_DAYS) -> int:
+    """
+    Re-derive the last N days of the rollup from raw JobPostingKeyword rows
+
+    Used to backfill an empty rollup and, with a small window, to reconcile
+    recent days on every scheduled refresh. Commits.
+
+    Returns:
+        int: Number of rollup cells written
+    """
+    start_day = window_start(days)
+    start_at = datetime.combine(start_day, datetime.min.time())
+
+    midpoint = case(
+        (and_(JobPostingKeyword.salary_min != 0, JobPostingKeyword.salary_max != 0),
+         (JobPostingKeyword.salary_min + JobPostingKeyword.salary_max) / 2.0),
+        else_=None
+    )
+    day_column = func.date(JobPostingKeyword.extracted_at)
+
+    try:
+        industry_service.backfill_industry_ids()
+
+        rows = db.session.query(
+            day_column.label('day'),
+            JobPostingKeyword.keyword_id,
+            func.coalesce(JobPostingKeyword.industry, '').label('industry'),
+            JobPostingKeyword.industry_id,
+            func.coalesce(JobPostingKeyword.location, '').label('location'),
+            func.coalesce(JobPostingKeyword.source, '').label('source'),
+            func.count(JobPostingKeyword.id).label('postings_count'),
+            func.coalesce(func.sum(JobPostingKeyword.frequency), 0).label('frequency_sum'),
+            func.count(midpoint).label('salary_count'),
+            func.coalesce(func.sum(midpoint), 0).label('salary_sum'),
+            func.min(midpoint).label('salary_low'),
+            func.max(midpoint).label('salary_high'),
+            func.count(JobPostingKeyword.salary_min).label('salary_min_count'),
+            func.coalesce(func.sum(JobPostingKeyword.salary_min), 0).label('salary_min_sum'),
+            func.count(JobPostingKeyword.salary_max).label('salary_max_count'),
+            func.coalesce(func.sum(JobPostingKeyword.salary_max), 0).label('salary_max_sum'),
+            func.max(JobPostingKeyword.extracted_at).label('last_seen')
+        ).filter(
+            JobPostingKeyword.extracted_at >= start_at
+        ).group_by(
+            day_column,
+            JobPostingKeyword.keyword_id,
+            func.coalesce(JobPostingKeyword.industry, ''),
+            JobPostingKeyword.industry_id,
+            func.coalesce(JobPostingKeyword.location, ''),
+            func.coalesce(JobPostingKeyword.source, '')
+        ).all()
+
+        digests = _build_salary_digests(start_at, midpoint, day_column)
+
+        SkillDemandDaily.query.filter(SkillDemandDaily.day >= start_day).delete(synchronize_session=False)
+
+        cells = []
+        for row in rows:
+            day = _as_date(row.day)
+            digest = digests.get(_cell_key(day, row.keyword_id, row.industry, row.location, row.source))
+            cells.append({
+                'day': day,
+                'keyword_id': row.keyword_id,
+                'industry': row.industry,
+                'industry_id': row.industry_id,
+                'location': row.location,
+                'source': row.source,
+                'postings_count': row.postings_count,
+                'frequency_sum': int(row.frequency_sum),
+                'salary_count': row.salary_count,
+                'salary_sum': float(row.salary_sum),
+                'salary_low': float(row.salary_low) if row.salary_low is not None else None,
+                'salary_high': float(row.salary_high) if row.salary_high is not None else None,
+                'salary_min_count': row.salary_min_count,
+                'salary_min_sum': float(row.salary_min_sum),
+                'salary_max_count': row.salary_max_count,
+                'salary_max_sum': float(row.salary_max_sum),
+                'salary_digest': digest.to_list() if digest is not None else None,
+                'last_seen': row.last_seen,
+                'updated_at': datetime.utcnow()
+            })
+        if cells:
+            db.session.bulk_insert_mappings(SkillDemandDaily, cells)
+        db.session.commit()
+
+        logger.info(f"Rebuilt skill demand rollup from {start_day}: {len(cells)} cells")
+        return len(cells)
+
+    except Exception as e:
+        logger.error(f"Failed to rebuild skill demand rollup: {str(e)}")
+        db.session.rollback()
+        raise
+
+
+def _raw_backed_days(now: Optional[datetime] = None) -> int:
+    """
+    Length of the rollup window raw JobPostingKeyword rows still fully cover
+
+    Posting retention purges raw rows well inside ROLLUP_RETENTION_DAYS and its
+    cutoff can fall mid-day, so the oldest remaining day counts as partial.
+    Rebuilding beyond this window would replace good cells with truncated ones.
+    """
+    oldest = db.session.query(func.min(JobPostingKeyword.extracted_at)).scalar()
+    if oldest is None:
+        return 0
+    now = now or datetime.utcnow()
+    return max(0, min(ROLLUP_RETENTION_DAYS, (now.date() - oldest.date()).days - 1))
+
+
+def ensure_rollup() -> bool:
+    """
+    Backfill the rollup on first use
+
+    Returns:
+        bool: False if the rollup could not be read or built (callers fall back to raw rows)
+    """
+    global _industry_ids_ready, _backfill_generation
+    try:
+        if not _industry_ids_ready:
+            # Rows written before the industry dimension existed
+            industry_service.backfill_industry_ids()
+            _industry_ids_ready = True
+        generation = market_cache.get_generation()
+        if _backfill_generation == generation or SkillDemandDaily.query.first() is not None:
+            return True
+        with _backfill_lock:
+            if _backfill_generation != generation and SkillDemandDaily.query.first() is None:
+                rebuild_rollup(ROLLUP_RETENTION_DAYS)
+            _backfill_generation = generation
+        return True
+    except Exception as e:
+        logger.warning(f"Skill demand rollup unavailable: {str(e)}")
+        db.session.rollback()
+        return False
+
+
+def reset_backfill_state():
+    """Allow the next ensure_rollup() to backfill an empty rollup again"""
+    global _backfill_generation
+    _backfill_generation = None
+
+
+def refresh_rollup() -> int:
+    """
+    Scheduled maintenance: backfill an empty rollup (or salary digests for the
+    days raw rows still cover) or reconcile recent days, then drop cells older
+    than the retention window
+
+    Returns:
+        int: Number of rollup cells written
+    """
+    backed_days = _raw_backed_days()
+    missing_digests = SkillDemandDaily.query.filter(
+        SkillDemandDaily.day >= window_start(backed_days),
+        SkillDemandDaily.salary_count > 0,
+        SkillDemandDaily.salary_digest.is_(None)
+    ).first() is not None
+
+    if SkillDemandDaily.query.first() is None:
+        written = rebuild_rollup(ROLLUP_RETENTION_DAYS)
+    elif missing_digests:
+        # Older cells outlive their raw rows; they keep their sums without a digest
+        written = rebuild_rollup(max(backed_days, RECONCILE_DAYS))
+    else:
+        written = rebuild_rollup(RECONCILE_DAYS)
+
+    pruned = SkillDemandDaily.query.filter(
+        SkillDemandDaily.day < window_start(ROLLUP_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    if pruned:
+        logger.info(f"Pruned {pruned} expired skill demand rollup cells")
+    return written
+
+
+def _apply_filters(query, start_day: date, end_day: Optional[date], industry: Optional[str],
+                   match_category: bool):
+    query = query.filter(SkillDemandDaily.day >= start_day)
+    if end_day is not None:
+        query = query.filter(SkillDemandDaily.day < end_day)
+    if industry:
+        query = query.filter(industry_service.industry_condition(
+            SkillDemandDaily.industry_id, industry,
+            keyword_id_column=SkillDemandDaily.keyword_id if match_category else None
+        ))
+    return query
+
+
+def aggregate_by_skill(start_day: date, end_day: Optional[date] = None, industry: Optional[str] = None,
+                       match_category: bool = False, keyword_id: Optional[int] = None) -> List:
+    """
+    Sum rollup cells per skill over [start_day, end_day)
+
+    Args:
+        start_day: First day included
+        end_day: First day excluded (None = up to today)
+        industry: Optional industry name or alias (resolved to industry ids)
+        match_category: Also accept skills whose Keyword.category is an alias of the industry
+        keyword_id: Restrict to one skill
+
+    Returns:
+        List of rows with keyword_id, keyword, category and summed rollup columns
+    """
+    query = db.session.query(
+        Keyword.id.label('keyword_id'),
+        Keyword.keyword,
+        Keyword.category,
+        func.sum(SkillDemandDaily.postings_count).label('postings_count'),
+        func.sum(SkillDemandDaily.frequency_sum).label('frequency_sum'),
+        func.sum(SkillDemandDaily.salary_count).label('salary_count'),
+        func.sum(SkillDemandDaily.salary_sum).label('salary_sum'),
+        func.min(SkillDemandDaily.salary_low).label('salary_low'),
+        func.max(SkillDemandDaily.salary_high).label('salary_high'),
+        func.sum(SkillDemandDaily.salary_min_count).label('salary_min_count'),
+        func.sum(SkillDemandDaily.salary_min_sum).label('salary_min_sum'),
+        func.sum(SkillDemandDaily.salary_max_count).label('salary_max_count'),
+        func.sum(SkillDemandDaily.salary_max_sum).label('salary_max_sum'),
+        func.max(SkillDemandDaily.last_seen).label('last_seen')
+    ).join(SkillDemandDaily, SkillDemandDaily.keyword_id == Keyword.id)
+
+    query = _apply_filters(query, start_day, end_day, industry, match_category)
+    if keyword_id is not None:
+        query = query.filter(SkillDemandDaily.keyword_id == keyword_id)
+    return query.group_by(Keyword.id, Keyword.keyword, Keyword.category).all()
+
+
+def aggregate_breakdown(dimension: str, start_day: date, industry: Optional[str] = None) -> List:
+    """
+    Posting counts per (skill, dimension value) for industry / location / source
+
+    Returns:
+        List of (keyword_id, value, count) rows, empty values excluded
+    """
+    column = getattr(SkillDemandDaily, dimension)
+    query = db.session.query(
+        SkillDemandDaily.keyword_id,
+        column,
+        func.sum(SkillDemandDaily.postings_count)
+    ).filter(column != '')
+    query = _apply_filters(query, start_day, None, industry, False)
+    return query.group_by(SkillDemandDaily.keyword_id, column).all()
+
+
+def aggregate_by_day(keyword_id: int, start_day: date) -> List:
+    """Per-day totals for one skill (at most one row per day in the window)"""
+    return db.session.query(
+        SkillDemandDaily.day,
+        func.sum(SkillDemandDaily.postings_count).label('postings_count'),
+        func.sum(SkillDemandDaily.salary_count).label('salary_count'),
+        func.sum(SkillDemandDaily.salary_sum).label('salary_sum')
+    ).filter(
+        SkillDemandDaily.keyword_id == keyword_id,
+        SkillDemandDaily.day >= start_day
+    ).group_by(SkillDemandDaily.day).order_by(SkillDemandDaily.day).all()
+
+
+def aggregate_location(location: str, start_day: date, keyword_id: Optional[int] = None):
+    """
+    Totals over cells whose location matches (case-insensitive substring)
+
+    Returns:
+        Row with postings_count, salary_count, salary_sum, salary_low and salary_high
+    """
+    query = db.session.query(
+        func.sum(SkillDemandDaily.postings_count).label('postings_count'),
+        func.sum(SkillDemandDaily.salary_count).label('salary_count'),
+        func.sum(SkillDemandDaily.salary_sum).label('salary_sum'),
+        func.min(SkillDemandDaily.salary_low).label('salary_low'),
+        func.max(SkillDemandDaily.salary_high).label('salary_high')
+    ).filter(
+        SkillDemandDaily.day >= start_day,
+        SkillDemandDaily.location.ilike(f'%{location}%')
+    )
+    if keyword_id is not None:
+        query = query.filter(SkillDemandDaily.keyword_id == keyword_id)
+    return query.one()
+
+
+def merge_salary_digests(start_day: date, group_by: Optional[str] = None, end_day: Optional[date] = None,
+                         industry: Optional[str] = None, keyword_id: Optional[int] = None,
+                         location: Optional[str] = None) -> Dict:
+    """
+    Merge the salary t-digests of matching cells
+
+    Args:
+        start_day: First day included
+        group_by: 'keyword_id', 'day' or None for a single digest
+        end_day: First day excluded (None = up to today)
+        industry: Optional industry name or alias (resolved to industry ids)
+        keyword_id: Restrict to one skill
+        location: Optional case-insensitive location substring filter
+
+    Returns:
+        Dict of group value (None when ungrouped) -> TDigest
+    """
+    group_column = getattr(SkillDemandDaily, group_by) if group_by else None
+    columns = [group_column, SkillDemandDaily.salary_digest] if group_by else [SkillDemandDaily.salary_digest]
+    query = db.session.query(*columns).filter(SkillDemandDaily.salary_count > 0)
+    query = _apply_filters(query, start_day, end_day, industry, False)
+    if keyword_id is not None:
+        query = query.filter(SkillDemandDaily.keyword_id == keyword_id)
+    if location:
+        query = query.filter(SkillDemandDaily.location.ilike(f'%{location}%'))
+
+    digests: Dict = {}
+    for row in query.yield_per(1000):
+        group = row[0] if group_by else None
+        if group_by == 'day':
+            group = _as_date(group)
+        digest = digests.get(group)
+        if digest is None:
+            digest = digests[group] = TDigest()
+        digest.merge(TDigest.from_list(row[-1]))
+    return digests
+
+
+def aggregate_trends(recent_start: date, previous_start: date, industry: Optional[str] = None,
+                     match_category: bool = False, change_threshold: float = 25.0,
+                     emerging_min: int = 3) -> List:
+    """
+    Current vs previous window demand per skill, classified in the same query
+
+    Both windows are summed in one pass with COUNT-style FILTER aggregates over
+    [previous_start, today), and the growth class is a CASE over the two sums,
+    so the trend comparison is a single round trip.
+
+    Args:
+        recent_start: First day of the current window
+        previous_start: First day of the previous window (which ends at recent_start)
+        industry: Optional industry name or alias (resolved to industry ids)
+        match_category: Also accept skills whose Keyword.category is an alias of the industry
+        change_threshold: Percent change that makes a skill growing / declining
+        emerging_min: Current postings needed for a skill absent last window to be emerging
+
+    Returns:
+        List of rows with keyword_id, keyword, category, current_count, previous_count,
+        change_percentage (None when new) and trend ('growing', 'declining', 'stable',
+        'emerging', or None for new skills below emerging_min); only skills seen in the
+        current window
+    """
+    in_recent = SkillDemandDaily.day >= recent_start
+    current = func.coalesce(func.sum(SkillDemandDaily.postings_count).filter(in_recent), 0)
+    previous = func.coalesce(func.sum(SkillDemandDaily.postings_count).filter(~in_recent), 0)
+
+    # Integer comparisons: curr >= prev * (1 + t/100) without float division
+    scale = 100
+    trend = case(
+        (previous == 0, case((current >= emerging_min, 'emerging'), else_=None)),
+        (current * scale >= previous * (scale + change_threshold), 'growing'),
+        (current * scale <= previous * (scale - change_threshold), 'declining'),
+        else_='stable'
+    )
+    change = case(
+        (previous == 0, None),
+        else_=(current - previous) * 100.0 / previous
+    )
+
+    query = db.session.query(
+        Keyword.id.label('keyword_id'),
+        Keyword.keyword,
+        Keyword.category,
+        current.label('current_count'),
+        previous.label('previous_count'),
+        change.label('change_percentage'),
+        trend.label('trend')
+    ).join(SkillDemandDaily, SkillDemandDaily.keyword_id == Keyword.id)
+
+    query = _apply_filters(query, previous_start, None, industry, match_category)
+    return query.group_by(Keyword.id, Keyword.keyword, Keyword.category).having(current > 0).all()
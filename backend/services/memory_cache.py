@@ -0,0 +1,165 @@
+"""
+Memory Cache - Thread-safe in-process LRU cache with TTL and byte limits
+
+Shared replacement for the ad-hoc dict+timestamp caches in the analyzer,
+KeywordManager, ConfigManager and language detection. get/set/delete are O(1):
+entries live in an OrderedDict kept in recency order, so eviction pops the
+oldest entry instead of scanning timestamps.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Returned by get() on a miss when no default is given and callers need to
+# tell a cached None apart from a missing key
+MISSING = object()
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Approximate the memory footprint of a value in bytes
+
+    Walks dicts, lists, tuples and sets (up to a few levels deep) and adds
+    sys.getsizeof of each element. Good enough for enforcing a byte budget.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _depth + 1) + estimate_size(item, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+class MemoryCache:
+    """Bounded LRU cache with optional per-entry TTL and total byte limit"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        name: str = 'cache',
+        sizeof: Callable[[Any], int] = estimate_size
+    ):
+        """
+        Args:
+            max_entries: Maximum number of entries before LRU eviction
+            ttl_seconds: Default time-to-live (None = never expires)
+            max_bytes: Maximum estimated size of all values (None = unbounded)
+            name: Label used in stats
+            sizeof: Function estimating a value's size in bytes
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.name = name
+        self._sizeof = sizeof
+        # key -> (value, expires_at or None, size)
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value (marking it recently used) or default"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self._expirations += 1
+                self._misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        """
+        Store a value, evicting least recently used entries as needed
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl_seconds: Overrides the cache's default TTL for this entry
+
+        Returns:
+            bool: False if the value alone exceeds max_bytes and was not stored
+        """
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            if self.max_bytes is not None and size > self.max_bytes:
+                return False
+
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+            return True
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove a key, returning True if it was present"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._bytes -= entry[2]
+            return True
+
+    def clear(self):
+        """Remove all entries (stats are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, MISSING) is not MISSING
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0
+            }
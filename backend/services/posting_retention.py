@@ -0,0 +1,221 @@
+"""
+Posting Retention - Time-partitioned storage and batched cleanup for JobPostingKeyword
+
+On PostgreSQL, job_posting_keyword is range-partitioned by month on extracted_at
+(migrations/partition_job_posting_keyword.py), so retention detaches and drops
+whole monthly partitions instead of deleting rows. Rows older than the cutoff in
+the partition that straddles it, and every expired row on databases without
+partitioning, are removed by a batched delete that commits per batch: a run that
+stops early (time budget, restart) simply resumes on the next run.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import logging
+import re
+import time
+
+from sqlalchemy import text
+
+from models import db, JobPostingKeyword
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = 'job_posting_keyword'
+
+# Monthly partitions are named job_posting_keyword_pYYYY_MM
+PARTITION_PATTERN = re.compile(rf'^{TABLE_NAME}_p(\d{{4}})_(\d{{2}})$')
+
+# Future months kept pre-created so inserts never land in the default partition
+PARTITION_MONTHS_AHEAD = 2
+
+# Rows per delete statement (each batch is its own short transaction)
+DELETE_BATCH_SIZE = 5000
+
+
+def month_start(value) -> date:
+    """First day of the month containing value"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after month"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'{TABLE_NAME}_p{month:%Y_%m}'
+
+
+def create_partition_sql(month: date, parent: str = TABLE_NAME) -> str:
+    """DDL for the monthly partition holding [month, next month)"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def is_partitioned() -> bool:
+    """True when job_posting_keyword is a PostgreSQL partitioned table"""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return bool(db.session.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = :table
+        )
+    """), {'table': TABLE_NAME}).scalar())
+
+
+def list_partitions() -> Dict[date, str]:
+    """Monthly partitions currently attached, keyed by their first day"""
+    names = db.session.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.relname = :table
+    """), {'table': TABLE_NAME}).scalars()
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def ensure_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the current and next few monthly partitions if missing. Commits.
+
+    Returns:
+        List[str]: Partitions created
+    """
+    existing = list_partitions()
+    current = month_start(now or datetime.utcnow())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month in existing:
+            continue
+        try:
+            db.session.execute(text(create_partition_sql(month)))
+            db.session.commit()
+            created.append(partition_name(month))
+        except Exception as e:
+            # Typically rows for that month already sit in the default partition
+            db.session.rollback()
+            logger.warning(f"Could not create partition {partition_name(month)}: {str(e)}")
+
+    if created:
+        logger.info(f"Created posting partitions: {', '.join(created)}")
+    return created
+
+
+def drop_expired_partitions(cutoff: datetime) -> List[str]:
+    """
+    Detach and drop monthly partitions that end on or before the cutoff. Commits.
+
+    Returns:
+        List[str]: Partitions dropped
+    """
+    dropped = []
+    for month, name in sorted(list_partitions().items()):
+        if datetime.combine(add_months(month, 1), datetime.min.time()) > cutoff:
+            continue
+        db.session.execute(text(f'ALTER TABLE {TABLE_NAME} DETACH PARTITION {name}'))
+        db.session.execute(text(f'DROP TABLE {name}'))
+        db.session.commit()
+        dropped.append(name)
+        logger.info(f"Dropped expired posting partition {name}")
+    return dropped
+
+
+def delete_in_batches(cutoff: datetime, batch_size: int = DELETE_BATCH_SIZE,
+                      time_budget_seconds: Optional[float] = None) -> Dict:
+    """
+    Delete postings extracted before the cutoff, one committed batch at a time
+
+    Each batch selects the oldest `batch_size` ids and deletes them, keeping
+    locks short and letting autovacuum keep up. Safe to stop at any point: the
+    next call picks up the remaining rows.
+
+    Args:
+        cutoff: Rows with extracted_at before this are deleted
+        batch_size: Rows per delete statement
+        time_budget_seconds: Stop after this long (None = run to completion)
+
+    Returns:
+        Dict with rows_deleted, batches and complete (False if the budget ran out)
+    """
+    started = time.monotonic()
+    deleted = 0
+    batches = 0
+
+    while True:
+        if time_budget_seconds is not None and time.monotonic() - started >= time_budget_seconds:
+            logger.info(f"Posting cleanup paused after {batches} batches ({deleted} rows)")
+            return {'rows_deleted': deleted, 'batches': batches, 'complete': False}
+
+        ids = [row_id for (row_id,) in db.session.query(JobPostingKeyword.id).filter(
+            JobPostingKeyword.extracted_at < cutoff
+        ).order_by(JobPostingKeyword.extracted_at).limit(batch_size)]
+        if not ids:
+            break
+
+        try:
+            # The extracted_at predicate lets PostgreSQL prune to the expired partitions
+            deleted += JobPostingKeyword.query.filter(
+                JobPostingKeyword.id.in_(ids),
+                JobPostingKeyword.extracted_at < cutoff
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        batches += 1
+        if batches % 20 == 0:
+            logger.info(f"Posting cleanup progress: {deleted} rows in {batches} batches")
+
+    return {'rows_deleted': deleted, 'batches': batches, 'complete': True}
+
+
+def purge_expired_postings(retention_days: int, batch_size: int = DELETE_BATCH_SIZE,
+                           time_budget_seconds: Optional[float] = None,
+                           now: Optional[datetime] = None) -> Dict:
+    """
+    Apply the posting retention policy
+
+    Partitioned tables get their upcoming partitions created and expired ones
+    dropped; whatever expired rows remain (straddling or default partition, or
+    an unpartitioned table) are deleted in batches.
+
+    Args:
+        retention_days: Keep postings extracted within this many days
+        batch_size: Rows per batched delete
+        time_budget_seconds: Cap on the batched delete (None = no cap)
+        now: Reference time (defaults to utcnow)
+
+    Returns:
+        Dict of progress metrics for the job log
+    """
+    started = time.monotonic()
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    metrics = {
+        'cutoff': cutoff.isoformat(),
+        'partitioned': is_partitioned(),
+        'partitions_created': [],
+        'partitions_dropped': []
+    }
+
+    if metrics['partitioned']:
+        metrics['partitions_created'] = ensure_partitions(now=now)
+        metrics['partitions_dropped'] = drop_expired_partitions(cutoff)
+
+    metrics.update(delete_in_batches(cutoff, batch_size, time_budget_seconds))
+    metrics['duration_seconds'] = round(time.monotonic() - started, 3)
+    return metrics
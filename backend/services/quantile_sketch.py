@@ -0,0 +1,125 @@
+"""
+Quantile Sketch - Mergeable t-digest for salary percentiles
+
+Each SkillDemandDaily cell stores a t-digest of its salary midpoints, so the
+median and p25/p75/p90 of any window, industry or location are answered by
+merging a few cell digests instead of sorting raw JobPostingKeyword rows.
+
+Centroid weight is capped at 4 * n * q * (1 - q) / compression, so centroids
+stay singleton until a digest holds more than ~2 * compression values (and
+always at the tails): small samples are exact, large ones stay within a
+fraction of a percent of rank error, and size grows as O(compression * log n)
+(a few hundred centroids for tens of thousands of values). Quantiles interpolate
+linearly between centroid centers, matching PostgreSQL percentile_cont and
+statistics.median on exact data.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Higher = more centroids and more accuracy
+DEFAULT_COMPRESSION = 100
+
+# Percentiles reported alongside salary medians
+SALARY_PERCENTILES = (0.25, 0.5, 0.75, 0.9)
+
+
+class TDigest:
+    """Mergeable quantile sketch (merging t-digest with a q(1 - q) size bound)"""
+
+    def __init__(self, compression: int = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self._centroids: List[List[float]] = []  # [mean, weight], sorted by mean
+        self._buffer: List[List[float]] = []
+        self.count = 0
+
+    def add(self, value: float, weight: int = 1) -> 'TDigest':
+        """Add a value (or a pre-weighted centroid)"""
+        self._buffer.append([float(value), weight])
+        self.count += weight
+        if len(self._buffer) > 5 * self.compression:
+            self._compress()
+        return self
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """Fold another digest into this one"""
+        for mean, weight in other.centroids():
+            self.add(mean, weight)
+        return self
+
+    def centroids(self) -> List[List[float]]:
+        """Compressed [mean, weight] pairs, sorted by mean"""
+        if self._buffer:
+            self._compress()
+        return self._centroids
+
+    def _compress(self):
+        items = sorted(self._centroids + self._buffer)
+        self._buffer = []
+        if not items:
+            self._centroids = []
+            return
+
+        total = self.count
+        merged = []
+        cumulative = 0
+        mean, weight = items[0]
+        for next_mean, next_weight in items[1:]:
+            proposed = weight + next_weight
+            q = (cumulative + proposed / 2) / total
+            if proposed <= 4 * total * q * (1 - q) / self.compression:
+                mean += (next_mean - mean) * next_weight / proposed
+                weight = proposed
+            else:
+                merged.append([mean, weight])
+                cumulative += weight
+                mean, weight = next_mean, next_weight
+        merged.append([mean, weight])
+        self._centroids = merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-th quantile (0 <= q <= 1)
+
+        Returns:
+            float or None if the digest is empty
+        """
+        centroids = self.centroids()
+        if not centroids:
+            return None
+
+        # Rank in 0-based sample positions; a centroid of weight w covering
+        # positions [start, start + w - 1] sits at its center position
+        rank = q * (self.count - 1)
+        start = 0
+        prev_center = prev_mean = None
+        for mean, weight in centroids:
+            center = start + (weight - 1) / 2
+            if rank <= center:
+                if prev_center is None:
+                    return mean
+                fraction = (rank - prev_center) / (center - prev_center)
+                return prev_mean + fraction * (mean - prev_mean)
+            prev_center, prev_mean = center, mean
+            start += weight
+        return centroids[-1][0]
+
+    def percentiles(self, quantiles: Sequence[float] = SALARY_PERCENTILES) -> Optional[Dict[str, float]]:
+        """Quantiles keyed 'p25', 'p50', ... (None if the digest is empty)"""
+        if not self.count:
+            return None
+        return {f'p{round(q * 100)}': round(self.quantile(q), 2) for q in quantiles}
+
+    def to_list(self) -> List[List[float]]:
+        """JSON-serializable centroids for storage"""
+        return [[mean, weight] for mean, weight in self.centroids()]
+
+    @classmethod
+    def from_list(cls, data: Optional[Iterable], compression: int = DEFAULT_COMPRESSION) -> 'TDigest':
+        """Rebuild a digest from to_list() output (None / empty -> empty digest)"""
+        digest = cls(compression)
+        for mean, weight in data or ():
+            digest.add(mean, weight)
+        return digest
+
+    def __len__(self) -> int:
+        return self.count
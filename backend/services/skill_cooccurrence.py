@@ -0,0 +1,372 @@
+"""
+Skill Co-occurrence Engine - Sparse co-occurrence matrix for skill relationships
+
+Confirmed SkillExtraction rows form a sparse analysis x skill incidence matrix X.
+C = X^T X gives, for every skill pair, the number of analyses containing both
+(the diagonal holds each skill's analysis count). C is persisted to disk as .npz
+and updated incrementally when an analysis' confirmed skills change, so related
+skills and recommendations are a sparse row lookup plus top-k instead of a
+pairwise Python loop over every extraction.
+
+Scoring:
+    count - raw co-occurrence count
+    lift  - P(a, b) / (P(a) P(b)): > 1 means the pair appears together more than chance
+    pmi   - log2(lift)
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from models import db, Analysis, SkillExtraction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MATRIX_PATH = os.getenv('SKILL_COOCCURRENCE_PATH', os.path.join('cache', 'skill_cooccurrence.npz'))
+
+SCORING_METHODS = ('count', 'lift', 'pmi')
+
+
+def load_confirmed_pairs(analysis_ids: Optional[Iterable[int]] = None,
+                         limit_days: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Distinct (analysis_id, keyword_id) pairs from confirmed skill extractions"""
+    query = db.session.query(
+        SkillExtraction.analysis_id,
+        SkillExtraction.matched_keyword_id
+    ).join(
+        Analysis, SkillExtraction.analysis_id == Analysis.id
+    ).filter(
+        SkillExtraction.user_confirmed == True,
+        SkillExtraction.matched_keyword_id.isnot(None)
+    )
+    if analysis_ids is not None:
+        query = query.filter(SkillExtraction.analysis_id.in_(list(analysis_ids)))
+    if limit_days:
+        query = query.filter(SkillExtraction.created_at >= datetime.utcnow() - timedelta(days=limit_days))
+    return query.distinct().all()
+
+
+def build_cooccurrence(pairs: Sequence[Tuple[int, int]]) -> Tuple[List[int], sparse.csr_matrix, int]:
+    """
+    Build C = X^T X from (analysis_id, keyword_id) pairs
+
+    Returns:
+        Tuple of (keyword ids in column order, C, number of analyses)
+    """
+    analysis_index: Dict[int, int] = {}
+    skill_index: Dict[int, int] = {}
+    rows = [analysis_index.setdefault(analysis_id, len(analysis_index)) for analysis_id, _ in pairs]
+    cols = [skill_index.setdefault(keyword_id, len(skill_index)) for _, keyword_id in pairs]
+
+    incidence = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (rows, cols)),
+        shape=(len(analysis_index), len(skill_index))
+    )
+    return list(skill_index), (incidence.T @ incidence).tocsr(), len(analysis_index)
+
+
+class SkillCooccurrenceEngine:
+    """Persistent sparse skill co-occurrence matrix with incremental updates"""
+
+    def __init__(self, path: str = DEFAULT_MATRIX_PATH):
+        self.path = path
+        self._skill_ids: List[int] = []
+        self._skill_index: Dict[int, int] = {}
+        self._analysis_skills: Dict[int, frozenset] = {}  # analysis id -> skill columns
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self._loaded_mtime: Optional[float] = None
+        self._ready = False
+        self._lock = threading.RLock()
+
+    # ==================== BUILD / PERSIST ====================
+
+    def rebuild(self) -> int:
+        """
+        Recompute the matrix from all confirmed extractions and save it
+
+        Returns:
+            int: Number of skills in the matrix
+        """
+        pairs = load_confirmed_pairs()
+        skill_ids, matrix, _ = build_cooccurrence(pairs)
+        skill_index = {keyword_id: col for col, keyword_id in enumerate(skill_ids)}
+
+        analysis_skills: Dict[int, Set[int]] = {}
+        for analysis_id, keyword_id in pairs:
+            analysis_skills.setdefault(analysis_id, set()).add(skill_index[keyword_id])
+
+        with self._lock:
+            self._skill_ids = skill_ids
+            self._skill_index = skill_index
+            self._analysis_skills = {a: frozenset(cols) for a, cols in analysis_skills.items()}
+            self._matrix = matrix
+            self._ready = True
+            self._save()
+
+        logger.info(f"Skill co-occurrence matrix rebuilt: {len(skill_ids)} skills, "
+                    f"{len(analysis_skills)} analyses, {matrix.nnz} non-zeros")
+        return len(skill_ids)
+
+    def update_analyses(self, analysis_ids: Iterable[int]) -> int:
+        """
+        Re-read the confirmed skills of some analyses and apply the difference
+
+        C changes by X_new^T X_new - X_old^T X_old over just these rows, so the
+        cost is proportional to the analyses touched, not the corpus.
+
+        Returns:
+            int: Number of analyses whose skill set changed
+        """
+        analysis_ids = set(analysis_ids)
+        if not analysis_ids:
+            return 0
+
+        self.ensure_loaded()
+        current: Dict[int, Set[int]] = {analysis_id: set() for analysis_id in analysis_ids}
+        for analysis_id, keyword_id in load_confirmed_pairs(analysis_ids):
+            current[analysis_id].add(keyword_id)
+
+        with self._lock:
+            for keyword_ids in current.values():
+                for keyword_id in keyword_ids:
+                    if keyword_id not in self._skill_index:
+                        self._skill_index[keyword_id] = len(self._skill_ids)
+                        self._skill_ids.append(keyword_id)
+            size = len(self._skill_ids)
+
+            old_rows, new_rows = [], []
+            for analysis_id, keyword_ids in current.items():
+                new_cols = frozenset(self._skill_index[k] for k in keyword_ids)
+                old_cols = self._analysis_skills.get(analysis_id, frozenset())
+                if new_cols == old_cols:
+                    continue
+                old_rows.append(old_cols)
+                new_rows.append(new_cols)
+                if new_cols:
+                    self._analysis_skills[analysis_id] = new_cols
+                else:
+                    self._analysis_skills.pop(analysis_id, None)
+
+            if not new_rows:
+                return 0
+
+            matrix = self._matrix.copy()
+            matrix.resize((size, size))
+            old = self._incidence(old_rows, size)
+            new = self._incidence(new_rows, size)
+            matrix = (matrix + new.T @ new - old.T @ old).tocsr()
+            matrix.eliminate_zeros()
+            self._matrix = matrix
+            self._save()
+
+        logger.info(f"Skill co-occurrence matrix updated for {len(new_rows)} analyses")
+        return len(new_rows)
+
+    @staticmethod
+    def _incidence(rows: Sequence[Iterable[int]], size: int) -> sparse.csr_matrix:
+        row_idx, col_idx = [], []
+        for i, cols in enumerate(rows):
+            for col in cols:
+                row_idx.append(i)
+                col_idx.append(col)
+        return sparse.csr_matrix(
+            (np.ones(len(col_idx), dtype=np.int32), (row_idx, col_idx)),
+            shape=(len(rows), size)
+        )
+
+    def _save(self):
+        """Atomically write the matrix and incidence lists to self.path"""
+        analysis_ids = np.fromiter(self._analysis_skills, dtype=np.int64, count=len(self._analysis_skills))
+        lengths = [len(self._analysis_skills[a]) for a in analysis_ids]
+        incidence_ptr = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+        incidence_cols = np.fromiter(
+            (col for a in analysis_ids for col in sorted(self._analysis_skills[a])),
+            dtype=np.int32, count=int(incidence_ptr[-1])
+        )
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    skill_ids=np.asarray(self._skill_ids, dtype=np.int64),
+                    data=self._matrix.data,
+                    indices=self._matrix.indices,
+                    indptr=self._matrix.indptr,
+                    analysis_ids=analysis_ids,
+                    incidence_ptr=incidence_ptr,
+                    incidence_cols=incidence_cols
+                )
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist skill co-occurrence matrix: {str(e)}")
+
+    def _load(self) -> bool:
+        try:
+            mtime = os.path.getmtime(self.path)
+            with np.load(self.path, allow_pickle=False) as stored:
+                skill_ids = [int(k) for k in stored['skill_ids']]
+                size = len(skill_ids)
+                matrix = sparse.csr_matrix(
+                    (stored['data'], stored['indices'], stored['indptr']), shape=(size, size)
+                )
+                ptr = stored['incidence_ptr']
+                cols = stored['incidence_cols']
+                analysis_skills = {
+                    int(analysis_id): frozenset(int(c) for c in cols[ptr[i]:ptr[i + 1]])
+                    for i, analysis_id in enumerate(stored['analysis_ids'])
+                }
+        except (OSError, KeyError, ValueError) as e:
+            logger.info(f"No usable skill co-occurrence matrix at {self.path}: {str(e)}")
+            return False
+
+        with self._lock:
+            self._skill_ids = skill_ids
+            self._skill_index = {keyword_id: col for col, keyword_id in enumerate(skill_ids)}
+            self._analysis_skills = analysis_skills
+            self._matrix = matrix
+            self._loaded_mtime = mtime
+            self._ready = True
+        return True
+
+    def ensure_loaded(self):
+        """Load (or reload, if another process rewrote it) the matrix, rebuilding if missing"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+
+        if mtime is not None and mtime != self._loaded_mtime and self._load():
+            return
+        if not self._ready:
+            self.rebuild()
+
+    # ==================== QUERIES ====================
+
+    @property
+    def analysis_count(self) -> int:
+        return len(self._analysis_skills)
+
+    def _scores(self, col: int, counts: np.ndarray, cols: np.ndarray, method: str) -> np.ndarray:
+        if method == 'count':
+            return counts.astype(float)
+        diagonal = self._matrix.diagonal()
+        lift = counts * self.analysis_count / (diagonal[col] * diagonal[cols])
+        return np.log2(lift) if method == 'pmi' else lift
+
+    @staticmethod
+    def _top_k(cols: np.ndarray, scores: np.ndarray, counts: np.ndarray, top_n: int) -> List[Tuple[int, float, int]]:
+        if len(cols) > top_n:
+            keep = np.argpartition(-scores, top_n - 1)[:top_n]
+            cols, scores, counts = cols[keep], scores[keep], counts[keep]
+        order = np.lexsort((-counts, -scores))
+        return [(int(cols[i]), float(scores[i]), int(counts[i])) for i in order]
+
+    def related(self, skill_id: int, top_n: int = 10, min_count: int = 1,
+                scoring: str = 'count') -> List[Tuple[int, float, int]]:
+        """
+        Skills co-occurring with one skill
+
+        Returns:
+            List of (keyword_id, score, co_occurrence_count), best first
+        """
+        self.ensure_loaded()
+        with self._lock:
+            col = self._skill_index.get(skill_id)
+            if col is None:
+                return []
+            row = self._matrix.getrow(col)
+            cols, counts = row.indices, row.data
+            keep = (cols != col) & (counts >= min_count)
+            cols, counts = cols[keep], counts[keep]
+            if not len(cols):
+                return []
+            scores = self._scores(col, counts, cols, scoring)
+            return [(self._skill_ids[c], score, count)
+                    for c, score, count in self._top_k(cols, scores, counts, top_n)]
+
+    def recommend(self, skill_ids: Iterable[int], top_n: int = 5,
+                  scoring: str = 'count') -> List[Tuple[int, float, int]]:
+        """
+        Skills that co-occur with a set of skills, scored by the sum over inputs
+
+        Returns:
+            List of (keyword_id, score, total_co_occurrence_count), best first
+        """
+        self.ensure_loaded()
+        with self._lock:
+            inputs = [self._skill_index[k] for k in set(skill_ids) if k in self._skill_index]
+            if not inputs:
+                return []
+
+            size = len(self._skill_ids)
+            total_scores = np.zeros(size)
+            total_counts = np.zeros(size, dtype=np.int64)
+            for col in inputs:
+                row = self._matrix.getrow(col)
+                total_scores[row.indices] += self._scores(col, row.data, row.indices, scoring)
+                total_counts[row.indices] += row.data
+
+            candidates = np.flatnonzero(total_counts)
+            candidates = candidates[~np.isin(candidates, inputs)]
+            if not len(candidates):
+                return []
+            return [(self._skill_ids[c], score, count) for c, score, count in self._top_k(
+                candidates, total_scores[candidates], total_counts[candidates], top_n
+            )]
+
+    def snapshot(self) -> Tuple[List[int], sparse.csr_matrix]:
+        """Current (keyword ids in column order, C) for bulk consumers"""
+        self.ensure_loaded()
+        with self._lock:
+            return list(self._skill_ids), self._matrix
+
+    def as_dict(self) -> Dict[int, Dict[int, int]]:
+        """skill_id -> {co-occurring skill_id: count} (diagonal excluded)"""
+        self.ensure_loaded()
+        with self._lock:
+            return matrix_to_dict(self._skill_ids, self._matrix)
+
+    def get_stats(self) -> Dict:
+        return {
+            'path': self.path,
+            'skills': len(self._skill_ids),
+            'analyses': self.analysis_count,
+            'non_zeros': int(self._matrix.nnz)
+        }
+
+
+def matrix_to_dict(skill_ids: List[int], matrix: sparse.csr_matrix) -> Dict[int, Dict[int, int]]:
+    """Convert a co-occurrence matrix to the nested dict format (diagonal excluded)"""
+    result = {}
+    for col, keyword_id in enumerate(skill_ids):
+        start, end = matrix.indptr[col], matrix.indptr[col + 1]
+        related = {
+            skill_ids[other]: int(count)
+            for other, count in zip(matrix.indices[start:end], matrix.data[start:end])
+            if other != col
+        }
+        if related:
+            result[keyword_id] = related
+    return result
+
+
+# Singleton instance
+_cooccurrence_engine = None
+
+
+def get_cooccurrence_engine() -> SkillCooccurrenceEngine:
+    """Get singleton instance of SkillCooccurrenceEngine"""
+    global _cooccurrence_engine
+    if _cooccurrence_engine is None:
+        _cooccurrence_engine = SkillCooccurrenceEngine()
+    return _cooccurrence_engine
@@ -0,0 +1,264 @@
+"""
+Skill Gap Index - Precomputed ranked demand vectors for skill gap analysis
+
+Stores, per scope (all postings, each industry, each normalized job role), the
+top skills by posting count in SkillDemandVector. A gap analysis is then a
+lookup of one small cached vector plus a set difference against the user's
+skills, so its cost does not grow with posting volume. Vectors are rebuilt by
+the scheduled market refresh (and once, on first use after deploy).
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import logging
+import re
+import threading
+
+from sqlalchemy import func
+
+from models import db, JobPostingKeyword, Keyword, SkillDemandDaily, SkillDemandVector
+from services import industry_service, market_cache, market_rollup_service
+
+logger = logging.getLogger(__name__)
+
+# Demand window the gap analysis compares against
+GAP_WINDOW_DAYS = 90
+
+# Skills kept per vector
+VECTOR_SIZE = 200
+
+# Postings (skill rows) a role needs before it gets its own vector
+MIN_ROLE_POSTINGS = 20
+
+# Title words that change seniority, not the role
+SENIORITY_WORDS = {
+    'senior', 'sr', 'junior', 'jr', 'lead', 'principal', 'staff', 'associate', 'intern',
+    'entry', 'level', 'mid', 'i', 'ii', 'iii', 'iv'
+}
+
+_rebuild_lock = threading.Lock()
+
+
+def normalize_role(job_title: Optional[str]) -> str:
+    """Role key for a job title ('Sr. Backend Engineer II' -> 'backend engineer')"""
+    words = re.findall(r'[a-z0-9+#]+', (job_title or '').lower())
+    return ' '.join(word for word in words if word not in SENIORITY_WORDS)[:200]
+
+
+def _rank(counts: Dict[int, int], top_k: int) -> List[Tuple[int, int]]:
+    """Top (keyword_id, count) pairs by count, ties by id"""
+    return heapq.nsmallest(top_k, counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def rebuild_vectors(window_days: int = GAP_WINDOW_DAYS, top_k: int = VECTOR_SIZE) -> Dict:
+    """
+    Recompute every demand vector for the window. Commits.
+
+    All-postings and per-industry vectors come from one grouped rollup query;
+    role vectors from one grouped query over raw postings' job titles.
+
+    Returns:
+        Dict with the number of vectors per scope
+    """
+    market_rollup_service.ensure_rollup()
+    start_day = market_rollup_service.window_start(window_days)
+    start_at = datetime.combine(start_day, datetime.min.time())
+
+    try:
+        scopes: Dict[Tuple[str, str], Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        for industry_id, keyword_id, count in db.session.query(
+            SkillDemandDaily.industry_id,
+            SkillDemandDaily.keyword_id,
+            func.sum(SkillDemandDaily.postings_count)
+        ).filter(
+            SkillDemandDaily.day >= start_day
+        ).group_by(SkillDemandDaily.industry_id, SkillDemandDaily.keyword_id):
+            scopes[('all', '')][keyword_id] += int(count)
+            if industry_id is not None:
+                scopes[('industry', str(industry_id))][keyword_id] += int(count)
+
+        roles: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        for job_title, keyword_id, count in db.session.query(
+            JobPostingKeyword.job_title,
+            JobPostingKeyword.keyword_id,
+            func.count(JobPostingKeyword.id)
+        ).filter(
+            JobPostingKeyword.extracted_at >= start_at,
+            JobPostingKeyword.job_title.isnot(None)
+        ).group_by(JobPostingKeyword.job_title, JobPostingKeyword.keyword_id):
+            role = normalize_role(job_title)
+            if role:
+                roles[role][keyword_id] += count
+        for role, counts in roles.items():
+            if sum(counts.values()) >= MIN_ROLE_POSTINGS:
+                scopes[('role', role)] = counts
+
+        # Always written, even empty: its computed_at marks the window as built,
+        # so requests do not rebuild it while there is no market data
+        scopes[('all', '')]
+        ranked = {scope: _rank(counts, top_k) for scope, counts in scopes.items()}
+        keyword_ids = {keyword_id for entries in ranked.values() for keyword_id, _ in entries}
+        names = dict(db.session.query(Keyword.id, Keyword.keyword).filter(Keyword.id.in_(keyword_ids))) \
+            if keyword_ids else {}
+
+        now = datetime.utcnow()
+        vectors = [{
+            'scope': scope,
+            'scope_key': scope_key,
+            'window_days': window_days,
+            'total_postings': sum(scopes[(scope, scope_key)].values()),
+            'entries': [[keyword_id, names.get(keyword_id), count] for keyword_id, count in entries],
+            'computed_at': now
+        } for (scope, scope_key), entries in ranked.items()]
+
+        SkillDemandVector.query.filter_by(window_days=window_days).delete(synchronize_session=False)
+        if vectors:
+            db.session.bulk_insert_mappings(SkillDemandVector, vectors)
+        db.session.commit()
+
+        stats = defaultdict(int)
+        for vector in vectors:
+            stats[vector['scope']] += 1
+        logger.info(f"Rebuilt skill demand vectors for {window_days} days: {dict(stats)}")
+        return dict(stats)
+
+    except Exception as e:
+        logger.error(f"Failed to rebuild skill demand vectors: {str(e)}")
+        db.session.rollback()
+        raise
+
+
+def ensure_vectors(window_days: int = GAP_WINDOW_DAYS):
+    """
+    Build the vectors if the window has never been computed
+
+    Only the very first request after deploy builds them; afterwards (even
+    with no market data) the all-postings vector exists and the scheduled
+    refresh is the only rebuild.
+    """
+    if SkillDemandVector.query.filter_by(window_days=window_days).first() is not None:
+        return
+    with _rebuild_lock:
+        if SkillDemandVector.query.filter_by(window_days=window_days).first() is None:
+            rebuild_vectors(window_days)
+
+
+def get_vector(scope: str, scope_key: str = '', window_days: int = GAP_WINDOW_DAYS) -> Optional[Dict]:
+    """
+    Cached demand vector for a scope
+
+    Returns:
+        Dict with total_postings and entries [(keyword_id, keyword, count), ...],
+        or None if the scope has no vector
+    """
+    def load():
+        vector = SkillDemandVector.query.filter_by(
+            scope=scope, scope_key=scope_key, window_days=window_days
+        ).first()
+        if vector is None:
+            return None
+        return {
+            'total_postings': vector.total_postings,
+            'entries': [tuple(entry) for entry in vector.entries]
+        }
+
+    return market_cache.get_or_compute('skill_gap_vector', f'{scope}:{scope_key}', window_days, load)
+
+
+def _merge_vectors(vectors: Iterable[Dict], top_k: int) -> Dict:
+    """Top-k merge of several ranked vectors (counts summed per skill)"""
+    counts: Dict[int, int] = defaultdict(int)
+    names = {}
+    total = 0
+    for vector in vectors:
+        total += vector['total_postings']
+        for keyword_id, keyword, count in vector['entries']:
+            counts[keyword_id] += count
+            names[keyword_id] = keyword
+    return {
+        'total_postings': total,
+        'entries': [(keyword_id, names[keyword_id], count) for keyword_id, count in _rank(counts, top_k)]
+    }
+
+
+def select_vector(job_title: Optional[str] = None, industry: Optional[str] = None,
+                  window_days: int = GAP_WINDOW_DAYS) -> Tuple[str, Optional[Dict]]:
+    """
+    Most specific vector available: role, then industry, then all postings
+
+    Returns:
+        Tuple of (scope used, vector or None when there is no market data)
+    """
+    ensure_vectors(window_days)
+
+    role = normalize_role(job_title)
+    if role:
+        vector = get_vector('role', role, window_days)
+        if vector is not None:
+            return 'role', vector
+
+    if industry:
+        vectors = [vector for vector in (
+            get_vector('industry', str(industry_id), window_days)
+            for industry_id in industry_service.resolve_industry_ids(industry)
+        ) if vector is not None]
+        if len(vectors) == 1:
+            return 'industry', vectors[0]
+        if vectors:
+            return 'industry', _merge_vectors(vectors, VECTOR_SIZE)
+
+    return 'all', get_vector('all', '', window_days)
+
+
+def analyze_gap(user_skills: List[str], job_title: Optional[str] = None, industry: Optional[str] = None,
+                top_n: int = 20, high_demand_score: float = 70) -> Optional[Dict]:
+    """
+    Compare a user's skills with the top of the market demand vector
+
+    Args:
+        user_skills: Skill names the user has
+        job_title: Optional target role (uses that role's vector when one exists)
+        industry: Optional industry (used when there is no role vector)
+        top_n: Top demanded skills compared against
+        high_demand_score: market_demand_score at which a missing skill is a high-demand gap
+
+    Returns:
+        Dict with scope, have_skills, missing_skills and high_demand_missing
+        (skill dicts), or None when there is no market data
+    """
+    scope, vector = select_vector(job_title, industry)
+    if not vector or not vector['entries']:
+        return None
+
+    user_names = {skill.strip().lower() for skill in user_skills if isinstance(skill, str)}
+    total = vector['total_postings']
+
+    have_skills = []
+    missing_skills = []
+    high_demand_missing = []
+    for keyword_id, keyword, count in vector['entries'][:top_n]:
+        # Same scale as MarketIntelligenceAnalyzer demand entries
+        demand_percentage = count / total * 100
+        skill = {
+            'skill_id': keyword_id,
+            'skill_name': keyword,
+            'market_demand_score': round(min(100, demand_percentage * 2), 2),
+            'demand_percentage': round(demand_percentage, 2),
+            'postings_count': count
+        }
+        if (keyword or '').lower() in user_names:
+            have_skills.append(skill)
+        else:
+            missing_skills.append(skill)
+            if skill['market_demand_score'] >= high_demand_score:
+                high_demand_missing.append(skill)
+
+    return {
+        'scope': scope,
+        'compared_skills': len(have_skills) + len(missing_skills),
+        'have_skills': have_skills,
+        'missing_skills': missing_skills,
+        'high_demand_missing': high_demand_missing
+    }
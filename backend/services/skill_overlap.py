@@ -0,0 +1,238 @@
+"""
+Skill Overlap Engine - Set-based skill matching for job requirements
+
+Canonicalizes free-text skills and job requirements to keyword ids using the
+Keyword table and its synonym lists, then scores overlap with set intersections.
+Used by the job matcher's fallback scoring and as the prefilter that picks which
+jobs are worth sending to AI matching.
+"""
+
+import re
+import threading
+import time
+import zlib
+import logging
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from models import db, Keyword, KeywordMatchingRule
+from services.memory_cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+# Longest keyword phrase (in tokens) tried when scanning a requirement
+MAX_PHRASE_TOKENS = 3
+
+# Canonicalized strings cached per vocabulary generation (LRU beyond this)
+MAX_CACHED_TERMS = 50000
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+
+# Filler words in requirement text that should never count as a skill on their own
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'or', 'the', 'of', 'in', 'on', 'to', 'for', 'with', 'at', 'by',
+    'as', 'is', 'are', 'be', 'using', 'use', 'plus', 'etc', 'e.g', 'i.e',
+    'experience', 'experienced', 'exp', 'years', 'year', 'yrs', 'knowledge',
+    'strong', 'solid', 'good', 'excellent', 'proficiency', 'proficient',
+    'familiarity', 'familiar', 'understanding', 'ability', 'skills', 'skill',
+    'working', 'hands-on', 'proven', 'background', 'preferred', 'required',
+    'nice', 'have', 'must', 'degree', 'similar', 'related', 'other'
+})
+
+
+def normalize_term(text: str) -> str:
+    """Lowercase and collapse whitespace, keeping symbols like + # . used in tech names"""
+    return ' '.join(TOKEN_PATTERN.findall(text.lower())).strip('.')
+
+
+class SkillOverlapEngine:
+    """Canonicalize skills to keyword ids and score overlap with set operations"""
+
+    def __init__(self, refresh_interval: int = 300):
+        self.refresh_interval = refresh_interval
+        self._vocabulary: Dict[str, int] = {}
+        self._loaded_at = 0.0
+        self._term_cache = self._new_term_cache()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_term_cache() -> MemoryCache:
+        return MemoryCache(max_entries=MAX_CACHED_TERMS, name='skill_terms')
+
+    # ==================== VOCABULARY ====================
+
+    def _load_vocabulary(self) -> Dict[str, int]:
+        """Build a term -> keyword id map from keywords, synonyms and exact matching rules"""
+        vocabulary = {}
+
+        rows = db.session.query(Keyword.id, Keyword.keyword, Keyword.synonyms).all()
+        for keyword_id, keyword, synonyms in rows:
+            for term in [keyword] + list(synonyms or []):
+                if isinstance(term, str):
+                    normalized = normalize_term(term)
+                    if normalized:
+                        vocabulary.setdefault(normalized, keyword_id)
+
+        rules = db.session.query(
+            KeywordMatchingRule.pattern, KeywordMatchingRule.normalized_keyword_id
+        ).filter(KeywordMatchingRule.match_type.in_(['substring', 'fuzzy'])).all()
+        for pattern, keyword_id in rules:
+            normalized = normalize_term(pattern)
+            if normalized:
+                vocabulary.setdefault(normalized, keyword_id)
+
+        return vocabulary
+
+    def refresh(self, force: bool = False):
+        """Reload the vocabulary if it is stale (or always, with force=True)"""
+        if not force and time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+
+        try:
+            vocabulary = self._load_vocabulary()
+        except Exception as e:
+            logger.error(f"Failed to load skill vocabulary: {str(e)}")
+            vocabulary = self._vocabulary
+
+        with self._lock:
+            self._vocabulary = vocabulary
+            # Swapped after the vocabulary, so a term is never cached under the wrong one
+            self._term_cache = self._new_term_cache()
+            self._loaded_at = time.monotonic()
+        logger.info(f"Skill overlap vocabulary loaded: {len(vocabulary)} terms")
+
+    @staticmethod
+    def _synthetic_id(term: str) -> int:
+        """Stable negative id for terms that are not in the keyword table"""
+        return -(zlib.crc32(term.encode('utf-8')) + 1)
+
+    # ==================== CANONICALIZATION ====================
+
+    def canonicalize(self, text: str) -> FrozenSet[int]:
+        """
+        Map one skill or requirement string to a set of keyword ids
+
+        The whole string is looked up first. Otherwise the tokens are scanned
+        greedily for the longest known keyword phrase; unknown tokens that are
+        not filler words get synthetic (negative) ids so "Python 3" still
+        overlaps "python" when the keyword table has no entry for it.
+        """
+        if not isinstance(text, str):
+            return frozenset()
+
+        term_cache = self._term_cache
+        cached = term_cache.get(text)
+        if cached is not None:
+            return cached
+
+        vocabulary = self._vocabulary
+        normalized = normalize_term(text)
+        ids = set()
+
+        if normalized in vocabulary:
+            ids.add(vocabulary[normalized])
+        elif normalized:
+            ids.add(self._synthetic_id(normalized))
+            tokens = normalized.split(' ')
+            i = 0
+            while i < len(tokens):
+                for size in range(min(MAX_PHRASE_TOKENS, len(tokens) - i), 0, -1):
+                    phrase = ' '.join(tokens[i:i + size])
+                    if phrase in vocabulary:
+                        ids.add(vocabulary[phrase])
+                        i += size
+                        break
+                else:
+                    token = tokens[i]
+                    if token not in STOPWORDS and not token.replace('.', '').replace('+', '').isdigit():
+                        ids.add(self._synthetic_id(token))
+                    i += 1
+
+        result = frozenset(ids)
+        term_cache.set(text, result)
+        return result
+
+    def canonicalize_skills(self, skills: Optional[Iterable[str]]) -> FrozenSet[int]:
+        """Union of keyword ids for a list of user skills"""
+        self.refresh()
+        ids = set()
+        for skill in skills or []:
+            ids.update(self.canonicalize(skill))
+        return frozenset(ids)
+
+    # ==================== SCORING ====================
+
+    def match_requirements(
+        self,
+        user_ids: FrozenSet[int],
+        requirements: Optional[Sequence[str]]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Split job requirements into (matching, missing) for a canonicalized skill set
+
+        Args:
+            user_ids: Result of canonicalize_skills() for the candidate
+            requirements: Raw requirement strings from JobPosting.requirements
+
+        Returns:
+            Tuple of (matching_requirements, missing_requirements) in input order
+        """
+        matching = []
+        missing = []
+        for requirement in requirements or []:
+            if user_ids.isdisjoint(self.canonicalize(requirement)):
+                missing.append(requirement)
+            else:
+                matching.append(requirement)
+        return matching, missing
+
+    def score_jobs(self, user_skills: Iterable[str], jobs: Sequence) -> List[Dict]:
+        """
+        Score skill overlap for a batch of jobs in one pass
+
+        Returns:
+            List of dicts (same order as jobs) with job, matching, missing and
+            skill_match_percentage (None when the job lists no requirements)
+        """
+        user_ids = self.canonicalize_skills(user_skills)
+        results = []
+        for job in jobs:
+            requirements = job.requirements or []
+            matching, missing = self.match_requirements(user_ids, requirements)
+            pct = (len(matching) / len(requirements)) * 100 if requirements else None
+            results.append({
+                'job': job,
+                'matching': matching,
+                'missing': missing,
+                'skill_match_percentage': pct
+            })
+        return results
+
+    def prefilter_jobs(self, user_skills: Iterable[str], jobs: Sequence, limit: int) -> List:
+        """
+        Pick the jobs most worth a full (AI) match by skill overlap
+
+        Jobs without listed requirements rank as a 50% overlap, matching the
+        fallback scorer's default. Ties keep the input order, so callers that
+        pass jobs newest-first keep recency as the tie-breaker.
+        """
+        scored = self.score_jobs(user_skills, jobs)
+        scored.sort(
+            key=lambda r: (
+                r['skill_match_percentage'] if r['skill_match_percentage'] is not None else 50,
+                len(r['matching'])
+            ),
+            reverse=True
+        )
+        return [r['job'] for r in scored[:limit]]
+
+
+# Singleton instance
+_skill_overlap_engine = None
+
+
+def get_skill_overlap_engine() -> SkillOverlapEngine:
+    """Get singleton instance of SkillOverlapEngine"""
+    global _skill_overlap_engine
+    if _skill_overlap_engine is None:
+        _skill_overlap_engine = SkillOverlapEngine()
+    return _skill_overlap_engine
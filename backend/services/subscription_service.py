@@ -4,57 +4,91 @@ Handles credit resets, trial management, and subscription lifecycle
 """
 
 from datetime import datetime, timedelta
-from models import db, User, SubscriptionTier
+import calendar
+from sqlalchemy import and_, extract, func, insert, literal, or_, select, update
+from models import db, User, SubscriptionTier, CreditLedgerEntry
+from config_manager import get_config_manager
+from services import credit_ledger, lifecycle_sweeps
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Paid tiers whose credits are reset on the billing anniversary
+RESET_TIERS = ['starter', 'pro', 'pro_annual', 'elite', 'student']
+
+# Users per id range in the monthly reset (one transaction each)
+RESET_BATCH_SIZE = 10000
+
+# Ledger operation recorded for monthly resets
+MONTHLY_RESET_OPERATION = 'monthly_reset'
+
 
 class SubscriptionService:
     """Service for managing subscriptions and credits"""
 
     @staticmethod
-    def reset_monthly_credits():
+    def reset_monthly_credits(batch_size: int = RESET_BATCH_SIZE):
         """
         Reset credits for all active subscribers on their billing anniversary
         This should be run daily via a scheduler
+
+        Works through users in id ranges of batch_size. Each range is one
+        INSERT ... SELECT of ledger entries and one UPDATE ... FROM
+        subscription_tiers, committed together. Users already reset today are
+        skipped, so a rerun after a failure only finishes the remaining ranges.
         """
         try:
             today = datetime.utcnow()
-            current_day = today.day
+            start_of_day = today.replace(hour=0, minute=0, second=0, microsecond=0)
+            last_day_of_month = calendar.monthrange(today.year, today.month)[1]
 
             # Find users whose subscription started on this day of the month
-            # Also handle edge case where current month doesn't have the day (e.g., Feb 31)
-            users = User.query.filter(
+            # Handle end-of-month edge cases: if subscribed on 29-31 and the
+            # current month is shorter, reset on its last day
+            subscription_day = extract('day', User.subscription_start_date)
+            if today.day == last_day_of_month:
+                anniversary = subscription_day >= today.day
+            else:
+                anniversary = subscription_day == today.day
+
+            due = and_(
+                User.subscription_status == 'active',
+                User.subscription_tier.in_(RESET_TIERS),
+                anniversary,
+                or_(User.last_credit_reset.is_(None), User.last_credit_reset < start_of_day),
+                User.subscription_tier == SubscriptionTier.name,
+                SubscriptionTier.is_active.is_(True)
+            )
+            allowance = func.coalesce(SubscriptionTier.monthly_credits, 0)
+
+            first_id, last_id = db.session.query(func.min(User.id), func.max(User.id)).filter(
                 User.subscription_status == 'active',
-                User.subscription_tier.in_(['starter', 'pro', 'pro_annual', 'elite', 'student'])
-            ).all()
+                User.subscription_tier.in_(RESET_TIERS)
+            ).one()
+            if first_id is None:
+                logger.info("Monthly credit reset complete: 0 users updated")
+                return 0
 
             reset_count = 0
-            for user in users:
-                # Check if it's their billing anniversary
-                if user.subscription_start_date:
-                    subscription_day = user.subscription_start_date.day
-
-                    # Handle end-of-month edge cases
-                    # If subscribed on 29-31 and current month is shorter, reset on last day
-                    import calendar
-                    last_day_of_month = calendar.monthrange(today.year, today.month)[1]
-
-                    should_reset = (subscription_day == current_day) or \
-                                 (subscription_day > last_day_of_month and current_day == last_day_of_month)
-
-                    if should_reset:
-                        from config_manager import ConfigManager
-                        config_mgr = ConfigManager(db)
-                        tier = config_mgr.get_subscription_tier(user.subscription_tier)
-                        if tier:
-                            user.credits = tier.monthly_credits
-                            user.last_credit_reset = today
-                            reset_count += 1
-                            logger.info(f"Reset credits for user {user.id} ({user.subscription_tier}): {tier.monthly_credits} credits")
+            for low in range(first_id, last_id + 1, batch_size):
+                in_batch = and_(due, User.id >= low, User.id < low + batch_size)
+
+                # Ledger first, while users.credits still holds the old balance
+                entries = select(
+                    User.id, literal(credit_ledger.RESET), allowance - User.credits, allowance,
+                    literal(MONTHLY_RESET_OPERATION), literal(today, db.DateTime)
+                ).where(in_batch).with_for_update(of=User)
+                db.session.execute(insert(CreditLedgerEntry).from_select(
+                    ['user_id', 'kind', 'delta', 'balance_after', 'operation', 'created_at'], entries
+                ))
+
+                result = db.session.execute(
+                    update(User).where(in_batch).values(credits=allowance, last_credit_reset=today),
+                    execution_options={'synchronize_session': False}
+                )
+                db.session.commit()
+                reset_count += result.rowcount
 
-            db.session.commit()
             logger.info(f"Monthly credit reset complete: {reset_count} users updated")
             return reset_count
 
@@ -168,34 +202,24 @@ class SubscriptionService:
         try:
             now = datetime.utcnow()
 
-            # Find users with expired trials
-            expired_trials = User.query.filter(
-                User.is_trial_active == True,
-                User.trial_end_date <= now
-            ).all()
-
-            expired_count = 0
-            for user in expired_trials:
-                # End trial
-                user.is_trial_active = False
-                user.trial_expired_date = now
-
-                # Check if user has a paid subscription
-                if not user.subscription_id or user.subscription_tier == 'free':
-                    # Downgrade to free tier
-                    user.subscription_tier = 'free'
-                    user.subscription_status = 'inactive'
-                    user.credits = 3  # Free tier credits
-                    logger.info(f"Trial expired for user {user.id}, downgraded to free tier")
-                else:
-                    logger.info(f"Trial expired for user {user.id}, but has active subscription")
+            expired = and_(User.is_trial_active == True, User.trial_end_date <= now)
+            ended = {'is_trial_active': False, 'trial_expired_date': now}
 
-                expired_count += 1
+            # Users without a paid subscription are downgraded to the free tier
+            downgraded = lifecycle_sweeps.run('trial_downgrade', and_(
+                expired,
+                or_(User.subscription_id.is_(None), User.subscription_id == '', User.subscription_tier == 'free')
+            ), dict(ended, subscription_tier='free', subscription_status='inactive', credits=3),
+                ledger_operation='trial_expired')
 
-                # TODO: Send trial expiration email
+            # The rest keep their active subscription
+            kept = lifecycle_sweeps.run('trial_end', expired, ended)
 
-            db.session.commit()
-            logger.info(f"Trial expiration check complete: {expired_count} trials expired")
+            # TODO: Send trial expiration email
+
+            expired_count = downgraded + kept
+            logger.info(f"Trial expiration check complete: {expired_count} trials expired "
+                        f"({downgraded} downgraded to free tier)")
             return expired_count
 
         except Exception as e:
@@ -223,16 +247,16 @@ class SubscriptionService:
 
             # Get credit cost for this operation and tier
             if amount is None:
-                from config_manager import ConfigManager
-                config_mgr = ConfigManager(db)
-                rate_limit = config_mgr.get_rate_limit(operation, user.subscription_tier)
+                rate_limit = get_config_manager().get_rate_limit(operation, user.subscription_tier)
                 if rate_limit:
-                    amount = rate_limit.cost_in_credits
+                    amount = rate_limit['cost_in_credits']
                 else:
                     amount = 1  # Default cost
 
-            # Check if user has enough credits
-            if user.credits < amount:
+            # Deduct credits (no-op when the balance does not cover them)
+            remaining = credit_ledger.debit(user_id, amount, operation)
+            if remaining is None:
+                db.session.refresh(user)
                 return {
                     'success': False,
                     'credits_remaining': user.credits,
@@ -240,15 +264,9 @@ class SubscriptionService:
                     'message': f'Insufficient credits. Need {amount}, have {user.credits}.'
                 }
 
-            # Deduct credits
-            user.credits -= amount
-            db.session.commit()
-
-            logger.info(f"Deducted {amount} credits from user {user_id} for {operation}. Remaining: {user.credits}")
-
             return {
                 'success': True,
-                'credits_remaining': user.credits,
+                'credits_remaining': remaining,
                 'credits_deducted': amount,
                 'message': f'Successfully deducted {amount} credits'
             }
@@ -278,11 +296,9 @@ class SubscriptionService:
 
             # Get credit cost
             if amount is None:
-                from config_manager import ConfigManager
-                config_mgr = ConfigManager(db)
-                rate_limit = config_mgr.get_rate_limit(operation, user.subscription_tier)
+                rate_limit = get_config_manager().get_rate_limit(operation, user.subscription_tier)
                 if rate_limit:
-                    amount = rate_limit.cost_in_credits
+                    amount = rate_limit['cost_in_credits']
                 else:
                     amount = 1
 
@@ -308,19 +324,14 @@ class SubscriptionService:
             reason: Reason for credit addition (for logging)
         """
         try:
-            user = User.query.get(user_id)
-            if not user:
+            balance = credit_ledger.grant(user_id, amount, reason)
+            if balance is None:
                 raise ValueError(f"User {user_id} not found")
 
-            user.credits += amount
-            db.session.commit()
-
-            logger.info(f"Added {amount} credits to user {user_id}. Reason: {reason}. New balance: {user.credits}")
-
             return {
                 'success': True,
                 'credits_added': amount,
-                'credits_total': user.credits
+                'credits_total': balance
             }
 
         except Exception as e:
@@ -341,24 +352,22 @@ class SubscriptionService:
             if not user:
                 return None
 
-            from config_manager import ConfigManager
-            config_mgr = ConfigManager(db)
-            tier = config_mgr.get_subscription_tier(user.subscription_tier)
+            tier = get_config_manager().get_subscription_tier(user.subscription_tier)
 
             return {
                 'user_id': user.id,
                 'subscription_tier': user.subscription_tier,
                 'subscription_status': user.subscription_status,
                 'credits': user.credits,
-                'monthly_credits': tier.monthly_credits if tier else 0,
+                'monthly_credits': tier['monthly_credits'] if tier else 0,
                 'is_trial_active': user.is_trial_active,
                 'trial_end_date': user.trial_end_date.isoformat() if user.trial_end_date else None,
                 'subscription_start_date': user.subscription_start_date.isoformat() if user.subscription_start_date else None,
                 'stripe_customer_id': user.stripe_customer_id,
                 'subscription_id': user.subscription_id,
-                'tier_features': tier.features if tier else {},
-                'max_file_size_mb': tier.max_file_size_mb if tier else 5,
-                'max_analyses_per_month': tier.max_analyses_per_month if tier else 3
+                'tier_features': tier['features'] if tier else {},
+                'max_file_size_mb': tier['max_file_size_mb'] if tier else 5,
+                'max_analyses_per_month': tier['max_analyses_per_month'] if tier else 3
             }
 
         except Exception as e:
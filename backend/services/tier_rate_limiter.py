@@ -0,0 +1,240 @@
+"""
+Tier Rate Limiter - Per-user, per-tier, per-operation limits for AI endpoints
+
+Limits come from RateLimitConfig rows (requests_per_hour / requests_per_day for
+an operation and tier, falling back to the 'default' tier) read through the
+ConfigManager's configuration snapshot, with built-in hourly defaults for operations
+that have no row. Daily credit caps come from SubscriptionTier.rate_limits
+['daily_credits'].
+
+Each limit is a GCRA (generic cell rate algorithm) bucket keyed on
+user + tier + operation: a request is allowed when it fits the limit over the
+trailing period, and a rejection says exactly when the next one will fit
+(Retry-After). With REDIS_URL configured, every window for a request is checked
+and updated by one Lua script call, so a decision costs a single round trip
+and is shared by all workers. Without Redis the same algorithm runs in process
+memory (single-process development only).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Built-in operations per hour, used when RateLimitConfig has no row
+DEFAULT_HOURLY_LIMITS = {
+    'free': {
+        'analyze': 2,
+        'feedback': 2,
+        'optimize': 1,
+        'cover_letter': 1,
+        'skill_suggestions': 2,
+    },
+    'pro': {
+        'analyze': 10,
+        'feedback': 5,
+        'optimize': 5,
+        'cover_letter': 5,
+        'skill_suggestions': 10,
+    },
+    'elite': {
+        'analyze': 50,
+        'feedback': 20,
+        'optimize': 20,
+        'cover_letter': 20,
+        'skill_suggestions': 50,
+    }
+}
+
+# Built-in credits per day, used when the tier has no rate_limits['daily_credits']
+DEFAULT_DAILY_CREDITS = {
+    'free': 5,
+    'pro': 100,
+    'elite': 1000
+}
+
+# Older RateLimitConfig rows name operations differently
+OPERATION_ALIASES = {
+    'analyze': 'resume_analysis',
+    'optimize': 'optimization',
+}
+
+HOUR = 3600
+DAY = 86400
+
+# Seconds of float rounding ignored when a bucket is exactly full
+TOLERANCE = 0.001
+
+# Memory fallback prunes expired buckets once it holds this many
+MEMORY_PRUNE_THRESHOLD = 10000
+
+# Checks every (key, period, limit) bucket and only records the request if all allow it.
+# Times are Redis server time so all workers share one clock; 0.001 is TOLERANCE.
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local retry_after = 0
+local tats = {}
+for i = 1, #KEYS do
+    local period = tonumber(ARGV[2 * i - 1])
+    local interval = period / tonumber(ARGV[2 * i])
+    local tat = math.max(tonumber(redis.call('GET', KEYS[i]) or now), now)
+    tats[i] = tat + interval
+    retry_after = math.max(retry_after, tats[i] - period - now)
+end
+if retry_after > 0.001 then
+    return {0, tostring(retry_after)}
+end
+for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], tostring(tats[i]), 'EX', math.ceil(tats[i] - now))
+end
+return {1, '0'}
+"""
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of one rate limit check"""
+    allowed: bool
+    retry_after: int = 0  # Seconds until the request would be allowed
+
+
+_memory_buckets: Dict[str, float] = {}
+_memory_lock = threading.Lock()
+_redis_client = None
+_redis_script = None
+_redis_checked = False
+
+
+def _get_redis():
+    """Lazily connect to Redis and register the GCRA script (None if unavailable)"""
+    global _redis_client, _redis_script, _redis_checked
+    if _redis_checked:
+        return _redis_script
+
+    _redis_checked = True
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        try:
+            import redis
+            _redis_client = redis.from_url(redis_url, decode_responses=True)
+            _redis_script = _redis_client.register_script(GCRA_SCRIPT)
+        except Exception as e:
+            logger.warning(f"Rate limiter Redis unavailable, using in-memory limits: {str(e)}")
+            _redis_client = _redis_script = None
+    return _redis_script
+
+
+def _config_manager():
+    from config_manager import get_config_manager
+    try:
+        return get_config_manager()
+    except RuntimeError:
+        return None
+
+
+def get_limits(tier: str, operation: str) -> List[Tuple[int, int]]:
+    """
+    Limits for a tier and operation
+
+    Returns:
+        List of (period_seconds, max_requests) windows; empty means unlimited
+    """
+    config = None
+    manager = _config_manager()
+    if manager is not None:
+        rows = manager.get_all_rate_limits()
+        for name in (operation, OPERATION_ALIASES.get(operation)):
+            config = rows.get((name, tier)) or rows.get((name, 'default'))
+            if config:
+                break
+
+    if config:
+        return [(period, limit) for period, limit in (
+            (HOUR, config.get('requests_per_hour')),
+            (DAY, config.get('requests_per_day'))
+        ) if limit]
+
+    tier_defaults = DEFAULT_HOURLY_LIMITS.get(tier, DEFAULT_HOURLY_LIMITS['free'])
+    limit = tier_defaults.get(operation)
+    return [(HOUR, limit)] if limit else []
+
+
+def daily_credit_limit(tier: str) -> int:
+    """Credits a tier may spend per day"""
+    manager = _config_manager()
+    if manager is not None:
+        tier_config = manager.get_subscription_tier(tier)
+        configured = ((tier_config or {}).get('rate_limits') or {}).get('daily_credits')
+        if configured:
+            return int(configured)
+    return DEFAULT_DAILY_CREDITS.get(tier, DEFAULT_DAILY_CREDITS['free'])
+
+
+def _bucket_key(user_id: int, tier: str, operation: str, period: int) -> str:
+    return f'ratelimit:{user_id}:{tier}:{operation}:{period}'
+
+
+def _hit_memory(keys: List[str], limits: List[Tuple[int, int]]) -> Tuple[bool, float]:
+    """GCRA over process-local buckets (same algorithm as GCRA_SCRIPT)"""
+    now = time.time()
+    with _memory_lock:
+        if len(_memory_buckets) > MEMORY_PRUNE_THRESHOLD:
+            for key in [key for key, tat in _memory_buckets.items() if tat < now]:
+                del _memory_buckets[key]
+
+        retry_after = 0.0
+        tats = []
+        for key, (period, limit) in zip(keys, limits):
+            tat = max(_memory_buckets.get(key, now), now) + period / limit
+            tats.append(tat)
+            retry_after = max(retry_after, tat - period - now)
+        if retry_after > TOLERANCE:
+            return False, retry_after
+
+        for key, tat in zip(keys, tats):
+            _memory_buckets[key] = tat
+        return True, 0.0
+
+
+def hit(user_id: int, tier: str, operation: str) -> RateLimitResult:
+    """
+    Count one request against the user's limits for an operation
+
+    Nothing is counted when the request is rejected.
+
+    Returns:
+        RateLimitResult (allowed, or seconds until it would be)
+    """
+    limits = get_limits(tier, operation)
+    if not limits:
+        return RateLimitResult(True)
+    keys = [_bucket_key(user_id, tier, operation, period) for period, _ in limits]
+
+    allowed, retry_after = None, 0.0
+    script = _get_redis()
+    if script is not None:
+        try:
+            args = [value for window in limits for value in window]
+            allowed, retry_after = script(keys=keys, args=args)
+            allowed, retry_after = bool(int(allowed)), float(retry_after)
+        except Exception as e:
+            logger.warning(f"Rate limiter Redis call failed, using in-memory limits: {str(e)}")
+            allowed = None
+    if allowed is None:
+        allowed, retry_after = _hit_memory(keys, limits)
+
+    if allowed:
+        return RateLimitResult(True)
+    return RateLimitResult(False, max(1, math.ceil(retry_after)))
+
+
+def reset():
+    """Forget all in-memory buckets"""
+    with _memory_lock:
+        _memory_buckets.clear()
@@ -0,0 +1,236 @@
+"""
+Token Revocation - Local-first JWT revocation checks
+
+Every authenticated request asks whether its token's JTI has been revoked.
+Each worker answers that from bloom filters of revoked JTIs held in memory,
+so the common case (a token that was never revoked) costs no network hop.
+Only a filter hit is confirmed against Redis (jwt_blacklist:{jti}, which
+expires with the token), so false positives never reject a valid token.
+
+Filters are split into generations by the hour the token expires in. A token
+is only looked up in its own generation, and a generation is dropped once all
+its tokens have expired, so entries leave the filter along with the token
+lifetime and no filter ever needs deleting from.
+
+With REDIS_URL configured, revoke() also appends the JTI to a Redis stream
+(REVOCATION_STREAM). Each worker replays the stream on start and then follows
+it with a background blocking read, so a logout on one worker reaches the
+others within milliseconds. While the follower is not running (disconnected,
+catching up) checks go to Redis directly. Without Redis the filter is backed
+by an exact in-process set (single-process development only).
+"""
+
+from typing import Dict, Optional
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Redis stream every worker follows, and the key prefix checked on filter hits
+REVOCATION_STREAM = 'jwt_revocations'
+REVOKED_KEY_PREFIX = 'jwt_blacklist:'
+
+# Revocations kept in the stream for workers that start later (approximate trim)
+STREAM_MAX_LENGTH = 100000
+
+# Each generation covers tokens expiring within one window
+GENERATION_SECONDS = 3600
+
+# Revocations per generation before the false positive rate exceeds the target
+GENERATION_CAPACITY = 50000
+FALSE_POSITIVE_RATE = 0.001
+
+# Lifetime assumed for tokens without an exp claim
+DEFAULT_TOKEN_LIFETIME = 3600
+
+# Blocking read timeout for the stream follower (milliseconds)
+FOLLOW_BLOCK_MS = 5000
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings (double hashing on one blake2b digest)"""
+
+    def __init__(self, capacity: int = GENERATION_CAPACITY, error_rate: float = FALSE_POSITIVE_RATE):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+_filters: Dict[int, BloomFilter] = {}
+_local_revoked: Dict[str, float] = {}  # jti -> expiry, authoritative without Redis
+_lock = threading.Lock()
+_redis_client = None
+_redis_checked = False
+_follower_pid = None
+_synced = False  # True while the follower is caught up with the stream
+
+
+def _get_redis():
+    """Lazily connect to Redis for shared revocations (None if unavailable)"""
+    global _redis_client, _redis_checked
+    if _redis_checked:
+        return _redis_client
+
+    _redis_checked = True
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        try:
+            import redis
+            _redis_client = redis.from_url(redis_url, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"Token revocation Redis unavailable, using in-memory revocations: {str(e)}")
+            _redis_client = None
+    return _redis_client
+
+
+def _generation(expires_at: float) -> int:
+    return int(expires_at // GENERATION_SECONDS)
+
+
+def _expiry(expires_at: Optional[float]) -> float:
+    return float(expires_at) if expires_at else time.time() + DEFAULT_TOKEN_LIFETIME
+
+
+def _add_local(jti: str, expires_at: float):
+    """Put a revocation in this worker's filters, dropping expired generations"""
+    now = time.time()
+    if expires_at <= now:
+        return
+    with _lock:
+        current = _generation(now)
+        for generation in [g for g in _filters if g < current]:
+            del _filters[generation]
+        for revoked in [j for j, exp in _local_revoked.items() if exp <= now]:
+            del _local_revoked[revoked]
+
+        generation = _generation(expires_at)
+        if generation not in _filters:
+            _filters[generation] = BloomFilter()
+        _filters[generation].add(jti)
+        if _redis_client is None:
+            _local_revoked[jti] = expires_at
+
+
+def _apply_entries(entries) -> Optional[str]:
+    """Add stream entries to the filters, returning the last entry id"""
+    last_id = None
+    for entry_id, fields in entries:
+        last_id = entry_id
+        try:
+            _add_local(fields['jti'], float(fields['exp']))
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Skipping malformed revocation stream entry {entry_id}")
+    return last_id
+
+
+def _follow_stream(client):
+    """Replay the revocation stream, then apply new entries as they arrive"""
+    global _synced
+    while True:
+        try:
+            last_id = _apply_entries(client.xrange(REVOCATION_STREAM)) or '0-0'
+            _synced = True
+            while True:
+                for _, entries in client.xread({REVOCATION_STREAM: last_id}, block=FOLLOW_BLOCK_MS) or []:
+                    last_id = _apply_entries(entries) or last_id
+        except Exception as e:
+            logger.warning(f"Token revocation stream disconnected: {str(e)}")
+        # Revocations may be missed until the stream is replayed again
+        _synced = False
+        time.sleep(5)
+
+
+def _ensure_follower():
+    """Start this process's stream follower (once per pid, so forked workers get their own)"""
+    global _follower_pid, _synced
+    client = _get_redis()
+    if client is not None and _follower_pid != os.getpid():
+        # A forked worker inherits the parent's sync flag and filters but not its
+        # follower thread: check Redis directly until its own follower has replayed
+        _follower_pid = os.getpid()
+        _synced = False
+        with _lock:
+            _filters.clear()
+        threading.Thread(target=_follow_stream, args=(client,), name='revocation-follower', daemon=True).start()
+    return client
+
+
+def revoke(jti: str, expires_at: Optional[float] = None):
+    """
+    Revoke a token until it expires
+
+    Args:
+        jti: Token identifier
+        expires_at: Token exp claim (Unix seconds); tokens without one are
+            revoked for DEFAULT_TOKEN_LIFETIME
+    """
+    expires_at = _expiry(expires_at)
+    ttl = int(math.ceil(expires_at - time.time()))
+    if ttl <= 0:
+        return
+
+    client = _ensure_follower()
+    _add_local(jti, expires_at)
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.setex(f'{REVOKED_KEY_PREFIX}{jti}', ttl, '1')
+        pipe.xadd(REVOCATION_STREAM, {'jti': jti, 'exp': expires_at},
+                  maxlen=STREAM_MAX_LENGTH, approximate=True)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to publish token revocation: {str(e)}")
+
+
+def is_revoked(jti: str, expires_at: Optional[float] = None) -> bool:
+    """
+    Whether a token has been revoked
+
+    A miss in the local filter is final while the stream follower is caught
+    up; a hit (or an unsynced follower) is confirmed in Redis. Tokens without
+    an exp claim have no generation and are always checked exactly.
+    """
+    client = _ensure_follower()
+
+    if expires_at:
+        bloom = _filters.get(_generation(float(expires_at)))
+        maybe_revoked = bloom is not None and jti in bloom
+        if not maybe_revoked and (client is None or _synced):
+            return False
+    else:
+        maybe_revoked = False
+
+    if client is None:
+        return jti in _local_revoked
+    try:
+        return client.exists(f'{REVOKED_KEY_PREFIX}{jti}') > 0
+    except Exception as e:
+        logger.warning(f"Token revocation Redis check failed, using local filter: {str(e)}")
+        return maybe_revoked
+
+
+def reset():
+    """Forget all local revocations"""
+    with _lock:
+        _filters.clear()
+        _local_revoked.clear()
@@ -0,0 +1,104 @@
+"""
+User Context - Request-scoped current user and permission resolver
+
+Authorization decorators, route helpers and admission control all need the
+authenticated user. load_user() loads it once per request with its roles in a
+single joined query and keeps it on flask.g, so later callers in the same
+request get the same object without touching the database.
+
+Permission checks expand roles into permission names. That expansion rarely
+changes, so it is cached per role across requests for PERMISSION_CACHE_SECONDS
+and loaded for all of a user's uncached roles in one query, instead of
+lazy-loading every role's permissions on each check.
+"""
+
+from typing import Dict, FrozenSet, Optional, Tuple
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.orm import joinedload
+
+from models import db, User, Permission, role_permissions
+
+logger = logging.getLogger(__name__)
+
+# How long a role's permission set is reused across requests
+PERMISSION_CACHE_SECONDS = 60
+
+_role_permissions: Dict[int, Tuple[float, FrozenSet[str]]] = {}
+_lock = threading.Lock()
+
+
+def _request_users() -> Dict[int, Optional[User]]:
+    if not has_request_context():
+        return {}
+    # Keyed on the request too: an app context (and g) can outlive one request
+    current = request._get_current_object()
+    if g.get('user_context_request') is not current:
+        g.user_context_request = current
+        g.user_context = {}
+    return g.user_context
+
+
+def load_user(user_id=None) -> Optional[User]:
+    """
+    The user for this request, loaded with roles at most once per request
+
+    Args:
+        user_id: User to load (defaults to the JWT identity)
+
+    Returns:
+        User, or None if it does not exist
+    """
+    if user_id is None:
+        user_id = get_jwt_identity()
+    if user_id is None:
+        return None
+    user_id = int(user_id)
+
+    users = _request_users()
+    if user_id not in users:
+        users[user_id] = User.query.options(joinedload(User.roles)).filter(User.id == user_id).one_or_none()
+    return users[user_id]
+
+
+def remember_user(user: User):
+    """Use an already loaded user for the rest of the request"""
+    _request_users().setdefault(user.id, user)
+
+
+def get_permissions(user: User) -> FrozenSet[str]:
+    """Names of every permission the user has through their roles"""
+    role_ids = [role.id for role in user.roles]
+    now = time.monotonic()
+    with _lock:
+        cached = {role_id: _role_permissions.get(role_id) for role_id in role_ids}
+    missing = [role_id for role_id, entry in cached.items()
+               if entry is None or now - entry[0] > PERMISSION_CACHE_SECONDS]
+
+    if missing:
+        loaded = {role_id: set() for role_id in missing}
+        rows = db.session.query(role_permissions.c.role_id, Permission.name).join(
+            Permission, Permission.id == role_permissions.c.permission_id
+        ).filter(role_permissions.c.role_id.in_(missing))
+        for role_id, name in rows:
+            loaded[role_id].add(name)
+        with _lock:
+            for role_id, names in loaded.items():
+                cached[role_id] = _role_permissions[role_id] = (now, frozenset(names))
+
+    return frozenset().union(*(names for _, names in cached.values()))
+
+
+def has_permission(user: User, permission_name: str) -> bool:
+    """Check if a user has a permission through any of their roles"""
+    return permission_name in get_permissions(user)
+
+
+def clear_permission_cache():
+    """Forget cached role permissions (after editing roles or permissions)"""
+    with _lock:
+        _role_permissions.clear()
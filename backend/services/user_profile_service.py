@@ -0,0 +1,214 @@
+"""
+User Profile Service - Materialized per-user skill profiles
+
+Keeps one UserSkillProfile row per user so matching and insights endpoints
+can read a user's skills without scanning and re-parsing Analysis.keywords_found.
+The profile is updated incrementally whenever an analysis is saved.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+import logging
+
+from sqlalchemy import func
+
+from models import db, Analysis, Keyword, UserSkillProfile
+
+logger = logging.getLogger(__name__)
+
+# Each new analysis decays existing weights by DECAY and adds 1.0 per skill found.
+# Skills whose weight drops below MIN_WEIGHT are pruned, so a skill seen once stays
+# for exactly RECENT_ANALYSES analyses (0.8^4 = 0.41 is kept, 0.8^5 = 0.33 is not).
+DECAY = 0.8
+MIN_WEIGHT = 0.35
+RECENT_ANALYSES = 5
+MAX_SKILLS = 200
+
+EXPERIENCE_LEVELS = {
+    'entry': 'Entry',
+    'junior': 'Entry',
+    'mid': 'Mid',
+    'senior': 'Senior',
+    'lead': 'Lead',
+    'expert': 'Lead',
+    'executive': 'Executive'
+}
+
+
+def normalize_skill_names(keywords_found: Optional[Iterable]) -> List[str]:
+    """
+    Normalize an Analysis.keywords_found payload into unique lowercase skill names
+
+    Args:
+        keywords_found: List of strings or dicts with a 'keyword' field
+
+    Returns:
+        List[str]: Unique, stripped, lowercase skill names in input order
+    """
+    names = []
+    seen = set()
+    for kw in keywords_found or []:
+        if isinstance(kw, dict):
+            kw = kw.get('keyword') or kw.get('name') or ''
+        if not isinstance(kw, str):
+            continue
+        name = kw.strip().lower()
+        if name and name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def normalize_experience_level(level: Optional[str]) -> Optional[str]:
+    """Map analyzer levels ('entry', 'mid', 'senior', 'expert') to the matching scale"""
+    if not level:
+        return None
+    return EXPERIENCE_LEVELS.get(level.strip().lower())
+
+
+def _resolve_keyword_ids(names: Iterable[str]) -> List[int]:
+    """Resolve skill names to Keyword ids in a single query"""
+    names = list(names)
+    if not names:
+        return []
+    rows = db.session.query(Keyword.id).filter(func.lower(Keyword.keyword).in_(names)).all()
+    return sorted(row.id for row in rows)
+
+
+def _merge_skills(weights: Dict[str, float], new_skills: List[str]) -> Dict[str, float]:
+    """Apply one analysis worth of skills to a weight map"""
+    merged = {name: weight * DECAY for name, weight in weights.items()}
+    for name in new_skills:
+        merged[name] = merged.get(name, 0.0) + 1.0
+
+    kept = {name: round(weight, 4) for name, weight in merged.items() if weight >= MIN_WEIGHT}
+    if len(kept) > MAX_SKILLS:
+        top = sorted(kept.items(), key=lambda item: item[1], reverse=True)[:MAX_SKILLS]
+        kept = dict(top)
+    return kept
+
+
+def _apply_analysis(profile: UserSkillProfile, analysis: Analysis, experience_level: Optional[str] = None):
+    """Fold one analysis into the profile's weights and metadata (no commit)"""
+    weights = dict(zip(profile.skill_names or [], profile.skill_weights or []))
+    weights = _merge_skills(weights, normalize_skill_names(analysis.keywords_found))
+
+    names = sorted(weights)
+    profile.skill_names = names
+    profile.skill_weights = [weights[name] for name in names]
+
+    level = normalize_experience_level(experience_level)
+    if level:
+        profile.experience_level = level
+    if analysis.detected_industry and analysis.detected_industry != 'Unknown':
+        profile.industry = analysis.detected_industry
+
+    profile.analyses_count = (profile.analyses_count or 0) + 1
+    profile.last_analysis_id = analysis.id
+    profile.last_analysis_at = analysis.created_at or datetime.utcnow()
+
+
+def record_analysis(analysis: Analysis, experience_level: Optional[str] = None) -> Optional[UserSkillProfile]:
+    """
+    Incrementally update a user's profile after an analysis has been saved
+
+    Args:
+        analysis: Committed Analysis row
+        experience_level: Resume level reported by the analyzer, if any
+
+    Returns:
+        UserSkillProfile or None if the update failed
+    """
+    try:
+        profile = UserSkillProfile.query.get(analysis.user_id)
+        if profile is None:
+            # First profile for this user - build it from history (includes this analysis)
+            return rebuild_profile(analysis.user_id, experience_level=experience_level)
+
+        _apply_analysis(profile, analysis, experience_level)
+        profile.keyword_ids = _resolve_keyword_ids(profile.skill_names)
+        db.session.commit()
+        return profile
+
+    except Exception as e:
+        logger.error(f"Failed to update skill profile for user {analysis.user_id}: {str(e)}")
+        db.session.rollback()
+        return None
+
+
+def rebuild_profile(user_id: int, experience_level: Optional[str] = None) -> Optional[UserSkillProfile]:
+    """
+    Rebuild a user's profile from their most recent analyses
+
+    Used to backfill users that predate profiles and after analyses are deleted
+    or transferred. Returns None when the user has no analyses.
+    """
+    try:
+        analyses = Analysis.query.filter_by(user_id=user_id).order_by(
+            Analysis.created_at.desc()
+        ).limit(RECENT_ANALYSES).all()
+
+        profile = UserSkillProfile.query.get(user_id)
+        if not analyses:
+            if profile is not None:
+                db.session.delete(profile)
+                db.session.commit()
+            return None
+
+        if profile is None:
+            profile = UserSkillProfile(user_id=user_id)
+            db.session.add(profile)
+
+        profile.skill_names = []
+        profile.skill_weights = []
+        profile.analyses_count = 0
+        for analysis in reversed(analyses):
+            _apply_analysis(profile, analysis)
+
+        level = normalize_experience_level(experience_level)
+        if level:
+            profile.experience_level = level
+        profile.analyses_count = Analysis.query.filter_by(user_id=user_id).count()
+        profile.keyword_ids = _resolve_keyword_ids(profile.skill_names)
+
+        db.session.commit()
+        logger.info(f"Rebuilt skill profile for user {user_id}: {len(profile.skill_names)} skills")
+        return profile
+
+    except Exception as e:
+        logger.error(f"Failed to rebuild skill profile for user {user_id}: {str(e)}")
+        db.session.rollback()
+        return None
+
+
+def get_profile(user_id: int) -> Optional[UserSkillProfile]:
+    """Get a user's profile, backfilling it from analyses on first access"""
+    profile = UserSkillProfile.query.get(user_id)
+    if profile is None:
+        profile = rebuild_profile(user_id)
+    return profile
+
+
+def get_user_skill_set(user_id: int) -> Set[str]:
+    """Get the user's skills as a set of lowercase names"""
+    profile = get_profile(user_id)
+    return set(profile.skill_names or []) if profile else set()
+
+
+def get_user_keyword_ids(user_id: int) -> List[int]:
+    """Get the sorted Keyword ids the user's skills resolve to"""
+    profile = get_profile(user_id)
+    return list(profile.keyword_ids or []) if profile else []
+
+
+def get_ranked_skills(user_id: int) -> List[str]:
+    """Get the user's skill names ordered by weight (strongest first)"""
+    profile = get_profile(user_id)
+    if not profile:
+        return []
+    ranked = sorted(
+        zip(profile.skill_names or [], profile.skill_weights or []),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    return [name for name, _ in ranked]
@@ -11,10 +11,13 @@ Analyzes skill co-occurrences across resumes and user confirmations to:
 from typing import Dict, List, Tuple, Optional
 from collections import Counter, defaultdict
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT ... ON CONFLICT statement when persisting relationships
+PERSIST_BATCH_SIZE = 1000
+
 
 class SkillRelationshipAnalyzer:
     """Analyzes skill relationships and co-occurrences"""
@@ -28,6 +31,9 @@ class SkillRelationshipAnalyzer:
         """
         Get all skill co-occurrences from confirmed extractions.
 
+        All-time co-occurrences come from the persisted sparse matrix; a time
+        window is computed on the fly as X^T X over that window's extractions.
+
         Args:
             limit_days: Only analyze extractions from last N days (None = all time)
 
@@ -39,56 +45,22 @@ class SkillRelationshipAnalyzer:
 
         try:
             from app import app
-            from models import SkillExtraction, Analysis
-            from sqlalchemy import func
+            from services import skill_cooccurrence
 
             with app.app_context():
-                # Build query
-                query = (
-                    SkillExtraction.query
-                    .join(Analysis, SkillExtraction.analysis_id == Analysis.id)
-                    .filter(SkillExtraction.user_confirmed == True)
-                )
-
-                # Optional time limit
-                if limit_days:
-                    cutoff_date = datetime.utcnow() - timedelta(days=limit_days)
-                    query = query.filter(SkillExtraction.created_at >= cutoff_date)
-
-                extractions = query.all()
-
-                if not extractions:
-                    return {}
+                if not limit_days:
+                    return skill_cooccurrence.get_cooccurrence_engine().as_dict()
 
-                # Group by analysis to find co-occurrences
-                analysis_skills = defaultdict(set)
-                for extraction in extractions:
-                    if extraction.matched_keyword_id:
-                        analysis_skills[extraction.analysis_id].add(extraction.matched_keyword_id)
-
-                # Count co-occurrences
-                cooccurrences = defaultdict(lambda: defaultdict(int))
-                for analysis_id, skill_ids in analysis_skills.items():
-                    skill_list = list(skill_ids)
-                    # Count all pairs
-                    for i, skill_a in enumerate(skill_list):
-                        for skill_b in skill_list[i + 1:]:
-                            # Store both directions
-                            cooccurrences[skill_a][skill_b] += 1
-                            cooccurrences[skill_b][skill_a] += 1
-
-                # Convert to standard dict format
-                result = {}
-                for skill_a, co_skills in cooccurrences.items():
-                    result[skill_a] = dict(co_skills)
-
-                return result
+                pairs = skill_cooccurrence.load_confirmed_pairs(limit_days=limit_days)
+                skill_ids, matrix, _ = skill_cooccurrence.build_cooccurrence(pairs)
+                return skill_cooccurrence.matrix_to_dict(skill_ids, matrix)
 
         except Exception as e:
             logger.error(f"Error analyzing skill co-occurrences: {str(e)}")
             return {}
 
-    def get_related_skills(self, skill_id: int, top_n: int = 10, min_strength: int = 2) -> List[Dict]:
+    def get_related_skills(self, skill_id: int, top_n: int = 10, min_strength: int = 2,
+                           scoring: str = 'count') -> List[Dict]:
         """
         Get skills that frequently co-occur with a given skill.
 
@@ -96,6 +68,7 @@ class SkillRelationshipAnalyzer:
             skill_id: ID of the skill to find relationships for
             top_n: Number of related skills to return
             min_strength: Minimum co-occurrence count to consider
+            scoring: 'count', 'lift' or 'pmi'
 
         Returns:
             List of related skills with strength scores
@@ -105,35 +78,27 @@ class SkillRelationshipAnalyzer:
 
         try:
             from app import app
-            from models import Keyword
-
-            cooccurrences = self.get_skill_cooccurrences()
+            from services import skill_cooccurrence
 
-            if skill_id not in cooccurrences:
-                return []
-
-            # Get related skills
-            related = cooccurrences[skill_id]
-
-            # Filter by minimum strength and sort
-            related_filtered = [
-                (skill_id, strength) for skill_id, strength in related.items()
-                if strength >= min_strength
-            ]
-            related_filtered.sort(key=lambda x: x[1], reverse=True)
-
-            # Get keyword details
             with app.app_context():
+                related = skill_cooccurrence.get_cooccurrence_engine().related(
+                    skill_id, top_n=top_n, min_count=min_strength, scoring=scoring
+                )
+                keywords = self._load_keywords(related_id for related_id, _, _ in related)
+
                 result = []
-                for related_skill_id, strength in related_filtered[:top_n]:
-                    keyword = Keyword.query.get(related_skill_id)
+                for related_skill_id, score, strength in related:
+                    keyword = keywords.get(related_skill_id)
                     if keyword:
-                        result.append({
+                        entry = {
                             'skill_id': related_skill_id,
                             'skill_name': keyword.keyword,
                             'co_occurrence_strength': strength,
                             'category': keyword.category
-                        })
+                        }
+                        if scoring != 'count':
+                            entry[scoring] = round(score, 4)
+                        result.append(entry)
 
                 return result
 
@@ -141,6 +106,16 @@ class SkillRelationshipAnalyzer:
             logger.error(f"Error getting related skills: {str(e)}")
             return []
 
+    @staticmethod
+    def _load_keywords(keyword_ids) -> Dict:
+        """Fetch Keyword rows for a set of ids in one query"""
+        from models import Keyword
+
+        keyword_ids = list(keyword_ids)
+        if not keyword_ids:
+            return {}
+        return {keyword.id: keyword for keyword in Keyword.query.filter(Keyword.id.in_(keyword_ids))}
+
     def analyze_skill_category_relationships(self) -> Dict[str, Dict]:
         """
         Analyze relationships between skills in different categories.
@@ -205,73 +180,159 @@ class SkillRelationshipAnalyzer:
         """
         Persist skill relationships to the database.
 
-        Analyzes current co-occurrences and updates SkillRelationship table.
+        Analyzes current co-occurrences and upserts the SkillRelationship table
+        in batches (see _upsert_relationships).
 
         Returns:
-            Number of relationships persisted
+            Number of relationships inserted or updated
         """
         if not self.db:
             return 0
 
         try:
             from app import app
-            from models import SkillRelationship
-            from sqlalchemy import func
-
-            cooccurrences = self.get_skill_cooccurrences()
 
             with app.app_context():
-                count = 0
-
-                for skill_a, related_skills in cooccurrences.items():
-                    for skill_b, strength in related_skills.items():
-                        if strength >= self.min_cooccurrence_threshold:
-                            # Skip if relationship already exists and is newer
-                            existing = SkillRelationship.query.filter(
-                                ((SkillRelationship.skill_a_id == skill_a) &
-                                 (SkillRelationship.skill_b_id == skill_b)) |
-                                ((SkillRelationship.skill_a_id == skill_b) &
-                                 (SkillRelationship.skill_b_id == skill_a))
-                            ).first()
-
-                            if existing:
-                                # Update co-occurrence strength
-                                existing.co_occurrence_count = strength
-                                existing.last_updated = datetime.utcnow()
-                            else:
-                                # Create new relationship
-                                # Ensure consistent ordering (lower ID first)
-                                if skill_a < skill_b:
-                                    rel = SkillRelationship(
-                                        skill_a_id=skill_a,
-                                        skill_b_id=skill_b,
-                                        co_occurrence_count=strength,
-                                        relationship_strength=self._calculate_strength(strength),
-                                        relationship_type='co-occurrence',
-                                        last_updated=datetime.utcnow()
-                                    )
-                                else:
-                                    rel = SkillRelationship(
-                                        skill_a_id=skill_b,
-                                        skill_b_id=skill_a,
-                                        co_occurrence_count=strength,
-                                        relationship_strength=self._calculate_strength(strength),
-                                        relationship_type='co-occurrence',
-                                        last_updated=datetime.utcnow()
-                                    )
-
-                                self.db.session.add(rel)
-                                count += 1
-
-                self.db.session.commit()
-                logger.info(f"Persisted {count} skill relationships")
-                return count
+                stats = self._upsert_relationships()
+                return stats['inserted'] + stats['updated']
 
         except Exception as e:
             logger.error(f"Error persisting skill relationships: {str(e)}")
             self.db.session.rollback()
             return 0
 
+    def build_relationships(self) -> Dict[str, int]:
+        """
+        Rebuild the co-occurrence matrix from scratch and persist relationships.
+
+        Used by the nightly rebuild job. Raises on failure so the job is logged as failed.
+
+        Returns:
+            Dictionary of row counts (pairs, inserted, updated, unchanged, skills)
+        """
+        from app import app
+        from services.skill_cooccurrence import get_cooccurrence_engine
+
+        with app.app_context():
+            skills = get_cooccurrence_engine().rebuild()
+            try:
+                stats = self._upsert_relationships()
+            except Exception:
+                self.db.session.rollback()
+                raise
+            stats['skills'] = skills
+            return stats
+
+    def _relationship_pairs(self) -> Dict[Tuple[int, int], Tuple[int, float]]:
+        """(lower id, higher id) -> (co-occurrence count, Jaccard strength) for pairs over the threshold"""
+        from scipy import sparse
+        from services.skill_cooccurrence import get_cooccurrence_engine
+
+        skill_ids, matrix = get_cooccurrence_engine().snapshot()
+        frequency = matrix.diagonal()
+        upper = sparse.triu(matrix, k=1).tocoo()
+
+        pairs = {}
+        for row, col, count in zip(upper.row, upper.col, upper.data):
+            if count < self.min_cooccurrence_threshold:
+                continue
+            skill_a, skill_b = skill_ids[row], skill_ids[col]
+            key = (skill_a, skill_b) if skill_a < skill_b else (skill_b, skill_a)
+            strength = count / (frequency[row] + frequency[col] - count)
+            pairs[key] = (int(count), round(float(strength), 4))
+        return pairs
+
+    def _upsert_relationships(self) -> Dict[str, int]:
+        """
+        Write all relationship pairs with batched INSERT ... ON CONFLICT DO UPDATE.
+
+        Existing pairs are loaded in one query so rows whose count and strength
+        are unchanged are skipped and inserts/updates can be counted. Stored
+        co-occurrence pairs that are no longer over the threshold are deleted.
+        Commits.
+        """
+        from sqlalchemy import delete
+        from models import SkillRelationship
+
+        pairs = self._relationship_pairs()
+        existing = {
+            (skill_1_id, skill_2_id): (relationship_id, count, strength, relationship_type)
+            for relationship_id, skill_1_id, skill_2_id, count, strength, relationship_type in self.db.session.query(
+                SkillRelationship.id,
+                SkillRelationship.skill_1_id,
+                SkillRelationship.skill_2_id,
+                SkillRelationship.co_occurrence_count,
+                SkillRelationship.relationship_strength,
+                SkillRelationship.relationship_type
+            )
+        }
+
+        now = datetime.utcnow()
+        rows = []
+        inserted = updated = 0
+        for (skill_1_id, skill_2_id), (count, strength) in pairs.items():
+            previous = existing.get((skill_1_id, skill_2_id))
+            if previous is None:
+                inserted += 1
+            elif previous[1] == count and previous[2] is not None and round(previous[2], 4) == strength:
+                # Strength also depends on each skill's frequency, so both must match
+                continue
+            else:
+                updated += 1
+            rows.append({
+                'skill_1_id': skill_1_id,
+                'skill_2_id': skill_2_id,
+                'co_occurrence_count': count,
+                'relationship_strength': strength,
+                'relationship_type': 'co-occurrence',
+                'first_seen_at': now,
+                'last_updated_at': now
+            })
+
+        # Co-occurrence pairs that dropped below the threshold or disappeared
+        stale = [
+            relationship_id for key, (relationship_id, _, _, relationship_type) in existing.items()
+            if key not in pairs and relationship_type == 'co-occurrence'
+        ]
+
+        if rows:
+            insert = self._dialect_insert(SkillRelationship.__table__)
+            for start in range(0, len(rows), PERSIST_BATCH_SIZE):
+                statement = insert.values(rows[start:start + PERSIST_BATCH_SIZE])
+                statement = statement.on_conflict_do_update(
+                    index_elements=['skill_1_id', 'skill_2_id'],
+                    set_={
+                        'co_occurrence_count': statement.excluded.co_occurrence_count,
+                        'relationship_strength': statement.excluded.relationship_strength,
+                        'last_updated_at': statement.excluded.last_updated_at
+                    }
+                )
+                self.db.session.execute(statement)
+        for start in range(0, len(stale), PERSIST_BATCH_SIZE):
+            self.db.session.execute(
+                delete(SkillRelationship).where(SkillRelationship.id.in_(stale[start:start + PERSIST_BATCH_SIZE])),
+                execution_options={'synchronize_session': False}
+            )
+        self.db.session.commit()
+
+        stats = {
+            'pairs': len(pairs),
+            'inserted': inserted,
+            'updated': updated,
+            'unchanged': len(pairs) - inserted - updated,
+            'deleted': len(stale)
+        }
+        logger.info(f"Persisted skill relationships: {stats}")
+        return stats
+
+    def _dialect_insert(self, table):
+        """INSERT construct supporting on_conflict_do_update for the bound database"""
+        if self.db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(table)
+
     def _calculate_strength(self, co_occurrence_count: int) -> str:
         """
         Calculate relationship strength based on co-occurrence count.
@@ -293,13 +354,14 @@ class SkillRelationshipAnalyzer:
         else:
             return 'very_strong'
 
-    def recommend_related_skills(self, skills: List[str], top_n: int = 5) -> List[Dict]:
+    def recommend_related_skills(self, skills: List[str], top_n: int = 5, scoring: str = 'count') -> List[Dict]:
         """
         Recommend skills that often appear with a given set of skills.
 
         Args:
             skills: List of skill names
             top_n: Number of recommendations to return
+            scoring: 'count', 'lift' or 'pmi' (summed over the input skills)
 
         Returns:
             List of recommended skills with scores
@@ -310,38 +372,30 @@ class SkillRelationshipAnalyzer:
         try:
             from app import app
             from models import Keyword
+            from services import skill_cooccurrence
 
             with app.app_context():
                 # Find keyword IDs for input skills
-                skill_ids = []
-                for skill_name in skills:
-                    keyword = Keyword.query.filter_by(keyword=skill_name.lower()).first()
-                    if keyword:
-                        skill_ids.append(keyword.id)
+                names = {skill_name.lower() for skill_name in skills}
+                skill_ids = [keyword_id for (keyword_id,) in
+                             self.db.session.query(Keyword.id).filter(Keyword.keyword.in_(names))]
 
                 if not skill_ids:
                     return []
 
-                # Get co-occurrences
-                cooccurrences = self.get_skill_cooccurrences()
-
-                # Find skills that co-occur with any input skill
-                recommendation_scores = Counter()
-                for skill_id in skill_ids:
-                    if skill_id in cooccurrences:
-                        for related_skill, strength in cooccurrences[skill_id].items():
-                            if related_skill not in skill_ids:  # Don't recommend input skills
-                                recommendation_scores[related_skill] += strength
+                recommendations = skill_cooccurrence.get_cooccurrence_engine().recommend(
+                    skill_ids, top_n=top_n, scoring=scoring
+                )
+                keywords = self._load_keywords(keyword_id for keyword_id, _, _ in recommendations)
 
-                # Get top recommendations
                 result = []
-                for recommended_skill_id, score in recommendation_scores.most_common(top_n):
-                    keyword = Keyword.query.get(recommended_skill_id)
+                for recommended_skill_id, score, _ in recommendations:
+                    keyword = keywords.get(recommended_skill_id)
                     if keyword:
                         result.append({
                             'skill_id': recommended_skill_id,
                             'skill_name': keyword.keyword,
-                            'recommendation_score': score,
+                            'recommendation_score': int(score) if scoring == 'count' else round(score, 4),
                             'category': keyword.category
                         })
 
@@ -361,4 +415,6 @@ def get_skill_relationship_analyzer(db=None) -> SkillRelationshipAnalyzer:
     global _analyzer
     if _analyzer is None:
         _analyzer = SkillRelationshipAnalyzer(db=db)
+    elif _analyzer.db is None and db is not None:
+        _analyzer.db = db
     return _analyzer
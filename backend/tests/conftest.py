@@ -56,14 +56,24 @@ sys.modules["redis"] = mock_redis
 # ---------------------------
 
 from app import create_app
+import config_manager
 from models import db
 from config import TestingConfig
+from services import ai_queue, industry_service, market_cache, market_rollup_service, tier_rate_limiter, token_revocation, user_context
 
 @pytest.fixture
 def app():
     """Create application for testing"""
     app = create_app('testing')
-    
+    market_cache.clear()
+    industry_service.clear_industry_cache()
+    market_rollup_service.reset_backfill_state()
+    tier_rate_limiter.reset()
+    ai_queue.reset()
+    token_revocation.reset()
+    user_context.clear_permission_cache()
+    config_manager.reset_snapshot()
+
     with app.app_context():
         db.create_all()
         yield app
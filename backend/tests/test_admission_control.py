@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from models import db, User, Analysis
+from services import admission_control, tier_rate_limiter
+
+
+class FakeRedis:
+    """Just enough of redis-py's pipeline API for the usage windows"""
+
+    def __init__(self):
+        self.sorted_sets = {}
+        self.values = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        self.redis.round_trips += 1
+        results = []
+        for name, args in self.commands:
+            key = args[0]
+            zset = self.redis.sorted_sets.setdefault(key, {})
+            if name == 'zremrangebyscore':
+                for member in [m for m, score in zset.items() if args[1] <= score <= args[2]]:
+                    del zset[member]
+                results.append(None)
+            elif name == 'zcard':
+                results.append(len(zset))
+            elif name == 'zadd':
+                zset.update(args[1])
+                results.append(len(args[1]))
+            elif name == 'get':
+                results.append(self.redis.values.get(key))
+            elif name == 'incrby':
+                self.redis.values[key] = int(self.redis.values.get(key, 0)) + args[1]
+                results.append(self.redis.values[key])
+            else:
+                results.append(True)
+        return results
+
+
+def make_user(credits=10, tier='free', analyses_ago=()):
+    user = User(email=f'{tier}-{credits}@example.com', password_hash='x', credits=credits, subscription_tier=tier)
+    db.session.add(user)
+    db.session.flush()
+    db.session.add_all([
+        Analysis(user_id=user.id, match_score=50, created_at=datetime.utcnow() - age)
+        for age in analyses_ago
+    ])
+    db.session.commit()
+    return user
+
+
+class TestAdmissionControl:
+    """Test the consolidated pre-flight admission check"""
+
+    def test_database_windows_in_one_query(self, app):
+        """Test every check is answered by a single range query"""
+        user_id = make_user(analyses_ago=[timedelta(hours=30), timedelta(minutes=1)]).id
+        db.session.expunge_all()
+        # Tier limits are served from the config cache once loaded
+        tier_rate_limiter.get_limits('free', 'analyze')
+        tier_rate_limiter.daily_credit_limit('free')
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            decision = admission_control.admit(user_id, 'analyze')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert decision.allowed and decision.reason == admission_control.ADMITTED
+        assert decision.user.id == user_id
+        assert decision.details['remaining_after'] == 9
+        assert len(statements) == 1
+        assert 'date(' not in statements[0].lower()
+
+    def test_rejections(self, app):
+        """Test rapid-fire, daily limit and credit rejections with their responses"""
+        rapid = make_user(tier='elite', analyses_ago=[timedelta(seconds=10 * i) for i in range(11)])
+        decision = admission_control.admit(rapid.id, 'analyze')
+        assert (decision.reason, decision.status_code) == (admission_control.TOO_MANY_REQUESTS, 429)
+
+        # Free tier allows 5 credits a day; analyses before midnight do not count
+        today = datetime.utcnow() - datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        busy = make_user(credits=20, analyses_ago=[today + timedelta(minutes=5)] * 6)
+        assert admission_control.admit(busy.id, 'analyze').allowed
+        db.session.add_all([Analysis(user_id=busy.id, match_score=50) for _ in range(5)])
+        db.session.commit()
+        decision = admission_control.admit(busy.id, 'analyze')
+        assert (decision.reason, decision.status_code) == (admission_control.DAILY_LIMIT, 429)
+
+        # Today's analyses are estimated at the analysis price, not the requested operation's
+        light = make_user(credits=15, analyses_ago=[timedelta(minutes=10)] * 3)
+        assert admission_control.admit(light.id, 'optimize').allowed
+
+        broke = make_user(credits=1, tier='pro')
+        decision = admission_control.admit(broke.id, 'optimize')
+        assert (decision.reason, decision.status_code) == (admission_control.INSUFFICIENT_CREDITS, 402)
+        with app.test_request_context():
+            response, status = decision.to_response()
+        assert status == 402
+        assert response.get_json()['required_credits'] == 2
+        assert response.get_json()['upgrade_url'] == '/dashboard/upgrade'
+
+        assert admission_control.admit(999, 'analyze').status_code == 404
+
+    def test_redis_windows(self, app, monkeypatch):
+        """Test Redis counters slide the recent window and sum credits per day"""
+        redis = FakeRedis()
+        monkeypatch.setattr(admission_control, '_get_redis', lambda: redis)
+        user = make_user(credits=100, tier='elite')
+
+        for _ in range(11):
+            assert admission_control.admit(user.id, 'optimize').allowed
+        assert redis.round_trips == 22
+        decision = admission_control.admit(user.id, 'optimize')
+        assert decision.reason == admission_control.TOO_MANY_REQUESTS
+        assert redis.values[admission_control._daily_key(user.id, datetime.utcnow())] == 22
+
+        # Once the recent entries age out, the daily credit total is what limits
+        redis.sorted_sets.clear()
+        redis.values[admission_control._daily_key(user.id, datetime.utcnow())] = 1000
+        assert admission_control.admit(user.id, 'optimize').reason == admission_control.DAILY_LIMIT
+
+    def test_ai_routes_use_admission(self, client):
+        """Test AI routes reject before doing any work"""
+        user = make_user(credits=0)
+        analysis = Analysis(user_id=user.id, match_score=50)
+        db.session.add(analysis)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+        response = client.post('/api/analyze-intelligent', headers=headers)
+        assert response.status_code == 402
+        assert response.get_json()['current_credits'] == 0
+
+        response = client.post(f'/api/analyze/cover-letter/{analysis.id}', headers=headers)
+        assert response.status_code == 402
+        assert response.get_json()['required_credits'] == 2
+
+        # The /api/v1/analysis blueprint goes through the same check
+        response = client.post(f'/api/v1/analysis/analyses/{analysis.id}/optimize', headers=headers)
+        assert response.status_code == 402
+        assert response.get_json()['required_credits'] == 2
+
+    def test_blueprint_refunds_failed_ai_call(self, client, monkeypatch):
+        """Test blueprint AI routes hold credits and hand them back when generation fails"""
+        from gemini_service import gemini_service
+        user = make_user(credits=5, tier='pro')
+        analysis = Analysis(user_id=user.id, match_score=50, resume_text='resume', job_description='job')
+        db.session.add(analysis)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+        monkeypatch.setattr(gemini_service, 'generate_optimized_resume', lambda **kwargs: None)
+        response = client.post(f'/api/v1/analysis/analyses/{analysis.id}/optimize', headers=headers)
+        assert response.status_code == 500
+        assert db.session.query(User.credits).filter_by(id=user.id).scalar() == 5
+
+        monkeypatch.setattr(gemini_service, 'generate_optimized_resume', lambda **kwargs: 'Optimized')
+        response = client.post(f'/api/v1/analysis/analyses/{analysis.id}/optimize', headers=headers)
+        assert response.status_code == 200
+        assert db.session.query(User.credits).filter_by(id=user.id).scalar() == 3
@@ -0,0 +1,128 @@
+import threading
+import time
+from flask_jwt_extended import create_access_token
+from models import db, User
+from services import ai_queue
+from services.ai_queue import FairQueue, QueueTicket
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.005)
+
+
+def enqueue(queue, tenant, tier, results):
+    """Start a waiter and return once it is queued"""
+    depth = queue.get_stats()['queue_depth']
+    thread = threading.Thread(target=lambda: results.append((tenant, queue.acquire(tenant, tier))))
+    thread.start()
+    wait_for(lambda: queue.get_stats()['queue_depth'] > depth or len(results) and not results[-1][1].allowed)
+    return thread
+
+
+class TestAIQueue:
+    """Test tier-weighted fair admission to AI capacity"""
+
+    def test_weighted_fair_order(self):
+        """Test paying tiers go first and each user's burst is interleaved with others"""
+        queue = FairQueue(concurrency=1, max_depth=10, max_wait=100)
+        holder = queue.acquire('holder', 'free')
+        assert holder.allowed and holder.wait_seconds == 0
+
+        granted = []
+        for tenant, tier in [('f1', 'free'), ('f1', 'free'), ('f1', 'free'), ('f2', 'free'),
+                             ('e1', 'elite'), ('e1', 'elite')]:
+            enqueue(queue, tenant, tier, granted)
+        assert queue.get_stats()['queue_depth'] == 6
+
+        ticket = holder
+        for count in range(1, 7):
+            queue.release(ticket)
+            wait_for(lambda: len(granted) == count)
+            ticket = granted[-1][1]
+        queue.release(ticket)
+
+        assert [tenant for tenant, _ in granted] == ['e1', 'e1', 'f1', 'f2', 'f1', 'f1']
+        stats = queue.get_stats()
+        assert stats['active'] == 0 and stats['queue_depth'] == 0
+        assert stats['tiers']['free']['admitted'] == 5
+        assert stats['tiers']['free']['wait_avg_seconds'] >= stats['tiers']['elite']['wait_avg_seconds']
+
+    def test_load_shedding(self):
+        """Test a full queue sheds the request that would be served last, with an estimated wait"""
+        queue = FairQueue(concurrency=1, max_depth=2, max_wait=100)
+        holder = queue.acquire('holder', 'free')
+        results = []
+        first = enqueue(queue, 'f1', 'free', results)
+        evicted = enqueue(queue, 'f2', 'free', results)
+
+        # A paying user displaces the last free waiter...
+        enqueue(queue, 'p1', 'pro', results)
+        evicted.join(5)
+        assert results[0][0] == 'f2'
+        assert not results[0][1].allowed and results[0][1].retry_after > 0
+
+        # ...and a free arrival behind a full queue is turned away at once
+        rejected = queue.acquire('f3', 'free')
+        assert not rejected.allowed
+        assert rejected.retry_after >= 3 * ai_queue.INITIAL_SERVICE_SECONDS
+
+        # So is anyone whose estimated wait is too long
+        impatient = FairQueue(concurrency=1, max_depth=10, max_wait=5)
+        impatient.acquire('holder', 'free')
+        assert impatient.acquire('x', 'elite').retry_after == ai_queue.INITIAL_SERVICE_SECONDS
+        stats = queue.get_stats()
+        assert stats['tiers']['free']['shed'] == 2
+        assert stats['queue_depth'] == 2
+
+        queue.release(holder)
+        wait_for(lambda: len(results) == 2)
+        queue.release(results[-1][1])
+        first.join(5)
+        assert [tenant for tenant, ticket in results if ticket.allowed] == ['p1', 'f1']
+
+    def test_ai_route_holds_and_releases_slot(self, client, monkeypatch):
+        """Test AI routes take a slot for the request and return 503 when shed"""
+        user = User(email='queued@example.com', password_hash='x', credits=10, subscription_tier='pro')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+        assert client.post('/api/analyze-intelligent', headers=headers).status_code == 400
+        stats = ai_queue.get_stats()
+        assert stats['active'] == 0
+        assert stats['tiers']['pro']['admitted'] == 1
+
+        queue = ai_queue.get_queue()
+        monkeypatch.setattr(queue, 'acquire', lambda tenant, tier: QueueTicket(False, tier, retry_after=12))
+        response = client.post('/api/analyze-intelligent', headers=headers)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '12'
+        assert response.get_json()['estimated_wait_seconds'] == 12
+
+    def test_concurrency_below_worker_threads(self, monkeypatch):
+        """Test the default deploy leaves a thread to queue on, so fair ordering actually runs"""
+        import gunicorn_config
+        threads = gunicorn_config.threads
+        monkeypatch.delenv('AI_QUEUE_CONCURRENCY', raising=False)
+        concurrency = ai_queue.concurrency_for_threads(threads)
+        assert 1 <= concurrency < threads or threads == 1
+        assert ai_queue.FairQueue().concurrency == ai_queue.MAX_CONCURRENT
+        monkeypatch.setenv('AI_QUEUE_CONCURRENCY', str(threads + 5))
+        assert ai_queue.concurrency_for_threads(threads) == concurrency
+
+        # Every thread busy: all slots held and the remaining threads wait in the queue
+        queue = FairQueue(concurrency=concurrency, max_depth=threads, max_wait=100)
+        held = [queue.acquire(f'u{i}', 'pro') for i in range(concurrency)]
+        results = []
+        waiters = [enqueue(queue, f'w{i}', 'free', results) for i in range(threads - concurrency)]
+        assert queue.get_stats()['queue_depth'] == threads - concurrency
+        for ticket in held:
+            queue.release(ticket)
+        for waiter in waiters:
+            waiter.join(5)
+        assert all(ticket.allowed for _, ticket in results)
+        for _, ticket in results:
+            queue.release(ticket)
@@ -0,0 +1,72 @@
+import time
+from services.ats_scanner import scan_resume
+
+
+CLEAN_RESUME = """Jane Doe
+jane@example.com
+
+SUMMARY
+Backend engineer focused on reliable data platforms.
+
+Work Experience
+Senior Engineer, Acme Corp - Jan 2019 to Present
+- Led migration of billing services to Kubernetes, cutting costs by 30%
+- Built event pipelines processing 2M messages per day
+Engineer, Beta Inc - 06/2015 - 12/2018
+- Shipped payment APIs used by 400 merchants
+
+Education
+B.Sc. Computer Science, State University, May 2015
+
+Skills:
+Python, Go, PostgreSQL, Kafka, AWS
+""" + "\n".join(f"- Delivered project {i} on time with measurable impact for stakeholders" for i in range(20))
+
+
+class TestATSScanner:
+    """Test the single-pass ATS readability scanner"""
+
+    def test_clean_resume_scores_full(self):
+        """Test a well-structured resume has no issues"""
+        result = scan_resume(CLEAN_RESUME)
+
+        assert result["score"] == 100
+        assert result["issues"] == []
+        assert result["metrics"]["section_headers"] == ['summary', 'experience', 'education', 'skills']
+        assert result["metrics"]["missing_sections"] == []
+        assert result["metrics"]["date_count"] == 2
+        assert result["metrics"]["bullet_density"] > 0.5
+
+    def test_table_artifacts_detected(self):
+        """Test pipe and column-gap layouts are flagged"""
+        table = "\n".join(f"Company {i} | Engineer | 2019 - 2021" for i in range(6))
+        result = scan_resume(CLEAN_RESUME + "\n" + table)
+
+        assert result["table_artifacts"] is True
+        assert result["metrics"]["table_artifact_lines"] == 6
+        assert any("Table" in issue for issue in result["issues"])
+
+    def test_short_and_fragmented_text(self):
+        """Test image-like extractions keep the legacy penalties"""
+        result = scan_resume("\n".join(["ab", "cd", "ef", "Jane Doe resume"]))
+
+        assert result["suspicious_low_length"] is True
+        assert result["column_structure_issues"] is True
+        assert result["score"] == 100 - 30 - 15 - 10
+
+    def test_paragraph_resume_lacks_bullets(self):
+        """Test long resumes without bullets get a bullet density warning"""
+        text = "Experience and education\n" + "\n".join(
+            f"In 2020 I worked on project number {i} and improved several internal systems." for i in range(25)
+        )
+        result = scan_resume(text)
+
+        assert result["metrics"]["bullet_lines"] == 0
+        assert any("bullet" in issue for issue in result["issues"])
+
+    def test_scan_is_linear_and_cheap(self):
+        """Test scanning a large batch of resumes stays fast enough for bulk rescoring"""
+        start = time.perf_counter()
+        for _ in range(500):
+            scan_resume(CLEAN_RESUME)
+        assert time.perf_counter() - start < 1.0
@@ -0,0 +1,90 @@
+from unittest.mock import MagicMock
+from sqlalchemy import event
+import config_manager
+from config_manager import get_config_manager
+from models import db, SystemConfiguration, SubscriptionTier, RateLimitConfig, ConfigVersion
+
+
+def seed():
+    db.session.add_all([
+        SystemConfiguration(config_key='max_file_size_mb', config_value=16, data_type='int'),
+        SubscriptionTier(name='pro', display_name='Pro', monthly_credits=20, position=2),
+        SubscriptionTier(name='legacy', display_name='Legacy', is_active=False),
+        RateLimitConfig(operation='analyze', subscription_tier='default', requests_per_hour=5,
+                        requests_per_day=20, cost_in_credits=1)
+    ])
+    db.session.commit()
+
+
+def count_statements(func):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, statements
+
+
+class TestConfigSnapshot:
+    """Test the process-wide configuration snapshot"""
+
+    def test_reads_served_from_snapshot(self, app):
+        """Test all three tables load once and reads then touch no database"""
+        seed()
+        manager = get_config_manager()
+        manager.reload()
+
+        def read():
+            return (
+                manager.get_config('max_file_size_mb'),
+                manager.get_subscription_tier('pro')['monthly_credits'],
+                manager.get_subscription_tier('legacy'),
+                manager.get_rate_limit('analyze', 'pro')['requests_per_hour'],
+                [t['name'] for t in manager.get_all_subscription_tiers()]
+            )
+
+        values, statements = count_statements(read)
+        assert values == (16, 20, None, 5, ['pro'])
+        assert statements == []
+        # Per-call instances share the snapshot
+        assert config_manager.ConfigManager(db).get_config('max_file_size_mb') == 16
+
+    def test_writes_reach_other_workers(self, app, monkeypatch):
+        """Test a version bump (or a pub/sub message) makes a worker reload"""
+        seed()
+        manager = get_config_manager()
+        assert manager.get_config('max_file_size_mb') == 16
+
+        # Another worker edits the config and bumps the version
+        SystemConfiguration.query.filter_by(config_key='max_file_size_mb').update({'config_value': 32})
+        db.session.add(ConfigVersion(id=1, version=1))
+        db.session.commit()
+        assert manager.get_config('max_file_size_mb') == 16
+
+        now = config_manager.time.monotonic()
+        monkeypatch.setattr(config_manager.time, 'monotonic', lambda: now + config_manager.VERSION_CHECK_SECONDS + 1)
+        assert manager.get_config('max_file_size_mb') == 32
+        assert manager.snapshot().version == 1
+
+        # A published change is picked up on the very next read
+        SystemConfiguration.query.filter_by(config_key='max_file_size_mb').update({'config_value': 64})
+        db.session.commit()
+        monkeypatch.setattr(config_manager, '_stale', True)
+        assert manager.get_config('max_file_size_mb') == 64
+
+    def test_admin_write_publishes(self, app, monkeypatch):
+        """Test writes bump the version, reload locally and notify other workers"""
+        redis = MagicMock()
+        monkeypatch.setattr(config_manager, '_get_redis', lambda: redis)
+        monkeypatch.setattr(config_manager, '_ensure_listener', lambda: True)
+        manager = get_config_manager()
+
+        assert manager.set_config('gemini_model', 'models/gemini-2.5-pro', 'string')
+        assert manager.get_config('gemini_model') == 'models/gemini-2.5-pro'
+        assert manager.set_config('gemini_model', 'models/gemini-2.5-flash', 'string')
+        assert manager.get_config('gemini_model') == 'models/gemini-2.5-flash'
+
+        assert ConfigVersion.query.get(1).version == 2
+        redis.publish.assert_called_with(config_manager.CONFIG_CHANNEL, 2)
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import threading
+from sqlalchemy import create_engine, event
+from models import db, User, CreditLedgerEntry
+from services import credit_ledger
+
+
+def make_user(credits):
+    user = User(email=f'ledger-{credits}@example.com', password_hash='x', credits=credits)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def balance(user_id):
+    db.session.expire_all()
+    return User.query.get(user_id).credits
+
+
+class TestCreditLedger:
+    """Test atomic credit changes and the audit ledger"""
+
+    def test_debit_is_conditional(self, app):
+        """Test debits charge in one statement and never overdraw"""
+        user_id = make_user(3)
+
+        assert credit_ledger.debit(user_id, 2, 'optimize') == 1
+        assert credit_ledger.debit(user_id, 2, 'optimize') is None
+        assert balance(user_id) == 1
+        assert credit_ledger.grant(user_id, 5, 'purchase') == 6
+        assert credit_ledger.debit(999, 1, 'analyze') is None
+
+        entries = CreditLedgerEntry.query.filter_by(user_id=user_id).order_by(CreditLedgerEntry.id).all()
+        assert [(e.kind, e.delta, e.balance_after) for e in entries] == [
+            ('debit', -2, 1), ('grant', 5, 6)
+        ]
+        assert sum(e.delta for e in entries) == balance(user_id) - 3
+
+    def test_reservations_settle_once(self, app):
+        """Test reserve/commit/refund and that a reservation cannot be settled twice"""
+        user_id = make_user(4)
+
+        kept = credit_ledger.reserve(user_id, 2, 'cover_letter')
+        returned = credit_ledger.reserve(user_id, 2, 'feedback')
+        assert balance(user_id) == 0
+        assert credit_ledger.reserve(user_id, 1, 'analyze') is None
+
+        assert credit_ledger.commit_reservation(kept)
+        assert credit_ledger.refund_reservation(returned)
+        assert balance(user_id) == 2
+
+        assert not credit_ledger.refund_reservation(returned)
+        assert not credit_ledger.refund_reservation(kept)
+        assert not credit_ledger.commit_reservation(returned)
+        assert balance(user_id) == 2
+        assert [e.kind for e in CreditLedgerEntry.query.order_by(CreditLedgerEntry.id)] == \
+            ['reserve', 'reserve', 'commit', 'refund']
+
+    def test_concurrent_charges(self, app, monkeypatch):
+        """Test many threads racing for the same balance neither overdraw nor lose updates"""
+        # A file database so every thread gets its own connection and transaction
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 30})
+        event.listen(engine, 'connect', lambda conn, _: conn.execute('PRAGMA journal_mode=WAL'))
+        monkeypatch.setitem(db.engines, None, engine)
+        try:
+            db.create_all()
+            user_id = make_user(60)
+            results, errors = [], []
+
+            def worker(n):
+                try:
+                    with app.app_context():
+                        for i in range(10):
+                            if (n + i) % 3:
+                                results.append(credit_ledger.debit(user_id, 1, 'analyze') is not None)
+                            else:
+                                reservation_id = credit_ledger.reserve(user_id, 2, 'optimize')
+                                if reservation_id is not None and i % 2:
+                                    credit_ledger.refund_reservation(reservation_id)
+                                elif reservation_id is not None:
+                                    credit_ledger.commit_reservation(reservation_id)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(12)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert errors == []
+            assert sum(results) > 0
+            # Each change saw the balance left by the one before it: no lost updates
+            running = 60
+            entries = CreditLedgerEntry.query.order_by(CreditLedgerEntry.id).all()
+            for entry in entries:
+                if entry.delta:
+                    running += entry.delta
+                    assert entry.balance_after == running >= 0
+            assert balance(user_id) == running
+            # No reservation is settled twice
+            settled = [e.settles_id for e in entries if e.settles_id is not None]
+            assert len(settled) == len(set(settled))
+        finally:
+            db.session.remove()
+            engine.dispose()
+            os.unlink(path)
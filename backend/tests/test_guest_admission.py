@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+import uuid
+from sqlalchemy import event
+from models import db, GuestSession
+from services import guest_admission
+
+
+class FakeRedis:
+    """Just enough of redis-py for the guest admission keys"""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hgetall(self, key):
+        return {k: str(v) for k, v in self.data.get(key, {}).items()}
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        entry = self.data.setdefault(key, {})
+        if mapping:
+            entry.update(mapping)
+        if field is not None:
+            entry[field] = value
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def hincrby(self, key, field, amount):
+        entry = self.data.setdefault(key, {})
+        entry[field] = int(entry.get(field, 0)) + amount
+        return entry[field]
+
+    def expire(self, key, seconds):
+        return True
+
+    expireat = expire
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        self.data.get(key, {}).pop(member, None)
+
+    def zremrangebyscore(self, key, low, high):
+        entries = self.data.get(key, {})
+        for member in [m for m, score in entries.items() if low <= score <= high]:
+            del entries[member]
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+def make_session(ip='10.0.0.1', device='device-1', credits=1):
+    session = GuestSession(
+        id=str(uuid.uuid4()),
+        session_token=f'guest_{ip}_{device}',
+        ip_address=ip,
+        device_fingerprint=device,
+        credits_remaining=credits,
+        expires_at=datetime.utcnow() + timedelta(hours=24)
+    )
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def count_statements(func):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, statements
+
+
+class TestGuestAdmission:
+    """Test guest session and analysis admission"""
+
+    def test_session_limit_per_ip_without_redis(self, client):
+        """Test the database fallback still caps new sessions per IP"""
+        headers = {'X-Forwarded-For': '203.0.113.7'}
+        for _ in range(guest_admission.SESSION_LIMIT_PER_IP):
+            response = client.post('/api/guest/session', json={}, headers=headers)
+            assert response.status_code == 201
+
+        response = client.post('/api/guest/session', json={}, headers=headers)
+        assert response.status_code == 429
+        assert response.get_json()['error_type'] == 'RATE_LIMIT_EXCEEDED'
+
+        token = client.post('/api/guest/session', json={}, headers={'X-Forwarded-For': '203.0.113.8'}).get_json()['guest_token']
+        info = client.get('/api/guest/session/info', headers={'Authorization': f'Bearer {token}'})
+        assert info.status_code == 200
+
+    def test_redis_checks_touch_no_database(self, app, monkeypatch):
+        """Test cached sessions and analysis claims are served from Redis"""
+        redis = FakeRedis()
+        monkeypatch.setattr(guest_admission, '_get_redis', lambda: redis)
+        session = make_session()
+        guest_admission.record_new_session(session)
+
+        def admit():
+            state = guest_admission.get_session(session.session_token)
+            return state, guest_admission.claim_analysis(state, '10.0.0.1')
+
+        (state, decision), statements = count_statements(admit)
+        assert statements == []
+        assert decision.allowed and state.credits_remaining == 0
+        assert guest_admission.check_new_session('10.0.0.1').allowed
+
+        # Unknown tokens are remembered as missing
+        assert guest_admission.get_session('guest_unknown') is None
+        _, statements = count_statements(lambda: guest_admission.get_session('guest_unknown'))
+        assert statements == []
+
+    def test_failed_analysis_releases_claim(self, app, monkeypatch):
+        """Test a claim is handed back and device limits apply across IPs"""
+        redis = FakeRedis()
+        monkeypatch.setattr(guest_admission, '_get_redis', lambda: redis)
+        session = make_session()
+        state = guest_admission.get_session(session.session_token)
+
+        decision = guest_admission.claim_analysis(state, '10.0.0.1')
+        assert decision.allowed
+        assert guest_admission.claim_analysis(state, '10.0.0.1').status_code == 402
+        guest_admission.release_claim(state, '10.0.0.1', decision)
+
+        state = guest_admission.get_session(session.session_token)
+        assert state.credits_remaining == 1
+        assert guest_admission.claim_analysis(state, '10.0.0.1').allowed
+
+        # Same device on a new IP and session is still over its daily limit
+        other = guest_admission.get_session(make_session(ip='10.0.0.2').session_token)
+        assert other.device_fingerprint == 'device-1'
+        denied = guest_admission.claim_analysis(other, '10.0.0.2')
+        assert denied.status_code == 429
+        assert redis.hgetall(guest_admission._session_key(other.token))['credits'] == '1'
+
+    def test_expired_key_and_purchase_refresh(self, app, monkeypatch):
+        """Test credit changes never recreate an expired session key and purchases refresh the cache"""
+        redis = FakeRedis()
+        monkeypatch.setattr(guest_admission, '_get_redis', lambda: redis)
+        session = make_session()
+        state = guest_admission.get_session(session.session_token)
+        key = guest_admission._session_key(session.session_token)
+
+        decision = guest_admission.claim_analysis(state, '10.0.0.1')
+        redis.delete(key)  # Session expired while the analysis ran
+        guest_admission.release_claim(state, '10.0.0.1', decision)
+        assert key not in redis.data
+
+        redis.delete(guest_admission._ip_analyses_key('10.0.0.1'))
+        redis.delete(guest_admission._device_analyses_key('device-1'))
+        state.credits_remaining = 1
+        assert guest_admission.claim_analysis(state, '10.0.0.1').status_code == 401
+        assert key not in redis.data
+
+        # A weekly pass tops the session up; the cached copy follows the database
+        session.credits_remaining = 1000
+        db.session.commit()
+        guest_admission.refresh_session(session)
+        assert guest_admission.get_session(session.session_token).credits_remaining == 1000
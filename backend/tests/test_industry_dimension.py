@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import db, Industry, Keyword, JobPostingKeyword, SkillDemandDaily
+from services import industry_service, market_rollup_service
+
+
+def industry_id(name):
+    return Industry.query.filter_by(name=name).one().id
+
+
+class TestIndustryResolution:
+    """Test canonical industry ids and alias resolution"""
+
+    def test_aliases_resolve_to_canonical_ids(self, app):
+        """Test names, synonyms and detected industries share one canonical id"""
+        technology = industry_service.resolve_industry_ids('Technology')
+        assert len(technology) == 1
+        for text in ('tech', ' TECHNOLOGY ', 'IT', 'software'):
+            assert industry_service.resolve_industry_ids(text) == technology
+
+        # INDUSTRY_DETECTION's 'Security' is a synonym, not a second industry
+        assert industry_service.resolve_industry_ids('Security') == [industry_id('Cybersecurity')]
+        assert Industry.query.filter_by(name='Security').first() is None
+        assert Industry.query.filter_by(name='Real Estate').first() is not None
+
+        # Fragments fall back to substring matching over aliases only
+        assert industry_service.resolve_industry_ids('estat') == [industry_id('Real Estate')]
+        assert industry_service.resolve_industry_ids('no such industry') == []
+        assert industry_service.resolve_industry_ids('') == []
+
+    def test_postings_get_ids_on_ingest(self, app):
+        """Test recorded postings and rollup cells carry the id, creating unseen industries"""
+        keyword = Keyword(keyword='python', keyword_type='skill', category='tech')
+        db.session.add(keyword)
+        db.session.flush()
+
+        rows = [JobPostingKeyword(keyword_id=keyword.id, industry=industry, extracted_at=datetime.utcnow())
+                for industry in ('Technology', 'tech ', 'Biotech', None)]
+        db.session.add_all(rows)
+        market_rollup_service.record_postings(rows)
+        db.session.commit()
+
+        technology, biotech = industry_id('Technology'), industry_id('Biotech')
+        assert [r.industry_id for r in rows] == [technology, technology, biotech, None]
+        assert {(c.industry, c.industry_id) for c in SkillDemandDaily.query} == \
+            {('Technology', technology), ('tech ', technology), ('Biotech', biotech), ('', None)}
+
+        # An exact alias wins over the substring fallback
+        assert industry_service.resolve_industry_ids('tech') == [technology]
+        assert industry_service.resolve_industry_ids('biote') == [biotech]
+
+
+class TestIndustryFilters:
+    """Test market queries filter on industry_id"""
+
+    def test_backfill_and_equality_filters(self, app):
+        """Test legacy rows are backfilled and filters compile to industry_id predicates"""
+        keywords = [Keyword(keyword='python', keyword_type='skill', category='Technology'),
+                    Keyword(keyword='excel', keyword_type='skill', category='finance')]
+        db.session.add_all(keywords)
+        db.session.flush()
+        for i in range(30):
+            db.session.add(JobPostingKeyword(
+                keyword_id=keywords[i % 2].id,
+                industry=['Technology', 'Finance', 'Information Technology'][i % 3],
+                extracted_at=datetime.utcnow() - timedelta(days=i)
+            ))
+        db.session.commit()
+
+        assert industry_service.backfill_industry_ids() == 30
+        assert JobPostingKeyword.query.filter(JobPostingKeyword.industry_id.is_(None)).count() == 0
+        assert industry_service.backfill_industry_ids() == 0
+        market_rollup_service.rebuild_rollup()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            start = market_rollup_service.window_start(90)
+            rows = market_rollup_service.aggregate_by_skill(start, industry='Technology')
+            with_category = market_rollup_service.aggregate_by_skill(start, industry='finance', match_category=True)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert all('like' not in sql.lower() for sql in statements)
+        # 'Information Technology' is an alias of Technology, as the substring filter matched it
+        assert sum(r.postings_count for r in rows) == 20
+        # Finance postings plus every Technology-industry posting of the finance-category skill
+        expected = JobPostingKeyword.query.filter(
+            (JobPostingKeyword.industry == 'Finance') | (JobPostingKeyword.keyword_id == keywords[1].id)
+        ).count()
+        assert sum(r.postings_count for r in with_category) == expected
@@ -0,0 +1,83 @@
+import time
+import pytest
+from services import language_detection
+from services.language_detection import detect_language
+
+
+SAMPLES = {
+    'en': 'Senior software engineer with eight years of experience building distributed systems and APIs.',
+    'fr': "Ingénieur logiciel avec huit ans d'expérience dans le développement de systèmes pour les clients et une équipe.",
+    'de': 'Softwareentwickler mit acht Jahren Erfahrung in der Entwicklung von Systemen und die Leitung für das Team.',
+    'es': 'Ingeniero de software con ocho años de experiencia en el desarrollo de sistemas y una gran pasión por los datos.',
+    'pt': 'Engenheiro de software com oito anos de experiência no desenvolvimento de sistemas para clientes, pela equipe que não para.',
+    'it': 'Ingegnere del software con otto anni di esperienza nello sviluppo di sistemi per i clienti della azienda, che sono nel cloud.',
+    'nl': 'Software engineer met acht jaar ervaring in het ontwikkelen van systemen voor klanten en een team, ook bij de overheid.',
+    'pl': 'Inżynier oprogramowania z ośmioletnim doświadczeniem w tworzeniu systemów dla klientów oraz zespołu, jest liderem przez dwa lata.',
+    'ru': 'Старший инженер-программист с восьмилетним опытом разработки распределенных систем и интерфейсов.',
+    'zh': '高级软件工程师，拥有八年分布式系统和应用程序接口开发经验，熟悉云计算平台和微服务架构设计，曾带领十人团队完成核心支付系统的重构与迁移。',
+    'ja': 'シニアソフトウェアエンジニアとして八年間の経験があり、分散システムとAPIの開発を担当しました。クラウド基盤とマイクロサービスの設計にも精通しています。',
+    'ko': '분산 시스템과 API 개발 경력 8년의 시니어 소프트웨어 엔지니어입니다. 클라우드 플랫폼에 익숙합니다.',
+    'ar': 'مهندس برمجيات أول يتمتع بخبرة ثماني سنوات في بناء الأنظمة الموزعة وواجهات برمجة التطبيقات.',
+    'hi': 'वितरित प्रणालियों और एपीआई के निर्माण में आठ वर्षों के अनुभव के साथ वरिष्ठ सॉफ्टवेयर इंजीनियर।',
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    language_detection.clear_cache()
+    yield
+    language_detection.clear_cache()
+
+
+class TestLanguageDetection:
+    """Test shared heuristic language detection"""
+
+    @pytest.mark.parametrize('expected', sorted(SAMPLES))
+    def test_detects_language(self, expected):
+        """Test each supported script and stopword language is detected"""
+        assert detect_language(SAMPLES[expected]) == expected
+
+    def test_short_text_defaults_to_english(self):
+        """Test text below the minimum length is treated as English"""
+        assert detect_language('Ingénieur logiciel de la') == 'en'
+        assert detect_language('') == 'en'
+        assert detect_language(None) == 'en'
+
+    def test_stopwords_match_whole_words_only(self):
+        """Test stopwords inside longer words do not count"""
+        text = 'Delivered detailed dashboards, designed elastic pipelines and deployed unit tests daily.'
+        assert detect_language(text) == 'en'
+
+    @pytest.mark.parametrize('text', [
+        'Engineering manager. I led a team of six engineers on payments, e.g. ledger and billing, '
+        'as a lead. Worked per client to plan each release.',
+        'Backend developer. I do code reviews w/ the team and I ship features weekly; '
+        'I own the on-call rota for our APIs.',
+    ])
+    def test_short_english_words_stay_english(self, text):
+        """Test English words and abbreviations that look like foreign stopwords do not flip the language"""
+        assert detect_language(text) == 'en'
+
+    def test_analyzers_share_detector(self):
+        """Test both AI services delegate to the shared detector"""
+        from gemini_service import GeminiService
+        service = GeminiService.__new__(GeminiService)
+        assert service.detect_language(SAMPLES['de']) == 'de'
+
+    def test_detection_benchmark(self):
+        """Micro-benchmark: uncached detection of resume-sized samples stays well under a millisecond each"""
+        base = SAMPLES['en'] * 12
+        texts = [f'{i} {base}' for i in range(2000)]
+
+        start = time.perf_counter()
+        results = [detect_language(text) for text in texts]
+        elapsed = time.perf_counter() - start
+
+        assert set(results) == {'en'}
+        assert elapsed < 1.0
+
+        start = time.perf_counter()
+        for text in texts[:200]:
+            detect_language(text)
+        cached = time.perf_counter() - start
+        assert cached < elapsed
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from sqlalchemy import event
+from models import db, User, CreditLedgerEntry
+from services import lifecycle_sweeps
+from services.subscription_service import SubscriptionService
+import email_automation
+
+
+def make_user(email, **fields):
+    user = User(email=email, password_hash='x', email_verified=True, **fields)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def reload(user_id):
+    db.session.expire_all()
+    return User.query.get(user_id)
+
+
+def count_updates(func):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return len([s for s in statements if s.startswith('UPDATE')])
+
+
+class TestLifecycleSweeps:
+    """Test set-based trial and re-engagement sweeps"""
+
+    def test_trial_expirations_in_batches(self, app, monkeypatch):
+        """Test expired trials are ended with one UPDATE per batch"""
+        monkeypatch.setattr(lifecycle_sweeps, 'SWEEP_BATCH_SIZE', 2)
+        past = datetime.utcnow() - timedelta(days=1)
+        free = [make_user(f'free{i}@example.com', is_trial_active=True, trial_end_date=past,
+                          subscription_tier='pro', subscription_status='active', credits=10) for i in range(3)]
+        paid = make_user('paid@example.com', is_trial_active=True, trial_end_date=past,
+                         subscription_tier='pro', subscription_status='active', subscription_id='sub_1', credits=10)
+        ongoing = make_user('ongoing@example.com', is_trial_active=True,
+                            trial_end_date=datetime.utcnow() + timedelta(days=1), subscription_tier='pro')
+
+        updates = count_updates(lambda: SubscriptionService.check_trial_expirations())
+        assert updates == 3  # Two batches of downgrades, one batch of ended paid trials
+
+        for user_id in free:
+            user = reload(user_id)
+            assert (user.is_trial_active, user.subscription_tier, user.credits) == (False, 'free', 3)
+            assert user.trial_expired_date is not None
+        user = reload(paid)
+        assert (user.is_trial_active, user.subscription_tier, user.credits) == (False, 'pro', 10)
+        assert reload(ongoing).is_trial_active
+        assert SubscriptionService.check_trial_expirations() == 0
+
+        # Downgrades are audited like every other balance change
+        entries = CreditLedgerEntry.query.order_by(CreditLedgerEntry.user_id).all()
+        assert [(e.user_id, e.kind, e.delta, e.balance_after, e.operation) for e in entries] == [
+            (user_id, 'reset', -7, 3, 'trial_expired') for user_id in free
+        ]
+
+    def test_short_batch_does_not_end_sweep(self, app, monkeypatch):
+        """Test rows dropped by the criteria re-check do not stop the sweep early"""
+        changed = make_user('changed@example.com', is_trial_active=False)
+        due = [make_user(f'due{i}@example.com', is_trial_active=True) for i in range(2)]
+        criteria = User.is_trial_active == True
+
+        # The first lookup also returns a row that stopped matching before the UPDATE
+        lookups = []
+        original = lifecycle_sweeps._next_ids
+        monkeypatch.setattr(lifecycle_sweeps, '_next_ids', lambda criteria, after_id, size: lookups.append(after_id) or (
+            [changed, due[0]] if after_id == 0 else original(criteria, after_id, size)))
+
+        batches = list(lifecycle_sweeps.sweep('test', criteria, {'is_trial_active': False}, batch_size=2))
+        assert [[row.id for row in rows] for rows in batches] == [[due[0]], [due[1]]]
+        assert lookups == [0, due[0], due[1]]
+        assert not any(reload(user_id).is_trial_active for user_id in due)
+
+    def test_grace_period_streams_downgraded_users(self, app):
+        """Test downgraded users get the final email once and failures stay unmarked"""
+        ended = datetime.utcnow() - timedelta(days=5)
+        fields = dict(is_trial_active=True, trial_end_date=ended, subscription_tier='pro')
+        fresh = make_user('fresh@example.com', **fields)
+        emailed = make_user('emailed@example.com', email_sequence_step=5, **fields)
+        bounced = make_user('bounced@example.com', **fields)
+
+        email_service = MagicMock()
+        email_service.generate_unsubscribe_token.return_value = None
+        email_service.send_trial_expired_email.side_effect = lambda email, *args: email != 'bounced@example.com'
+        email_automation.handle_grace_period_end(app, db, User, email_service)
+
+        assert [call.args[0] for call in email_service.send_trial_expired_email.call_args_list] == [
+            'fresh@example.com', 'bounced@example.com'
+        ]
+        for user_id in (fresh, emailed, bounced):
+            user = reload(user_id)
+            assert (user.subscription_tier, user.credits, user.is_trial_active) == ('free', 5, False)
+        assert sorted(e.user_id for e in CreditLedgerEntry.query.filter_by(
+            kind='reset', operation='grace_period_downgrade', delta=5)) == [fresh, emailed, bounced]
+        assert reload(fresh).email_sequence_step == 5 and reload(fresh).last_email_sent_date is not None
+        assert reload(bounced).email_sequence_step == 0 and reload(bounced).last_email_sent_date is None
+
+    def test_reengagement_marks_only_sent(self, app):
+        """Test re-engagement skips opted-out and recently emailed users"""
+        now = datetime.utcnow()
+        inactive = now - timedelta(days=20)
+        due = make_user('due@example.com', last_login=inactive, last_email_sent_date=now - timedelta(days=6))
+        make_user('recent@example.com', last_login=inactive, last_email_sent_date=now - timedelta(days=2))
+        opted_out = make_user('optout@example.com', last_login=inactive, email_preferences={'marketing': False})
+        make_user('active@example.com', last_login=now)
+
+        email_service = MagicMock()
+        email_service.generate_unsubscribe_token.return_value = None
+        email_service.send_reengagement_email.return_value = True
+        email_automation.check_inactive_users(app, db, User, email_service)
+
+        email_service.send_reengagement_email.assert_called_once_with('due@example.com', 'due', 20, None)
+        assert reload(due).last_email_sent_date > now - timedelta(minutes=1)
+        assert reload(opted_out).last_email_sent_date is None
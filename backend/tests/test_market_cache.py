@@ -0,0 +1,133 @@
+import pytest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import desc, func
+from models import db, User, Keyword, JobPostingKeyword
+from services import industry_service, market_cache
+import routes_job_seeker_insights
+
+
+@pytest.fixture
+def market(app):
+    keywords = [Keyword(keyword=name, keyword_type='skill', category='tech')
+                for name in ('python', 'sql', 'react')]
+    db.session.add_all(keywords)
+    db.session.flush()
+
+    rows = []
+    for i in range(60):
+        salary_min = (60 + i) * 1000 if i % 3 else None
+        rows.append(JobPostingKeyword(
+            keyword_id=keywords[i % 3].id,
+            job_posting_url=f'https://jobs.example.com/{i // 2}',
+            job_title=['Engineer', 'Analyst', 'Developer', None][i % 4],
+            salary_min=salary_min,
+            salary_max=salary_min + 20000 if salary_min else None,
+            industry='Technology',
+            location=['Remote', 'Austin, TX', 'New York, NY', ''][i % 4],
+            extracted_at=datetime.utcnow() - timedelta(days=i % 80)
+        ))
+    db.session.add_all(rows)
+    db.session.commit()
+    industry_service.backfill_industry_ids()
+    return keywords
+
+
+def make_user(email):
+    user = User(email=email, password_hash='x', preferred_industry='Technology')
+    db.session.add(user)
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+class TestMarketCache:
+    """Test the generation-keyed market response cache"""
+
+    def test_hit_until_generation_bump(self, app):
+        """Test payloads are reused until the generation is bumped"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'value': len(calls)}
+
+        assert market_cache.get_or_compute('demo', 'Technology', 90, compute) == {'value': 1}
+        assert market_cache.get_or_compute('demo', 'technology ', 90, compute) == {'value': 1}
+        assert market_cache.get_or_compute('demo', 'Technology', 30, compute) == {'value': 2}
+
+        market_cache.bump_generation('test')
+        assert market_cache.get_or_compute('demo', 'Technology', 90, compute) == {'value': 3}
+
+    def test_empty_payloads_not_cached(self, app):
+        """Test an empty (error) payload is recomputed on the next request"""
+        results = [{}, None, {'value': 1}]
+        compute = lambda: results.pop(0)
+
+        assert market_cache.get_or_compute('demo', None, 90, compute) == {}
+        assert market_cache.get_or_compute('demo', None, 90, compute) is None
+        assert market_cache.get_or_compute('demo', None, 90, compute) == {'value': 1}
+        assert market_cache.get_or_compute('demo', None, 90, compute) == {'value': 1}
+
+    def test_location_summary_matches_query(self, market):
+        """Test summing cached per-skill location stats equals the direct per-user query"""
+        skill_ids = {market[0].id, market[2].id}
+        stats = routes_job_seeker_insights.compute_location_skill_stats('tech')
+
+        expected = db.session.query(
+            JobPostingKeyword.location,
+            func.count(JobPostingKeyword.id).label('job_count'),
+            func.avg(JobPostingKeyword.salary_min).label('avg_salary_min'),
+            func.avg(JobPostingKeyword.salary_max).label('avg_salary_max'),
+            func.count(func.distinct(JobPostingKeyword.job_title)).label('unique_roles')
+        ).filter(
+            JobPostingKeyword.location.isnot(None),
+            JobPostingKeyword.location != '',
+            JobPostingKeyword.keyword_id.in_(skill_ids),
+            JobPostingKeyword.industry.ilike('%tech%')
+        ).group_by(JobPostingKeyword.location).order_by(desc('job_count')).all()
+
+        summary = routes_job_seeker_insights.summarize_locations(stats, skill_ids)
+        assert [s['job_count'] for s in summary] == [r.job_count for r in expected]
+
+        summary.sort(key=lambda s: s['location'])
+        expected.sort(key=lambda r: r.location)
+        assert [(s['location'], s['job_count'], s['unique_roles']) for s in summary] == \
+            [(r.location, r.job_count, r.unique_roles) for r in expected]
+        for s, r in zip(summary, expected):
+            assert s['avg_salary_min'] == pytest.approx(r.avg_salary_min)
+            assert s['avg_salary_max'] == pytest.approx(r.avg_salary_max)
+
+    def test_endpoints_cached_between_ingestions(self, client, market, monkeypatch):
+        """Test insights endpoints share one computation per industry and refresh after a bump"""
+        calls = []
+        original = routes_job_seeker_insights.compute_dashboard_market
+        monkeypatch.setattr(routes_job_seeker_insights, 'compute_dashboard_market',
+                            lambda industry=None: calls.append(industry) or original(industry))
+        first, second = make_user('a@example.com'), make_user('b@example.com')
+
+        for headers in (first, second):
+            for path in ('/api/insights/dashboard', '/api/insights/trending-skills',
+                         '/api/insights/location-intelligence', '/api/market/skills/demand',
+                         '/api/market/dashboard/summary'):
+                assert client.get(path, headers=headers).status_code == 200
+        assert len(calls) == 1
+
+        # The per-skill-set location summary is cached too
+        summaries = []
+        original_summary = routes_job_seeker_insights.summarize_locations
+        monkeypatch.setattr(routes_job_seeker_insights, 'summarize_locations',
+                            lambda *args: summaries.append(1) or original_summary(*args))
+        for headers in (first, second):
+            assert client.get('/api/insights/location-intelligence', headers=headers).status_code == 200
+        assert summaries == []
+
+        before = client.get('/api/insights/dashboard', headers=first).get_json()
+        db.session.add(JobPostingKeyword(keyword_id=market[0].id, job_posting_url='https://jobs.example.com/new',
+                                         industry='Technology', extracted_at=datetime.utcnow()))
+        db.session.commit()
+        assert client.get('/api/insights/dashboard', headers=first).get_json()['quick_stats'] == before['quick_stats']
+
+        market_cache.bump_generation('test')
+        after = client.get('/api/insights/dashboard', headers=first).get_json()
+        assert after['quick_stats']['total_jobs_in_market'] == before['quick_stats']['total_jobs_in_market'] + 1
+        assert len(calls) == 2
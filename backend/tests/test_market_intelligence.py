@@ -0,0 +1,246 @@
+import random
+import statistics
+import pytest
+from collections import Counter
+from datetime import datetime, timedelta
+from models import db, Keyword, JobPostingKeyword, SkillDemandDaily
+from market_intelligence_analyzer import MarketIntelligenceAnalyzer
+from services import industry_service, market_rollup_service
+
+DAY_OFFSETS = [d for d in range(121) if abs(d - 90) > 1]
+
+
+@pytest.fixture
+def postings(app):
+    rng = random.Random(42)
+    keywords = [Keyword(keyword=name, keyword_type='skill', category='tech')
+                for name in ('python', 'sql', 'react', 'excel')]
+    db.session.add_all(keywords)
+    db.session.flush()
+
+    rows = []
+    for i in range(600):
+        salary_min = rng.choice([0, None, rng.randint(50, 150) * 1000])
+        rows.append(JobPostingKeyword(
+            keyword_id=rng.choice(keywords).id,
+            frequency=rng.randint(1, 3),
+            salary_min=salary_min,
+            salary_max=salary_min + rng.randint(0, 40) * 1000 if salary_min else None,
+            source=rng.choice(['indeed', 'adzuna', 'linkedin', None]),
+            industry=rng.choice(['Technology', 'Finance', 'Healthcare']),
+            location=rng.choice(['New York, NY', 'Austin, TX', 'Remote', '']),
+            # Keep clear of the 90-day boundary so day- and timestamp-based cutoffs agree
+            extracted_at=datetime.utcnow() - timedelta(days=rng.choice(DAY_OFFSETS), hours=rng.randint(0, 12))
+        ))
+    db.session.add_all(rows)
+    db.session.commit()
+    industry_service.backfill_industry_ids()
+    return rows
+
+
+def exact_demand(rows, limit_days=90, industry=None):
+    """Reference implementation mirroring the original row-by-row aggregation"""
+    cutoff = datetime.utcnow() - timedelta(days=limit_days)
+    selected = [r for r in rows if r.extracted_at >= cutoff
+                and (not industry or industry.lower() in (r.industry or '').lower())]
+    result = {}
+    for kid in {r.keyword_id for r in selected}:
+        mine = [r for r in selected if r.keyword_id == kid]
+        salaries = [(r.salary_min + r.salary_max) / 2 for r in mine if r.salary_min and r.salary_max]
+        result[kid] = {
+            'postings_count': len(mine),
+            'demand_percentage': round(len(mine) / len(selected) * 100, 2),
+            'average_salary': round(statistics.mean(salaries), 2) if salaries else None,
+            'median_salary': round(statistics.median(salaries), 2) if salaries else None,
+            'salary_range': round(max(salaries) - min(salaries), 2) if salaries else None,
+            'industries': Counter(r.industry for r in mine if r.industry),
+        }
+    return result
+
+
+class TestSkillMarketDemand:
+    """Test database-side / streaming market demand aggregation"""
+
+    @pytest.mark.parametrize('use_rollup', [True, False])
+    @pytest.mark.parametrize('industry', [None, 'tech'])
+    def test_matches_exact(self, postings, industry, use_rollup, monkeypatch):
+        """Test rollup reads and the raw streaming fallback reproduce row-by-row statistics"""
+        if not use_rollup:
+            monkeypatch.setattr(market_rollup_service, 'ensure_rollup', lambda: False)
+        analyzer = MarketIntelligenceAnalyzer(db=db)
+        demand = analyzer.get_skill_market_demand(limit_days=90, industry=industry)
+        expected = exact_demand(postings, industry=industry)
+
+        assert set(demand) == set(expected)
+        for kid, data in demand.items():
+            for field in ('postings_count', 'demand_percentage', 'average_salary',
+                          'median_salary', 'salary_range'):
+                assert data[field] == expected[kid][field], field
+            top = expected[kid]['industries'].most_common(3)
+            assert sorted(data['top_industries'].values(), reverse=True) == [count for _, count in top]
+
+    def test_no_postings(self, app):
+        """Test an empty window returns no skills"""
+        analyzer = MarketIntelligenceAnalyzer(db=db)
+        assert analyzer.get_skill_market_demand(limit_days=30) == {}
+
+
+def rollup_snapshot():
+    return sorted(
+        (c.day, c.keyword_id, c.industry, c.location, c.source, c.postings_count, c.frequency_sum,
+         c.salary_count, round(c.salary_sum, 2), c.salary_low, c.salary_high,
+         c.salary_min_count, round(c.salary_min_sum, 2), c.salary_max_count, round(c.salary_max_sum, 2))
+        for c in SkillDemandDaily.query.all()
+    )
+
+
+class TestSkillDemandRollup:
+    """Test the daily skill demand rollup"""
+
+    def test_incremental_matches_rebuild(self, postings):
+        """Test folding new rows in incrementally equals rebuilding from raw rows"""
+        market_rollup_service.rebuild_rollup()
+        keyword_id = postings[0].keyword_id
+
+        new_rows = [
+            JobPostingKeyword(keyword_id=keyword_id, frequency=2, salary_min=90000, salary_max=110000,
+                              source='indeed', industry='Technology', location='Remote',
+                              extracted_at=datetime.utcnow()),
+            JobPostingKeyword(keyword_id=keyword_id, frequency=1, salary_min=None, salary_max=None,
+                              source=None, industry='Finance', location=None,
+                              extracted_at=datetime.utcnow() - timedelta(days=3)),
+        ]
+        db.session.add_all(new_rows)
+        db.session.flush()
+        market_rollup_service.record_postings(new_rows)
+        db.session.commit()
+        incremental = rollup_snapshot()
+
+        market_rollup_service.rebuild_rollup()
+        assert incremental == rollup_snapshot()
+
+    def test_digest_backfill_keeps_purged_days(self, postings):
+        """Test refreshing cells without digests leaves days older than the raw rows in place"""
+        market_rollup_service.rebuild_rollup()
+        before = rollup_snapshot()
+        SkillDemandDaily.query.update({'salary_digest': None})
+        cutoff = datetime.utcnow() - timedelta(days=90)
+        JobPostingKeyword.query.filter(JobPostingKeyword.extracted_at < cutoff).delete()
+        db.session.commit()
+
+        market_rollup_service.refresh_rollup()
+        assert rollup_snapshot() == before
+        backed = market_rollup_service.window_start(market_rollup_service._raw_backed_days())
+        assert not SkillDemandDaily.query.filter(
+            SkillDemandDaily.day >= backed, SkillDemandDaily.salary_count > 0,
+            SkillDemandDaily.salary_digest.is_(None)).count()
+        assert SkillDemandDaily.query.filter(
+            SkillDemandDaily.day < backed, SkillDemandDaily.salary_count > 0).count()
+
+    def test_trend_and_industry_reads(self, postings):
+        """Test salary trends and industry requirements read consistent totals from the rollup"""
+        analyzer = MarketIntelligenceAnalyzer(db=db)
+        keyword_id = postings[0].keyword_id
+
+        trends = analyzer.get_salary_trends(keyword_id, limit_days=180)
+        expected = sum(1 for r in postings if r.keyword_id == keyword_id)
+        assert trends['total_postings'] == expected
+
+        requirements = analyzer.get_industry_skill_requirements('finance', limit_days=180)
+        assert requirements['postings_analyzed'] == sum(1 for r in postings if r.industry == 'Finance')
+        frequencies = [skill['demand_frequency'] for skill in requirements['top_skills']]
+        assert frequencies == sorted(frequencies, reverse=True)
+
+    def test_salary_percentiles_from_digests(self, postings):
+        """Test location and monthly medians/percentiles from cell digests match exact values"""
+        analyzer = MarketIntelligenceAnalyzer(db=db)
+        keyword_id = postings[0].keyword_id
+
+        def mids(rows):
+            return sorted((r.salary_min + r.salary_max) / 2 for r in rows if r.salary_min and r.salary_max)
+
+        austin = mids(r for r in postings if r.location == 'Austin, TX' and r.keyword_id == keyword_id)
+        insights = analyzer.get_location_salary_insights('austin', skill_id=keyword_id)
+        assert insights['median_salary'] == round(statistics.median(austin), 2)
+        assert insights['salary_percentiles']['p90'] == round(statistics.quantiles(austin, n=10, method='inclusive')[-1], 2)
+        assert (insights['min_salary'], insights['max_salary']) == (austin[0], austin[-1])
+
+        trends = analyzer.get_salary_trends(keyword_id, limit_days=180)
+        for month in trends['monthly_data']:
+            values = mids(r for r in postings if r.keyword_id == keyword_id
+                          and r.extracted_at.strftime('%Y-%m') == month['month'])
+            assert month['median_salary'] == (round(statistics.median(values), 2) if values else None)
+
+
+def two_window_trends(industry=None):
+    """Reference: the original two grouped queries classified in Python"""
+    now = datetime.utcnow()
+    recent_start, previous_start = (now - timedelta(days=30)).date(), (now - timedelta(days=90)).date()
+    recent = {r.keyword_id: int(r.postings_count) for r in market_rollup_service.aggregate_by_skill(
+        recent_start, industry=industry, match_category=True)}
+    previous = {r.keyword_id: int(r.postings_count) for r in market_rollup_service.aggregate_by_skill(
+        previous_start, end_day=recent_start, industry=industry, match_category=True)}
+
+    result = {}
+    for kid, curr in recent.items():
+        prev = previous.get(kid, 0)
+        if prev == 0:
+            result[kid] = ('emerging' if curr >= 3 else None, curr, 0)
+            continue
+        change = (curr - prev) / prev * 100
+        trend = 'growing' if change >= 25 else 'declining' if change <= -25 else 'stable'
+        result[kid] = (trend, curr, prev)
+    return result
+
+
+class TestSkillTrends:
+    """Test single-pass current vs previous window trend classification"""
+
+    @pytest.mark.parametrize('industry', [None, 'tech', 'finance'])
+    def test_matches_two_window_queries(self, postings, industry):
+        """Test FILTER aggregates and SQL classification match the two-query comparison"""
+        from sqlalchemy import event
+
+        market_rollup_service.ensure_rollup()
+        # Skew one skill so every class shows up
+        cutoff = datetime.utcnow() - timedelta(days=25)
+        for row in postings[:200]:
+            if row.keyword_id == postings[0].keyword_id and row.extracted_at < cutoff:
+                row.extracted_at = datetime.utcnow() - timedelta(days=5)
+        db.session.commit()
+        market_rollup_service.rebuild_rollup()
+
+        now = datetime.utcnow()
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            rows = market_rollup_service.aggregate_trends(
+                (now - timedelta(days=30)).date(), (now - timedelta(days=90)).date(),
+                industry=industry, match_category=True
+            )
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert len(statements) == 1
+        expected = two_window_trends(industry)
+        assert {r.keyword_id: (r.trend, r.current_count, r.previous_count) for r in rows} == expected
+        for r in rows:
+            if r.previous_count:
+                assert r.change_percentage == pytest.approx((r.current_count - r.previous_count) / r.previous_count * 100)
+
+    def test_trending_payload(self, postings):
+        """Test the endpoint helper buckets rows and reports velocity over every current skill"""
+        from routes_job_seeker_insights import compute_skill_trends
+
+        trends = compute_skill_trends()
+        expected = two_window_trends()
+        classes = Counter(trend for trend, _, _ in expected.values())
+        assert [s['skill_id'] for s in trends['growing']] == \
+            [s['skill_id'] for s in sorted(trends['growing'], key=lambda s: -s['change_percentage'])]
+        assert len(trends['growing']) == classes['growing']
+        assert len(trends['declining']) == classes['declining']
+        assert len(trends['emerging']) == classes['emerging']
+        assert trends['stable_count'] == classes['stable']
+        changing = classes['growing'] + classes['declining'] + classes['emerging']
+        assert trends['market_velocity'] == round(changing / len(expected) * 100, 1)
@@ -0,0 +1,85 @@
+import threading
+import time
+from services.memory_cache import MemoryCache, MISSING
+
+
+class TestMemoryCache:
+    """Test the shared LRU/TTL cache"""
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first"""
+        cache = MemoryCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Test entries expire after their TTL and count as misses"""
+        now = [1000.0]
+        monkeypatch.setattr('services.memory_cache.time.monotonic', lambda: now[0])
+        cache = MemoryCache(ttl_seconds=10)
+        cache.set('short', 'x', ttl_seconds=1)
+        cache.set('long', 'y')
+
+        now[0] += 5
+        assert cache.get('short', MISSING) is MISSING
+        assert cache.get('long') == 'y'
+
+        stats = cache.get_stats()
+        assert stats['expirations'] == 1
+        assert stats['hits'] == 1 and stats['misses'] == 1
+
+    def test_byte_limit(self):
+        """Test total size stays under max_bytes and oversized values are rejected"""
+        cache = MemoryCache(max_entries=100, max_bytes=300, sizeof=len)
+        cache.set('a', 'x' * 100)
+        cache.set('b', 'x' * 100)
+        cache.set('c', 'x' * 150)
+
+        assert 'a' not in cache
+        assert cache.get_stats()['bytes'] == 250
+        assert cache.set('huge', 'x' * 301) is False
+        assert 'huge' not in cache
+
+    def test_cached_none_is_distinguishable(self):
+        """Test a stored None is a hit when a sentinel default is used"""
+        cache = MemoryCache()
+        cache.set('key', None)
+        assert cache.get('key', MISSING) is None
+        assert cache.get('other', MISSING) is MISSING
+
+    def test_concurrent_access(self):
+        """Test concurrent writers never exceed the entry limit"""
+        cache = MemoryCache(max_entries=50)
+
+        def worker(offset):
+            for i in range(2000):
+                cache.set((offset, i), i)
+                cache.get((offset, i - 1))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(cache) == 50
+        assert cache.get_stats()['evictions'] == 8 * 2000 - 50
+
+    def test_constant_time_operations(self):
+        """Test set/get cost does not grow with cache size"""
+        cache = MemoryCache(max_entries=100000)
+        for i in range(100000):
+            cache.set(i, i)
+
+        start = time.perf_counter()
+        for i in range(10000):
+            cache.set(('new', i), i)
+            cache.get(i)
+        assert time.perf_counter() - start < 0.5
@@ -0,0 +1,59 @@
+from datetime import date, datetime, timedelta
+from models import db, Keyword, JobPostingKeyword
+from services import posting_retention
+
+
+def add_postings(ages_in_days):
+    keyword = Keyword(keyword='python', keyword_type='skill', category='tech')
+    db.session.add(keyword)
+    db.session.flush()
+    db.session.add_all([
+        JobPostingKeyword(keyword_id=keyword.id, industry='Technology',
+                          extracted_at=datetime.utcnow() - timedelta(days=age, hours=1))
+        for age in ages_in_days
+    ])
+    db.session.commit()
+
+
+class TestPostingRetention:
+    """Test batched, resumable posting cleanup"""
+
+    def test_batched_delete_resumes(self, app):
+        """Test expired rows go in bounded batches and a paused run resumes"""
+        add_postings([d for d in range(0, 200, 2)])
+        cutoff = datetime.utcnow() - timedelta(days=90)
+        expired = JobPostingKeyword.query.filter(JobPostingKeyword.extracted_at < cutoff).count()
+
+        paused = posting_retention.delete_in_batches(cutoff, batch_size=7, time_budget_seconds=0)
+        assert paused == {'rows_deleted': 0, 'batches': 0, 'complete': False}
+
+        result = posting_retention.delete_in_batches(cutoff, batch_size=7)
+        assert result['complete'] is True
+        assert result['rows_deleted'] == expired
+        assert result['batches'] == -(-expired // 7)
+        assert JobPostingKeyword.query.filter(JobPostingKeyword.extracted_at < cutoff).count() == 0
+        assert JobPostingKeyword.query.count() == 100 - expired
+
+    def test_cleanup_job_reports_metrics(self, app):
+        """Test the scheduled cleanup uses extracted_at and logs progress metrics"""
+        import scheduled_ingestion_tasks
+        from job_scheduler import get_scheduler
+
+        add_postings([1, 30, 95, 120, 150])
+        result = scheduled_ingestion_tasks.cleanup_old_data()
+
+        assert result['success'] is True
+        metrics = result['metrics']
+        assert metrics['partitioned'] is False
+        assert metrics['rows_deleted'] == 3 and metrics['complete'] is True
+        assert JobPostingKeyword.query.count() == 2
+        assert get_scheduler().tasks['cleanup_old_data']['last_metrics']['rows_deleted'] == 3
+
+    def test_partition_naming(self):
+        """Test monthly partition bounds roll over year ends"""
+        assert posting_retention.add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+        assert posting_retention.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+        assert posting_retention.partition_name(date(2026, 3, 1)) == 'job_posting_keyword_p2026_03'
+        assert posting_retention.create_partition_sql(date(2026, 12, 1)).endswith(
+            "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+        )
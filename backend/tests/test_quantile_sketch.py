@@ -0,0 +1,78 @@
+import bisect
+import random
+import statistics
+import pytest
+from services.quantile_sketch import TDigest
+
+
+def exact_quantile(values, q):
+    """Linear-interpolated quantile (PostgreSQL percentile_cont)"""
+    ordered = sorted(values)
+    rank = q * (len(ordered) - 1)
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (rank - lower) * (ordered[upper] - ordered[lower])
+
+
+class TestTDigest:
+    """Test the mergeable salary quantile sketch"""
+
+    @pytest.mark.parametrize('size', [1, 2, 7, 50, 199])
+    def test_small_samples_are_exact(self, size):
+        """Test digests below the compression threshold reproduce exact quantiles"""
+        rng = random.Random(size)
+        values = [rng.randint(40, 200) * 500 for _ in range(size)]
+        digest = TDigest()
+        for value in values:
+            digest.add(value)
+
+        assert digest.quantile(0.5) == pytest.approx(statistics.median(values))
+        for q in (0, 0.25, 0.75, 0.9, 1):
+            assert digest.quantile(q) == pytest.approx(exact_quantile(values, q))
+
+    def test_merged_digests_accuracy(self):
+        """Test merging many serialized cell digests stays within 1% rank error"""
+        rng = random.Random(7)
+        values = []
+        cells = []
+        for _ in range(300):
+            digest = TDigest()
+            for _ in range(rng.randint(1, 120)):
+                value = round(rng.lognormvariate(11.3, 0.4), -2)
+                values.append(value)
+                digest.add(value)
+            cells.append(digest.to_list())
+
+        merged = TDigest()
+        for stored in cells:
+            merged.merge(TDigest.from_list(stored))
+
+        ordered = sorted(values)
+        assert merged.count == len(values)
+        assert len(merged.to_list()) < 6 * merged.compression
+        for q in (0.25, 0.5, 0.75, 0.9):
+            estimate = merged.quantile(q)
+            rank = bisect.bisect_left(ordered, estimate) / len(ordered)
+            assert abs(rank - q) < 0.01, q
+            assert estimate == pytest.approx(exact_quantile(values, q), rel=0.02)
+
+    def test_merge_order_independent(self):
+        """Test the tails stay exact and merge order barely moves the median"""
+        rng = random.Random(3)
+        values = [rng.uniform(30000, 250000) for _ in range(5000)]
+        forward, backward = TDigest(), TDigest()
+        for value in values:
+            forward.add(value)
+        for value in reversed(values):
+            backward.add(value)
+
+        assert forward.quantile(0) == backward.quantile(0) == min(values)
+        assert forward.quantile(1) == backward.quantile(1) == max(values)
+        assert forward.quantile(0.5) == pytest.approx(backward.quantile(0.5), rel=0.005)
+
+    def test_empty_digest(self):
+        """Test an empty digest reports no quantiles"""
+        digest = TDigest.from_list(None)
+        assert digest.quantile(0.5) is None
+        assert digest.percentiles() is None
+        assert TDigest().add(100000).percentiles() == {'p25': 100000, 'p50': 100000, 'p75': 100000, 'p90': 100000}
@@ -0,0 +1,201 @@
+import math
+import random
+import pytest
+from collections import defaultdict
+from models import db, User, Analysis, Keyword, SkillExtraction
+from services import skill_cooccurrence
+from services.skill_cooccurrence import SkillCooccurrenceEngine
+from skill_relationship_analyzer import SkillRelationshipAnalyzer
+
+
+@pytest.fixture
+def engine(app, tmp_path, monkeypatch):
+    engine = SkillCooccurrenceEngine(str(tmp_path / 'cooccurrence.npz'))
+    monkeypatch.setattr(skill_cooccurrence, '_cooccurrence_engine', engine)
+    return engine
+
+
+@pytest.fixture
+def extractions(app):
+    rng = random.Random(11)
+    user = User(email='cooccur@example.com', password_hash='x')
+    keywords = [Keyword(keyword=name, keyword_type='skill', category='tech')
+                for name in ('python', 'django', 'sql', 'react', 'docker', 'excel')]
+    db.session.add(user)
+    db.session.add_all(keywords)
+    db.session.flush()
+
+    analyses = []
+    for _ in range(40):
+        analysis = Analysis(user_id=user.id, match_score=70)
+        db.session.add(analysis)
+        db.session.flush()
+        analyses.append(analysis)
+        for keyword in rng.sample(keywords, rng.randint(1, 4)):
+            db.session.add(SkillExtraction(
+                analysis_id=analysis.id, extracted_text=keyword.keyword, matched_keyword_id=keyword.id,
+                confidence=0.9, user_confirmed=rng.random() < 0.8
+            ))
+    db.session.commit()
+    return analyses, keywords
+
+
+def naive_cooccurrences():
+    """Reference: the original pairwise loop over confirmed extractions"""
+    analysis_skills = defaultdict(set)
+    for extraction in SkillExtraction.query.filter_by(user_confirmed=True):
+        analysis_skills[extraction.analysis_id].add(extraction.matched_keyword_id)
+
+    result = defaultdict(lambda: defaultdict(int))
+    for skills in analysis_skills.values():
+        skill_list = list(skills)
+        for i, skill_a in enumerate(skill_list):
+            for skill_b in skill_list[i + 1:]:
+                result[skill_a][skill_b] += 1
+                result[skill_b][skill_a] += 1
+    return {skill: dict(related) for skill, related in result.items()}, analysis_skills
+
+
+class TestSkillCooccurrenceEngine:
+    """Test the sparse X^T X co-occurrence engine"""
+
+    def test_matches_pairwise_counts(self, extractions, engine):
+        """Test the sparse matrix reproduces the pairwise co-occurrence counts"""
+        analyzer = SkillRelationshipAnalyzer(db=db)
+        expected, _ = naive_cooccurrences()
+        assert analyzer.get_skill_cooccurrences() == expected
+        assert analyzer.get_skill_cooccurrences(limit_days=30) == expected
+
+    def test_incremental_updates_match_rebuild(self, extractions, engine, tmp_path):
+        """Test confirm/reject/new-analysis updates equal a full rebuild and survive a reload"""
+        analyses, keywords = extractions
+        engine.rebuild()
+
+        pending = SkillExtraction.query.filter_by(user_confirmed=False).first()
+        pending.user_confirmed = True
+        confirmed = SkillExtraction.query.filter(
+            SkillExtraction.analysis_id != pending.analysis_id,
+            SkillExtraction.user_confirmed == True
+        ).first()
+        confirmed.user_confirmed = False
+
+        new_keyword = Keyword(keyword='rust', keyword_type='skill', category='tech')
+        db.session.add(new_keyword)
+        db.session.flush()
+        for keyword in (new_keyword, keywords[0]):
+            db.session.add(SkillExtraction(analysis_id=analyses[0].id, extracted_text=keyword.keyword,
+                                           matched_keyword_id=keyword.id, confidence=1.0, user_confirmed=True))
+        db.session.commit()
+
+        changed = engine.update_analyses({pending.analysis_id, confirmed.analysis_id, analyses[0].id})
+        assert changed >= 2
+        expected, _ = naive_cooccurrences()
+        assert engine.as_dict() == expected
+
+        reloaded = SkillCooccurrenceEngine(engine.path)
+        assert reloaded.as_dict() == expected
+        assert reloaded.get_stats()['analyses'] == engine.get_stats()['analyses']
+
+        rebuilt = SkillCooccurrenceEngine(str(tmp_path / 'fresh.npz'))
+        rebuilt.rebuild()
+        assert rebuilt.as_dict() == expected
+
+    def test_lift_and_recommendations(self, extractions, engine):
+        """Test lift/PMI scoring and multi-skill recommendations against direct counts"""
+        _, keywords = extractions
+        expected, analysis_skills = naive_cooccurrences()
+        total = len(analysis_skills)
+        frequency = defaultdict(int)
+        for skills in analysis_skills.values():
+            for skill in skills:
+                frequency[skill] += 1
+
+        python_id = keywords[0].id
+        for related_id, lift, count in engine.related(python_id, top_n=10, scoring='lift'):
+            assert count == expected[python_id][related_id]
+            assert lift == pytest.approx(count * total / (frequency[python_id] * frequency[related_id]))
+        pmi = engine.related(python_id, top_n=1, scoring='pmi')[0]
+        assert pmi[1] == pytest.approx(max(math.log2(l) for _, l, _ in engine.related(python_id, scoring='lift')))
+
+        inputs = {keywords[0].id, keywords[1].id}
+        recommendations = engine.recommend(inputs, top_n=3)
+        sums = defaultdict(int)
+        for skill in inputs:
+            for related_id, count in expected.get(skill, {}).items():
+                if related_id not in inputs:
+                    sums[related_id] += count
+        assert [score for _, score, _ in recommendations] == sorted(sums.values(), reverse=True)[:3]
+
+        analyzer = SkillRelationshipAnalyzer(db=db)
+        named = analyzer.recommend_related_skills(['Python', 'Django'], top_n=3)
+        assert [r['recommendation_score'] for r in named] == [int(score) for _, score, _ in recommendations]
+
+
+class TestPersistSkillRelationships:
+    """Test set-based persistence of skill relationships"""
+
+    def test_bulk_upsert(self, extractions, engine):
+        """Test relationships are upserted in a constant number of statements"""
+        from sqlalchemy import event
+        from models import SkillRelationship
+
+        analyzer = SkillRelationshipAnalyzer(db=db)
+        expected, _ = naive_cooccurrences()
+        expected_pairs = {
+            (a, b): count for a, related in expected.items() for b, count in related.items()
+            if a < b and count >= analyzer.min_cooccurrence_threshold
+        }
+        engine.rebuild()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            persisted = analyzer.persist_skill_relationships()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert persisted == len(expected_pairs)
+        assert len(statements) <= 3
+        stored = {(r.skill_1_id, r.skill_2_id): r.co_occurrence_count for r in SkillRelationship.query}
+        assert stored == expected_pairs
+        assert all(0 < r.relationship_strength <= 1 for r in SkillRelationship.query)
+
+        # Nothing changed: every pair is skipped
+        assert analyzer.persist_skill_relationships() == 0
+
+    def test_upsert_refreshes_strength_and_deletes_stale(self, extractions, engine, monkeypatch):
+        """Test a pair with an unchanged count but new strength is updated and vanished pairs are removed"""
+        from models import SkillRelationship
+
+        analyzer = SkillRelationshipAnalyzer(db=db)
+        engine.rebuild()
+        analyzer.persist_skill_relationships()
+        pairs = analyzer._relationship_pairs()
+        (changed, (count, strength)), (dropped, _) = sorted(pairs.items())[:2]
+        keyword_ids = [k.id for k in extractions[1]]
+        db.session.add(SkillRelationship(skill_1_id=keyword_ids[0], skill_2_id=keyword_ids[0],
+                                         relationship_type='prerequisite', relationship_strength=1.0))
+        db.session.commit()
+
+        # Skill frequencies moved: same count, new strength; one pair fell below the threshold
+        pairs[changed] = (count, round(strength / 2, 4))
+        del pairs[dropped]
+        monkeypatch.setattr(analyzer, '_relationship_pairs', lambda: pairs)
+        stats = analyzer._upsert_relationships()
+        assert (stats['updated'], stats['deleted'], stats['inserted']) == (1, 1, 0)
+
+        stored = {(r.skill_1_id, r.skill_2_id): r for r in SkillRelationship.query}
+        assert stored[changed].relationship_strength == round(strength / 2, 4)
+        assert dropped not in stored
+        assert stored[(keyword_ids[0], keyword_ids[0])].relationship_type == 'prerequisite'
+
+    def test_rebuild_job_reports_counts(self, extractions, engine):
+        """Test the nightly job rebuilds the matrix and reports row counts"""
+        import scheduled_ingestion_tasks
+
+        result = scheduled_ingestion_tasks.rebuild_skill_relationships()
+        assert result['success'] is True
+        stats = result['relationships_updated']
+        assert stats['inserted'] == stats['pairs'] > 0
+        assert stats['updated'] == stats['unchanged'] == 0
@@ -0,0 +1,114 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from models import db, User, Keyword, JobPostingKeyword
+from market_intelligence_analyzer import MarketIntelligenceAnalyzer
+from services import market_rollup_service, skill_gap_index
+
+SKILLS = ['python', 'sql', 'excel', 'react', 'docker', 'tableau', 'aws', 'java']
+
+
+@pytest.fixture
+def postings(app):
+    rng = random.Random(5)
+    keywords = [Keyword(keyword=name, keyword_type='skill', category='tech') for name in SKILLS]
+    db.session.add_all(keywords)
+    db.session.flush()
+
+    rows = []
+    for i in range(400):
+        title = rng.choice(['Senior Data Analyst', 'Data Analyst II', 'Backend Engineer', 'Nurse'])
+        # Analysts lean on sql / excel / tableau, engineers on python / docker / aws
+        weights = [5, 9, 8, 1, 1, 7, 1, 1] if 'Analyst' in title else [9, 3, 1, 3, 7, 1, 6, 4]
+        rows.append(JobPostingKeyword(
+            keyword_id=rng.choices(keywords, weights)[0].id,
+            job_title=title,
+            industry='Healthcare' if title == 'Nurse' else rng.choice(['Technology', 'Finance']),
+            extracted_at=datetime.utcnow() - timedelta(days=rng.randint(0, 120), hours=6)
+        ))
+    db.session.add_all(rows)
+    market_rollup_service.record_postings(rows)
+    db.session.commit()
+    return keywords
+
+
+class TestSkillGapIndex:
+    """Test gap analysis over precomputed demand vectors"""
+
+    def test_matches_market_demand_ranking(self, postings):
+        """Test the all-postings vector reproduces the top-20 demand comparison"""
+        analyzer = MarketIntelligenceAnalyzer(db=db)
+        demand = analyzer.get_skill_market_demand(limit_days=90)
+        top = sorted(demand.values(), key=lambda d: (-d['postings_count'], d['skill_id']))[:20]
+        user_skills = ['Python', 'excel', 'kotlin']
+
+        analysis = analyzer.get_skill_gap_analysis(user_skills)
+        assert analysis['demand_scope'] == 'all'
+        assert [s['skill_id'] for s in analysis['have_skills']] == \
+            [d['skill_id'] for d in top if d['skill_name'] in ('python', 'excel')]
+        assert analysis['missing_skills'] == len(top) - 2
+        for skill in analysis['have_skills']:
+            assert skill['market_demand_score'] == demand[skill['skill_id']]['market_demand_score']
+            assert skill['postings_count'] == demand[skill['skill_id']]['postings_count']
+
+    def test_role_then_industry_then_all(self, postings):
+        """Test the most specific vector is chosen and ranks that scope's postings"""
+        scope, vector = skill_gap_index.select_vector(job_title='Sr. Data Analyst')
+        assert scope == 'role'
+        cutoff = datetime.combine(market_rollup_service.window_start(90), datetime.min.time())
+        analyst_rows = JobPostingKeyword.query.filter(
+            JobPostingKeyword.job_title.in_(['Senior Data Analyst', 'Data Analyst II']),
+            JobPostingKeyword.extracted_at >= cutoff
+        ).all()
+        assert vector['total_postings'] == len(analyst_rows)
+        assert vector['entries'][0][1] in ('sql', 'excel', 'tableau')
+
+        assert skill_gap_index.select_vector(job_title='Astronaut', industry='health')[0] == 'industry'
+        scope, merged = skill_gap_index.select_vector(industry='finance')
+        assert scope == 'industry'
+        assert merged['total_postings'] == sum(
+            1 for r in JobPostingKeyword.query if r.industry == 'Finance' and r.extracted_at >= cutoff
+        )
+        assert skill_gap_index.select_vector(job_title='Astronaut')[0] == 'all'
+
+    def test_endpoint_served_from_cached_vector(self, client, postings):
+        """Test repeat gap analyses touch no posting data"""
+        user = User(email='gap@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+        body = {'skills': ['SQL', 'Tableau'], 'job_title': 'Data Analyst'}
+
+        first = client.post('/api/market/skills/gap-analysis', json=body, headers=headers)
+        assert first.status_code == 200
+        assert first.get_json()['analysis']['demand_scope'] == 'role'
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            second = client.post('/api/market/skills/gap-analysis', json=body, headers=headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert second.get_json() == first.get_json()
+        assert not any('job_posting_keyword' in sql or 'skill_demand_daily' in sql for sql in statements)
+
+    def test_no_market_data_builds_once(self, app):
+        """Test an empty market is marked as computed instead of rebuilt on every request"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        assert skill_gap_index.analyze_gap(['python']) is None
+
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            assert skill_gap_index.analyze_gap(['python']) is None
+            assert market_rollup_service.ensure_rollup()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert not any('job_posting_keyword' in sql or 'DELETE' in sql for sql in statements)
+
+        # The scheduled refresh is what rebuilds
+        assert skill_gap_index.rebuild_vectors() == {'all': 1}
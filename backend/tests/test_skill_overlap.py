@@ -0,0 +1,84 @@
+import time
+import pytest
+from types import SimpleNamespace
+from models import db, Keyword
+from services import skill_overlap
+from services.skill_overlap import SkillOverlapEngine
+
+
+@pytest.fixture
+def engine(app):
+    db.session.add(Keyword(keyword='javascript', keyword_type='language', category='frontend',
+                           synonyms=['js', 'ecmascript']))
+    db.session.add(Keyword(keyword='machine learning', keyword_type='concept', category='ml',
+                           synonyms=['ml']))
+    db.session.add(Keyword(keyword='aws', keyword_type='technology', category='devops',
+                           synonyms=['amazon web services']))
+    db.session.commit()
+    engine = SkillOverlapEngine()
+    engine.refresh(force=True)
+    return engine
+
+
+class TestSkillOverlapEngine:
+    """Test set-based skill overlap scoring"""
+
+    def test_synonyms_map_to_same_keyword(self, engine):
+        """Test requirement synonyms resolve to the user's keyword"""
+        user_ids = engine.canonicalize_skills(['JS', 'ML'])
+        matching, missing = engine.match_requirements(
+            user_ids, ['JavaScript', 'Experience with machine learning', 'Amazon Web Services']
+        )
+        assert matching == ['JavaScript', 'Experience with machine learning']
+        assert missing == ['Amazon Web Services']
+
+    def test_unknown_terms_match_by_token(self, engine):
+        """Test terms missing from the keyword table still overlap on tokens"""
+        user_ids = engine.canonicalize_skills(['python', 'aws lambda'])
+        matching, missing = engine.match_requirements(
+            user_ids, ['Python 3', 'AWS', '5+ years experience', 'Kubernetes']
+        )
+        assert matching == ['Python 3', 'AWS']
+        assert missing == ['5+ years experience', 'Kubernetes']
+
+    def test_filler_words_do_not_match(self, engine):
+        """Test shared filler words are not counted as overlap"""
+        user_ids = engine.canonicalize_skills(['strong communication skills'])
+        matching, _ = engine.match_requirements(user_ids, ['Strong SQL skills'])
+        assert matching == []
+
+    def test_prefilter_ranks_by_overlap(self, engine):
+        """Test prefilter keeps the jobs with the best overlap, newest first on ties"""
+        jobs = [
+            SimpleNamespace(id=1, requirements=['Go', 'Rust']),
+            SimpleNamespace(id=2, requirements=['js', 'aws']),
+            SimpleNamespace(id=3, requirements=['javascript', 'Go']),
+            SimpleNamespace(id=4, requirements=['ecmascript', 'amazon web services']),
+        ]
+        top = engine.prefilter_jobs(['javascript', 'aws'], jobs, limit=3)
+        assert [job.id for job in top] == [2, 4, 3]
+
+    def test_term_cache_is_bounded(self, engine, monkeypatch):
+        """Test canonicalized terms are evicted LRU and dropped with the vocabulary"""
+        monkeypatch.setattr(skill_overlap, 'MAX_CACHED_TERMS', 2)
+        engine.refresh(force=True)
+        for term in ('js', 'ml', 'aws', 'js'):
+            engine.canonicalize(term)
+        assert len(engine._term_cache) == 2 and 'ml' not in engine._term_cache
+
+        engine.refresh(force=True)
+        assert len(engine._term_cache) == 0
+
+    def test_batch_scoring_throughput(self, engine):
+        """Test thousands of jobs score in a millisecond-scale batch once requirements are cached"""
+        requirements = [['JavaScript', 'AWS', f'Tool {i % 50}', 'Machine Learning'] for i in range(5000)]
+        jobs = [SimpleNamespace(id=i, requirements=reqs) for i, reqs in enumerate(requirements)]
+        engine.score_jobs(['js', 'ml'], jobs[:50])  # warm the canonicalization cache
+
+        start = time.perf_counter()
+        results = engine.score_jobs(['js', 'ml'], jobs)
+        elapsed = time.perf_counter() - start
+
+        assert len(results) == 5000
+        assert results[0]['matching'] == ['JavaScript', 'Machine Learning']
+        assert elapsed < 0.5
@@ -0,0 +1,53 @@
+from datetime import datetime
+from models import db, User, SubscriptionTier, CreditLedgerEntry
+from services import subscription_service
+from services.subscription_service import SubscriptionService
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return cls(2026, 2, 28, 2, 0)
+
+
+def make_subscriber(email, tier, start_day, credits=1, status='active'):
+    user = User(email=email, password_hash='x', credits=credits, subscription_tier=tier,
+                subscription_status=status, subscription_start_date=datetime(2025, 12, start_day))
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+class TestMonthlyCreditReset:
+    """Test the set-based monthly credit reset"""
+
+    def test_resets_anniversaries_in_batches(self, app, monkeypatch):
+        """Test end-of-month anniversaries, tier allowances and ledger entries"""
+        monkeypatch.setattr(subscription_service, 'datetime', FrozenDatetime)
+        db.session.add_all([
+            SubscriptionTier(name='pro', display_name='Pro', monthly_credits=20),
+            SubscriptionTier(name='elite', display_name='Elite', monthly_credits=50),
+            SubscriptionTier(name='student', display_name='Student', monthly_credits=10, is_active=False)
+        ])
+        db.session.commit()
+
+        due = [make_subscriber('day28@example.com', 'pro', 28, credits=3),
+               make_subscriber('day31@example.com', 'elite', 31, credits=60)]
+        skipped = [make_subscriber('day27@example.com', 'pro', 27),
+                   make_subscriber('cancelled@example.com', 'pro', 28, status='cancelled'),
+                   make_subscriber('free@example.com', 'free', 28),
+                   make_subscriber('student@example.com', 'student', 28)]
+
+        assert SubscriptionService.reset_monthly_credits(batch_size=2) == 2
+        db.session.expire_all()
+        assert [User.query.get(user_id).credits for user_id in due] == [20, 50]
+        assert [User.query.get(user_id).credits for user_id in skipped] == [1, 1, 1, 1]
+
+        entries = CreditLedgerEntry.query.order_by(CreditLedgerEntry.user_id).all()
+        assert [(e.user_id, e.kind, e.delta, e.balance_after, e.operation) for e in entries] == [
+            (due[0], 'reset', 17, 20, 'monthly_reset'), (due[1], 'reset', -10, 50, 'monthly_reset')
+        ]
+
+        # A rerun the same day leaves already reset users alone
+        assert SubscriptionService.reset_monthly_credits() == 0
+        assert CreditLedgerEntry.query.count() == 2
@@ -0,0 +1,65 @@
+import time
+from flask_jwt_extended import create_access_token
+from config_manager import get_config_manager
+from models import db, User, RateLimitConfig, SubscriptionTier
+from services import tier_rate_limiter
+
+
+class TestTierRateLimiter:
+    """Test per-user, per-tier, per-operation rate limits"""
+
+    def test_default_limits_and_retry_after(self, app, monkeypatch):
+        """Test GCRA buckets keyed on user, tier and operation"""
+        get_config_manager().clear_cache()
+        assert tier_rate_limiter.hit(1, 'free', 'analyze').allowed
+        assert tier_rate_limiter.hit(1, 'free', 'analyze').allowed
+        rejected = tier_rate_limiter.hit(1, 'free', 'analyze')
+        assert not rejected.allowed
+        assert 1790 <= rejected.retry_after <= 1800
+
+        # Other users, operations and tiers have their own buckets
+        assert tier_rate_limiter.hit(2, 'free', 'analyze').allowed
+        assert tier_rate_limiter.hit(1, 'free', 'feedback').allowed
+        assert tier_rate_limiter.hit(1, 'pro', 'analyze').allowed
+
+        # One request's worth of capacity returns after retry_after
+        later = time.time() + rejected.retry_after
+        monkeypatch.setattr(tier_rate_limiter.time, 'time', lambda: later)
+        assert tier_rate_limiter.hit(1, 'free', 'analyze').allowed
+        assert not tier_rate_limiter.hit(1, 'free', 'analyze').allowed
+
+    def test_limits_come_from_config(self, app):
+        """Test RateLimitConfig rows (tier, then default, then old names) and tier daily credits"""
+        db.session.add_all([
+            RateLimitConfig(operation='analyze', subscription_tier='free', requests_per_hour=10, requests_per_day=3),
+            RateLimitConfig(operation='optimization', subscription_tier='default', requests_per_hour=7, requests_per_day=50),
+            SubscriptionTier(name='pro', display_name='Pro', rate_limits={'daily_credits': 40})
+        ])
+        db.session.commit()
+        get_config_manager().clear_cache()
+
+        assert tier_rate_limiter.get_limits('free', 'analyze') == [(3600, 10), (86400, 3)]
+        assert tier_rate_limiter.get_limits('elite', 'optimize') == [(3600, 7), (86400, 50)]
+        assert tier_rate_limiter.get_limits('pro', 'cover_letter') == [(3600, 5)]
+        assert tier_rate_limiter.daily_credit_limit('pro') == 40
+        assert tier_rate_limiter.daily_credit_limit('elite') == 1000
+
+        # The daily window is the one that runs out first
+        results = [tier_rate_limiter.hit(7, 'free', 'analyze') for _ in range(4)]
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert results[-1].retry_after > 3600
+
+    def test_ai_route_sends_retry_after(self, client):
+        """Test an AI route rejects over-limit users with a Retry-After header"""
+        get_config_manager().clear_cache()
+        user = User(email='limited@example.com', password_hash='x', credits=10)
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+        # Free tier: 2 analyses per hour (these fail validation after admission)
+        for _ in range(2):
+            assert client.post('/api/analyze-intelligent', headers=headers).status_code == 400
+        response = client.post('/api/analyze-intelligent', headers=headers)
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) > 0
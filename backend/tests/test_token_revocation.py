@@ -0,0 +1,93 @@
+import time
+from unittest.mock import MagicMock
+from services import token_revocation
+from services.token_revocation import BloomFilter
+
+
+class TestTokenRevocation:
+    """Test local-first JWT revocation checks"""
+
+    def test_bloom_filter(self):
+        """Test no false negatives and a false positive rate near the target"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'revoked-{i}')
+        assert all(f'revoked-{i}' in bloom for i in range(1000))
+        false_positives = sum(f'valid-{i}' in bloom for i in range(10000))
+        assert false_positives < 300
+
+    def test_logout_revokes_token(self, client, auth_headers):
+        """Test both logout routes revoke the token they were called with"""
+        assert client.get('/api/v1/auth/me', headers=auth_headers).status_code == 200
+        assert client.post('/api/v1/auth/logout', headers=auth_headers).status_code == 200
+        assert client.get('/api/v1/auth/me', headers=auth_headers).status_code == 401
+
+        response = client.post('/api/v1/auth/login', json={
+            'email': 'test@example.com', 'password': 'testpassword123'
+        })
+        headers = {'Authorization': f"Bearer {response.get_json()['data']['access_token']}"}
+        assert client.post('/api/auth/logout', headers=headers).status_code == 200
+        assert client.get('/api/v1/auth/me', headers=headers).status_code == 401
+
+    def test_redis_consulted_only_on_filter_hits(self, monkeypatch):
+        """Test unrevoked tokens never reach Redis once the stream is followed"""
+        token_revocation.reset()
+        redis = MagicMock()
+        redis.exists.return_value = 1
+        monkeypatch.setattr(token_revocation, '_redis_client', redis)
+        monkeypatch.setattr(token_revocation, '_redis_checked', True)
+        monkeypatch.setattr(token_revocation, '_follower_pid', token_revocation.os.getpid())
+        monkeypatch.setattr(token_revocation, '_synced', True)
+        exp = time.time() + 600
+
+        # A revocation published by another worker arrives through the stream
+        token_revocation._apply_entries([('1-0', {'jti': 'elsewhere', 'exp': str(exp)})])
+        token_revocation.revoke('here', exp)
+        redis.pipeline.return_value.xadd.assert_called_once()
+
+        assert not token_revocation.is_revoked('never-revoked', exp)
+        redis.exists.assert_not_called()
+        assert token_revocation.is_revoked('elsewhere', exp)
+        assert token_revocation.is_revoked('here', exp)
+        assert redis.exists.call_count == 2
+
+        # Until the follower catches up, every check goes to Redis
+        monkeypatch.setattr(token_revocation, '_synced', False)
+        redis.exists.return_value = 0
+        assert not token_revocation.is_revoked('never-revoked', exp)
+        assert redis.exists.call_count == 3
+
+    def test_forked_worker_starts_unsynced(self, monkeypatch):
+        """Test a forked worker does not trust the parent's sync flag or filters"""
+        token_revocation.reset()
+        redis = MagicMock()
+        redis.exists.return_value = 1
+        threads = MagicMock()
+        monkeypatch.setattr(token_revocation.threading, 'Thread', threads)
+        monkeypatch.setattr(token_revocation, '_redis_client', redis)
+        monkeypatch.setattr(token_revocation, '_redis_checked', True)
+        monkeypatch.setattr(token_revocation, '_follower_pid', -1)  # Set by the parent process
+        monkeypatch.setattr(token_revocation, '_synced', True)
+        exp = time.time() + 600
+        token_revocation._apply_entries([('1-0', {'jti': 'inherited', 'exp': str(exp)})])
+
+        assert token_revocation.is_revoked('revoked-since-fork', exp)
+        redis.exists.assert_called_once()
+        threads.return_value.start.assert_called_once()
+        assert not token_revocation._synced and not token_revocation._filters
+
+    def test_generations_expire_with_tokens(self, monkeypatch):
+        """Test revocations leave the filter once their tokens have expired"""
+        token_revocation.reset()
+        now = time.time()
+        token_revocation.revoke('short', now + 60)
+        token_revocation.revoke('long', now + 3 * token_revocation.GENERATION_SECONDS)
+        assert token_revocation.is_revoked('short', now + 60)
+        assert len(token_revocation._filters) == 2
+
+        later = now + 2 * token_revocation.GENERATION_SECONDS
+        monkeypatch.setattr(token_revocation.time, 'time', lambda: later)
+        token_revocation.revoke('another', later + 60)
+        assert token_revocation._generation(now + 60) not in token_revocation._filters
+        assert 'short' not in token_revocation._local_revoked
+        assert token_revocation.is_revoked('long', now + 3 * token_revocation.GENERATION_SECONDS)
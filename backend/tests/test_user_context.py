@@ -0,0 +1,95 @@
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from middleware import require_permission
+from models import db, User, Role, Permission
+from services import user_context
+
+
+def count_statements(func):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, statements
+
+
+def make_user():
+    support = Role(name='support', permissions=[Permission(name='view_users'), Permission(name='view_logs')])
+    billing = Role(name='billing', permissions=[Permission(name='issue_refunds')])
+    user = User(email='staff@example.com', password_hash='x', roles=[support, billing])
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+class TestUserContext:
+    """Test the request-scoped user and permission resolver"""
+
+    def test_user_loaded_once_per_request(self, app):
+        """Test repeated loads in a request share one query, roles included"""
+        user_id = make_user()
+        db.session.expunge_all()
+
+        with app.test_request_context():
+            def load():
+                user = user_context.load_user(user_id)
+                assert user_context.load_user(str(user_id)) is user
+                return sorted(role.name for role in user.roles)
+
+            roles, statements = count_statements(load)
+            assert roles == ['billing', 'support']
+            assert len(statements) == 1
+
+        # A new request loads again
+        with app.test_request_context():
+            _, statements = count_statements(lambda: user_context.load_user(user_id))
+            assert len(statements) == 1
+
+    def test_permission_check_queries(self, app):
+        """Test require_permission costs two queries cold and one warm (was 2 + one per role)"""
+        user_id = make_user()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+        view = require_permission('issue_refunds')(lambda: 'ok')
+        denied = require_permission('delete_users')(lambda: 'ok')
+
+        def request(endpoint):
+            db.session.expunge_all()
+            with app.test_request_context(headers=headers):
+                return count_statements(endpoint)
+
+        result, statements = request(view)
+        assert result == 'ok'
+        assert len(statements) == 2
+        result, statements = request(view)
+        assert result == 'ok'
+        assert len(statements) == 1
+        (_, status), statements = request(denied)
+        assert status == 403
+        assert len(statements) == 1
+
+        # Before: the model walks roles and lazy-loads each role's permissions
+        db.session.expunge_all()
+        allowed, statements = count_statements(lambda: User.query.get(user_id).has_permission('issue_refunds'))
+        assert allowed
+        assert len(statements) == 4
+
+    def test_permission_cache_expires(self, app, monkeypatch):
+        """Test role permission changes are picked up after PERMISSION_CACHE_SECONDS"""
+        user_id = make_user()
+        user = User.query.get(user_id)
+        assert not user_context.has_permission(user, 'export_data')
+
+        role = Role.query.filter_by(name='support').first()
+        role.permissions.append(Permission(name='export_data'))
+        db.session.commit()
+        assert not user_context.has_permission(user, 'export_data')
+
+        now = user_context.time.monotonic()
+        monkeypatch.setattr(user_context.time, 'monotonic', lambda: now + user_context.PERMISSION_CACHE_SECONDS + 1)
+        assert user_context.has_permission(user, 'export_data')
+
+        user_context.clear_permission_cache()
+        assert user_context.get_permissions(user) == {'view_users', 'view_logs', 'issue_refunds', 'export_data'}
@@ -0,0 +1,79 @@
+import pytest
+from datetime import datetime, timedelta
+from models import db, User, Analysis, Keyword, UserSkillProfile
+from services import user_profile_service
+
+
+@pytest.fixture
+def user(app):
+    user = User(email='profile@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.add(Keyword(keyword='python', keyword_type='language', category='backend'))
+    db.session.add(Keyword(keyword='docker', keyword_type='tool', category='devops'))
+    db.session.commit()
+    return user
+
+
+def add_analysis(user, keywords, minutes_ago=0, industry='Technology'):
+    analysis = Analysis(
+        user_id=user.id,
+        match_score=70,
+        keywords_found=keywords,
+        detected_industry=industry,
+        created_at=datetime.utcnow() - timedelta(minutes=minutes_ago)
+    )
+    db.session.add(analysis)
+    db.session.commit()
+    return analysis
+
+
+class TestUserSkillProfile:
+    """Test materialized user skill profiles"""
+
+    def test_backfill_from_existing_analyses(self, user):
+        """Test profile is built from history on first access"""
+        add_analysis(user, ['Python', {'keyword': 'AWS'}], minutes_ago=10)
+        add_analysis(user, ['python', 'Docker'], minutes_ago=5)
+
+        profile = user_profile_service.get_profile(user.id)
+
+        assert profile.skill_names == ['aws', 'docker', 'python']
+        assert profile.analyses_count == 2
+        assert profile.industry == 'Technology'
+        python_id = Keyword.query.filter_by(keyword='python').first().id
+        docker_id = Keyword.query.filter_by(keyword='docker').first().id
+        assert profile.keyword_ids == sorted([python_id, docker_id])
+        assert user_profile_service.get_ranked_skills(user.id)[0] == 'python'
+
+    def test_incremental_update_decays_old_skills(self, user):
+        """Test skills not seen in recent analyses are pruned"""
+        first = add_analysis(user, ['cobol'])
+        user_profile_service.record_analysis(first, experience_level='senior')
+
+        for _ in range(user_profile_service.RECENT_ANALYSES):
+            user_profile_service.record_analysis(add_analysis(user, ['python']))
+
+        profile = UserSkillProfile.query.get(user.id)
+        assert profile.skill_names == ['python']
+        assert profile.experience_level == 'Senior'
+        assert profile.analyses_count == user_profile_service.RECENT_ANALYSES + 1
+
+    def test_rebuild_after_delete(self, user):
+        """Test rebuilding drops skills from deleted analyses"""
+        keep = add_analysis(user, ['python'], minutes_ago=5)
+        user_profile_service.record_analysis(keep)
+        removed = add_analysis(user, ['rust'])
+        user_profile_service.record_analysis(removed)
+        assert 'rust' in user_profile_service.get_user_skill_set(user.id)
+
+        db.session.delete(removed)
+        db.session.commit()
+        user_profile_service.rebuild_profile(user.id)
+
+        assert user_profile_service.get_user_skill_set(user.id) == {'python'}
+
+    def test_no_analyses(self, user):
+        """Test users without analyses have an empty profile"""
+        assert user_profile_service.get_profile(user.id) is None
+        assert user_profile_service.get_user_skill_set(user.id) == set()
+        assert user_profile_service.get_user_keyword_ids(user.id) == []